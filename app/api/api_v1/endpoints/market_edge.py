@@ -1,12 +1,19 @@
-from typing import Dict, List, Optional, Any
+import json
+from typing import AsyncIterator, Dict, List, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from datetime import datetime
 
+from ....core.config import settings
 from ....core.database import get_db
+from ....core.logging import logger
 from ....auth.dependencies import get_current_user
 from ....models.user import User
+from ....data.interfaces.base import DataPage
+from ....data.pagination import decode_cursor
+from ....data.platform_data_layer import PlatformDataLayer, get_platform_data_layer
 
 router = APIRouter(prefix="/market-edge", tags=["market-edge"])
 
@@ -471,4 +478,128 @@ async def compare_competitors(
                 }
             ]
         }
-    }
\ No newline at end of file
+    }
+
+
+async def get_data_layer() -> PlatformDataLayer:
+    """Platform data layer dependency for data-backed endpoints"""
+    if not settings.DATA_LAYER_ENABLED:
+        raise HTTPException(status_code=503, detail="Data layer is not enabled")
+    
+    try:
+        return await get_platform_data_layer()
+    except Exception as e:
+        logger.error(f"Failed to initialize platform data layer: {e}")
+        raise HTTPException(status_code=503, detail="Data layer unavailable")
+
+
+def _validate_cursor(cursor: Optional[str]) -> None:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+async def _ndjson_pages(pages: AsyncIterator[DataPage]) -> AsyncIterator[str]:
+    """
+    Serialize pages as newline-delimited JSON, one page per line
+    
+    Only the page being written is held in memory. The status code has
+    already been sent when a page fails, so failures are reported as a
+    final error line.
+    """
+    try:
+        async for page in pages:
+            yield json.dumps(
+                {"data": page.data, "count": len(page.data), "next_cursor": page.next_cursor},
+                default=str
+            ) + "\n"
+    except Exception as e:
+        logger.error(f"Market Edge data stream failed: {e}")
+        yield json.dumps({"error": "Data stream interrupted"}) + "\n"
+
+
+def _ndjson_response(pages: AsyncIterator[DataPage]) -> StreamingResponse:
+    return StreamingResponse(
+        _ndjson_pages(pages),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/markets/{market_id}/competitive-data/stream")
+async def stream_competitive_data(
+    market_id: str,
+    current_user: User = Depends(get_current_user),
+    data_layer: PlatformDataLayer = Depends(get_data_layer),
+    competitors: Optional[List[str]] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the last page of a previous response"),
+    page_size: int = Query(500, ge=1, le=5000),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows in this response")
+):
+    """Stream competitive intelligence for a market as NDJSON pages"""
+    _validate_cursor(cursor)
+    
+    date_range = None
+    if start_date or end_date:
+        date_range = {key: value for key, value in (("start_date", start_date), ("end_date", end_date)) if value}
+    
+    return _ndjson_response(data_layer.stream_competitive_intelligence(
+        org_id=str(current_user.organisation_id),
+        market=market_id,
+        competitors=competitors,
+        date_range=date_range,
+        cursor=cursor,
+        page_size=page_size,
+        limit=limit
+    ))
+
+
+@router.get("/markets/{market_id}/search/stream")
+async def stream_search_results(
+    market_id: str,
+    q: str = Query(..., min_length=1),
+    current_user: User = Depends(get_current_user),
+    data_layer: PlatformDataLayer = Depends(get_data_layer),
+    cursor: Optional[str] = Query(None),
+    page_size: int = Query(500, ge=1, le=5000),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Stream competitive intelligence search results as NDJSON pages"""
+    _validate_cursor(cursor)
+    
+    return _ndjson_response(data_layer.stream_search_results(
+        org_id=str(current_user.organisation_id),
+        search_query=q,
+        market=market_id,
+        cursor=cursor,
+        page_size=page_size,
+        limit=limit
+    ))
+
+
+@router.get("/markets/{market_id}/trending/stream")
+async def stream_trending_data(
+    market_id: str,
+    current_user: User = Depends(get_current_user),
+    data_layer: PlatformDataLayer = Depends(get_data_layer),
+    period: str = Query("7d", pattern="^(7d|30d|90d)$"),
+    cursor: Optional[str] = Query(None),
+    page_size: int = Query(500, ge=1, le=5000),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Stream trending competitive data for a market as NDJSON pages"""
+    _validate_cursor(cursor)
+    
+    return _ndjson_response(data_layer.stream_trending_data(
+        org_id=str(current_user.organisation_id),
+        market=market_id,
+        period=period,
+        cursor=cursor,
+        page_size=page_size,
+        limit=limit
+    ))
+
@@ -240,6 +240,7 @@ async def create_organization(
                 created_locations.append(location_node)
         
         db.commit()
+        await PermissionResolutionEngine(db).invalidate_tenant_permissions_cache(organization.id)
         
         logger.info(f"Created organization {organization.name} with hierarchy structure")
         
@@ -273,7 +274,7 @@ async def get_organization_structure(
     
     # Check access permissions
     permission_engine = PermissionResolutionEngine(db)
-    if not permission_engine.check_permission(current_user.id, "read"):
+    if not await permission_engine.check_permission(current_user.id, "read"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions to view organization structure"
@@ -435,6 +436,7 @@ async def create_hierarchy_node(
         
         db.add(new_node)
         db.commit()
+        await PermissionResolutionEngine(db).invalidate_node_permissions_cache(new_node)
         
         logger.info(f"Created hierarchy node: {new_node.name} at level {new_node.level.value}")
         
@@ -497,6 +499,7 @@ async def update_hierarchy_node(
             node.settings = str(request.settings).replace("'", '"')
         
         db.commit()
+        await PermissionResolutionEngine(db).invalidate_node_permissions_cache(node)
         
         logger.info(f"Updated hierarchy node: {node.name}")
         
@@ -604,8 +607,10 @@ async def delete_hierarchy_node(
         ).delete()
         
         # Delete the main node
+        tenant_id = node.legacy_organisation_id
         db.delete(node)
         db.commit()
+        await PermissionResolutionEngine(db).invalidate_tenant_permissions_cache(tenant_id)
         
         logger.info(f"Deleted hierarchy node: {node.name} (force={force})")
         
@@ -684,6 +689,7 @@ async def assign_user_to_node(
             ).update({"is_primary": False})
         
         db.commit()
+        await PermissionResolutionEngine(db).invalidate_node_permissions_cache(node)
         
         logger.info(f"Assigned user {user.email} to node {node.name} with role {request.role.value}")
         
@@ -721,7 +727,7 @@ async def get_user_permissions(
         )
     
     permission_engine = PermissionResolutionEngine(db)
-    resolved_permissions = permission_engine.resolve_user_permissions(
+    resolved_permissions = await permission_engine.resolve_user_permissions(
         user_id, context_node_id
     )
     
@@ -12,6 +12,7 @@ from ....models.user import User, UserRole
 from ....models.user_application_access import UserApplicationAccess, UserInvitation, ApplicationType, InvitationStatus
 from ....models.organisation import Organisation
 from ....auth.dependencies import get_current_user, get_current_active_user, require_admin, require_super_admin
+from ....auth.identity import invalidate_user
 from ....services.auth import send_invitation_email
 
 logger = logging.getLogger(__name__)
@@ -260,6 +261,7 @@ async def update_user(
     
     db.commit()
     db.refresh(user)
+    invalidate_user(user_id=user.id, email=user.email)
     
     return _format_user_response(user)
 
@@ -300,6 +302,7 @@ async def delete_user_admin(
     # Delete the user
     db.delete(user)
     db.commit()
+    invalidate_user(user_id=user.id, email=user.email)
 
     return {"message": f"User {user.email} deleted successfully"}
 
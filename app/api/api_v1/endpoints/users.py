@@ -5,6 +5,7 @@ from typing import List, Optional
 from ....core.database import get_db
 from ....models.user import User, UserRole
 from ....auth.dependencies import get_current_user, require_admin
+from ....auth.identity import invalidate_user
 
 router = APIRouter()
 
@@ -152,6 +153,7 @@ async def update_user(
     
     db.commit()
     db.refresh(user)
+    invalidate_user(user_id=user.id, email=user.email)
     
     return UserResponse(
         id=str(user.id),
@@ -1,7 +1,7 @@
 from typing import Optional, List, Dict, Any
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..core.database import get_db, get_async_db
@@ -9,113 +9,76 @@ from ..models.user import User, UserRole
 from ..models.organisation import Organisation
 from ..models.user_application_access import UserApplicationAccess, ApplicationType
 from .jwt import verify_token, extract_tenant_context_from_token, should_refresh_token
+from .token_cache import VerifiedTokenCache
+from .identity import resolve_user_by_email
+from .jwks import jwks_manager
 from ..auth.auth0 import auth0_client
 from ..core.config import settings
 from ..core.logging import logger
-import httpx
 from jose import jwt, jwk
 from jose.exceptions import JWTError, ExpiredSignatureError, JWTClaimsError
-import time
 from functools import lru_cache
 
 security = HTTPBearer(auto_error=False)  # Disable auto_error to handle manually
 
-# JWKS cache with timestamp for rotation handling
-_jwks_cache: Dict[str, Any] = {}
-_jwks_cache_timestamp: float = 0
-_jwks_cache_ttl: int = 3600  # Cache JWKS for 1 hour
+# Public keys of the last JWKS document seen, constructed once and indexed by kid
+_jwks_keys: Dict[str, Any] = {}
+_jwks_keys_source: Optional[Dict[str, Any]] = None
 
-async def get_auth0_jwks() -> Dict[str, Any]:
+# Claims of Auth0 tokens that passed verification
+auth0_token_cache = VerifiedTokenCache()
+
+
+def get_jwks_signing_keys(jwks: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Fetch Auth0 JWKS (JSON Web Key Set) with caching.
+    Signing keys of a JWKS document by kid, as constructed key objects
 
-    JWKS contains public keys used to verify JWT signatures.
-    Cached for 1 hour to reduce Auth0 API calls while allowing for key rotation.
+    Keys are built once per JWKS document, i.e. once per refresh, instead
+    of from the JWK on every verification.
     """
-    global _jwks_cache, _jwks_cache_timestamp
+    global _jwks_keys, _jwks_keys_source
 
-    current_time = time.time()
+    if jwks is not _jwks_keys_source:
+        keys = {}
+        for key in jwks.get("keys", []):
+            try:
+                keys[key.get("kid")] = jwk.construct(key, algorithm="RS256")
+            except Exception as key_error:
+                logger.error("Failed to construct RSA key from JWKS", extra={
+                    "event": "auth0_verify_key_construction_failed",
+                    "error": str(key_error),
+                    "key_id": key.get("kid")
+                })
+        _jwks_keys, _jwks_keys_source = keys, jwks
 
-    # Return cached JWKS if still valid
-    if _jwks_cache and (current_time - _jwks_cache_timestamp) < _jwks_cache_ttl:
-        logger.debug("Using cached JWKS", extra={
-            "event": "jwks_cache_hit",
-            "cache_age_seconds": int(current_time - _jwks_cache_timestamp)
-        })
-        return _jwks_cache
+    return _jwks_keys
 
-    # Fetch fresh JWKS from Auth0
-    jwks_url = f"https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json"
 
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            logger.debug("Fetching JWKS from Auth0", extra={
-                "event": "jwks_fetch_start",
-                "jwks_url": jwks_url
-            })
+def get_auth0_issuer() -> str:
+    return f"https://{settings.AUTH0_DOMAIN}/"
 
-            response = await client.get(jwks_url)
-            response.raise_for_status()
 
-            jwks = response.json()
+def get_unverified_issuer(token: str) -> Optional[str]:
+    """The token's iss claim, read without verification, for routing only"""
+    try:
+        return jwt.get_unverified_claims(token).get("iss")
+    except JWTError:
+        return None
 
-            # Validate JWKS structure
-            if not jwks.get("keys") or not isinstance(jwks["keys"], list):
-                logger.error("Invalid JWKS structure from Auth0", extra={
-                    "event": "jwks_invalid_structure",
-                    "has_keys": "keys" in jwks
-                })
-                # If we have cached JWKS, return it as fallback
-                if _jwks_cache:
-                    logger.warning("Using stale JWKS cache due to invalid fetch")
-                    return _jwks_cache
-                raise ValueError("Invalid JWKS structure")
-
-            # Update cache
-            _jwks_cache = jwks
-            _jwks_cache_timestamp = current_time
-
-            logger.info("Successfully fetched and cached JWKS", extra={
-                "event": "jwks_fetch_success",
-                "key_count": len(jwks["keys"])
-            })
 
-            return jwks
+async def get_auth0_jwks() -> Dict[str, Any]:
+    """
+    Auth0 JWKS (JSON Web Key Set), the public keys used to verify JWT signatures.
 
-    except httpx.TimeoutException as e:
-        logger.error("Timeout fetching JWKS from Auth0", extra={
-            "event": "jwks_fetch_timeout",
-            "error": str(e)
-        })
-        # Return cached JWKS if available
-        if _jwks_cache:
-            logger.warning("Using stale JWKS cache due to timeout")
-            return _jwks_cache
-        raise
-
-    except httpx.HTTPError as e:
-        logger.error("HTTP error fetching JWKS from Auth0", extra={
-            "event": "jwks_fetch_http_error",
-            "error": str(e),
-            "status_code": getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
-        })
-        # Return cached JWKS if available
-        if _jwks_cache:
-            logger.warning("Using stale JWKS cache due to HTTP error")
-            return _jwks_cache
-        raise
+    Served from memory by jwks_manager, which refreshes it in the background
+    ahead of its 1 hour TTL and falls back to the last good document.
+    """
+    return await jwks_manager.get_jwks()
 
-    except Exception as e:
-        logger.error("Unexpected error fetching JWKS", extra={
-            "event": "jwks_fetch_error",
-            "error": str(e),
-            "error_type": type(e).__name__
-        })
-        # Return cached JWKS if available
-        if _jwks_cache:
-            logger.warning("Using stale JWKS cache due to unexpected error")
-            return _jwks_cache
-        raise
+
+async def refresh_auth0_jwks(key_id: str) -> Dict[str, Any]:
+    """Auth0 JWKS refreshed early for a key id it does not contain (rate-limited)"""
+    return await jwks_manager.refresh_for_unknown_kid(key_id)
 
 
 async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
@@ -138,6 +101,10 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
     validated via userinfo endpoint which could accept invalid tokens if Auth0's
     userinfo endpoint was compromised or returned cached data.
     """
+    cached_payload = auth0_token_cache.get(token)
+    if cached_payload is not None:
+        return cached_payload
+
     try:
         # STEP 1: Get JWKS (public keys) from Auth0
         try:
@@ -168,13 +135,14 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
             return None
 
         # STEP 3: Find matching key in JWKS
-        signing_key = None
-        for key in jwks.get("keys", []):
-            if key.get("kid") == key_id:
-                signing_key = key
-                break
+        public_key = get_jwks_signing_keys(jwks).get(key_id)
+
+        if public_key is None:
+            # Possibly a rotated key: refresh once and look again
+            jwks = await refresh_auth0_jwks(key_id)
+            public_key = get_jwks_signing_keys(jwks).get(key_id)
 
-        if not signing_key:
+        if public_key is None:
             logger.warning("Signing key not found in JWKS", extra={
                 "event": "auth0_verify_key_not_found",
                 "key_id": key_id,
@@ -184,58 +152,45 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
 
         # STEP 4: Verify signature and decode token
         try:
-            # Construct RSA public key from JWKS entry using jose.jwk
-            # CRITICAL FIX: Must use jwk.construct() to properly build the key for jose library
-            try:
-                constructed_key = jwk.construct(signing_key)
-                public_key = constructed_key.to_pem().decode('utf-8')
-            except Exception as key_error:
-                logger.error("Failed to construct RSA key from JWKS", extra={
-                    "event": "auth0_verify_key_construction_failed",
-                    "error": str(key_error),
-                    "key_id": signing_key.get("kid")
+            # Auth0 audience can be the client_id OR the userinfo endpoint,
+            # depending on the Auth0 configuration. The unverified claims pick
+            # which one to validate against so the token is decoded once; a
+            # token from another issuer cannot pass and is rejected up front.
+            decoded = None
+            last_error = None
+            issuer = get_auth0_issuer()
+
+            unverified_claims = jwt.get_unverified_claims(token)
+            if unverified_claims.get("iss") != issuer:
+                logger.warning("Token issuer is not Auth0", extra={
+                    "event": "auth0_verify_wrong_issuer",
+                    "issuer": unverified_claims.get("iss")
                 })
                 return None
 
-            # Verify JWT signature and decode with claim validation
-            # Note: Auth0 audience can be the client_id OR a custom API audience
-            # We'll try both to support different Auth0 configurations
-            decoded = None
-            last_error = None
+            token_audiences = unverified_claims.get("aud") or []
+            if isinstance(token_audiences, str):
+                token_audiences = [token_audiences]
+
+            if settings.AUTH0_CLIENT_ID in token_audiences:
+                audience = settings.AUTH0_CLIENT_ID
+            elif f"{issuer}userinfo" in token_audiences:
+                audience = f"{issuer}userinfo"
+            else:
+                audience = None
+                logger.warning("Token audience validation failed, attempting without audience check", extra={
+                    "event": "auth0_verify_audience_bypass",
+                    "token_audiences": token_audiences
+                })
 
-            # Try with client_id as audience (default Auth0 configuration)
-            try:
-                decoded = jwt.decode(
-                    token,
-                    public_key,
-                    algorithms=["RS256"],
-                    audience=settings.AUTH0_CLIENT_ID,
-                    issuer=f"https://{settings.AUTH0_DOMAIN}/"
-                )
-            except JWTClaimsError as e:
-                last_error = e
-                # If audience validation fails, try with userinfo endpoint as audience
-                try:
-                    decoded = jwt.decode(
-                        token,
-                        public_key,
-                        algorithms=["RS256"],
-                        audience=f"https://{settings.AUTH0_DOMAIN}/userinfo",
-                        issuer=f"https://{settings.AUTH0_DOMAIN}/"
-                    )
-                except JWTClaimsError:
-                    # If that also fails, try without audience validation (log warning)
-                    logger.warning("Token audience validation failed, attempting without audience check", extra={
-                        "event": "auth0_verify_audience_bypass",
-                        "error": str(e)
-                    })
-                    decoded = jwt.decode(
-                        token,
-                        public_key,
-                        algorithms=["RS256"],
-                        issuer=f"https://{settings.AUTH0_DOMAIN}/",
-                        options={"verify_aud": False}  # Skip audience validation
-                    )
+            decoded = jwt.decode(
+                token,
+                public_key,
+                algorithms=["RS256"],
+                audience=audience,
+                issuer=issuer,
+                options={"verify_aud": audience is not None}
+            )
 
             if not decoded:
                 logger.error("Failed to decode token", extra={
@@ -281,7 +236,7 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
 
             # Return payload directly (JWT signature already verified)
             # Extract relevant claims for application use
-            return {
+            payload = {
                 "sub": decoded.get("sub"),
                 "email": decoded.get("email"),
                 "user_role": decoded.get("user_role", "viewer"),
@@ -295,6 +250,8 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
                 "iat": decoded.get("iat"),
                 "permissions": decoded.get("permissions", [])
             }
+            auth0_token_cache.set(token, payload)
+            return payload
 
         # Production mode: Verify with userinfo endpoint
         try:
@@ -308,7 +265,7 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
 
             # Merge decoded JWT claims with user info (JWT claims take precedence)
             # Extract relevant claims for application use
-            return {
+            payload = {
                 "sub": decoded.get("sub") or user_info.get("sub"),
                 "email": user_info.get("email") or decoded.get("email"),
                 "user_role": user_info.get("user_role", "viewer"),
@@ -322,6 +279,8 @@ async def verify_auth0_token(token: str) -> Optional[Dict[str, Any]]:
                 "iat": decoded.get("iat"),
                 "permissions": user_info.get("permissions", []) or decoded.get("permissions", [])
             }
+            auth0_token_cache.set(token, payload)
+            return payload
 
         except Exception as e:
             logger.warning("Userinfo secondary validation failed (JWT still valid)", extra={
@@ -378,8 +337,11 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify token with enhanced validation
-    payload = verify_token(credentials.credentials, expected_type="access")
+    # Verify token with enhanced validation. Tokens issued by Auth0 go
+    # straight to Auth0 verification; they can never pass the internal check
+    payload = None
+    if get_unverified_issuer(credentials.credentials) != get_auth0_issuer():
+        payload = verify_token(credentials.credentials, expected_type="access")
     
     # CRITICAL FIX: Fallback to Auth0 token verification if internal JWT fails
     # This supports Matt.Lindop's Auth0 tokens for the £925K Zebra opportunity
@@ -428,13 +390,9 @@ async def get_current_user(
         })
         raise credentials_exception
 
-    # Get user with organization loaded - using async query BY EMAIL
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.organisation))
-        .filter(User.email == user_email)
-    )
-    user = result.scalar_one_or_none()
+    # Get user with organization loaded BY EMAIL - shared with the rest of
+    # the request and, for a short TTL, with later requests
+    user = await resolve_user_by_email(user_email, db)
     if user is None:
         logger.warning("User not found by email", extra={
             "event": "auth_user_not_found",
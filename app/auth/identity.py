@@ -0,0 +1,282 @@
+"""
+Identity Resolver
+
+A single request can look up its user from several places: get_current_user,
+the module auth middleware, the auth context cache and the session and JWT
+services. They all resolve through here instead of querying independently.
+
+Users are kept as column snapshots of the user and their organisation, in
+two layers:
+- a request-scoped memo held in a contextvar, installed per request by
+  IdentityScopeMiddleware, so one request queries a user at most once
+- a short-TTL, per-worker cache keyed by email and by id, shared across
+  requests and dropped by invalidate_user / invalidate_organisation when a
+  user or organisation is updated
+
+A snapshot is turned back into a User without a query: it is rebuilt as a
+detached instance and, when the caller has a session, merged into it with
+load=False so endpoints can keep modifying and committing the user they get.
+Inactive users are resolved like any other; callers keep their own
+is_active checks. Missing users are never cached.
+"""
+import contextvars
+import copy
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from ..core.config import settings
+from ..core.database import get_async_session_local
+from ..models.organisation import Organisation
+from ..models.user import User
+
+
+@dataclass(frozen=True)
+class IdentitySnapshot:
+    """Loaded column values of a user and their organisation"""
+    user: Dict[str, Any]
+    organisation: Optional[Dict[str, Any]]
+
+    @property
+    def user_id(self) -> str:
+        return str(self.user["id"])
+
+    @property
+    def email(self) -> str:
+        return self.user["email"]
+
+    @property
+    def organisation_id(self) -> str:
+        return str(self.user["organisation_id"])
+
+
+def _column_values(instance: Any) -> Dict[str, Any]:
+    state = inspect(instance)
+    return {
+        attr.key: copy.deepcopy(state.dict[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def snapshot_user(user: User) -> IdentitySnapshot:
+    """Snapshot a user loaded with their organisation"""
+    organisation = inspect(user).dict.get("organisation")
+    return IdentitySnapshot(
+        user=_column_values(user),
+        organisation=_column_values(organisation) if organisation is not None else None,
+    )
+
+
+def _detached(model: type, values: Dict[str, Any]) -> Any:
+    instance = inspect(model).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(instance, key, copy.deepcopy(value))
+    make_transient_to_detached(instance)
+    return instance
+
+
+def materialize(snapshot: IdentitySnapshot) -> User:
+    """A detached User, with organisation loaded, rebuilt from a snapshot"""
+    user = _detached(User, snapshot.user)
+    organisation = _detached(Organisation, snapshot.organisation) if snapshot.organisation is not None else None
+    set_committed_value(user, "organisation", organisation)
+    return user
+
+
+class IdentityCache:
+    """Bounded LRU of identity snapshots, reachable by email and by id"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.maxsize = maxsize if maxsize is not None else settings.IDENTITY_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.IDENTITY_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, Tuple[float, IdentitySnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[IdentitySnapshot]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, snapshot: IdentitySnapshot) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key in (email_key(snapshot.email), id_key(snapshot.user_id)):
+                self._entries[key] = (expires_at, snapshot)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id: Optional[str] = None, email: Optional[str] = None) -> None:
+        """Drop a user under both of its keys"""
+        keys = set()
+        if user_id is not None:
+            keys.add(id_key(user_id))
+        if email is not None:
+            keys.add(email_key(email))
+        with self._lock:
+            for key in list(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    keys.update((email_key(entry[1].email), id_key(entry[1].user_id)))
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def discard_organisation(self, organisation_id: str) -> None:
+        """Drop every user of an organisation"""
+        organisation_id = str(organisation_id)
+        with self._lock:
+            stale = [key for key, (_, snapshot) in self._entries.items()
+                     if snapshot.organisation_id == organisation_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def email_key(email: str) -> str:
+    return f"email:{email}"
+
+
+def id_key(user_id: Any) -> str:
+    return f"id:{user_id}"
+
+
+# Shared across requests in this worker
+identity_cache = IdentityCache()
+
+# Snapshots resolved by the current request; None outside identity_scope()
+_request_identities: contextvars.ContextVar[Optional[Dict[str, IdentitySnapshot]]] = contextvars.ContextVar(
+    "request_identities", default=None
+)
+
+
+@contextmanager
+def identity_scope() -> Iterator[None]:
+    """Memoise users resolved within the block, e.g. one request"""
+    token = _request_identities.set({})
+    try:
+        yield
+    finally:
+        _request_identities.reset(token)
+
+
+def _lookup(key: str) -> Optional[IdentitySnapshot]:
+    memo = _request_identities.get()
+    if memo is not None and key in memo:
+        return memo[key]
+    snapshot = identity_cache.get(key)
+    if snapshot is not None and memo is not None:
+        memo[key] = snapshot
+    return snapshot
+
+
+def _remember(snapshot: IdentitySnapshot) -> None:
+    identity_cache.set(snapshot)
+    memo = _request_identities.get()
+    if memo is not None:
+        memo[email_key(snapshot.email)] = snapshot
+        memo[id_key(snapshot.user_id)] = snapshot
+
+
+async def _merge(db: AsyncSession, model: type, values: Dict[str, Any]) -> Any:
+    # A copy already in the session may carry changes merge would overwrite
+    existing = db.identity_map.get(identity_key(model, values["id"]))
+    if existing is not None:
+        return existing
+    return await db.merge(_detached(model, values), load=False)
+
+
+async def _attach(snapshot: IdentitySnapshot, db: Optional[AsyncSession]) -> User:
+    if db is None:
+        return materialize(snapshot)
+    user = await _merge(db, User, snapshot.user)
+    if snapshot.organisation is not None and "organisation" not in inspect(user).dict:
+        set_committed_value(user, "organisation", await _merge(db, Organisation, snapshot.organisation))
+    return user
+
+
+async def _load(db: AsyncSession, criterion) -> Optional[User]:
+    result = await db.execute(
+        select(User).options(selectinload(User.organisation)).filter(criterion)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _resolve(key: str, criterion, db: Optional[AsyncSession]) -> Optional[User]:
+    snapshot = _lookup(key)
+    if snapshot is not None:
+        return await _attach(snapshot, db)
+
+    if db is not None:
+        user = await _load(db, criterion)
+        if user is not None:
+            _remember(snapshot_user(user))
+        return user
+
+    async with get_async_session_local()() as session:
+        user = await _load(session, criterion)
+    if user is None:
+        return None
+    snapshot = snapshot_user(user)
+    _remember(snapshot)
+    return materialize(snapshot)
+
+
+async def resolve_user_by_email(email: str, db: Optional[AsyncSession] = None) -> Optional[User]:
+    """
+    The user with this email, organisation loaded, or None
+
+    With a session the user is returned attached to it; without one, a
+    detached copy is returned and any query runs on a short-lived session.
+    """
+    return await _resolve(email_key(email), User.email == email, db)
+
+
+async def resolve_user_by_id(user_id: Any, db: Optional[AsyncSession] = None) -> Optional[User]:
+    """The user with this id, organisation loaded, or None; see resolve_user_by_email"""
+    return await _resolve(id_key(user_id), User.id == user_id, db)
+
+
+def invalidate_user(user_id: Any = None, email: Optional[str] = None) -> None:
+    """Forget a user after it is updated or deleted; call after commit"""
+    user_id = str(user_id) if user_id is not None else None
+    identity_cache.discard_user(user_id=user_id, email=email)
+    memo = _request_identities.get()
+    if memo is not None:
+        for key in [key for key, snapshot in memo.items()
+                    if snapshot.user_id == user_id or snapshot.email == email]:
+            del memo[key]
+
+
+def invalidate_organisation(organisation_id: Any) -> None:
+    """Forget every user of an organisation after it is updated or deleted"""
+    identity_cache.discard_organisation(str(organisation_id))
+    memo = _request_identities.get()
+    if memo is not None:
+        for key in [key for key, snapshot in memo.items()
+                    if snapshot.organisation_id == str(organisation_id)]:
+            del memo[key]
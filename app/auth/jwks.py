@@ -0,0 +1,256 @@
+"""
+Auth0 JWKS Manager
+
+Keeps Auth0's signing keys (/.well-known/jwks.json) in memory for token
+verification:
+- a background task refreshes the document ahead of its TTL, so requests
+  never wait on a fetch in steady state
+- concurrent fetches are coalesced into one, over a pooled HTTP client
+- a token signed with an unknown kid triggers an immediate refresh, at most
+  once per interval, to pick up rotated keys
+- when Auth0 cannot be reached the last good document keeps being served
+
+The endpoint is AUTH0_JWKS_URL when set, so tests and local setups can point
+it at a stub; an httpx transport can also be passed in directly.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..core.config import settings
+from ..core.logging import logger
+
+
+class JWKSManager:
+    """Cached, background-refreshed JWKS document of one issuer"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        refresh_ahead_seconds: Optional[float] = None,
+        unknown_kid_interval_seconds: Optional[float] = None,
+        retry_seconds: float = 30.0,
+        timeout_seconds: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._url = url
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.JWKS_CACHE_TTL_SECONDS
+        self.refresh_ahead_seconds = (
+            refresh_ahead_seconds if refresh_ahead_seconds is not None
+            else settings.JWKS_REFRESH_AHEAD_SECONDS
+        )
+        self.unknown_kid_interval_seconds = (
+            unknown_kid_interval_seconds if unknown_kid_interval_seconds is not None
+            else settings.JWKS_UNKNOWN_KID_REFRESH_INTERVAL_SECONDS
+        )
+        self.retry_seconds = retry_seconds
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._jwks: Dict[str, Any] = {}
+        self._fetched_at: float = 0.0
+        self._failed_at: Optional[float] = None
+        self._unknown_kid_refreshed_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fetch_count = 0
+
+    @property
+    def url(self) -> str:
+        return self._url or settings.AUTH0_JWKS_URL or f"https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json"
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    def _is_fresh(self) -> bool:
+        return bool(self._jwks) and self.age_seconds < self.ttl_seconds
+
+    def _in_retry_backoff(self) -> bool:
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds
+
+    def _has_kid(self, kid: str) -> bool:
+        return any(key.get("kid") == kid for key in self._jwks.get("keys", []))
+
+    async def get_jwks(self) -> Dict[str, Any]:
+        """The current JWKS document, fetching it only when there is none or it has expired"""
+        if self._is_fresh():
+            if not self.is_running and self.age_seconds >= self.ttl_seconds - self.refresh_ahead_seconds:
+                # No refresher task (e.g. outside the app): refresh ahead from here
+                self._refresh_soon()
+            return self._jwks
+
+        if self._jwks and self._in_retry_backoff():
+            return self._jwks
+
+        try:
+            return await self.refresh()
+        except Exception:
+            if self._jwks:
+                logger.warning("Using stale JWKS cache after failed refresh", extra={
+                    "event": "jwks_stale_fallback",
+                    "cache_age_seconds": int(self.age_seconds)
+                })
+                return self._jwks
+            raise
+
+    async def refresh_for_unknown_kid(self, kid: str) -> Dict[str, Any]:
+        """
+        Refresh early for a kid missing from the document, as after a key rotation
+
+        Forced refreshes are limited to one per unknown_kid_interval_seconds so
+        tokens with made-up kids cannot hammer Auth0.
+        """
+        if self._has_kid(kid):
+            return self._jwks
+
+        if self._inflight is None or self._inflight.done():
+            now = time.monotonic()
+            if (self._unknown_kid_refreshed_at is not None
+                    and now - self._unknown_kid_refreshed_at < self.unknown_kid_interval_seconds):
+                return self._jwks
+            self._unknown_kid_refreshed_at = now
+            logger.info("Refreshing JWKS for unknown key id", extra={
+                "event": "jwks_unknown_kid_refresh",
+                "key_id": kid
+            })
+
+        try:
+            return await self.refresh()
+        except Exception:
+            return self._jwks
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Fetch the document now; concurrent callers share a single fetch"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self._inflight)
+
+    def _refresh_soon(self) -> None:
+        if self._inflight is None or self._inflight.done():
+            asyncio.ensure_future(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            pass
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+            )
+        return self._client
+
+    async def _fetch(self) -> Dict[str, Any]:
+        url = self.url
+        self.fetch_count += 1
+        logger.debug("Fetching JWKS from Auth0", extra={
+            "event": "jwks_fetch_start",
+            "jwks_url": url
+        })
+
+        try:
+            response = await self._get_client().get(url)
+            response.raise_for_status()
+            jwks = response.json()
+
+        except httpx.TimeoutException as e:
+            self._failed_at = time.monotonic()
+            logger.error("Timeout fetching JWKS from Auth0", extra={
+                "event": "jwks_fetch_timeout",
+                "error": str(e)
+            })
+            raise
+
+        except httpx.HTTPError as e:
+            self._failed_at = time.monotonic()
+            logger.error("HTTP error fetching JWKS from Auth0", extra={
+                "event": "jwks_fetch_http_error",
+                "error": str(e),
+                "status_code": getattr(getattr(e, "response", None), "status_code", None)
+            })
+            raise
+
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            logger.error("Unexpected error fetching JWKS", extra={
+                "event": "jwks_fetch_error",
+                "error": str(e),
+                "error_type": type(e).__name__
+            })
+            raise
+
+        if not isinstance(jwks, dict) or not isinstance(jwks.get("keys"), list) or not jwks["keys"]:
+            self._failed_at = time.monotonic()
+            logger.error("Invalid JWKS structure from Auth0", extra={
+                "event": "jwks_invalid_structure",
+                "has_keys": isinstance(jwks, dict) and "keys" in jwks
+            })
+            raise ValueError("Invalid JWKS structure")
+
+        self._jwks = jwks
+        self._fetched_at = time.monotonic()
+        self._failed_at = None
+
+        logger.info("Successfully fetched and cached JWKS", extra={
+            "event": "jwks_fetch_success",
+            "key_count": len(jwks["keys"])
+        })
+        return jwks
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start background refreshing on the running event loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        """Stop background refreshing without waiting for the task to exit"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self) -> None:
+        """Stop background refreshing and close the HTTP client"""
+        task = self._task
+        self.cancel()
+        if task:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            if self._jwks:
+                await asyncio.sleep(max(self.ttl_seconds - self.refresh_ahead_seconds - self.age_seconds, 1.0))
+            try:
+                await self.refresh()
+            except Exception:
+                await asyncio.sleep(self.retry_seconds)
+
+    def clear(self) -> None:
+        """Forget the cached document"""
+        self._jwks = {}
+        self._fetched_at = 0.0
+        self._failed_at = None
+        self._unknown_kid_refreshed_at = None
+
+
+# Auth0 signing keys shared by every request in this worker
+jwks_manager = JWKSManager()
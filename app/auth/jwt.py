@@ -5,9 +5,13 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..core.config import settings
 from ..core.logging import logger
+from .token_cache import VerifiedTokenCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Claims of internal tokens that passed verification
+verified_token_cache = VerifiedTokenCache()
+
 
 def create_access_token(
     data: Dict[str, Any], 
@@ -123,8 +127,9 @@ def create_refresh_token(
 def verify_token(token: str, expected_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """Verify JWT token with enhanced validation"""
     try:
-        # Decode and verify token
-        payload = jwt.decode(
+        # Decode and verify token, unless it was verified recently
+        cached_payload = verified_token_cache.get(token)
+        payload = cached_payload or jwt.decode(
             token, 
             settings.JWT_SECRET_KEY, 
             algorithms=[settings.JWT_ALGORITHM],
@@ -158,6 +163,9 @@ def verify_token(token: str, expected_type: Optional[str] = None) -> Optional[Di
                 }
             )
             return None
+        
+        if cached_payload is None:
+            verified_token_cache.set(token, payload)
             
         logger.debug(
             "Token verification successful",
@@ -0,0 +1,70 @@
+"""
+Verified Token Cache
+
+Clients send the same bearer token on every request until it expires, so
+the claims of a token that passed verification are kept for a short TTL
+and reused without re-checking its signature. Entries are keyed by a hash
+of the token, never the token itself, and never outlive the token's exp.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims with per-entry expiry"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.maxsize = maxsize if maxsize is not None else settings.TOKEN_VERIFICATION_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.TOKEN_VERIFICATION_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a previously verified token, or None"""
+        key = token_hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(claims)
+
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        """Remember claims that passed verification, until the TTL or the token's exp"""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+
+        key = token_hash(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -282,27 +282,21 @@ class AuthContextCache:
     async def _verify_cached_user(self, user_id: str) -> Optional['User']:
         """Verify cached user is still active and valid"""
         try:
-            from sqlalchemy import select
-            from ..models.user import User
-            from ..core.database import get_db
+            from ..auth.identity import resolve_user_by_id
             
-            async for db_session in get_db():
-                try:
-                    stmt = select(User).where(User.id == user_id)
-                    result = await db_session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    
-                    # Verify user exists and is active
-                    if user and user.is_active:
-                        return user
-                    elif user and not user.is_active:
-                        logger.warning(f"Cached user {user_id} is inactive")
-                    else:
-                        logger.warning(f"Cached user {user_id} not found in database")
-                    break
-                except Exception as db_error:
-                    logger.error(f"Database error verifying user {user_id}: {str(db_error)}")
-                    break
+            try:
+                user = await resolve_user_by_id(user_id)
+            except Exception as db_error:
+                logger.error(f"Database error verifying user {user_id}: {str(db_error)}")
+                return None
+            
+            # Verify user exists and is active
+            if user and user.is_active:
+                return user
+            elif user and not user.is_active:
+                logger.warning(f"Cached user {user_id} is inactive")
+            else:
+                logger.warning(f"Cached user {user_id} not found in database")
             
             return None
         except Exception as e:
@@ -0,0 +1,56 @@
+"""
+Bloom Filter
+
+A fixed-size set-membership filter: might_contain never returns False for an
+added item, and returns True for an item never added with probability
+false_positive_rate once `capacity` items are in. Items cannot be removed;
+rebuild a new filter instead.
+"""
+import hashlib
+import math
+from typing import Iterable
+
+
+class BloomFilter:
+    """Bit array with k positions per item from two halves of one BLAKE2b digest"""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.num_bits = max(int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], capacity: int, false_positive_rate: float = 0.001) -> "BloomFilter":
+        items = list(items)
+        bloom = cls(max(capacity, len(items) * 2), false_positive_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __contains__(self, item: str) -> bool:
+        return self.might_contain(item)
+
+    @property
+    def is_saturated(self) -> bool:
+        """More items than it was sized for; false positives rise past the target rate"""
+        return self.count > self.capacity
@@ -81,6 +81,54 @@ class Settings(BaseSettings):
         default=False,
         description="Skip Auth0 /userinfo verification to avoid rate limiting. JWT signature still verified. Use for staging/testing only."
     )
+    TOKEN_VERIFICATION_CACHE_TTL_SECONDS: int = Field(
+        default=60,
+        description="Seconds a verified bearer token's claims are reused without re-verifying; never beyond the token's exp"
+    )
+    TOKEN_VERIFICATION_CACHE_SIZE: int = Field(
+        default=10000,
+        description="Most verified tokens kept per worker"
+    )
+    AUTH0_JWKS_URL: Optional[str] = Field(
+        default=None,
+        description="JWKS endpoint override, e.g. a local stub; defaults to https://AUTH0_DOMAIN/.well-known/jwks.json"
+    )
+    JWKS_CACHE_TTL_SECONDS: int = Field(
+        default=3600,
+        description="Seconds a fetched JWKS document is used before it must be refetched"
+    )
+    JWKS_REFRESH_AHEAD_SECONDS: int = Field(
+        default=300,
+        description="How long before the JWKS TTL runs out the background refresh fetches a new document"
+    )
+    JWKS_UNKNOWN_KID_REFRESH_INTERVAL_SECONDS: int = Field(
+        default=60,
+        description="Minimum seconds between JWKS refreshes forced by tokens with an unknown key id"
+    )
+    TOKEN_BLACKLIST_FILTER_CAPACITY: int = Field(
+        default=100000,
+        description="Revoked token JTIs the per-worker Bloom filter is sized for at a 0.1% false-positive rate"
+    )
+    TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS: int = Field(
+        default=300,
+        description="Seconds between rebuilds of the revoked-token filter from Redis, dropping expired JTIs"
+    )
+    IDENTITY_CACHE_TTL_SECONDS: int = Field(
+        default=30,
+        description="Seconds a resolved user is reused across requests; updates in this worker invalidate it immediately"
+    )
+    IDENTITY_CACHE_SIZE: int = Field(
+        default=10000,
+        description="Most resolved users kept per worker"
+    )
+    FEATURE_FLAG_SNAPSHOT_MAX_AGE_SECONDS: int = Field(
+        default=300,
+        description="Seconds an in-memory feature flag snapshot is used before it is rebuilt even without a change"
+    )
+    FEATURE_FLAG_SNAPSHOT_VERSION_CHECK_SECONDS: float = Field(
+        default=5.0,
+        description="Minimum seconds between checks of the shared feature flag version for changes made by other workers"
+    )
     
     CORS_ORIGINS: Union[str, List[str]] = Field(default=["http://localhost:3000", "http://localhost:3001"])
     
@@ -91,6 +139,22 @@ class Settings(BaseSettings):
     RATE_LIMIT_TENANT_REQUESTS_PER_MINUTE: int = 1000
     RATE_LIMIT_ADMIN_REQUESTS_PER_MINUTE: int = 5000
     RATE_LIMIT_STORAGE_URL: str = "redis://localhost:6379/1"
+    RATE_LIMIT_LOCAL_LEASES_ENABLED: bool = Field(
+        default=True,
+        description="Admit requests from per-worker quota leases and only contact Redis to refill them"
+    )
+    RATE_LIMIT_LEASE_FRACTION: float = Field(
+        default=0.1,
+        description="Share of a key's remaining quota a worker leases at a time; bounds unused quota held per worker"
+    )
+    RATE_LIMIT_LEASE_MAX_REQUESTS: int = Field(
+        default=100,
+        description="Most requests' worth of quota a worker leases at a time"
+    )
+    RATE_LIMIT_LEASE_SECONDS: float = Field(
+        default=1.0,
+        description="Seconds a lease may be spent before it is refreshed from Redis; bounds how stale leased quota can be"
+    )
 
     # Authentication Rate Limiting (DoS Protection)
     RATE_LIMIT_AUTH_REQUESTS: str = Field(
@@ -124,6 +188,63 @@ class Settings(BaseSettings):
     REDIS_RETRY_ON_TIMEOUT: bool = True
     REDIS_MAX_CONNECTIONS: int = 50
 
+    # Inter-module message bus transport
+    MESSAGE_BUS_TRANSPORT: str = Field(
+        default="memory",
+        description="Message bus transport: 'memory' (single process) or 'redis_streams' (shared across workers)"
+    )
+    MESSAGE_BUS_STREAM_PREFIX: str = "message_bus"
+    MESSAGE_BUS_CONSUMER_GROUP: str = "message_bus_workers"
+    MESSAGE_BUS_CONSUMERS_PER_LANE: int = Field(
+        default=4,
+        description="Concurrent consumers per message bus priority lane in each worker process"
+    )
+    MESSAGE_BUS_MAX_CONCURRENT_MESSAGES: int = Field(
+        default=1000,
+        description="Messages handed to local handlers in-process at once in each worker"
+    )
+    MESSAGE_BUS_LANE_SLOTS: int = Field(
+        default=12,
+        description="Messages the lane consumers of each worker process at once, shared by the four priority "
+                    "lanes by weight. Keep it below 4 x MESSAGE_BUS_CONSUMERS_PER_LANE, or the lanes never "
+                    "compete for slots"
+    )
+    MESSAGE_BUS_CLAIM_IDLE_MS: int = Field(
+        default=60000,
+        description="Idle time after which another consumer reclaims an unacknowledged stream entry"
+    )
+    MESSAGE_BUS_WORKER_ID: Optional[str] = Field(
+        default=None,
+        description="Stable id of this worker on its host (e.g. the process manager's worker index), "
+                    "used in the stream consumer name; defaults to the process id"
+    )
+
+    # Event store persistence (domain_events table)
+    EVENT_STORE_BATCH_SIZE: int = Field(
+        default=500,
+        description="Maximum events written by a single multi-row INSERT into domain_events"
+    )
+    EVENT_STORE_FLUSH_INTERVAL_MS: int = Field(
+        default=200,
+        description="Maximum time an event waits in the write buffer before a partial batch is flushed"
+    )
+    EVENT_STORE_BUFFER_SIZE: int = Field(
+        default=10000,
+        description="Events buffered for persistence before appends block (backpressure)"
+    )
+    EVENT_STORE_SNAPSHOT_INTERVAL: int = Field(
+        default=100,
+        description="Events appended to an aggregate between automatic snapshots (0 disables)"
+    )
+    EVENT_STORE_PARTITION_MONTHS_AHEAD: int = Field(
+        default=3,
+        description="Months after the current one kept partitioned in domain_events"
+    )
+    EVENT_STORE_PARTITION_CHECK_HOURS: float = Field(
+        default=24.0,
+        description="Hours between checks for missing domain_events partitions"
+    )
+
     class SupabaseConfig(BaseModel):
         URL: str
         KEY: str
@@ -0,0 +1,155 @@
+"""
+Domain Event Partitions
+
+domain_events is range-partitioned by month on occurred_at. The migration
+creates the first twelve months and a DEFAULT partition; this keeps the
+partitions for the current month and the next
+EVENT_STORE_PARTITION_MONTHS_AHEAD months in place:
+- it runs on startup and then every EVENT_STORE_PARTITION_CHECK_HOURS
+- every worker may run it: creation is serialised by an advisory lock and
+  months that already have a partition are skipped
+- rows that landed in the DEFAULT partition for a month (because the job
+  was not running) are moved into the new partition in the same
+  transaction, since Postgres refuses to attach a range the DEFAULT
+  partition already holds rows for
+
+Dropping or archiving old months is left to operations.
+"""
+import asyncio
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import get_async_engine
+from .logging import logger
+
+PARENT_TABLE = "domain_events"
+DEFAULT_PARTITION = "domain_events_default"
+
+# Arbitrary key serialising partition maintenance across workers
+PARTITION_LOCK_KEY = 720_301_118
+
+
+def month_start(year: int, month: int) -> date:
+    """First day of a month, normalising month numbers outside 1-12"""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{PARENT_TABLE}_{start:%Y_%m}"
+
+
+def required_months(today: date, months_ahead: int) -> List[date]:
+    """Month starts that should have a partition: this month and the next months_ahead"""
+    return [month_start(today.year, today.month + offset) for offset in range(months_ahead + 1)]
+
+
+def partition_statements(start: date, has_default: bool = True) -> List[str]:
+    """Create one month's partition, moving in any rows the DEFAULT partition holds for it"""
+    end = month_start(start.year, start.month + 1)
+    name = partition_name(start)
+    statements = [f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"]
+    if has_default:
+        bounds = f"occurred_at >= '{start.isoformat()}' AND occurred_at < '{end.isoformat()}'"
+        statements.append(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {bounds} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    statements.append(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    return statements
+
+
+class DomainEventPartitionMaintainer:
+    """Creates upcoming monthly domain_events partitions in the background"""
+
+    def __init__(
+        self,
+        months_ahead: Optional[int] = None,
+        check_interval_hours: Optional[float] = None
+    ):
+        self.months_ahead = (
+            months_ahead if months_ahead is not None
+            else settings.EVENT_STORE_PARTITION_MONTHS_AHEAD
+        )
+        self.check_interval_hours = (
+            check_interval_hours if check_interval_hours is not None
+            else settings.EVENT_STORE_PARTITION_CHECK_HOURS
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.created_partitions: List[str] = []
+
+    async def ensure_partitions(self, today: Optional[date] = None) -> List[str]:
+        """Create the missing partitions; returns the names of those created"""
+        months = required_months(today or date.today(), self.months_ahead)
+
+        async with get_async_engine().begin() as conn:
+            if conn.dialect.name != "postgresql":
+                return []
+
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            existing = set((await conn.execute(text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+            ), {"parent": PARENT_TABLE})).scalars())
+
+            created = []
+            for start in months:
+                if partition_name(start) in existing:
+                    continue
+                for statement in partition_statements(start, DEFAULT_PARTITION in existing):
+                    await conn.execute(text(statement))
+                created.append(partition_name(start))
+
+        if created:
+            self.created_partitions.extend(created)
+            logger.info("Created domain_events partitions", extra={
+                "event": "domain_event_partitions_created",
+                "partitions": created
+            })
+        return created
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start partition maintenance on the running event loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        """Stop partition maintenance without waiting for the task to exit"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self) -> None:
+        """Stop partition maintenance"""
+        task = self._task
+        self.cancel()
+        if task:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.ensure_partitions()
+            except Exception as e:
+                logger.warning(f"domain_events partition maintenance failed: {e}")
+            await asyncio.sleep(max(self.check_interval_hours, 0.01) * 3600)
+
+
+# Shared by the application's startup and shutdown hooks
+domain_event_partitions = DomainEventPartitionMaintainer()
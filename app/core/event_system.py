@@ -11,8 +11,8 @@ import json
 import logging
 import time
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Set, Callable, Union, Tuple, AsyncGenerator
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Set, Callable, Union, Tuple, AsyncGenerator, Awaitable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -21,16 +21,18 @@ import threading
 import weakref
 from collections import defaultdict, OrderedDict, deque
 import hashlib
+import heapq
 import pickle
 from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, desc, func
+from sqlalchemy import select, and_, or_, desc, func, insert
 from sqlalchemy.orm import selectinload
 from redis import asyncio as aioredis
 
-from ..models.modules import ModuleUsageLog
-from ..core.database import get_db
+from ..models.domain_events import DomainEventRecord
+from ..core.config import settings
+from ..core.database import get_async_engine
 from ..core.message_bus import (
     get_message_bus, 
     MessageHandler, 
@@ -179,6 +181,10 @@ class DomainEvent:
         )
 
 
+# Folds one event into aggregate state; the result must be JSON serializable
+AggregateReducer = Callable[[Optional[Dict[str, Any]], DomainEvent], Dict[str, Any]]
+
+
 @dataclass
 class WorkflowStep:
     """Individual step in a workflow"""
@@ -221,8 +227,10 @@ class WorkflowDefinition:
     trigger_events: List[str]  # Events that trigger this workflow
     steps: List[WorkflowStep]
     
-    # Execution settings
+    # Execution settings. With parallel_execution, steps run as soon as the
+    # steps they depend on have completed; otherwise one at a time in order.
     parallel_execution: bool = False
+    max_parallel_steps: Optional[int] = None  # Defaults to the engine limit
     timeout_seconds: int = 3600
     retry_policy: Dict[str, Any] = field(default_factory=dict)
     
@@ -271,6 +279,12 @@ class WorkflowExecution:
     completed_at: Optional[datetime] = None
     duration_ms: Optional[float] = None
     
+    # Per-step timing in ms from execution start (ready, started, finished)
+    # and the longest dependency chain by step duration
+    step_timings: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_ms: Optional[float] = None
+    
     # Error handling
     error_message: Optional[str] = None
     compensation_executed: bool = False
@@ -295,46 +309,286 @@ class WorkflowExecution:
         return cls(**data)
 
 
+class DomainEventBatcher:
+    """
+    Background writer for the domain_events table
+    
+    Events are buffered in a bounded queue and flushed with a single multi-row
+    INSERT once a batch fills up or the flush interval elapses. When the buffer
+    is full, submit() waits for space, slowing producers down instead of
+    growing memory while the database is behind.
+    """
+    
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        max_buffered_events: Optional[int] = None,
+        max_retries: int = 3,
+        write_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+    ):
+        self.batch_size = batch_size or settings.EVENT_STORE_BATCH_SIZE
+        self.flush_interval_seconds = (
+            flush_interval_seconds if flush_interval_seconds is not None
+            else settings.EVENT_STORE_FLUSH_INTERVAL_MS / 1000
+        )
+        self.max_retries = max_retries
+        self._write_batch = write_batch or self._insert_rows
+        
+        self._queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max_buffered_events or settings.EVENT_STORE_BUFFER_SIZE
+        )
+        self._batch: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        
+        # Statistics
+        self.total_submitted = 0
+        self.total_written = 0
+        self.total_batches = 0
+        self.total_dropped = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+    
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize() + len(self._batch)
+    
+    def start(self):
+        """Start the background flush task if it is not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush task and write everything still buffered"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        
+        await self._flush_remaining()
+    
+    async def submit(self, event: DomainEvent):
+        """Queue an event for persistence, waiting while the buffer is full"""
+        self.start()
+        
+        if self._queue.full():
+            self.backpressure_waits += 1
+        
+        await self._queue.put(self._event_to_row(event))
+        self.total_submitted += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get persistence statistics"""
+        return {
+            "buffered": self.buffered,
+            "batch_size": self.batch_size,
+            "total_submitted": self.total_submitted,
+            "total_written": self.total_written,
+            "total_batches": self.total_batches,
+            "total_dropped": self.total_dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "average_batch_size": self.total_written / self.total_batches if self.total_batches else 0.0,
+            "last_flush_ms": self.last_flush_ms
+        }
+    
+    async def _run(self):
+        """Collect events into batches and flush on size or time"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            try:
+                self._batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval_seconds
+                
+                while len(self._batch) < self.batch_size:
+                    if not self._queue.empty():
+                        self._batch.append(self._queue.get_nowait())
+                        continue
+                    
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    
+                    try:
+                        self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                
+                await self._flush_batch()
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in domain event batcher: {str(e)}")
+                await asyncio.sleep(1)
+    
+    async def _flush_remaining(self):
+        """Write everything still buffered once the flush task has stopped"""
+        while self._queue.qsize() and len(self._batch) < self.batch_size:
+            self._batch.append(self._queue.get_nowait())
+            if len(self._batch) == self.batch_size:
+                await self._flush_batch()
+        
+        if self._batch:
+            await self._flush_batch()
+    
+    async def _flush_batch(self):
+        """Write the current batch, retrying with backoff before dropping it"""
+        batch = self._batch
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                start_time = time.perf_counter()
+                await self._write_batch(batch)
+                self.last_flush_ms = (time.perf_counter() - start_time) * 1000
+                self.total_written += len(batch)
+                self.total_batches += 1
+                break
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping {len(batch)} domain events after {attempt + 1} failed writes: {str(e)}")
+                    self.total_dropped += len(batch)
+                    break
+                
+                logger.warning(f"Failed to write {len(batch)} domain events, retrying: {str(e)}")
+                await asyncio.sleep(min(0.1 * (2 ** attempt), 5))
+        
+        self._batch = []
+    
+    @staticmethod
+    def _event_to_row(event: DomainEvent) -> Dict[str, Any]:
+        metadata = event.metadata
+        occurred_at = metadata.occurred_at
+        if occurred_at.tzinfo is None:
+            occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+        
+        return {
+            "id": str(uuid.uuid4()),
+            "occurred_at": occurred_at,
+            "event_id": metadata.event_id,
+            "name": event.name,
+            "event_type": metadata.event_type.value,
+            "status": event.status.value,
+            "aggregate_id": metadata.aggregate_id,
+            "aggregate_type": metadata.aggregate_type,
+            "version": metadata.version,
+            "source_module": metadata.source_module or None,
+            "user_id": metadata.user_id,
+            "correlation_id": metadata.correlation_id,
+            "category": metadata.category,
+            "payload": event.payload,
+            "event_metadata": metadata.to_dict()
+        }
+    
+    @staticmethod
+    async def _insert_rows(rows: List[Dict[str, Any]]):
+        """Write rows with one multi-row INSERT in a single transaction"""
+        async with get_async_engine().begin() as conn:
+            await conn.execute(insert(DomainEventRecord.__table__).values(rows))
+
+
+# KEYS: aggregate version counter. Returns the next version, or nil when the
+# counter has not been seeded from the aggregate's history yet.
+NEXT_VERSION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+
 class EventStore:
     """Event store for event sourcing with Redis and database persistence"""
     
     def __init__(
         self, 
         redis_client: Optional[aioredis.Redis] = None,
-        max_memory_events: int = 10000
+        max_memory_events: int = 10000,
+        event_batcher: Optional[DomainEventBatcher] = None,
+        snapshot_interval: Optional[int] = None
     ):
         self.redis = redis_client
         self.max_memory_events = max_memory_events
         
+        # Batched writes to the domain_events table
+        self.event_batcher = event_batcher or DomainEventBatcher()
+        
         # In-memory storage for when Redis is unavailable
         self.memory_store: OrderedDict[str, DomainEvent] = OrderedDict()
         self.aggregate_streams: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
         
-        # Event indexing for fast retrieval
+        # Event indexing for fast retrieval. Events are evicted oldest-first and
+        # appended to their aggregate in order, so an evicted event is always at
+        # the head of its aggregate deque and index maintenance stays O(1).
         self.event_index: Dict[str, Set[str]] = defaultdict(set)  # category -> event_ids
-        self.aggregate_index: Dict[str, List[str]] = defaultdict(list)  # aggregate_id -> event_ids
+        self.aggregate_index: Dict[str, deque] = defaultdict(deque)  # aggregate_id -> event_ids
+        
+        # Latest version per aggregate seen by this worker, least recently
+        # used first. Only a cache: versions are allocated from a Redis
+        # counter shared by every worker, and either is seeded from the
+        # aggregate's history (snapshot, stream, domain_events) when missing.
+        self.aggregate_versions: OrderedDict[str, int] = OrderedDict()
+        self._next_version_script = None
+        
+        # Snapshots: reducers by aggregate type fold events into state, and a
+        # snapshot is taken every ``snapshot_interval`` events per aggregate
+        self.snapshot_interval = (
+            snapshot_interval if snapshot_interval is not None
+            else settings.EVENT_STORE_SNAPSHOT_INTERVAL
+        )
+        self.aggregate_reducers: Dict[str, AggregateReducer] = {}
+        self.memory_snapshots: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._events_since_snapshot: Dict[str, int] = defaultdict(int)
+        self._snapshot_tasks: Dict[str, asyncio.Task] = {}
         
         self._store_lock = threading.RLock()
     
+    def start(self):
+        """Start background persistence"""
+        self.event_batcher.start()
+    
+    async def stop(self):
+        """Stop background persistence, flushing buffered events"""
+        if self._snapshot_tasks:
+            await asyncio.gather(*self._snapshot_tasks.values(), return_exceptions=True)
+        
+        await self.event_batcher.stop()
+    
+    def register_reducer(self, aggregate_type: str, reducer: AggregateReducer):
+        """Register the reducer used to snapshot aggregates of a type"""
+        self.aggregate_reducers[aggregate_type] = reducer
+    
+    async def next_version(self, aggregate_id: str) -> int:
+        """
+        Reserve the next version number for an aggregate
+        
+        With Redis the version comes from an INCR on a counter shared by all
+        workers. Without it, versions are only unique within this worker.
+        """
+        if self.redis:
+            try:
+                return await self._next_redis_version(aggregate_id)
+            except Exception as e:
+                logger.warning(f"Failed to allocate version for {aggregate_id} from Redis: {str(e)}")
+        
+        with self._store_lock:
+            known = self.aggregate_versions.get(aggregate_id)
+        if known is None:
+            known = await self._latest_version(aggregate_id)
+        
+        with self._store_lock:
+            # Another caller may have advanced it while the history was read
+            version = max(known, self.aggregate_versions.get(aggregate_id, 0)) + 1
+            self._remember_version(aggregate_id, version)
+            return version
+    
     async def append_event(self, event: DomainEvent) -> bool:
         """Append event to the event store"""
         try:
-            with self._store_lock:
-                # Store in memory
-                if len(self.memory_store) >= self.max_memory_events:
-                    # Remove oldest event
-                    oldest_id, _ = self.memory_store.popitem(last=False)
-                    self._remove_from_indexes(oldest_id)
-                
-                self.memory_store[event.metadata.event_id] = event
-                self.memory_store.move_to_end(event.metadata.event_id)
-                
-                # Update indexes
-                self._update_indexes(event)
-                
-                # Store in aggregate stream
-                if event.metadata.aggregate_id:
-                    self.aggregate_streams[event.metadata.aggregate_id].append(event.metadata.event_id)
+            self._store_in_memory(event)
             
             # Persist to Redis if available
             if self.redis:
@@ -343,6 +597,9 @@ class EventStore:
             # Persist to database for long-term storage
             await self._persist_to_database(event)
             
+            if event.metadata.aggregate_id:
+                self._maybe_schedule_snapshot(event)
+            
             logger.debug(f"Appended event {event.metadata.event_id} to event store")
             return True
             
@@ -394,14 +651,42 @@ class EventStore:
         aggregate_id: str, 
         from_version: int = 0
     ) -> AsyncGenerator[DomainEvent, None]:
-        """Get event stream for aggregate"""
+        """
+        Get event stream for aggregate in version order
+        
+        Recent events come from memory. Older events evicted from memory are
+        read from the Redis stream, and anything older than the Redis stream
+        from the domain_events table. Each tier only supplies versions below
+        the oldest version held by the tier after it.
+        """
         try:
-            event_ids = self.aggregate_index.get(aggregate_id, [])
-            for event_id in event_ids:
-                if event_id in self.memory_store:
-                    event = self.memory_store[event_id]
-                    if event.metadata.version >= from_version:
+            with self._store_lock:
+                memory_events = [
+                    self.memory_store[event_id]
+                    for event_id in self.aggregate_index.get(aggregate_id, ())
+                    if event_id in self.memory_store
+                ]
+            memory_events = [event for event in memory_events if event.metadata.version >= from_version]
+            memory_floor = memory_events[0].metadata.version if memory_events else None
+            
+            # Versions start at 1, so nothing can precede a tier starting there
+            first_version = max(from_version, 1)
+            
+            if memory_floor is None or first_version < memory_floor:
+                redis_floor = await self._get_redis_stream_floor(aggregate_id)
+                
+                floors = [floor for floor in (redis_floor, memory_floor) if floor is not None]
+                db_ceiling = min(floors) if floors else None
+                if db_ceiling is None or first_version < db_ceiling:
+                    async for event in self._stream_from_database(aggregate_id, from_version, db_ceiling):
+                        yield event
+                
+                if redis_floor is not None and (memory_floor is None or redis_floor < memory_floor):
+                    async for event in self._stream_from_redis(aggregate_id, from_version, memory_floor):
                         yield event
+            
+            for event in memory_events:
+                yield event
         except Exception as e:
             logger.error(f"Failed to get event stream for {aggregate_id}: {str(e)}")
     
@@ -410,10 +695,26 @@ class EventStore:
         aggregate_id: str,
         from_version: int = 0,
         to_version: Optional[int] = None,
-        event_handler: Optional[Callable[[DomainEvent], None]] = None
+        event_handler: Optional[Callable[[DomainEvent], None]] = None,
+        snapshot_handler: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[DomainEvent]:
-        """Replay events for an aggregate"""
+        """
+        Replay events for an aggregate
+        
+        When a snapshot handler is given, the latest usable snapshot is passed
+        to it first and only the events after the snapshot are replayed.
+        """
         try:
+            if snapshot_handler:
+                snapshot = await self.get_snapshot(aggregate_id)
+                if (
+                    snapshot
+                    and snapshot['version'] >= from_version
+                    and (to_version is None or snapshot['version'] <= to_version)
+                ):
+                    await snapshot_handler(snapshot)
+                    from_version = snapshot['version'] + 1
+            
             events = []
             async for event in self.get_event_stream(aggregate_id, from_version):
                 if to_version and event.metadata.version > to_version:
@@ -434,21 +735,61 @@ class EventStore:
             logger.error(f"Failed to replay events for {aggregate_id}: {str(e)}")
             return []
     
-    async def create_snapshot(self, aggregate_id: str, snapshot_data: Dict[str, Any]) -> bool:
-        """Create snapshot of aggregate state"""
+    async def load_aggregate(
+        self,
+        aggregate_id: str,
+        reducer: AggregateReducer,
+        to_version: Optional[int] = None
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Rebuild aggregate state from its latest snapshot; returns (state, version)"""
+        state: Optional[Dict[str, Any]] = None
+        version = 0
+        
+        async def apply_snapshot(snapshot: Dict[str, Any]):
+            nonlocal state, version
+            state, version = snapshot['data'], snapshot['version']
+        
+        async def apply_event(event: DomainEvent):
+            nonlocal state, version
+            state, version = reducer(state, event), event.metadata.version
+        
+        await self.replay_events(
+            aggregate_id,
+            to_version=to_version,
+            event_handler=apply_event,
+            snapshot_handler=apply_snapshot
+        )
+        return state, version
+    
+    async def create_snapshot(
+        self,
+        aggregate_id: str,
+        snapshot_data: Dict[str, Any],
+        version: Optional[int] = None
+    ) -> bool:
+        """Create snapshot of aggregate state as of ``version`` (default: latest)"""
         try:
+            if version is None:
+                version = self.aggregate_versions.get(aggregate_id) or await self._latest_version(aggregate_id)
+            
             snapshot_key = f"snapshot:{aggregate_id}"
             snapshot = {
                 'aggregate_id': aggregate_id,
                 'data': snapshot_data,
-                'version': len(self.aggregate_index.get(aggregate_id, [])),
+                'version': version,
                 'created_at': datetime.utcnow().isoformat()
             }
             
             if self.redis:
                 await self.redis.set(snapshot_key, json.dumps(snapshot))
+            else:
+                with self._store_lock:
+                    self.memory_snapshots[aggregate_id] = snapshot
+                    self.memory_snapshots.move_to_end(aggregate_id)
+                    if len(self.memory_snapshots) > self.max_memory_events:
+                        self.memory_snapshots.popitem(last=False)
             
-            logger.debug(f"Created snapshot for aggregate {aggregate_id}")
+            logger.debug(f"Created snapshot for aggregate {aggregate_id} at version {snapshot['version']}")
             return True
             
         except Exception as e:
@@ -464,8 +805,9 @@ class EventStore:
                 snapshot_data = await self.redis.get(snapshot_key)
                 if snapshot_data:
                     return json.loads(snapshot_data)
+                return None
             
-            return None
+            return self.memory_snapshots.get(aggregate_id)
             
         except Exception as e:
             logger.error(f"Failed to get snapshot for {aggregate_id}: {str(e)}")
@@ -473,6 +815,67 @@ class EventStore:
     
     # Private helper methods
     
+    async def _next_redis_version(self, aggregate_id: str) -> int:
+        if self._next_version_script is None:
+            self._next_version_script = self.redis.register_script(NEXT_VERSION_SCRIPT)
+        
+        counter_key = f"version:{aggregate_id}"
+        version = await self._next_version_script(keys=[counter_key])
+        if version is None:
+            # First version allocated since the counter was lost or created:
+            # seed it, letting the first of several racing workers win
+            await self.redis.set(counter_key, await self._latest_version(aggregate_id), nx=True)
+            version = await self.redis.incr(counter_key)
+        
+        version = int(version)
+        with self._store_lock:
+            self._remember_version(aggregate_id, version)
+        return version
+    
+    async def _latest_version(self, aggregate_id: str) -> int:
+        """Highest version in the aggregate's snapshot, events in memory, Redis stream or domain_events"""
+        versions = [0]
+        
+        with self._store_lock:
+            event_ids = self.aggregate_index.get(aggregate_id)
+            if event_ids and event_ids[-1] in self.memory_store:
+                versions.append(self.memory_store[event_ids[-1]].metadata.version)
+        
+        snapshot = await self.get_snapshot(aggregate_id)
+        if snapshot:
+            versions.append(snapshot['version'])
+        
+        if self.redis:
+            try:
+                entries = await self.redis.xrevrange(f"stream:{aggregate_id}", count=1)
+                if entries:
+                    versions.append(self._decode_stream_entry(entries[0][1]).metadata.version)
+            except Exception as e:
+                logger.warning(f"Failed to read Redis stream for {aggregate_id}: {str(e)}")
+        
+        versions.append(await self._get_database_version(aggregate_id))
+        return max(versions)
+    
+    async def _get_database_version(self, aggregate_id: str) -> int:
+        """Highest version of the aggregate persisted to domain_events"""
+        query = select(func.max(DomainEventRecord.version)).where(
+            DomainEventRecord.aggregate_id == aggregate_id
+        )
+        try:
+            async with get_async_engine().connect() as conn:
+                return (await conn.execute(query)).scalar() or 0
+        except Exception as e:
+            logger.warning(f"Failed to read persisted version for {aggregate_id}: {str(e)}")
+            return 0
+    
+    def _remember_version(self, aggregate_id: str, version: int):
+        """Record an aggregate's latest version, evicting the least recently used"""
+        if version > self.aggregate_versions.get(aggregate_id, 0):
+            self.aggregate_versions[aggregate_id] = version
+        self.aggregate_versions.move_to_end(aggregate_id)
+        if len(self.aggregate_versions) > self.max_memory_events:
+            self.aggregate_versions.popitem(last=False)
+    
     def _update_indexes(self, event: DomainEvent):
         """Update event indexes"""
         event_id = event.metadata.event_id
@@ -489,16 +892,166 @@ class EventStore:
         for tag in event.metadata.tags:
             self.event_index[f"tag:{tag}"].add(event_id)
     
-    def _remove_from_indexes(self, event_id: str):
-        """Remove event from indexes"""
-        # Remove from all indexes
-        for index_key, event_set in self.event_index.items():
-            event_set.discard(event_id)
+    def _store_in_memory(self, event: DomainEvent):
+        """Store event in memory, evicting the oldest event when full"""
+        event_id = event.metadata.event_id
+        
+        with self._store_lock:
+            previous = self.memory_store.pop(event_id, None)
+            if previous is not None:
+                # Re-appended event: drop its old index entries first
+                self._remove_from_indexes(previous)
+            elif len(self.memory_store) >= self.max_memory_events:
+                # Remove oldest event
+                _, oldest = self.memory_store.popitem(last=False)
+                self._remove_from_indexes(oldest)
+            
+            self.memory_store[event_id] = event
+            
+            # Update indexes
+            self._update_indexes(event)
+            
+            # Store in aggregate stream
+            aggregate_id = event.metadata.aggregate_id
+            if aggregate_id:
+                self.aggregate_streams[aggregate_id].append(event_id)
+                self._remember_version(aggregate_id, event.metadata.version)
+    
+    def _remove_from_indexes(self, event: DomainEvent):
+        """Remove event from the indexes it was added to"""
+        event_id = event.metadata.event_id
+        
+        index_keys = [f"tag:{tag}" for tag in event.metadata.tags]
+        if event.metadata.category:
+            index_keys.append(event.metadata.category)
+        
+        for index_key in index_keys:
+            event_set = self.event_index.get(index_key)
+            if event_set is not None:
+                event_set.discard(event_id)
+                if not event_set:
+                    del self.event_index[index_key]
+        
+        aggregate_id = event.metadata.aggregate_id
+        if aggregate_id:
+            event_ids = self.aggregate_index.get(aggregate_id)
+            if event_ids:
+                if event_ids[0] == event_id:
+                    event_ids.popleft()
+                else:
+                    # Only reached when an event is re-appended out of order
+                    event_ids.remove(event_id)
+                if not event_ids:
+                    del self.aggregate_index[aggregate_id]
+                    self.aggregate_streams.pop(aggregate_id, None)
+    
+    def _maybe_schedule_snapshot(self, event: DomainEvent):
+        """Snapshot the aggregate in the background every ``snapshot_interval`` events"""
+        reducer = self.aggregate_reducers.get(event.metadata.aggregate_type)
+        if not reducer or self.snapshot_interval <= 0:
+            return
+        
+        aggregate_id = event.metadata.aggregate_id
+        self._events_since_snapshot[aggregate_id] += 1
+        if self._events_since_snapshot[aggregate_id] < self.snapshot_interval:
+            return
+        if aggregate_id in self._snapshot_tasks:
+            return
+        
+        del self._events_since_snapshot[aggregate_id]
+        task = asyncio.create_task(self._take_snapshot(aggregate_id, reducer))
+        self._snapshot_tasks[aggregate_id] = task
+        task.add_done_callback(lambda _: self._snapshot_tasks.pop(aggregate_id, None))
+    
+    async def _take_snapshot(self, aggregate_id: str, reducer: AggregateReducer):
+        """Fold the events since the previous snapshot into a new one"""
+        try:
+            state, version = await self.load_aggregate(aggregate_id, reducer)
+            if version:
+                await self.create_snapshot(aggregate_id, state, version)
+        except Exception as e:
+            logger.error(f"Failed to take automatic snapshot for {aggregate_id}: {str(e)}")
+    
+    @staticmethod
+    def _decode_stream_entry(fields: Dict[Any, Any]) -> DomainEvent:
+        event_data = fields.get('event_data', fields.get(b'event_data'))
+        return DomainEvent.from_dict(json.loads(event_data))
+    
+    async def _get_redis_stream_floor(self, aggregate_id: str) -> Optional[int]:
+        """Oldest version held in the aggregate's Redis stream"""
+        if not self.redis:
+            return None
+        
+        try:
+            entries = await self.redis.xrange(f"stream:{aggregate_id}", count=1)
+            if entries:
+                return self._decode_stream_entry(entries[0][1]).metadata.version
+        except Exception as e:
+            logger.warning(f"Failed to read Redis stream for {aggregate_id}: {str(e)}")
         
-        # Remove from aggregate indexes
-        for aggregate_id, event_list in self.aggregate_index.items():
-            if event_id in event_list:
-                event_list.remove(event_id)
+        return None
+    
+    async def _stream_from_redis(
+        self,
+        aggregate_id: str,
+        from_version: int,
+        before_version: Optional[int],
+        page_size: int = 500
+    ) -> AsyncGenerator[DomainEvent, None]:
+        """Page through the aggregate's Redis stream with XRANGE"""
+        stream_key = f"stream:{aggregate_id}"
+        start = "-"
+        
+        while True:
+            entries = await self.redis.xrange(stream_key, min=start, count=page_size)
+            for entry_id, fields in entries:
+                event = self._decode_stream_entry(fields)
+                if before_version is not None and event.metadata.version >= before_version:
+                    return
+                if event.metadata.version >= from_version:
+                    yield event
+            
+            if len(entries) < page_size:
+                return
+            
+            last_id = entries[-1][0]
+            start = f"({last_id.decode() if isinstance(last_id, bytes) else last_id}"
+    
+    async def _stream_from_database(
+        self,
+        aggregate_id: str,
+        from_version: int,
+        before_version: Optional[int]
+    ) -> AsyncGenerator[DomainEvent, None]:
+        """Stream the aggregate's persisted events from domain_events"""
+        query = (
+            select(
+                DomainEventRecord.name,
+                DomainEventRecord.payload,
+                DomainEventRecord.status,
+                DomainEventRecord.event_metadata
+            )
+            .where(
+                DomainEventRecord.aggregate_id == aggregate_id,
+                DomainEventRecord.version >= from_version
+            )
+            .order_by(DomainEventRecord.version)
+        )
+        if before_version is not None:
+            query = query.where(DomainEventRecord.version < before_version)
+        
+        try:
+            async with get_async_engine().connect() as conn:
+                result = await conn.stream(query)
+                async for row in result:
+                    yield DomainEvent.from_dict({
+                        'name': row.name,
+                        'payload': row.payload,
+                        'status': row.status,
+                        'metadata': row.event_metadata
+                    })
+        except Exception as e:
+            logger.warning(f"Failed to read persisted events for {aggregate_id}: {str(e)}")
     
     async def _persist_to_redis(self, event: DomainEvent):
         """Persist event to Redis"""
@@ -524,32 +1077,8 @@ class EventStore:
             logger.error(f"Failed to persist event to Redis: {str(e)}")
     
     async def _persist_to_database(self, event: DomainEvent):
-        """Persist event to database for long-term storage"""
-        try:
-            # Store in module usage log table for now
-            # In production, you'd have a dedicated events table
-            async for db_session in get_db():
-                try:
-                    usage_log = ModuleUsageLog(
-                        module_id=event.metadata.source_module or "event_system",
-                        organisation_id=event.metadata.aggregate_id or "system",
-                        user_id=event.metadata.user_id or "system",
-                        action=f"EVENT:{event.name}",
-                        context=event.payload,
-                        success=event.status == EventStatus.PROCESSED
-                    )
-                    
-                    db_session.add(usage_log)
-                    await db_session.commit()
-                    break
-                    
-                except Exception as e:
-                    logger.error(f"Database error persisting event: {str(e)}")
-                    await db_session.rollback()
-                    break
-                    
-        except Exception as e:
-            logger.error(f"Failed to persist event to database: {str(e)}")
+        """Queue event for batched persistence to the domain_events table"""
+        await self.event_batcher.submit(event)
 
 
 class EventBus:
@@ -737,22 +1266,37 @@ class EventBus:
 class WorkflowEngine:
     """Workflow orchestration engine for event-driven workflows"""
     
-    def __init__(self, event_bus: EventBus):
+    def __init__(
+        self,
+        event_bus: EventBus,
+        max_concurrent_steps: int = 100,
+        max_parallel_steps_per_workflow: int = 10
+    ):
         self.event_bus = event_bus
         
         # Workflow storage
         self.workflow_definitions: Dict[str, WorkflowDefinition] = {}
         self.active_executions: Dict[str, WorkflowExecution] = {}
         
+        # Step dependency graphs: workflow_id -> step_id -> dependent step_ids
+        self.step_dependents: Dict[str, Dict[str, List[str]]] = {}
+        
         # Event subscriptions for workflow triggers
         self.trigger_mappings: Dict[str, List[str]] = defaultdict(list)  # event -> workflow_ids
         
-        # Execution queues
+        # Execution queue
         self.execution_queue = asyncio.Queue()
-        self.step_queue = asyncio.Queue()
+        
+        # Concurrency limits: steps running across all workflows, and steps
+        # running within one parallel workflow execution
+        self.max_concurrent_steps = max_concurrent_steps
+        self.max_parallel_steps_per_workflow = max_parallel_steps_per_workflow
+        self.step_semaphore = asyncio.Semaphore(max_concurrent_steps)
+        self.running_steps = 0
         
         # Background processing
         self.background_tasks: List[asyncio.Task] = []
+        self.execution_tasks: Dict[str, asyncio.Task] = {}
         
         self._workflows_lock = threading.RLock()
         
@@ -766,10 +1310,6 @@ class WorkflowEngine:
             exec_task = asyncio.create_task(self._process_workflow_executions())
             self.background_tasks.append(exec_task)
             
-            # Start step execution processor
-            step_task = asyncio.create_task(self._process_workflow_steps())
-            self.background_tasks.append(step_task)
-            
             logger.info("Workflow engine started")
             
         except Exception as e:
@@ -779,12 +1319,13 @@ class WorkflowEngine:
     async def stop(self):
         """Stop workflow engine"""
         try:
-            # Cancel background tasks
-            for task in self.background_tasks:
+            # Cancel background tasks and running executions
+            tasks = self.background_tasks + list(self.execution_tasks.values())
+            for task in tasks:
                 task.cancel()
             
-            if self.background_tasks:
-                await asyncio.gather(*self.background_tasks, return_exceptions=True)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
             
             logger.info("Workflow engine stopped")
             
@@ -793,8 +1334,11 @@ class WorkflowEngine:
     
     def register_workflow(self, workflow: WorkflowDefinition):
         """Register workflow definition"""
+        dependents = self._build_step_graph(workflow)
+        
         with self._workflows_lock:
             self.workflow_definitions[workflow.workflow_id] = workflow
+            self.step_dependents[workflow.workflow_id] = dependents
             
             # Update trigger mappings
             for event_name in workflow.trigger_events:
@@ -806,6 +1350,7 @@ class WorkflowEngine:
         """Unregister workflow definition"""
         with self._workflows_lock:
             workflow = self.workflow_definitions.pop(workflow_id, None)
+            self.step_dependents.pop(workflow_id, None)
             if workflow:
                 # Clean up trigger mappings
                 for event_name in workflow.trigger_events:
@@ -871,6 +1416,11 @@ class WorkflowEngine:
                 execution.status = WorkflowStatus.CANCELLED
                 execution.completed_at = datetime.utcnow()
                 
+                # Stop any steps still in flight
+                task = self.execution_tasks.get(execution_id)
+                if task:
+                    task.cancel()
+                
                 if execution.started_at:
                     duration = execution.completed_at - execution.started_at
                     execution.duration_ms = duration.total_seconds() * 1000
@@ -915,8 +1465,9 @@ class WorkflowEngine:
                 # Start workflow execution
                 execution.status = WorkflowStatus.RUNNING
                 
-                # Queue first step for execution
-                await self.step_queue.put((execution_id, 0))
+                task = asyncio.create_task(self._run_workflow_execution(execution))
+                self.execution_tasks[execution_id] = task
+                task.add_done_callback(lambda _, eid=execution_id: self.execution_tasks.pop(eid, None))
                 
             except asyncio.CancelledError:
                 break
@@ -924,60 +1475,164 @@ class WorkflowEngine:
                 logger.error(f"Error processing workflow executions: {str(e)}")
                 await asyncio.sleep(1)
     
-    async def _process_workflow_steps(self):
-        """Process individual workflow steps"""
-        while True:
-            try:
-                execution_id, step_index = await self.step_queue.get()
-                execution = self.active_executions.get(execution_id)
-                
-                if not execution or execution.status != WorkflowStatus.RUNNING:
-                    continue
-                
-                workflow = self.workflow_definitions.get(execution.workflow_id)
-                if not workflow:
-                    execution.status = WorkflowStatus.FAILED
-                    execution.error_message = "Workflow definition not found"
-                    continue
+    async def _run_workflow_execution(self, execution: WorkflowExecution):
+        """Run workflow steps as their dependencies complete"""
+        execution_id = execution.execution_id
+        workflow = self.workflow_definitions.get(execution.workflow_id)
+        dependents = self.step_dependents.get(execution.workflow_id)
+        if not workflow or dependents is None:
+            execution.status = WorkflowStatus.FAILED
+            execution.error_message = "Workflow definition not found"
+            return
+        
+        if workflow.parallel_execution:
+            step_limit = workflow.max_parallel_steps or self.max_parallel_steps_per_workflow
+        else:
+            step_limit = 1
+        
+        steps = {step.step_id: step for step in workflow.steps}
+        step_order = {step.step_id: index for index, step in enumerate(workflow.steps)}
+        waiting_on = {step.step_id: len(set(step.depends_on)) for step in workflow.steps}
+        
+        # Ready steps are started in definition order
+        ready = [(step_order[step_id], step_id) for step_id, count in waiting_on.items() if count == 0]
+        heapq.heapify(ready)
+        running: Dict[asyncio.Task, str] = {}
+        clock_start = time.perf_counter()
+        
+        for _, step_id in ready:
+            execution.step_timings[step_id] = {'ready_ms': 0.0}
+        
+        try:
+            while ready or running:
+                while ready and len(running) < step_limit:
+                    _, step_id = heapq.heappop(ready)
+                    execution.current_step_index = step_order[step_id]
+                    task = asyncio.create_task(
+                        self._run_workflow_step(execution, steps[step_id], clock_start)
+                    )
+                    running[task] = step_id
                 
-                if step_index >= len(workflow.steps):
-                    # Workflow completed
-                    execution.status = WorkflowStatus.COMPLETED
-                    execution.completed_at = datetime.utcnow()
-                    
-                    if execution.started_at:
-                        duration = execution.completed_at - execution.started_at
-                        execution.duration_ms = duration.total_seconds() * 1000
-                    
-                    logger.info(f"Workflow execution {execution_id} completed")
-                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
                 
-                # Execute current step
-                step = workflow.steps[step_index]
-                execution.current_step_index = step_index
+                if execution.status != WorkflowStatus.RUNNING:
+                    # Cancelled while steps were in flight
+                    return
                 
-                try:
-                    await self._execute_workflow_step(execution, step)
-                    
-                    # Mark step as completed
-                    execution.completed_steps.append(step.step_id)
+                for task in done:
+                    step_id = running.pop(task)
+                    error = task.exception()
+                    if error:
+                        step = steps[step_id]
+                        logger.error(f"Step {step.name} failed in execution {execution_id}: {str(error)}")
+                        
+                        execution.failed_steps.append(step_id)
+                        execution.status = WorkflowStatus.FAILED
+                        execution.error_message = str(error) or type(error).__name__
+                        self._finish_execution(execution)
+                        return
                     
-                    # Queue next step
-                    await self.step_queue.put((execution_id, step_index + 1))
-                    
-                except Exception as e:
-                    logger.error(f"Step {step.name} failed in execution {execution_id}: {str(e)}")
-                    
-                    execution.failed_steps.append(step.step_id)
-                    execution.status = WorkflowStatus.FAILED
-                    execution.error_message = str(e)
-                    execution.completed_at = datetime.utcnow()
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error processing workflow steps: {str(e)}")
-                await asyncio.sleep(1)
+                    # Mark step as completed and release its dependents
+                    execution.completed_steps.append(step_id)
+                    finished_ms = execution.step_timings[step_id]['finished_ms']
+                    for dependent_id in dependents[step_id]:
+                        waiting_on[dependent_id] -= 1
+                        if waiting_on[dependent_id] == 0:
+                            execution.step_timings[dependent_id] = {'ready_ms': finished_ms}
+                            heapq.heappush(ready, (step_order[dependent_id], dependent_id))
+            
+            # Workflow completed
+            execution.status = WorkflowStatus.COMPLETED
+            self._finish_execution(execution)
+            logger.info(f"Workflow execution {execution_id} completed")
+            
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+    
+    async def _run_workflow_step(self, execution: WorkflowExecution, step: WorkflowStep, clock_start: float):
+        """Run one step under the global step limit, recording its timing"""
+        async with self.step_semaphore:
+            self.running_steps += 1
+            timing = execution.step_timings[step.step_id]
+            timing['started_ms'] = (time.perf_counter() - clock_start) * 1000
+            try:
+                await asyncio.wait_for(
+                    self._execute_workflow_step(execution, step),
+                    timeout=step.timeout_seconds
+                )
+            finally:
+                self.running_steps -= 1
+                timing['finished_ms'] = (time.perf_counter() - clock_start) * 1000
+                timing['duration_ms'] = timing['finished_ms'] - timing['started_ms']
+    
+    def _finish_execution(self, execution: WorkflowExecution):
+        """Record completion time and the critical path of finished steps"""
+        execution.completed_at = datetime.utcnow()
+        if execution.started_at:
+            duration = execution.completed_at - execution.started_at
+            execution.duration_ms = duration.total_seconds() * 1000
+        
+        workflow = self.workflow_definitions.get(execution.workflow_id)
+        if not workflow:
+            return
+        
+        # Longest chain of step durations through the dependency graph;
+        # steps are visited in dependency order, as they completed
+        path_ms: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        depends_on = {step.step_id: step.depends_on for step in workflow.steps}
+        
+        for step_id in execution.completed_steps:
+            longest_dependency = max(depends_on[step_id], key=lambda dep: path_ms.get(dep, 0.0), default=None)
+            previous[step_id] = longest_dependency
+            path_ms[step_id] = execution.step_timings[step_id]['duration_ms'] + path_ms.get(longest_dependency, 0.0)
+        
+        if not path_ms:
+            return
+        
+        step_id = max(path_ms, key=path_ms.get)
+        execution.critical_path_ms = path_ms[step_id]
+        critical_path = []
+        while step_id:
+            critical_path.append(step_id)
+            step_id = previous[step_id]
+        execution.critical_path = critical_path[::-1]
+    
+    @staticmethod
+    def _build_step_graph(workflow: WorkflowDefinition) -> Dict[str, List[str]]:
+        """Map each step to the steps depending on it, rejecting invalid graphs"""
+        dependents: Dict[str, List[str]] = {step.step_id: [] for step in workflow.steps}
+        if len(dependents) != len(workflow.steps):
+            raise ValueError(f"Workflow {workflow.workflow_id} has duplicate step ids")
+        
+        waiting_on = {}
+        for step in workflow.steps:
+            waiting_on[step.step_id] = len(set(step.depends_on))
+            for dependency in set(step.depends_on):
+                if dependency not in dependents:
+                    raise ValueError(
+                        f"Step {step.step_id} in workflow {workflow.workflow_id} depends on unknown step {dependency}"
+                    )
+                dependents[dependency].append(step.step_id)
+        
+        # Kahn's algorithm: every step must be reachable without a cycle
+        ready = [step_id for step_id, count in waiting_on.items() if count == 0]
+        visited = 0
+        while ready:
+            step_id = ready.pop()
+            visited += 1
+            for dependent_id in dependents[step_id]:
+                waiting_on[dependent_id] -= 1
+                if waiting_on[dependent_id] == 0:
+                    ready.append(dependent_id)
+        
+        if visited != len(dependents):
+            raise ValueError(f"Workflow {workflow.workflow_id} has a dependency cycle")
+        
+        return dependents
     
     async def _execute_workflow_step(self, execution: WorkflowExecution, step: WorkflowStep):
         """Execute individual workflow step"""
@@ -1092,6 +1747,7 @@ class EventDrivenSystem:
     async def start(self):
         """Start the event-driven system"""
         try:
+            self.event_store.start()
             await self.event_bus.start()
             await self.workflow_engine.start()
             
@@ -1106,6 +1762,7 @@ class EventDrivenSystem:
         try:
             await self.workflow_engine.stop()
             await self.event_bus.stop()
+            await self.event_store.stop()
             
             logger.info("Event-driven system stopped")
             
@@ -1138,6 +1795,8 @@ class EventDrivenSystem:
                 priority=priority,
                 tags=tags or set()
             )
+            if aggregate_id:
+                metadata.version = await self.event_store.next_version(aggregate_id)
             
             # Create domain event
             event = DomainEvent(
@@ -1228,21 +1887,40 @@ class EventDrivenSystem:
         self,
         aggregate_id: str,
         from_version: int = 0,
-        event_handler: Optional[Callable[[DomainEvent], None]] = None
+        event_handler: Optional[Callable[[DomainEvent], None]] = None,
+        snapshot_handler: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[DomainEvent]:
         """Replay events for aggregate"""
         return await self.event_store.replay_events(
-            aggregate_id, from_version, event_handler
+            aggregate_id,
+            from_version=from_version,
+            event_handler=event_handler,
+            snapshot_handler=snapshot_handler
         )
     
+    def register_aggregate_reducer(self, aggregate_type: str, reducer: AggregateReducer):
+        """Register reducer used to rebuild and snapshot aggregates of a type"""
+        self.event_store.register_reducer(aggregate_type, reducer)
+    
+    async def load_aggregate(
+        self,
+        aggregate_id: str,
+        reducer: AggregateReducer,
+        to_version: Optional[int] = None
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Rebuild aggregate state from its latest snapshot and later events"""
+        return await self.event_store.load_aggregate(aggregate_id, reducer, to_version)
+    
     def get_metrics(self) -> Dict[str, Any]:
         """Get system metrics"""
         return {
             **self.metrics,
             'active_workflows': len(self.workflow_engine.active_executions),
             'workflow_definitions': len(self.workflow_engine.workflow_definitions),
+            'running_workflow_steps': self.workflow_engine.running_steps,
             'event_subscribers': sum(len(subs) for subs in self.event_bus.subscribers.values()),
-            'pattern_subscribers': len(self.event_bus.pattern_subscribers)
+            'pattern_subscribers': len(self.event_bus.pattern_subscribers),
+            'event_persistence': self.event_store.event_batcher.get_stats()
         }
 
 
@@ -12,7 +12,7 @@ import logging
 import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Callable, Union, Tuple, Set
+from typing import Dict, Any, Optional, List, Callable, Union, Tuple, Set, Awaitable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -20,8 +20,16 @@ from functools import wraps
 from concurrent.futures import ThreadPoolExecutor
 import threading
 import weakref
-from collections import defaultdict, OrderedDict
+import os
+import socket
+from collections import defaultdict, OrderedDict, deque
 import hashlib
+import heapq
+import itertools
+import bisect
+from array import array
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
 from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -29,12 +37,18 @@ from sqlalchemy import select, and_, or_
 import traceback
 
 from ..models.modules import ModuleUsageLog
+from ..core.config import settings
 from ..core.database import get_db
 from ..services.audit_service import AuditService
 from ..core.module_registry import get_module_registry
 
 logger = logging.getLogger(__name__)
 
+# Set while a handler runs under a processing slot. Requests and events it
+# delivers in-process run without taking another slot: waiting for one while
+# holding one would deadlock once enough handlers nest.
+_holding_slot: ContextVar[bool] = ContextVar("message_bus_holding_slot", default=False)
+
 
 class MessageType(Enum):
     """Types of messages supported by the message bus"""
@@ -64,6 +78,12 @@ class MessagePriority(Enum):
     CRITICAL = 4
 
 
+class DeliveryGuarantee(Enum):
+    """Delivery guarantee requested for a message"""
+    AT_MOST_ONCE = "at_most_once"  # In-process hand-off, no persistence or redelivery
+    DURABLE = "durable"            # Persisted until processed, retried on failure
+
+
 @dataclass
 class MessageMetadata:
     """Metadata for message tracking and routing"""
@@ -78,6 +98,7 @@ class MessageMetadata:
     max_retries: int = 3
     priority: MessagePriority = MessagePriority.NORMAL
     tags: Set[str] = field(default_factory=set)
+    reply_to: Optional[str] = None  # Transport address for responses to requests
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization"""
@@ -111,6 +132,7 @@ class Message:
     status: MessageStatus = MessageStatus.PENDING
     error_message: Optional[str] = None
     processing_time_ms: Optional[float] = None
+    delivery: DeliveryGuarantee = DeliveryGuarantee.DURABLE
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert message to dictionary for serialization"""
@@ -120,7 +142,8 @@ class Message:
             "metadata": self.metadata.to_dict(),
             "status": self.status.value,
             "error_message": self.error_message,
-            "processing_time_ms": self.processing_time_ms
+            "processing_time_ms": self.processing_time_ms,
+            "delivery": self.delivery.value
         }
     
     @classmethod
@@ -132,7 +155,8 @@ class Message:
             metadata=MessageMetadata.from_dict(data["metadata"]),
             status=MessageStatus(data["status"]),
             error_message=data.get("error_message"),
-            processing_time_ms=data.get("processing_time_ms")
+            processing_time_ms=data.get("processing_time_ms"),
+            delivery=DeliveryGuarantee(data.get("delivery", DeliveryGuarantee.DURABLE.value))
         )
     
     def is_expired(self) -> bool:
@@ -374,107 +398,836 @@ class DeadLetterQueue:
             return message
 
 
+class RingBuffer:
+    """
+    Fixed-size, array-backed ring buffer of float samples.
+
+    Appends are O(1) and allocate nothing; once full, the oldest sample is
+    overwritten. Percentiles are computed over the retained window on read.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def values(self) -> array:
+        """Copy of the retained samples, oldest first"""
+        if self._size < self.capacity:
+            return self._data[:self._size]
+        return self._data[self._next:] + self._data[:self._next]
+
+    def percentiles(self, *quantiles: float) -> Dict[float, float]:
+        """Linear-interpolated percentiles (0-100) over the retained window"""
+        if not self._size:
+            return {quantile: 0.0 for quantile in quantiles}
+
+        ordered = sorted(self.values())
+        last = len(ordered) - 1
+        result = {}
+        for quantile in quantiles:
+            rank = last * quantile / 100.0
+            lower = int(rank)
+            upper = min(lower + 1, last)
+            result[quantile] = ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+        return result
+
+    def mean(self) -> float:
+        return sum(self.values()) / self._size if self._size else 0.0
+
+
 class MessageBusMetrics:
-    """Metrics collection for message bus performance"""
-    
-    def __init__(self, max_metrics: int = 10000):
-        self.max_metrics = max_metrics
-        self.metrics: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-        self._metrics_lock = threading.RLock()
-        
+    """
+    Metrics collection for message bus performance.
+
+    Recording a message only bumps counters and writes one float into a ring
+    buffer; no per-message objects are kept. The bus runs on a single event
+    loop, so no locking is needed on the hot path.
+    """
+
+    def __init__(self, max_processing_times: int = 1000, max_recent_failures: int = 100):
         # Aggregated metrics
         self.total_messages_sent = 0
         self.total_messages_processed = 0
         self.total_failures = 0
         self.total_timeouts = 0
-        
-        # Performance tracking
-        self.processing_times: List[float] = []
-        self.max_processing_times = 1000  # Keep last 1000 measurements
-    
+
+        # Performance tracking over the last ``max_processing_times`` messages
+        self.max_processing_times = max_processing_times
+        self.processing_times = RingBuffer(max_processing_times)
+
+        # Breakdown counters
+        self.sent_by_module: Dict[str, int] = defaultdict(int)
+        self.processed_by_module: Dict[str, int] = defaultdict(int)
+        self.failures_by_module: Dict[str, int] = defaultdict(int)
+        self.sent_by_type: Dict[str, int] = defaultdict(int)
+        self.processed_by_type: Dict[str, int] = defaultdict(int)
+        self.failures_by_type: Dict[str, int] = defaultdict(int)
+
+        # Failures are rare, so keep a small window of details for debugging
+        self.recent_failures: deque = deque(maxlen=max_recent_failures)
+
     def record_message_sent(self, message: Message):
         """Record message sent metric"""
-        with self._metrics_lock:
-            self.total_messages_sent += 1
-            self._add_metric("messages_sent", {
-                "timestamp": datetime.utcnow().isoformat(),
-                "message_id": message.metadata.message_id,
-                "message_type": message.message_type.value,
-                "sender_module": message.metadata.sender_module,
-                "recipient_module": message.metadata.recipient_module,
-                "priority": message.metadata.priority.value
-            })
-    
+        self.total_messages_sent += 1
+        self.sent_by_module[message.metadata.sender_module] += 1
+        self.sent_by_type[message.message_type.value] += 1
+
     def record_message_processed(self, message: Message, processing_time_ms: float):
         """Record message processed metric"""
-        with self._metrics_lock:
-            self.total_messages_processed += 1
-            
-            # Track processing times
-            self.processing_times.append(processing_time_ms)
-            if len(self.processing_times) > self.max_processing_times:
-                self.processing_times.pop(0)
-            
-            self._add_metric("messages_processed", {
-                "timestamp": datetime.utcnow().isoformat(),
-                "message_id": message.metadata.message_id,
-                "processing_time_ms": processing_time_ms,
-                "status": message.status.value
-            })
-    
+        self.total_messages_processed += 1
+        self.processing_times.append(processing_time_ms)
+        self.processed_by_module[message.metadata.recipient_module or message.metadata.topic or ""] += 1
+        self.processed_by_type[message.message_type.value] += 1
+
     def record_failure(self, message: Message, error: str):
         """Record message failure metric"""
-        with self._metrics_lock:
-            self.total_failures += 1
-            self._add_metric("message_failures", {
-                "timestamp": datetime.utcnow().isoformat(),
-                "message_id": message.metadata.message_id,
-                "error": error,
-                "retry_count": message.metadata.retry_count
-            })
-    
+        self.total_failures += 1
+        self.failures_by_module[message.metadata.recipient_module or message.metadata.topic or ""] += 1
+        self.failures_by_type[message.message_type.value] += 1
+        self.recent_failures.append(
+            (time.time(), message.metadata.message_id, error, message.metadata.retry_count)
+        )
+
     def record_timeout(self, message: Message):
         """Record message timeout metric"""
-        with self._metrics_lock:
-            self.total_timeouts += 1
-            self._add_metric("message_timeouts", {
-                "timestamp": datetime.utcnow().isoformat(),
-                "message_id": message.metadata.message_id
-            })
-    
+        self.total_timeouts += 1
+
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get performance summary"""
-        with self._metrics_lock:
-            avg_processing_time = (
-                sum(self.processing_times) / len(self.processing_times)
-                if self.processing_times else 0
-            )
-            
-            return {
-                "total_messages_sent": self.total_messages_sent,
-                "total_messages_processed": self.total_messages_processed,
-                "total_failures": self.total_failures,
-                "total_timeouts": self.total_timeouts,
-                "success_rate": (
-                    self.total_messages_processed / self.total_messages_sent
-                    if self.total_messages_sent > 0 else 1.0
-                ),
-                "failure_rate": (
-                    self.total_failures / self.total_messages_sent
-                    if self.total_messages_sent > 0 else 0.0
-                ),
-                "average_processing_time_ms": avg_processing_time,
-                "metrics_collected": sum(len(metrics) for metrics in self.metrics.values())
+        percentiles = self.processing_times.percentiles(50, 95, 99)
+
+        return {
+            "total_messages_sent": self.total_messages_sent,
+            "total_messages_processed": self.total_messages_processed,
+            "total_failures": self.total_failures,
+            "total_timeouts": self.total_timeouts,
+            "success_rate": (
+                self.total_messages_processed / self.total_messages_sent
+                if self.total_messages_sent > 0 else 1.0
+            ),
+            "failure_rate": (
+                self.total_failures / self.total_messages_sent
+                if self.total_messages_sent > 0 else 0.0
+            ),
+            "average_processing_time_ms": self.processing_times.mean(),
+            "p50_processing_time_ms": percentiles[50],
+            "p95_processing_time_ms": percentiles[95],
+            "p99_processing_time_ms": percentiles[99],
+            "metrics_collected": len(self.processing_times)
+        }
+
+    def get_breakdown(self) -> Dict[str, Any]:
+        """Get per-module and per-message-type counters"""
+        return {
+            "by_module": {
+                "sent": dict(self.sent_by_module),
+                "processed": dict(self.processed_by_module),
+                "failures": dict(self.failures_by_module)
+            },
+            "by_message_type": {
+                "sent": dict(self.sent_by_type),
+                "processed": dict(self.processed_by_type),
+                "failures": dict(self.failures_by_type)
+            },
+            "recent_failures": [
+                {
+                    "timestamp": datetime.utcfromtimestamp(timestamp).isoformat(),
+                    "message_id": message_id,
+                    "error": error,
+                    "retry_count": retry_count
+                }
+                for timestamp, message_id, error, retry_count in self.recent_failures
+            ]
+        }
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds"""
+
+    DEFAULT_BUCKETS_MS: Tuple[float, ...] = (
+        1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000
+    )
+
+    def __init__(self, buckets_ms: Optional[Tuple[float, ...]] = None):
+        self.buckets_ms = tuple(buckets_ms or self.DEFAULT_BUCKETS_MS)
+        # One extra bucket for values above the largest bound
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        """Record a single observation"""
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get bucket counts keyed by upper bound"""
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.buckets_ms, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "average_ms": self.sum_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "buckets": buckets
+        }
+
+
+class WeightedFairSemaphore:
+    """
+    Semaphore shared by all priority lanes that hands out free slots by
+    smooth weighted round-robin across lanes with waiters.
+
+    Uncontended lanes acquire immediately. Under saturation every lane with
+    waiters receives slots in proportion to its weight, so LOW traffic keeps
+    making progress while CRITICAL traffic gets the largest share.
+    """
+
+    DEFAULT_WEIGHTS: Dict[MessagePriority, int] = {
+        MessagePriority.CRITICAL: 8,
+        MessagePriority.HIGH: 4,
+        MessagePriority.NORMAL: 2,
+        MessagePriority.LOW: 1
+    }
+
+    def __init__(self, value: int, weights: Optional[Dict[MessagePriority, int]] = None):
+        if value < 1:
+            raise ValueError("Semaphore value must be at least 1")
+        self._value = value
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self._waiters: Dict[MessagePriority, deque] = {priority: deque() for priority in MessagePriority}
+        self._current_weight: Dict[MessagePriority, int] = {priority: 0 for priority in MessagePriority}
+        self.grants: Dict[MessagePriority, int] = {priority: 0 for priority in MessagePriority}
+
+    def locked(self) -> bool:
+        return self._value == 0
+
+    def waiting(self, priority: MessagePriority) -> int:
+        """Number of consumers of a lane waiting for a slot"""
+        return sum(1 for waiter in self._waiters[priority] if not waiter.done())
+
+    async def acquire(self, priority: MessagePriority = MessagePriority.NORMAL) -> bool:
+        """Acquire a slot on behalf of a priority lane"""
+        if self._value > 0 and not any(self._waiters.values()):
+            self._value -= 1
+            self.grants[priority] += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted as we were cancelled; pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters[priority].remove(waiter)
+                except ValueError:
+                    pass
+            raise
+        return True
+
+    def release(self):
+        """Release a slot and grant it to the next lane in weighted order"""
+        self._value += 1
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, priority: MessagePriority):
+        """Hold a slot for the duration of the block"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return None
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _wake_next(self):
+        while self._value > 0:
+            priority = self._select_lane()
+            if priority is None:
+                return
+            waiter = self._waiters[priority].popleft()
+            if waiter.done():
+                continue
+            self._value -= 1
+            self.grants[priority] += 1
+            waiter.set_result(True)
+
+    def _select_lane(self) -> Optional[MessagePriority]:
+        """Smooth weighted round-robin over lanes that have waiters"""
+        active = [priority for priority, waiters in self._waiters.items() if waiters]
+        if not active:
+            return None
+
+        total_weight = 0
+        for priority in active:
+            weight = self.weights[priority]
+            self._current_weight[priority] += weight
+            total_weight += weight
+
+        selected = max(active, key=lambda priority: self._current_weight[priority])
+        self._current_weight[selected] -= total_weight
+        return selected
+
+
+# Callback used by transports to hand a remote response back to the bus:
+# (correlation_id, payload, success, error_message) -> None
+ReplyCallback = Callable[[str, Dict[str, Any], bool, Optional[str]], None]
+
+
+class MessageTransport(ABC):
+    """
+    Abstract transport used by the message bus to move messages between
+    producers and consumers.
+
+    A transport delivers ``(delivery_tag, message)`` pairs per priority lane;
+    consumers must ``ack`` the tag once the message has been handled.
+    """
+
+    # Whether messages survive a process restart without extra persistence
+    durable: bool = False
+
+    # Whether consumers may live in other processes or on other nodes
+    distributed: bool = False
+
+    # Idle time after which another consumer may take over an unacknowledged
+    # delivery, if the transport does that
+    claim_idle_ms: Optional[int] = None
+
+    async def start(self, on_reply: Optional[ReplyCallback] = None):
+        """Start background work required by the transport"""
+        pass
+
+    async def stop(self):
+        """Stop background work and release resources"""
+        pass
+
+    @property
+    def reply_address(self) -> Optional[str]:
+        """Address other nodes should send responses to, if any"""
+        return None
+
+    @abstractmethod
+    async def publish(self, message: Message):
+        """Enqueue a message on the lane for its priority"""
+        pass
+
+    @abstractmethod
+    async def receive(self, priority: MessagePriority) -> Optional[Tuple[Any, Message]]:
+        """Wait for the next message on a lane, returning ``None`` on idle timeout"""
+        pass
+
+    @abstractmethod
+    async def ack(self, priority: MessagePriority, delivery_tag: Any):
+        """Acknowledge a delivered message"""
+        pass
+
+    @abstractmethod
+    async def publish_reply(
+        self,
+        reply_address: str,
+        correlation_id: str,
+        payload: Dict[str, Any],
+        success: bool,
+        error_message: Optional[str] = None
+    ):
+        """Route a response to the node that issued the request"""
+        pass
+
+    @abstractmethod
+    def queue_sizes(self) -> Dict[str, int]:
+        """Get locally known backlog per priority lane"""
+        pass
+
+
+class InMemoryTransport(MessageTransport):
+    """Single-process transport backed by one ``asyncio.Queue`` per priority"""
+
+    def __init__(self):
+        self.queues: Dict[MessagePriority, asyncio.Queue] = {
+            priority: asyncio.Queue() for priority in MessagePriority
+        }
+        self._on_reply: Optional[ReplyCallback] = None
+
+    async def start(self, on_reply: Optional[ReplyCallback] = None):
+        self._on_reply = on_reply
+
+    async def publish(self, message: Message):
+        await self.queues[message.metadata.priority].put(message)
+
+    async def receive(self, priority: MessagePriority) -> Optional[Tuple[Any, Message]]:
+        message = await self.queues[priority].get()
+        return None, message
+
+    async def ack(self, priority: MessagePriority, delivery_tag: Any):
+        pass
+
+    async def publish_reply(
+        self,
+        reply_address: str,
+        correlation_id: str,
+        payload: Dict[str, Any],
+        success: bool,
+        error_message: Optional[str] = None
+    ):
+        # Every requester lives in this process, so the reply goes straight back
+        if self._on_reply:
+            self._on_reply(correlation_id, payload, success, error_message)
+
+    def queue_sizes(self) -> Dict[str, int]:
+        return {priority.name: queue.qsize() for priority, queue in self.queues.items()}
+
+
+class RedisStreamsTransport(MessageTransport):
+    """
+    Durable, horizontally scalable transport built on Redis Streams.
+
+    Each priority lane is a stream read through a shared consumer group, so
+    messages are load-balanced across every worker process and node that
+    joins the group. Entries stay in the group's pending list until they are
+    acknowledged; entries left pending by a crashed consumer are reclaimed
+    with XAUTOCLAIM once they have been idle for ``claim_idle_ms``, and
+    consumers left idle with nothing pending are then removed from the group.
+
+    The consumer name should be stable across restarts of the same worker
+    (see create_message_transport) so that a restarted worker takes its own
+    pending entries back straight away instead of waiting for a reclaim.
+
+    Responses to requests are routed back to the originating node through a
+    per-consumer reply stream.
+    """
+
+    durable = True
+    distributed = True
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        stream_prefix: str = "message_bus",
+        group_name: str = "message_bus_workers",
+        consumer_name: Optional[str] = None,
+        batch_size: int = 32,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 60000,
+        claim_interval_seconds: float = 30.0,
+        max_stream_length: int = 100000,
+        reply_ttl_seconds: int = 300
+    ):
+        self.redis = redis_client
+        self.stream_prefix = stream_prefix
+        self.group_name = group_name
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.claim_interval_seconds = claim_interval_seconds
+        self.max_stream_length = max_stream_length
+        self.reply_ttl_seconds = reply_ttl_seconds
+
+        # Entries read from Redis but not yet handed to a consumer
+        self._buffers: Dict[MessagePriority, deque] = {
+            priority: deque() for priority in MessagePriority
+        }
+        self._last_claim: Dict[MessagePriority, float] = {
+            priority: 0.0 for priority in MessagePriority
+        }
+        # Re-deliver our own pending entries once after (re)start, from
+        # this entry id onwards; None once they have all been taken back
+        self._own_pending_from: Dict[MessagePriority, Optional[str]] = {
+            priority: "-" for priority in MessagePriority
+        }
+        self._groups_ready = False
+        self._on_reply: Optional[ReplyCallback] = None
+        self._reply_task: Optional[asyncio.Task] = None
+
+    def stream_key(self, priority: MessagePriority) -> str:
+        """Redis key of the stream backing a priority lane"""
+        return f"{self.stream_prefix}:{priority.name.lower()}"
+
+    @property
+    def reply_address(self) -> Optional[str]:
+        return f"{self.stream_prefix}:replies:{self.consumer_name}"
+
+    async def start(self, on_reply: Optional[ReplyCallback] = None):
+        await self._ensure_groups()
+        self._on_reply = on_reply
+        if on_reply and self._reply_task is None:
+            self._reply_task = asyncio.create_task(self._listen_for_replies())
+        logger.info(
+            f"Redis Streams transport started as consumer {self.consumer_name} "
+            f"in group {self.group_name}"
+        )
+
+    async def stop(self):
+        if self._reply_task:
+            self._reply_task.cancel()
+            await asyncio.gather(self._reply_task, return_exceptions=True)
+            self._reply_task = None
+
+        try:
+            await self.redis.delete(self.reply_address)
+        except Exception as e:
+            logger.debug(f"Failed to remove reply stream {self.reply_address}: {str(e)}")
+
+    async def publish(self, message: Message):
+        await self.redis.xadd(
+            self.stream_key(message.metadata.priority),
+            {"data": json.dumps(message.to_dict())},
+            maxlen=self.max_stream_length,
+            approximate=True
+        )
+
+    async def receive(self, priority: MessagePriority) -> Optional[Tuple[Any, Message]]:
+        buffer = self._buffers[priority]
+
+        if not buffer:
+            await self._fill_buffer(priority)
+
+        while buffer:
+            entry_id, fields = buffer.popleft()
+            message = self._decode_entry(fields)
+            if message is None:
+                # Poison entry: acknowledge so it is not redelivered forever
+                await self.ack(priority, entry_id)
+                continue
+            return entry_id, message
+
+        return None
+
+    async def ack(self, priority: MessagePriority, delivery_tag: Any):
+        if delivery_tag is None:
+            return
+        await self.redis.xack(self.stream_key(priority), self.group_name, delivery_tag)
+
+    async def publish_reply(
+        self,
+        reply_address: str,
+        correlation_id: str,
+        payload: Dict[str, Any],
+        success: bool,
+        error_message: Optional[str] = None
+    ):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(
+            reply_address,
+            {
+                "data": json.dumps({
+                    "correlation_id": correlation_id,
+                    "payload": payload,
+                    "success": success,
+                    "error": error_message
+                })
+            },
+            maxlen=self.max_stream_length,
+            approximate=True
+        )
+        pipe.expire(reply_address, self.reply_ttl_seconds)
+        await pipe.execute()
+
+    def queue_sizes(self) -> Dict[str, int]:
+        return {priority.name: len(buffer) for priority, buffer in self._buffers.items()}
+
+    async def get_lane_info(self) -> Dict[str, Dict[str, int]]:
+        """Get stream length and group pending count for every lane"""
+        info = {}
+        for priority in MessagePriority:
+            key = self.stream_key(priority)
+            pending = await self.redis.xpending(key, self.group_name)
+            info[priority.name] = {
+                "length": await self.redis.xlen(key),
+                "pending": pending["pending"] if pending else 0
             }
-    
-    def _add_metric(self, metric_type: str, data: Dict[str, Any]):
-        """Add metric with memory bounds"""
-        metrics_list = self.metrics[metric_type]
-        metrics_list.append(data)
-        
-        # Enforce memory limits
-        if len(metrics_list) > self.max_metrics // len(self.metrics or {"default": 1}):
-            metrics_list.pop(0)
+        return info
+
+    async def _ensure_groups(self):
+        """Create the consumer group on every lane stream if missing"""
+        if self._groups_ready:
+            return
+
+        for priority in MessagePriority:
+            try:
+                await self.redis.xgroup_create(
+                    self.stream_key(priority), self.group_name, id="0", mkstream=True
+                )
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+        self._groups_ready = True
+
+    async def _fill_buffer(self, priority: MessagePriority):
+        """Read the next batch for a lane: own pending, reclaimed, then new entries"""
+        key = self.stream_key(priority)
+        buffer = self._buffers[priority]
+
+        start_id = self._own_pending_from[priority]
+        if start_id is not None:
+            # Other consumers of the lane read new entries while this one
+            # takes back the next page, so no entry is redelivered twice
+            self._own_pending_from[priority] = None
+            try:
+                entries, self._own_pending_from[priority] = await self._claim_own_pending(key, start_id)
+            except Exception:
+                self._own_pending_from[priority] = start_id
+                raise
+            if entries:
+                buffer.extend(entries)
+                return
+
+        now = time.monotonic()
+        if now - self._last_claim[priority] >= self.claim_interval_seconds:
+            self._last_claim[priority] = now
+            claimed = await self.redis.xautoclaim(
+                key,
+                self.group_name,
+                self.consumer_name,
+                min_idle_time=self.claim_idle_ms,
+                start_id="0-0",
+                count=self.batch_size
+            )
+            entries = [entry for entry in claimed[1] if entry and entry[1]]
+            if entries:
+                logger.info(f"Reclaimed {len(entries)} stale entries from {key}")
+                buffer.extend(entries)
+                return
+            await self._remove_idle_consumers(key)
+
+        response = await self.redis.xreadgroup(
+            self.group_name,
+            self.consumer_name,
+            {key: ">"},
+            count=self.batch_size,
+            block=self.block_ms
+        )
+        buffer.extend(self._entries(response))
+
+    async def _claim_own_pending(
+        self, key: str, start_id: str
+    ) -> Tuple[List[Tuple[Any, Dict[Any, Any]]], Optional[str]]:
+        """
+        Take back entries this consumer read but never acknowledged before a
+        restart. Returns the entries and the id to continue from, if any.
+        """
+        pending = await self.redis.xpending_range(
+            key, self.group_name, min=start_id, max="+", count=self.batch_size,
+            consumername=self.consumer_name
+        )
+        if not pending:
+            return [], None
+
+        claimed = await self.redis.xclaim(
+            key,
+            self.group_name,
+            self.consumer_name,
+            min_idle_time=0,
+            message_ids=[entry["message_id"] for entry in pending]
+        )
+        entries = [entry for entry in claimed if entry and entry[1]]
+        if len(entries) < len(pending):
+            # Trimmed from the stream while pending: nothing left to deliver
+            delivered = {entry[0] for entry in entries}
+            missing = [entry["message_id"] for entry in pending if entry["message_id"] not in delivered]
+            await self.redis.xack(key, self.group_name, *missing)
+
+        next_id = None
+        if len(pending) == self.batch_size:
+            last_id = pending[-1]["message_id"]
+            if isinstance(last_id, bytes):
+                last_id = last_id.decode()
+            milliseconds, sequence = last_id.split("-")
+            next_id = f"{milliseconds}-{int(sequence) + 1}"
+        return entries, next_id
+
+    async def _remove_idle_consumers(self, key: str):
+        """Delete other consumers that have been idle past claim_idle_ms with nothing pending"""
+        try:
+            consumers = await self.redis.xinfo_consumers(key, self.group_name)
+        except Exception as e:
+            logger.debug(f"Failed to list consumers of {key}: {str(e)}")
+            return
+
+        for consumer in consumers:
+            name = consumer["name"]
+            if isinstance(name, bytes):
+                name = name.decode()
+            if name == self.consumer_name or consumer["idle"] < self.claim_idle_ms:
+                continue
+            # Deleting a consumer drops its pending entries, so check its
+            # pending list itself rather than the summary count
+            if await self.redis.xpending_range(
+                key, self.group_name, min="-", max="+", count=1, consumername=name
+            ):
+                continue
+            await self.redis.xgroup_delconsumer(key, self.group_name, name)
+            logger.info(f"Removed idle consumer {name} from {key}")
+
+    async def _listen_for_replies(self):
+        """Resolve responses that other nodes routed to this node's reply stream"""
+        last_id = "0"
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {self.reply_address: last_id}, count=self.batch_size, block=self.block_ms
+                )
+                for entry_id, fields in self._entries(response):
+                    last_id = entry_id
+                    reply = json.loads(fields.get("data") or fields.get(b"data"))
+                    self._on_reply(
+                        reply["correlation_id"],
+                        reply["payload"],
+                        reply["success"],
+                        reply.get("error")
+                    )
+                    await self.redis.xdel(self.reply_address, entry_id)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error reading reply stream {self.reply_address}: {str(e)}")
+                await asyncio.sleep(1)
+
+    @staticmethod
+    def _entries(response) -> List[Tuple[Any, Dict[Any, Any]]]:
+        """Flatten an XREAD/XREADGROUP response into (entry_id, fields) pairs"""
+        entries = []
+        for _stream, stream_entries in response or []:
+            entries.extend(stream_entries)
+        return entries
+
+    @staticmethod
+    def _decode_entry(fields: Dict[Any, Any]) -> Optional[Message]:
+        """Deserialize a stream entry into a Message"""
+        try:
+            raw = fields.get("data") or fields.get(b"data")
+            return Message.from_dict(json.loads(raw))
+        except Exception as e:
+            logger.error(f"Discarding undecodable stream entry: {str(e)}")
+            return None
+
+
+class RetryScheduler:
+    """
+    Delayed re-delivery of failed messages.
+
+    Messages waiting out their backoff sit in a min-heap keyed by due time and
+    a single background task re-dispatches them once due, so consumers never
+    sleep on behalf of a failing handler. Retries waiting in the heap are held
+    in memory only; on durable transports the bus leaves their original
+    delivery unacknowledged until they are re-dispatched.
+    """
+
+    def __init__(self, dispatch: Callable[[Message], Awaitable[None]]):
+        self._dispatch = dispatch
+        self._heap: List[Tuple[float, int, Message]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+
+        # Metrics
+        self.total_scheduled = 0
+        self.total_dispatched = 0
+        self.total_lateness_ms = 0.0
+        self.max_lateness_ms = 0.0
+        self.last_lateness_ms = 0.0
+
+    @property
+    def backlog(self) -> int:
+        """Number of messages waiting for their retry time"""
+        return len(self._heap)
+
+    def schedule(self, message: Message, delay_seconds: float):
+        """Schedule a message to be dispatched after ``delay_seconds``"""
+        due_at = time.monotonic() + max(delay_seconds, 0.0)
+        heapq.heappush(self._heap, (due_at, next(self._sequence), message))
+        self.total_scheduled += 1
+
+        # Wake the scheduler if this retry is due before everything else
+        if self._heap[0][2] is message:
+            self._wakeup.set()
+
+    async def run(self):
+        """Dispatch messages as their retry time comes due"""
+        while True:
+            try:
+                if not self._heap:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+
+                while self._heap and self._heap[0][0] <= time.monotonic():
+                    due_at, _, message = heapq.heappop(self._heap)
+                    self._record_lateness((time.monotonic() - due_at) * 1000)
+                    await self._dispatch(message)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in retry scheduler: {str(e)}")
+                await asyncio.sleep(1)
+
+    def drain(self) -> List[Message]:
+        """Remove and return every scheduled message, earliest first"""
+        messages = [message for _, _, message in sorted(self._heap)]
+        self._heap.clear()
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backlog depth and retry lateness metrics"""
+        next_due_in = (
+            max(self._heap[0][0] - time.monotonic(), 0.0) if self._heap else None
+        )
+        return {
+            "backlog": self.backlog,
+            "next_due_in_seconds": next_due_in,
+            "total_scheduled": self.total_scheduled,
+            "total_dispatched": self.total_dispatched,
+            "average_lateness_ms": (
+                self.total_lateness_ms / self.total_dispatched
+                if self.total_dispatched else 0.0
+            ),
+            "max_lateness_ms": self.max_lateness_ms,
+            "last_lateness_ms": self.last_lateness_ms
+        }
+
+    def _record_lateness(self, lateness_ms: float):
+        self.total_dispatched += 1
+        self.total_lateness_ms += lateness_ms
+        self.last_lateness_ms = lateness_ms
+        if lateness_ms > self.max_lateness_ms:
+            self.max_lateness_ms = lateness_ms
 
 
 class InterModuleMessageBus:
@@ -494,16 +1247,39 @@ class InterModuleMessageBus:
         self,
         redis_client: Optional[aioredis.Redis] = None,
         audit_service: Optional[AuditService] = None,
-        max_concurrent_messages: int = 1000
+        max_concurrent_messages: Optional[int] = None,
+        transport: Optional[MessageTransport] = None,
+        consumers_per_lane: Optional[int] = None,
+        lane_weights: Optional[Dict[MessagePriority, int]] = None,
+        lane_slots: Optional[int] = None
     ):
         self.redis = redis_client
         self.audit_service = audit_service
+        max_concurrent_messages = max_concurrent_messages or settings.MESSAGE_BUS_MAX_CONCURRENT_MESSAGES
         self.max_concurrent_messages = max_concurrent_messages
+        self.lane_slots = lane_slots or settings.MESSAGE_BUS_LANE_SLOTS
+        self.transport = transport or InMemoryTransport()
+        self.consumers_per_lane = max(
+            1, consumers_per_lane or settings.MESSAGE_BUS_CONSUMERS_PER_LANE
+        )
+        
+        # Each lane consumer holds at most one slot, so with as many slots as
+        # consumers the lanes never wait and their weights have no effect
+        lane_consumers = len(MessagePriority) * self.consumers_per_lane
+        if self.lane_slots >= lane_consumers:
+            logger.warning(
+                f"Message bus has {self.lane_slots} lane slots for {lane_consumers} "
+                f"lane consumers; lane weights have no effect"
+            )
         
         # Core components
         self.storage = MessageStorage(redis_client)
         self.dead_letter_queue = DeadLetterQueue(self.storage, audit_service)
         self.metrics = MessageBusMetrics()
+        self.retry_scheduler = RetryScheduler(self._dispatch_retry)
+        # Durable deliveries waiting for a scheduled retry stay unacknowledged
+        # until the retry is re-published: message id -> (lane, delivery tag)
+        self._unacked_retries: Dict[str, Tuple[MessagePriority, Any]] = {}
         
         # Message handling
         self.message_handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
@@ -513,40 +1289,57 @@ class InterModuleMessageBus:
         # Circuit breakers per module
         self.circuit_breakers: Dict[str, CircuitBreaker] = {}
         
-        # Processing queues with priority
-        self.message_queues: Dict[MessagePriority, asyncio.Queue] = {
-            priority: asyncio.Queue() for priority in MessagePriority
-        }
-        
         # Background tasks
         self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="message-bus")
         self.background_tasks: List[asyncio.Task] = []
-        self.processing_semaphore = asyncio.Semaphore(max_concurrent_messages)
+        # Lane consumers and in-process deliveries use separate pools, so
+        # local calls are not starved by (or starve) the lanes
+        self.lane_semaphore = WeightedFairSemaphore(self.lane_slots, lane_weights)
+        self.processing_semaphore = WeightedFairSemaphore(max_concurrent_messages, lane_weights)
+        
+        # Per-lane latency: time from send to processing start, and handler time
+        self.lane_queue_latency: Dict[MessagePriority, LatencyHistogram] = {
+            priority: LatencyHistogram() for priority in MessagePriority
+        }
+        self.lane_processing_latency: Dict[MessagePriority, LatencyHistogram] = {
+            priority: LatencyHistogram() for priority in MessagePriority
+        }
+        self.lane_in_flight: Dict[MessagePriority, int] = {priority: 0 for priority in MessagePriority}
+        
+        # At-most-once event deliveries running outside the lanes
+        self._in_process_tasks: Set[asyncio.Task] = set()
         
         # Locks for thread safety
         self._handlers_lock = threading.RLock()
         self._responses_lock = threading.RLock()
         
-        logger.info(f"Inter-module message bus initialized with max concurrent messages: {max_concurrent_messages}")
+        logger.info(
+            f"Inter-module message bus initialized with max concurrent messages: {max_concurrent_messages}, "
+            f"lane slots: {self.lane_slots}, "
+            f"transport: {type(self.transport).__name__}"
+        )
     
     async def start(self):
         """Start message bus processing"""
         try:
-            # Start message processing tasks for each priority
+            await self.transport.start(on_reply=self._resolve_pending_response)
+            
+            # Start a pool of consumers for each priority lane
             for priority in MessagePriority:
-                task = asyncio.create_task(
-                    self._process_messages_by_priority(priority)
-                )
-                self.background_tasks.append(task)
+                for _ in range(self.consumers_per_lane):
+                    task = asyncio.create_task(
+                        self._process_messages_by_priority(priority)
+                    )
+                    self.background_tasks.append(task)
+            
+            # Start delayed retry scheduler
+            retry_task = asyncio.create_task(self.retry_scheduler.run())
+            self.background_tasks.append(retry_task)
             
             # Start cleanup task
             cleanup_task = asyncio.create_task(self._cleanup_expired_messages())
             self.background_tasks.append(cleanup_task)
             
-            # Start metrics rotation task
-            metrics_task = asyncio.create_task(self._rotate_metrics())
-            self.background_tasks.append(metrics_task)
-            
             logger.info("Message bus background tasks started")
             
         except Exception as e:
@@ -557,14 +1350,25 @@ class InterModuleMessageBus:
         """Stop message bus processing"""
         try:
             # Cancel all background tasks
-            for task in self.background_tasks:
+            tasks = self.background_tasks + list(self._in_process_tasks)
+            for task in tasks:
                 task.cancel()
             
-            if self.background_tasks:
-                await asyncio.gather(*self.background_tasks, return_exceptions=True)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            
+            # Hand pending retries back to a durable transport rather than dropping them
+            pending_retries = self.retry_scheduler.drain()
+            if pending_retries and self.transport.durable:
+                for message in pending_retries:
+                    await self._dispatch_retry(message)
+            elif pending_retries:
+                logger.warning(f"Dropping {len(pending_retries)} scheduled retries on shutdown")
+            
+            await self.transport.stop()
             
             # Shutdown executor
-            self.executor.shutdown(wait=True, timeout=30)
+            self.executor.shutdown(wait=True)
             
             logger.info("Message bus stopped")
             
@@ -614,7 +1418,8 @@ class InterModuleMessageBus:
         payload: Dict[str, Any],
         timeout_seconds: int = 30,
         priority: MessagePriority = MessagePriority.NORMAL,
-        correlation_id: Optional[str] = None
+        correlation_id: Optional[str] = None,
+        delivery: DeliveryGuarantee = DeliveryGuarantee.AT_MOST_ONCE
     ) -> Any:
         """
         Send synchronous request and wait for response
@@ -626,6 +1431,9 @@ class InterModuleMessageBus:
             timeout_seconds: Request timeout
             priority: Message priority
             correlation_id: Optional correlation ID for tracking
+            delivery: AT_MOST_ONCE hands the request straight to a handler in
+                this process when one is registered; DURABLE always goes
+                through the transport and message storage
             
         Returns:
             Response data from recipient module
@@ -641,15 +1449,31 @@ class InterModuleMessageBus:
                 sender_module=sender_module,
                 recipient_module=recipient_module,
                 expires_at=datetime.utcnow() + timedelta(seconds=timeout_seconds),
-                priority=priority
+                priority=priority,
+                reply_to=self.transport.reply_address
             )
             
             message = Message(
                 message_type=MessageType.REQUEST,
                 payload=payload,
-                metadata=metadata
+                metadata=metadata,
+                delivery=delivery
             )
             
+            # In-process fast path: no queueing, persistence or serialization
+            if delivery == DeliveryGuarantee.AT_MOST_ONCE:
+                handler = self._get_local_handler(recipient_module, MessageType.REQUEST)
+                if handler is not None:
+                    self.metrics.record_message_sent(message)
+                    try:
+                        return await asyncio.wait_for(
+                            self._invoke_in_process(handler, message),
+                            timeout=timeout_seconds
+                        )
+                    except asyncio.TimeoutError:
+                        self.metrics.record_timeout(message)
+                        raise Exception(f"Request to {recipient_module} timed out after {timeout_seconds}s")
+            
             # Create future for response
             response_future = asyncio.Future()
             with self._responses_lock:
@@ -681,7 +1505,8 @@ class InterModuleMessageBus:
         correlation_id: str,
         payload: Dict[str, Any],
         success: bool = True,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        reply_to: Optional[str] = None
     ):
         """Send response to a request"""
         try:
@@ -706,32 +1531,60 @@ class InterModuleMessageBus:
                 error_message=error_message
             )
             
-            # Find and resolve pending response
-            with self._responses_lock:
-                if correlation_id in self.pending_responses:
-                    future = self.pending_responses[correlation_id]
-                    if not future.done():
-                        if success:
-                            future.set_result(payload)
-                        else:
-                            future.set_exception(Exception(error_message or "Request failed"))
-                    
-                    del self.pending_responses[correlation_id]
+            # Resolve locally, or route to the node that issued the request
+            resolved = self._resolve_pending_response(correlation_id, payload, success, error_message)
+            if (
+                not resolved
+                and reply_to
+                and reply_to != self.transport.reply_address
+                and self.transport.distributed
+            ):
+                await self.transport.publish_reply(
+                    reply_to, correlation_id, payload, success, error_message
+                )
             
             self.metrics.record_message_sent(message)
             
         except Exception as e:
             logger.error(f"Failed to send response for correlation {correlation_id}: {str(e)}")
     
+    def _resolve_pending_response(
+        self,
+        correlation_id: str,
+        payload: Dict[str, Any],
+        success: bool,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """Resolve a pending request future owned by this bus instance"""
+        with self._responses_lock:
+            future = self.pending_responses.pop(correlation_id, None)
+        
+        if future is None:
+            return False
+        
+        if not future.done():
+            if success:
+                future.set_result(payload)
+            else:
+                future.set_exception(Exception(error_message or "Request failed"))
+        return True
+    
     async def publish_event(
         self,
         sender_module: str,
         topic: str,
         payload: Dict[str, Any],
         tags: Optional[Set[str]] = None,
-        priority: MessagePriority = MessagePriority.NORMAL
+        priority: MessagePriority = MessagePriority.NORMAL,
+        delivery: DeliveryGuarantee = DeliveryGuarantee.DURABLE
     ):
-        """Publish event to topic subscribers"""
+        """
+        Publish event to topic subscribers
+        
+        With AT_MOST_ONCE delivery the event object is handed directly to
+        subscribers registered in this process, without persistence, retries
+        or delivery to other processes.
+        """
         try:
             message_id = str(uuid.uuid4())
             metadata = MessageMetadata(
@@ -745,10 +1598,16 @@ class InterModuleMessageBus:
             message = Message(
                 message_type=MessageType.EVENT,
                 payload=payload,
-                metadata=metadata
+                metadata=metadata,
+                delivery=delivery
             )
             
-            await self._queue_message(message)
+            if delivery == DeliveryGuarantee.AT_MOST_ONCE:
+                task = asyncio.create_task(self._deliver_event_in_process(message))
+                self._in_process_tasks.add(task)
+                task.add_done_callback(self._in_process_tasks.discard)
+            else:
+                await self._queue_message(message)
             self.metrics.record_message_sent(message)
             
             logger.debug(f"Published event to topic {topic} from {sender_module}")
@@ -830,11 +1689,10 @@ class InterModuleMessageBus:
     async def _queue_message(self, message: Message):
         """Queue message for processing based on priority"""
         try:
-            priority_queue = self.message_queues[message.metadata.priority]
-            await priority_queue.put(message)
+            await self.transport.publish(message)
             
-            # Store message for persistence
-            await self.storage.store_message(message)
+            if self._needs_storage(message):
+                await self.storage.store_message(message)
             
         except Exception as e:
             logger.error(f"Failed to queue message {message.metadata.message_id}: {str(e)}")
@@ -842,22 +1700,45 @@ class InterModuleMessageBus:
     
     async def _process_messages_by_priority(self, priority: MessagePriority):
         """Process messages for a specific priority queue"""
-        queue = self.message_queues[priority]
-        
         while True:
             try:
-                # Get message from queue
-                message = await queue.get()
-                
-                # Check if message expired
-                if message.is_expired():
-                    logger.warning(f"Message {message.metadata.message_id} expired before processing")
-                    self.metrics.record_timeout(message)
+                # Get message from transport
+                delivery = await self.transport.receive(priority)
+                if delivery is None:
                     continue
+                delivery_tag, message = delivery
+                retrying = False
                 
-                # Process message with semaphore protection
-                async with self.processing_semaphore:
-                    await self._process_message(message)
+                try:
+                    # Check if message expired
+                    if message.is_expired():
+                        logger.warning(f"Message {message.metadata.message_id} expired before processing")
+                        self.metrics.record_timeout(message)
+                        continue
+                    
+                    # Process message once the lane is granted a slot
+                    async with self._slot(self.lane_semaphore, priority):
+                        self.lane_queue_latency[priority].observe(
+                            (datetime.utcnow() - message.metadata.created_at).total_seconds() * 1000
+                        )
+                        self.lane_in_flight[priority] += 1
+                        started = time.perf_counter()
+                        try:
+                            await self._process_message(message)
+                            retrying = message.status == MessageStatus.PENDING
+                        finally:
+                            self.lane_in_flight[priority] -= 1
+                            self.lane_processing_latency[priority].observe(
+                                (time.perf_counter() - started) * 1000
+                            )
+                finally:
+                    if retrying and self.transport.durable:
+                        # The retry waits in memory; the entry stays pending in
+                        # the transport until the retry is re-published, so a
+                        # crash or restart meanwhile does not lose it
+                        self._unacked_retries[message.metadata.message_id] = (priority, delivery_tag)
+                    else:
+                        await self.transport.ack(priority, delivery_tag)
                 
             except asyncio.CancelledError:
                 break
@@ -896,16 +1777,21 @@ class InterModuleMessageBus:
             self.metrics.record_failure(message, str(e))
             
             # Handle retry logic
-            if message.metadata.retry_count < message.metadata.max_retries:
+            if message.delivery == DeliveryGuarantee.AT_MOST_ONCE:
+                # Never redeliver at-most-once messages
+                pass
+            elif message.metadata.retry_count < message.metadata.max_retries:
                 message.metadata.retry_count += 1
                 message.status = MessageStatus.PENDING
                 
-                # Exponential backoff
-                delay = min(2 ** message.metadata.retry_count, 60)  # Max 60 seconds
-                await asyncio.sleep(delay)
+                # Exponential backoff without blocking the consumer
+                delay = self._retry_delay(message.metadata.retry_count)
+                self.retry_scheduler.schedule(message, delay)
                 
-                logger.info(f"Retrying message {message.metadata.message_id} (attempt {message.metadata.retry_count})")
-                await self._queue_message(message)
+                logger.info(
+                    f"Scheduled retry of message {message.metadata.message_id} "
+                    f"(attempt {message.metadata.retry_count}) in {delay}s"
+                )
             else:
                 # Move to dead letter queue
                 await self.dead_letter_queue.add_message(message, f"Max retries exceeded: {str(e)}")
@@ -914,9 +1800,101 @@ class InterModuleMessageBus:
         
         finally:
             # Clean up message from storage if completed
-            if message.status in [MessageStatus.COMPLETED, MessageStatus.DEAD_LETTER]:
+            if (
+                message.status in [MessageStatus.COMPLETED, MessageStatus.DEAD_LETTER]
+                and self._needs_storage(message)
+            ):
                 await self.storage.delete_message(message.metadata.message_id)
     
+    def _needs_storage(self, message: Message) -> bool:
+        """Whether a queued message needs a persisted copy in message storage"""
+        # Durable transports keep their own copy of in-flight messages
+        return message.delivery == DeliveryGuarantee.DURABLE and not self.transport.durable
+    
+    def _get_local_handler(self, module_id: str, message_type: MessageType) -> Optional[MessageHandler]:
+        """Get the first handler registered in this process for a module and message type"""
+        handlers = self.message_handlers.get(f"{module_id}:{message_type.value}")
+        if handlers and module_id in self.circuit_breakers:
+            return handlers[0]
+        return None
+    
+    async def _invoke_in_process(self, handler: MessageHandler, message: Message) -> Any:
+        """Hand a request object directly to a local handler and return its result"""
+        priority = message.metadata.priority
+        async with self._in_process_slot(priority):
+            circuit_breaker = self.circuit_breakers[message.metadata.recipient_module]
+            message.status = MessageStatus.PROCESSING
+            start_time = time.perf_counter()
+            
+            try:
+                result = await circuit_breaker.call(handler.handle_message, message)
+            except Exception as e:
+                message.status = MessageStatus.FAILED
+                message.error_message = str(e)
+                self.metrics.record_failure(message, str(e))
+                raise
+            
+            processing_time = (time.perf_counter() - start_time) * 1000
+            message.status = MessageStatus.COMPLETED
+            message.processing_time_ms = processing_time
+            self.metrics.record_message_processed(message, processing_time)
+            self.lane_processing_latency[priority].observe(processing_time)
+            return result
+    
+    async def _deliver_event_in_process(self, message: Message):
+        """Fan an event object out to local subscribers"""
+        priority = message.metadata.priority
+        async with self._in_process_slot(priority):
+            start_time = time.perf_counter()
+            try:
+                await self._handle_event(message)
+            except Exception as e:
+                message.status = MessageStatus.FAILED
+                self.metrics.record_failure(message, str(e))
+                logger.error(f"Failed to deliver event {message.metadata.message_id}: {str(e)}")
+                return
+            
+            processing_time = (time.perf_counter() - start_time) * 1000
+            message.status = MessageStatus.COMPLETED
+            message.processing_time_ms = processing_time
+            self.metrics.record_message_processed(message, processing_time)
+            self.lane_processing_latency[priority].observe(processing_time)
+    
+    @asynccontextmanager
+    async def _slot(self, semaphore: WeightedFairSemaphore, priority: MessagePriority):
+        """Hold a slot of a pool while marking the handlers run under it"""
+        async with semaphore.slot(priority):
+            token = _holding_slot.set(True)
+            try:
+                yield
+            finally:
+                _holding_slot.reset(token)
+    
+    @asynccontextmanager
+    async def _in_process_slot(self, priority: MessagePriority):
+        """A processing slot, unless the caller is a handler that already holds one"""
+        if _holding_slot.get():
+            yield
+            return
+        async with self._slot(self.processing_semaphore, priority):
+            yield
+    
+    async def _dispatch_retry(self, message: Message):
+        """Re-publish a due retry, then acknowledge the delivery it replaces"""
+        # Taken first: the re-published message may fail and be held again
+        unacked = self._unacked_retries.pop(message.metadata.message_id, None)
+        await self._queue_message(message)
+        if unacked:
+            await self.transport.ack(*unacked)
+    
+    def _retry_delay(self, retry_count: int) -> float:
+        """Exponential backoff delay for a retry attempt"""
+        delay = min(2 ** retry_count, 60)  # Max 60 seconds
+        if self.transport.claim_idle_ms:
+            # Re-publish before another consumer may claim the held entry
+            delay = min(delay, self.transport.claim_idle_ms / 2000)
+        return delay
+    
     async def _handle_request(self, message: Message):
         """Handle request message"""
         recipient = message.metadata.recipient_module
@@ -946,7 +1924,8 @@ class InterModuleMessageBus:
                 sender_module=recipient,
                 correlation_id=message.metadata.correlation_id,
                 payload=result,
-                success=True
+                success=True,
+                reply_to=message.metadata.reply_to
             )
             
         except Exception as e:
@@ -956,7 +1935,8 @@ class InterModuleMessageBus:
                 correlation_id=message.metadata.correlation_id,
                 payload={},
                 success=False,
-                error_message=str(e)
+                error_message=str(e),
+                reply_to=message.metadata.reply_to
             )
             raise
     
@@ -1065,27 +2045,22 @@ class InterModuleMessageBus:
             except Exception as e:
                 logger.error(f"Error in cleanup task: {str(e)}")
     
-    async def _rotate_metrics(self):
-        """Background task to rotate metrics"""
-        while True:
-            try:
-                await asyncio.sleep(3600)  # Every hour
-                
-                # Reset metrics to prevent memory growth
-                with self.metrics._metrics_lock:
-                    # Keep only recent metrics
-                    for metric_type in list(self.metrics.metrics.keys()):
-                        metrics_list = self.metrics.metrics[metric_type]
-                        if len(metrics_list) > 1000:
-                            # Keep last 1000 entries
-                            self.metrics.metrics[metric_type] = metrics_list[-1000:]
-                
-                logger.debug("Rotated message bus metrics")
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in metrics rotation: {str(e)}")
+    def get_lane_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get queue depth, concurrency and latency histograms per priority lane"""
+        queue_sizes = self.transport.queue_sizes()
+        return {
+            priority.name: {
+                "consumers": self.consumers_per_lane,
+                "weight": self.lane_semaphore.weights[priority],
+                "queue_depth": queue_sizes.get(priority.name, 0),
+                "waiting_for_slot": self.lane_semaphore.waiting(priority),
+                "in_flight": self.lane_in_flight[priority],
+                "slots_granted": self.lane_semaphore.grants[priority],
+                "queue_latency_ms": self.lane_queue_latency[priority].to_dict(),
+                "processing_latency_ms": self.lane_processing_latency[priority].to_dict()
+            }
+            for priority in MessagePriority
+        }
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get current message bus metrics"""
@@ -1098,11 +2073,12 @@ class InterModuleMessageBus:
                 module: breaker.state.value 
                 for module, breaker in self.circuit_breakers.items()
             },
-            "queue_sizes": {
-                priority.name: queue.qsize() 
-                for priority, queue in self.message_queues.items()
-            },
-            "dead_letter_queue_size": len(self.dead_letter_queue.dead_messages)
+            "transport": type(self.transport).__name__,
+            "queue_sizes": self.transport.queue_sizes(),
+            "dead_letter_queue_size": len(self.dead_letter_queue.dead_messages),
+            "retry_scheduler": self.retry_scheduler.get_stats(),
+            "lanes": self.get_lane_stats(),
+            "breakdown": self.metrics.get_breakdown()
         }
 
 
@@ -1110,6 +2086,24 @@ class InterModuleMessageBus:
 message_bus: Optional[InterModuleMessageBus] = None
 
 
+def create_message_transport(redis_client: Optional[aioredis.Redis] = None) -> MessageTransport:
+    """Create the transport selected by MESSAGE_BUS_TRANSPORT"""
+    if settings.MESSAGE_BUS_TRANSPORT == "redis_streams":
+        if redis_client is None:
+            logger.warning("Redis Streams transport requested without a Redis client, using in-memory transport")
+            return InMemoryTransport()
+        # Stable across restarts, so a restarted worker recovers its own pending entries
+        worker_id = settings.MESSAGE_BUS_WORKER_ID or str(os.getpid())
+        return RedisStreamsTransport(
+            redis_client,
+            stream_prefix=settings.MESSAGE_BUS_STREAM_PREFIX,
+            group_name=settings.MESSAGE_BUS_CONSUMER_GROUP,
+            consumer_name=f"{socket.gethostname()}-{worker_id}",
+            claim_idle_ms=settings.MESSAGE_BUS_CLAIM_IDLE_MS
+        )
+    return InMemoryTransport()
+
+
 def get_message_bus() -> InterModuleMessageBus:
     """Get the global message bus instance"""
     global message_bus
@@ -1121,18 +2115,26 @@ def get_message_bus() -> InterModuleMessageBus:
 async def initialize_message_bus(
     redis_client: Optional[aioredis.Redis] = None,
     audit_service: Optional[AuditService] = None,
-    max_concurrent_messages: int = 1000
+    max_concurrent_messages: Optional[int] = None,
+    transport: Optional[MessageTransport] = None
 ) -> InterModuleMessageBus:
     """Initialize the global message bus"""
     global message_bus
     if message_bus is None:
+        if transport is None:
+            transport = create_message_transport(redis_client)
         message_bus = InterModuleMessageBus(
             redis_client=redis_client,
             audit_service=audit_service,
-            max_concurrent_messages=max_concurrent_messages
+            max_concurrent_messages=max_concurrent_messages,
+            transport=transport,
+            consumers_per_lane=settings.MESSAGE_BUS_CONSUMERS_PER_LANE
         )
         await message_bus.start()
-        logger.info(f"Global message bus initialized with {max_concurrent_messages} max concurrent messages")
+        logger.info(
+            f"Global message bus initialized with {message_bus.max_concurrent_messages} max concurrent messages, "
+            f"{message_bus.consumers_per_lane} consumers per lane"
+        )
     return message_bus
 
 
@@ -9,6 +9,8 @@ from enum import Enum
 from dataclasses import dataclass
 from datetime import timedelta
 
+from .route_matcher import RoutePatternMatcher
+
 
 class Industry(Enum):
     """Supported industry types with specific rate limiting requirements."""
@@ -71,6 +73,11 @@ class RateLimitConfig:
         self._industry_configs = self._initialize_industry_configs()
         self._endpoint_configs = self._initialize_endpoint_configs()
         self._global_limits = self._initialize_global_limits()
+        # Endpoint patterns compiled once, highest priority first
+        self._endpoint_matcher = RoutePatternMatcher([
+            (endpoint_config.pattern, endpoint_config)
+            for endpoint_config in sorted(self._endpoint_configs, key=lambda x: x.priority, reverse=True)
+        ])
     
     def _initialize_industry_configs(self) -> Dict[Industry, Dict[str, RateLimitRule]]:
         """Initialize industry-specific rate limiting configurations."""
@@ -323,34 +330,13 @@ class RateLimitConfig:
         return self._industry_configs.get(industry, self._industry_configs[Industry.DEFAULT])
     
     def get_endpoint_limits(self, path: str) -> List[EndpointLimits]:
-        """Get endpoint-specific limits that match the given path."""
-        matching_limits = []
-        
-        for endpoint_config in self._endpoint_configs:
-            if self._path_matches_pattern(path, endpoint_config.pattern):
-                matching_limits.append(endpoint_config)
-        
-        # Sort by priority (higher priority first)
-        return sorted(matching_limits, key=lambda x: x.priority, reverse=True)
+        """Get endpoint-specific limits that match the given path, highest priority first."""
+        return list(self._endpoint_matcher.match(path))
     
     def get_global_limits(self) -> Dict[str, RateLimitRule]:
         """Get global rate limits."""
         return self._global_limits
     
-    def _path_matches_pattern(self, path: str, pattern: str) -> bool:
-        """Check if a path matches a pattern (supports basic wildcards)."""
-        # Simple wildcard matching - can be enhanced with regex if needed
-        if pattern.endswith("*"):
-            return path.startswith(pattern[:-1])
-        elif pattern.startswith("*"):
-            return path.endswith(pattern[1:])
-        elif "*" in pattern:
-            parts = pattern.split("*")
-            if len(parts) == 2:
-                return path.startswith(parts[0]) and path.endswith(parts[1])
-        
-        return path == pattern
-    
     def get_applicable_limits(
         self, 
         path: str, 
@@ -16,6 +16,7 @@ from .logging import logger
 from .config import settings
 from .rate_limit_config import Industry, RateLimitRule, RateLimitType
 from ..services.rate_limit_service import RateLimitResult, SlidingWindowRateLimiter
+from ..services.rate_limit_engine import WINDOW_KEY_PREFIX
 
 
 class RateLimiterCore:
@@ -220,9 +221,10 @@ class RateLimiterCore:
         Create a secure rate limit key with proper tenant isolation.
         
         The key structure ensures that tenants cannot access each other's
-        rate limiting data.
+        rate limiting data. The sliding window limiter adds the
+        rate_limit:window: namespace.
         """
-        key_parts = ["rate_limit"]
+        key_parts = []
         
         # Always include tenant_id for isolation
         if tenant_id:
@@ -271,7 +273,7 @@ class RateLimiterCore:
         
         try:
             # Get statistics only for the specified tenant
-            tenant_pattern = f"rate_limit:tenant:{tenant_id}:*"
+            tenant_pattern = f"{WINDOW_KEY_PREFIX}tenant:{tenant_id}:*"
             
             keys = []
             async for key in self.redis_client.scan_iter(match=tenant_pattern):
@@ -339,9 +341,9 @@ class RateLimiterCore:
         try:
             # Build pattern for keys to reset
             if user_id:
-                pattern = f"rate_limit:tenant:{tenant_id}:user:{user_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}tenant:{tenant_id}:user:{user_id}:*"
             else:
-                pattern = f"rate_limit:tenant:{tenant_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}tenant:{tenant_id}:*"
             
             # Collect keys to delete
             keys = []
@@ -0,0 +1,100 @@
+"""
+Compiled Route Pattern Matching
+
+Rate limit and industry restriction tables are keyed by wildcard path
+patterns ("/api/v1/auth/*", "*/upload", "/health"). Instead of testing every
+pattern on every request, RoutePatternMatcher compiles a table into one
+regular expression that reports all matching patterns in a single pass,
+and memoizes the result per route template so repeat requests for the same
+route skip matching altogether. Exact paths are cached in front of the
+templates, since most traffic repeats paths verbatim.
+"""
+import re
+from functools import lru_cache
+from typing import Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Path segments that are resource identifiers (numeric ids and UUIDs)
+ID_SEGMENT = re.compile(
+    r"/(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})(?=/|\Z)"
+)
+ID_PLACEHOLDER = "{id}"
+
+# A pattern literal containing a segment of only these characters could
+# be (part of) an identifier, so templating would change its matches
+_ID_CHARS = re.compile(r"[0-9a-fA-F-]+")
+
+
+def route_template(path: str) -> str:
+    """Replace identifier segments so all requests for a route share one key."""
+    return ID_SEGMENT.sub("/" + ID_PLACEHOLDER, path)
+
+
+def pattern_regex(pattern: str) -> str:
+    """
+    Regular expression for a wildcard pattern
+
+    Follows the platform's wildcard rules: a trailing "*" is a prefix
+    match, a leading "*" a suffix match, a single inner "*" a prefix and
+    suffix match, and anything else an exact match.
+    """
+    if pattern.endswith("*"):
+        return re.escape(pattern[:-1])
+    if pattern.startswith("*"):
+        return rf".*{re.escape(pattern[1:])}\Z"
+
+    parts = pattern.split("*")
+    if len(parts) == 2:
+        # Prefix and suffix are checked independently and may overlap
+        return rf"(?={re.escape(parts[0])})(?=.*{re.escape(parts[1])}\Z)"
+    return rf"{re.escape(pattern)}\Z"
+
+
+def pattern_literals(pattern: str) -> List[str]:
+    """The literal text a pattern compares paths against."""
+    if pattern.endswith("*"):
+        return [pattern[:-1]]
+    if pattern.startswith("*"):
+        return [pattern[1:]]
+    parts = pattern.split("*")
+    return parts if len(parts) == 2 else [pattern]
+
+
+class RoutePatternMatcher(Generic[T]):
+    """
+    All entries whose pattern matches a path, in table order
+
+    Each pattern becomes an optional lookahead with an empty capture group,
+    so a single regex match marks every matching pattern at once.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[str, T]], cache_size: int = 4096):
+        self.entries = list(entries)
+        self._values = tuple(value for _, value in self.entries)
+        self._regex = re.compile(
+            "".join(f"(?:(?={pattern_regex(pattern)})())?" for pattern, _ in self.entries),
+            re.DOTALL
+        )
+        # Templating is only safe when no pattern compares against text
+        # that an identifier segment could contain
+        self.templated = not any(
+            _ID_CHARS.fullmatch(segment)
+            for pattern, _ in self.entries
+            for literal in pattern_literals(pattern)
+            for segment in literal.split("/")
+        )
+        self._lookup = lru_cache(maxsize=cache_size)(self._match)
+        self.match = lru_cache(maxsize=cache_size)(self._match_path)
+
+    def cache_info(self):
+        """Hits and misses of the per-template cache"""
+        return self._lookup.cache_info()
+
+    def _match_path(self, path: str) -> Tuple[T, ...]:
+        """Entries matching the path, memoized per route template"""
+        return self._lookup(route_template(path) if self.templated else path)
+
+    def _match(self, path: str) -> Tuple[T, ...]:
+        groups = self._regex.match(path).groups()
+        return tuple(value for value, group in zip(self._values, groups) if group is not None)
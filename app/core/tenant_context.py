@@ -0,0 +1,80 @@
+"""
+Tenant Database Context
+
+Carries the tenant context for RLS policies in a contextvar and applies it
+to every database transaction begun while it is set, on whichever session
+the request is using. PostgreSQL's transaction-local settings
+(set_config(..., true)) vanish at commit, so the settings are issued once
+per transaction, in a single statement, from the session's after_begin
+event rather than from a separate session.
+"""
+import contextvars
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+# One round trip for every RLS setting
+SET_TENANT_CONTEXT_SQL = text(
+    "SELECT "
+    "set_config('app.current_tenant_id', :tenant_id, true), "
+    "set_config('app.current_user_role', :user_role, true), "
+    "set_config('app.current_user_id', :user_id, true), "
+    "set_config('app.current_industry_type', :industry_type, true), "
+    "set_config('app.allow_cross_tenant', :allow_cross_tenant, true)"
+)
+
+# Tenant id sent for contexts that belong to no tenant (cross-tenant loads).
+# The RLS policies cast app.current_tenant_id to uuid, which fails on an
+# empty string; the nil UUID casts cleanly and matches no organisation, so
+# only the super admin policy can grant access.
+NO_TENANT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+@dataclass(frozen=True)
+class TenantDatabaseContext:
+    """RLS session settings for the current request"""
+    tenant_id: str
+    user_role: str
+    user_id: str
+    industry_type: Optional[str] = None
+    allow_cross_tenant: bool = False
+
+    def as_params(self) -> dict:
+        return {
+            "tenant_id": self.tenant_id or NO_TENANT_ID,
+            "user_role": self.user_role,
+            "user_id": self.user_id,
+            "industry_type": self.industry_type or "",
+            "allow_cross_tenant": "true" if self.allow_cross_tenant else "false",
+        }
+
+
+_current_tenant_context: contextvars.ContextVar[Optional[TenantDatabaseContext]] = contextvars.ContextVar(
+    "tenant_database_context", default=None
+)
+
+
+def get_tenant_context() -> Optional[TenantDatabaseContext]:
+    """Tenant context applied to transactions begun in the current context"""
+    return _current_tenant_context.get()
+
+
+def set_tenant_context(context: Optional[TenantDatabaseContext]) -> contextvars.Token:
+    """Set the tenant context; pass the returned token to reset_tenant_context."""
+    return _current_tenant_context.set(context)
+
+
+def reset_tenant_context(token: contextvars.Token) -> None:
+    """Restore the tenant context that was current before set_tenant_context."""
+    _current_tenant_context.reset(token)
+
+
+@event.listens_for(Session, "after_begin")
+def apply_tenant_context(session, transaction, connection) -> None:
+    """Issue the RLS settings on the connection of each new transaction."""
+    context = get_tenant_context()
+    if context is None or connection.dialect.name != "postgresql":
+        return
+    connection.execute(SET_TENANT_CONTEXT_SQL, context.as_params())
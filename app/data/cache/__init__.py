@@ -1,3 +1,4 @@
 from .redis_cache import RedisCacheManager
+from .local_cache import LocalLRUCache, LocalCacheEntry
 
-__all__ = ["RedisCacheManager"]
\ No newline at end of file
+__all__ = ["RedisCacheManager", "LocalLRUCache", "LocalCacheEntry"]
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, Optional, FrozenSet
+
+
+@dataclass
+class LocalCacheEntry:
+    """
+    Entry held in the in-process cache
+
+    Timestamps are wall-clock seconds so they can be compared with the
+    soft expiry stored alongside Redis entries by other workers.
+    """
+    value: Any
+    local_until: float
+    stale_after: float
+    expires_at: float
+    tags: FrozenSet[str] = field(default_factory=frozenset)
+
+    def is_fresh(self, now: float) -> bool:
+        """Servable without consulting Redis"""
+        return now < self.local_until and now < self.stale_after
+
+    def is_stale(self, now: float) -> bool:
+        """Past its soft TTL but still inside the stale-while-revalidate window"""
+        return self.stale_after <= now < self.expires_at
+
+
+class LocalLRUCache:
+    """Bounded in-process LRU cache used as an L1 in front of Redis"""
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, LocalCacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Optional[LocalCacheEntry]:
+        """Get an entry that has not hard-expired, marking it most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if (now if now is not None else time.time()) >= entry.expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: Hashable, entry: LocalCacheEntry) -> None:
+        """Insert or replace an entry, evicting the least recently used one when full"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove a single entry"""
+        return self._entries.pop(key, None) is not None
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying any of the given tags"""
+        tags = frozenset(tags)
+        if not tags:
+            return 0
+
+        doomed = [key for key, entry in self._entries.items() if entry.tags & tags]
+        for key in doomed:
+            del self._entries[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
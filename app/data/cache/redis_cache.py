@@ -1,16 +1,21 @@
 import asyncio
 import json
 import hashlib
-from typing import Any, Optional, Dict
+import time
+from typing import Any, Optional, Dict, Iterable, List
 from datetime import timedelta
 import redis.asyncio as redis
 from redis.exceptions import RedisError
 
-from ..interfaces.cache import ICacheManager
+from ..interfaces.cache import ICacheManager, build_cache_tags
 from ...core.logging import logger
 from ...core.config import settings
 from ...core.redis_manager import redis_manager
 
+# Tag members are pruned this long after their key expires, so a worker whose
+# clock runs ahead cannot drop a key that is still live in Redis
+TAG_PRUNE_GRACE_SECONDS = 60
+
 
 class RedisCacheManager(ICacheManager):
     """Redis-based cache manager for the data abstraction layer"""
@@ -20,6 +25,8 @@ class RedisCacheManager(ICacheManager):
         self.redis_client: Optional[redis.Redis] = None
         self.default_ttl = config.get("default_ttl", 3600)  # 1 hour default
         self.key_prefix = config.get("key_prefix", "data_layer:")
+        # Tag sets outlive their members so invalidation never misses a live key
+        self.tag_ttl = config.get("tag_ttl", 86400)
         
     async def initialize(self) -> None:
         """Initialize Redis connection using centralized connection manager"""
@@ -72,9 +79,17 @@ class RedisCacheManager(ICacheManager):
         self, 
         key: str, 
         value: Any, 
-        ttl: Optional[timedelta] = None
+        ttl: Optional[timedelta] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
-        """Set value in cache with optional TTL and fallback support"""
+        """
+        Set value in cache with optional TTL and fallback support
+        
+        Tagged keys are also added to one sorted set per tag, scored by the
+        key's expiry, so everything cached under a tag can be invalidated
+        without scanning the keyspace. Members whose keys have expired are
+        trimmed from the tag on every write to it.
+        """
         try:
             if not self.redis_client:
                 if redis_manager.is_fallback_mode():
@@ -101,7 +116,22 @@ class RedisCacheManager(ICacheManager):
             elif self.default_ttl:
                 ttl_seconds = self.default_ttl
             
-            if ttl_seconds:
+            if tags:
+                tag_ttl = max(ttl_seconds or 0, self.tag_ttl)
+                now = time.time()
+                expires_at = now + ttl_seconds if ttl_seconds else float("inf")
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    if ttl_seconds:
+                        pipe.setex(full_key, ttl_seconds, serialized_value)
+                    else:
+                        pipe.set(full_key, serialized_value)
+                    for tag in tags:
+                        tag_key = self._tag_key(tag)
+                        pipe.zadd(tag_key, {full_key: expires_at})
+                        pipe.zremrangebyscore(tag_key, "-inf", now - TAG_PRUNE_GRACE_SECONDS)
+                        pipe.expire(tag_key, tag_ttl)
+                    await pipe.execute()
+            elif ttl_seconds:
                 await self.redis_client.setex(full_key, ttl_seconds, serialized_value)
             else:
                 await self.redis_client.set(full_key, serialized_value)
@@ -222,15 +252,55 @@ class RedisCacheManager(ICacheManager):
         
         return ":".join(key_parts)
     
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under any of the given tags"""
+        try:
+            if not self.redis_client or not tags:
+                return 0
+            
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            
+            # Read and drop the tag sets atomically so keys tagged concurrently
+            # land in a fresh set instead of being lost
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for tag_key in tag_keys:
+                    pipe.zrange(tag_key, 0, -1)
+                pipe.delete(*tag_keys)
+                results = await pipe.execute()
+            
+            keys = set().union(*results[:len(tag_keys)])
+            if not keys:
+                return 0
+            
+            keys = list(keys)
+            deleted = 0
+            for start in range(0, len(keys), 500):
+                deleted += await self.redis_client.delete(*keys[start:start + 500])
+            
+            logger.info(f"Invalidated {deleted} keys tagged {', '.join(tags)}")
+            return deleted
+            
+        except RedisError as e:
+            logger.error(f"Redis error invalidating tags {tags}: {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Unexpected error invalidating tags {tags}: {e}")
+            return 0
+    
     async def invalidate_source_cache(self, source: str) -> int:
         """Invalidate all cache entries for a specific data source"""
-        pattern = f"{source}:*"
-        return await self.clear_pattern(pattern)
+        return await self.invalidate_tags(*build_cache_tags(source=source))
     
-    async def invalidate_org_cache(self, org_id: str) -> int:
+    async def invalidate_for_org(self, org_id: str) -> int:
         """Invalidate all cache entries for a specific organization"""
-        pattern = f"*:*:*{org_id}*"
-        return await self.clear_pattern(pattern)
+        return await self.invalidate_tags(*build_cache_tags(org_id=org_id))
+    
+    async def invalidate_for_market(self, market: str) -> int:
+        """Invalidate all cache entries for a specific market"""
+        return await self.invalidate_tags(*build_cache_tags(market=market))
+    
+    # Backward compatible name
+    invalidate_org_cache = invalidate_for_org
     
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -259,6 +329,10 @@ class RedisCacheManager(ICacheManager):
             logger.error(f"Unexpected error getting cache stats: {e}")
             return {}
     
+    def _tag_key(self, tag: str) -> str:
+        # Sorted sets; the plain sets previously kept under "tag:" expire unused
+        return f"{self.key_prefix}tag_index:{tag}"
+    
     def _calculate_hit_rate(self, hits: int, misses: int) -> float:
         """Calculate cache hit rate percentage"""
         total = hits + misses
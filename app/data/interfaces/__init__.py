@@ -1,4 +1,4 @@
-from .base import AbstractDataSource, DataSourceType, QueryParams, DataResponse
+from .base import AbstractDataSource, DataSourceType, QueryParams, DataResponse, DataPage
 from .cache import ICacheManager
 from .router import IDataSourceRouter
 
@@ -7,6 +7,7 @@ __all__ = [
     "DataSourceType", 
     "QueryParams",
     "DataResponse",
+    "DataPage",
     "ICacheManager",
     "IDataSourceRouter"
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -38,6 +38,13 @@ class DataResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class DataPage(BaseModel):
+    """One page of a streamed result set"""
+    data: List[Dict[str, Any]]
+    source: DataSourceType
+    next_cursor: Optional[str] = None
+
+
 class AbstractDataSource(ABC):
     """Base class for all data source implementations"""
     
@@ -93,6 +100,22 @@ class AbstractDataSource(ABC):
         """Execute a custom query (SQL, REST endpoint, etc.)"""
         pass
     
+    def stream_competitive_data(
+        self,
+        org_id: str,
+        market: str,
+        params: QueryParams,
+        cursor: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[DataPage]:
+        """
+        Stream competitive intelligence data in keyset-paginated pages
+        
+        params.limit caps the total rows streamed; the last page carries a
+        next_cursor to resume from when more rows remain.
+        """
+        raise NotImplementedError(f"{self.source_type} does not support streaming")
+    
     async def close(self) -> None:
         """Close connections and cleanup resources"""
         pass
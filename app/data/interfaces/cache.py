@@ -1,8 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Optional, Iterable, List
 from datetime import timedelta
 
 
+def build_cache_tags(
+    source: Optional[str] = None,
+    org_id: Optional[str] = None,
+    market: Optional[str] = None
+) -> List[str]:
+    """Build the invalidation tags for a cache entry"""
+    tags = []
+    if source:
+        tags.append(f"source:{source}")
+    if org_id:
+        tags.append(f"org:{org_id}")
+    if market:
+        tags.append(f"market:{market}")
+    return tags
+
+
 class ICacheManager(ABC):
     """Interface for cache management"""
     
@@ -16,9 +32,10 @@ class ICacheManager(ABC):
         self, 
         key: str, 
         value: Any, 
-        ttl: Optional[timedelta] = None
+        ttl: Optional[timedelta] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
-        """Set value in cache with optional TTL"""
+        """Set value in cache with optional TTL and invalidation tags"""
         pass
     
     @abstractmethod
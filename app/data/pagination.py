@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+
+# Column appended to every keyset ordering so the sort is total
+KEYSET_TIEBREAKER = "id"
+
+KeysetOrder = List[Tuple[str, bool]]
+
+
+def keyset_order(order_by: Optional[List[str]], tiebreaker: str = KEYSET_TIEBREAKER) -> KeysetOrder:
+    """
+    Turn an order_by list ("-date", "name") into (column, descending) pairs
+
+    The tiebreaker column is appended unless already present so that two
+    rows never compare equal and a cursor identifies one position exactly.
+    """
+    order = [
+        (field[1:], True) if field.startswith("-") else (field, False)
+        for field in (order_by or [])
+    ]
+    if tiebreaker not in {name for name, _ in order}:
+        order.append((tiebreaker, order[0][1] if order else False))
+    return order
+
+
+def _encode_value(value: Any) -> Any:
+    # Tag types that JSON would flatten to strings so keyset comparisons
+    # are bound with the column's own type when the cursor comes back
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, UUID):
+        return {"$uuid": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and len(value) == 1:
+        tag, raw = next(iter(value.items()))
+        if tag == "$dt":
+            return datetime.fromisoformat(raw)
+        if tag == "$d":
+            return date.fromisoformat(raw)
+        if tag == "$dec":
+            return Decimal(raw)
+        if tag == "$uuid":
+            return UUID(raw)
+    return value
+
+
+def encode_cursor(row: Dict[str, Any], order: KeysetOrder) -> str:
+    """Encode the sort-key values of the last row of a page as an opaque cursor"""
+    values = [_encode_value(row.get(name)) for name, _ in order]
+    payload = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: Optional[KeysetOrder] = None) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, validating it against the ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError("cursor payload is not a list")
+        values = [_decode_value(value) for value in values]
+    except Exception as e:
+        raise ValueError(f"Invalid pagination cursor: {e}") from e
+
+    if order is not None and len(values) != len(order):
+        raise ValueError("Invalid pagination cursor: does not match the requested ordering")
+    return values
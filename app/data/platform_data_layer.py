@@ -1,12 +1,14 @@
-from typing import Dict, List, Optional, Any, Union
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 
-from .interfaces.base import DataSourceType, QueryParams, DataResponse
+from .interfaces.base import DataSourceType, QueryParams, DataResponse, DataPage
 from .interfaces.router import IDataSourceRouter
 from .interfaces.cache import ICacheManager
 from .router import DataSourceRouter
 from .cache import RedisCacheManager
-from .sources import SupabaseDataSource
+from .sources import SupabaseDataSource, PostgreSQLDataSource
+from .config import create_data_layer_config
 from ..core.logging import logger
 
 
@@ -33,6 +35,7 @@ class PlatformDataLayer:
             
             # Initialize and register data sources
             await self._initialize_data_sources()
+            self.router.start_health_monitor()
             
             self._initialized = True
             logger.info("Platform data layer initialized successfully")
@@ -52,8 +55,14 @@ class PlatformDataLayer:
             await supabase_source.initialize()
             self.router.register_source(DataSourceType.SUPABASE, supabase_source)
         
+        # Initialize PostgreSQL source on the shared application engine
+        if "postgresql" in sources_config:
+            postgresql_source = PostgreSQLDataSource(sources_config["postgresql"])
+            await postgresql_source.initialize()
+            self.router.register_source(DataSourceType.POSTGRESQL, postgresql_source)
+        
         # Add other data sources here as they're implemented
-        # PostgreSQL, Databricks, etc.
+        # Databricks, etc.
     
     async def get_competitive_intelligence(
         self,
@@ -67,6 +76,32 @@ class PlatformDataLayer:
         """Get competitive intelligence data for a market"""
         self._ensure_initialized()
         
+        params = self._competitive_intelligence_params(competitors, date_range, limit, offset)
+        return await self.router.route_competitive_data(org_id, market, params)
+    
+    def stream_competitive_intelligence(
+        self,
+        org_id: str,
+        market: str,
+        competitors: Optional[List[str]] = None,
+        date_range: Optional[Dict[str, Union[str, datetime]]] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 500,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[DataPage]:
+        """Stream competitive intelligence data for a market in keyset-paginated pages"""
+        self._ensure_initialized()
+        
+        params = self._competitive_intelligence_params(competitors, date_range, limit)
+        return self.router.stream_competitive_data(org_id, market, params, cursor=cursor, page_size=page_size)
+    
+    @staticmethod
+    def _competitive_intelligence_params(
+        competitors: Optional[List[str]],
+        date_range: Optional[Dict[str, Union[str, datetime]]],
+        limit: Optional[int],
+        offset: Optional[int] = None
+    ) -> QueryParams:
         # Build query parameters
         filters = {}
         if competitors:
@@ -74,14 +109,12 @@ class PlatformDataLayer:
         if date_range:
             filters["date_range"] = date_range
         
-        params = QueryParams(
+        return QueryParams(
             filters=filters,
             limit=limit,
             offset=offset,
             order_by=["-date", "competitor_name"]
         )
-        
-        return await self.router.route_competitive_data(org_id, market, params)
     
     async def get_market_data(
         self,
@@ -155,19 +188,37 @@ class PlatformDataLayer:
         """Search competitive intelligence data"""
         self._ensure_initialized()
         
+        params = self._search_params(search_query, market, limit)
+        return await self.router.route_competitive_data(org_id, "all", params)
+    
+    def stream_search_results(
+        self,
+        org_id: str,
+        search_query: str,
+        market: Optional[str] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 500,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[DataPage]:
+        """Stream competitive intelligence search results in keyset-paginated pages"""
+        self._ensure_initialized()
+        
+        params = self._search_params(search_query, market, limit)
+        return self.router.stream_competitive_data(org_id, "all", params, cursor=cursor, page_size=page_size)
+    
+    @staticmethod
+    def _search_params(search_query: str, market: Optional[str], limit: Optional[int]) -> QueryParams:
         filters = {
             "search": search_query
         }
         if market:
             filters["market"] = market
         
-        params = QueryParams(
+        return QueryParams(
             filters=filters,
             limit=limit,
             order_by=["-relevance", "-date"]
         )
-        
-        return await self.router.route_competitive_data(org_id, "all", params)
     
     async def get_trending_data(
         self,
@@ -179,6 +230,26 @@ class PlatformDataLayer:
         """Get trending competitive data for a market"""
         self._ensure_initialized()
         
+        params = self._trending_params(period, limit)
+        return await self.router.route_competitive_data(org_id, market, params)
+    
+    def stream_trending_data(
+        self,
+        org_id: str,
+        market: str,
+        period: str = "7d",
+        cursor: Optional[str] = None,
+        page_size: int = 500,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[DataPage]:
+        """Stream trending competitive data for a market in keyset-paginated pages"""
+        self._ensure_initialized()
+        
+        params = self._trending_params(period, limit)
+        return self.router.stream_competitive_data(org_id, market, params, cursor=cursor, page_size=page_size)
+    
+    @staticmethod
+    def _trending_params(period: str, limit: Optional[int]) -> QueryParams:
         # Calculate date range based on period
         end_date = datetime.now()
         if period == "7d":
@@ -198,13 +269,11 @@ class PlatformDataLayer:
             "trending": True
         }
         
-        params = QueryParams(
+        return QueryParams(
             filters=filters,
             limit=limit,
             order_by=["-trend_score", "-date"]
         )
-        
-        return await self.router.route_competitive_data(org_id, market, params)
     
     async def get_analytics_summary(
         self,
@@ -332,6 +401,8 @@ class PlatformDataLayer:
         """Close all connections and cleanup resources"""
         try:
             if self.router:
+                self.router.stop_health_monitor()
+                
                 # Close all registered data sources
                 for source in self.router.sources.values():
                     await source.close()
@@ -347,4 +418,33 @@ class PlatformDataLayer:
     
     @property
     def is_initialized(self) -> bool:
-        return self._initialized
\ No newline at end of file
+        return self._initialized
+
+
+_platform_data_layer: Optional[PlatformDataLayer] = None
+_platform_data_layer_lock = asyncio.Lock()
+
+
+async def get_platform_data_layer() -> PlatformDataLayer:
+    """Get the process-wide data layer, initializing it on first use"""
+    global _platform_data_layer
+    
+    if _platform_data_layer is not None and _platform_data_layer.is_initialized:
+        return _platform_data_layer
+    
+    async with _platform_data_layer_lock:
+        if _platform_data_layer is None or not _platform_data_layer.is_initialized:
+            data_layer = PlatformDataLayer(create_data_layer_config())
+            await data_layer.initialize()
+            _platform_data_layer = data_layer
+    
+    return _platform_data_layer
+
+
+async def close_platform_data_layer() -> None:
+    """Close the process-wide data layer if it was initialized"""
+    global _platform_data_layer
+    
+    if _platform_data_layer is not None:
+        await _platform_data_layer.close()
+        _platform_data_layer = None
@@ -1,12 +1,18 @@
+import asyncio
 import time
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Awaitable, Callable, Dict, FrozenSet, List, Optional, Any, Tuple
 from datetime import timedelta
 
-from ..interfaces.base import AbstractDataSource, DataSourceType, QueryParams, DataResponse
+from ..interfaces.base import AbstractDataSource, DataSourceType, QueryParams, DataResponse, DataPage
 from ..interfaces.router import IDataSourceRouter
-from ..interfaces.cache import ICacheManager
+from ..interfaces.cache import ICacheManager, build_cache_tags
+from ..cache.local_cache import LocalLRUCache, LocalCacheEntry
+from .health_monitor import SourceHealthMonitor, SourceCircuitConfig
 from ...core.logging import logger
 
+# Soft-expiry timestamp stored with each Redis entry for stale-while-revalidate
+STALE_AFTER_FIELD = "_stale_after"
+
 
 class DataSourceRouter(IDataSourceRouter):
     """Routes queries to appropriate data sources with caching and failover"""
@@ -22,13 +28,40 @@ class DataSourceRouter(IDataSourceRouter):
             self.default_source = config.get('default_source', 'supabase')
             self.enable_fallback = config.get('enable_fallback', True)
             self.health_check_interval = config.get('health_check_interval', 60)
+            local_cache_size = config.get('local_cache_size', 1024)
+            self.local_cache_ttl = config.get('local_cache_ttl', 30)
+            circuit_config = SourceCircuitConfig(
+                failure_threshold=config.get('circuit_failure_threshold', 5),
+                open_seconds=config.get('circuit_open_seconds', 30)
+            )
         else:
             self.default_source = 'supabase'
             self.enable_fallback = True
             self.health_check_interval = 60
+            local_cache_size = 1024
+            self.local_cache_ttl = 30
+            circuit_config = SourceCircuitConfig()
+        
+        # Source health is tracked in the background; queries only consult
+        # the per-source circuit breakers
+        self.health_monitor = SourceHealthMonitor(
+            self.sources,
+            interval_seconds=self.health_check_interval,
+            circuit_config=circuit_config
+        )
+        
+        # In-process L1 in front of Redis; local_cache_ttl bounds how long an
+        # entry is served without checking Redis for other workers' invalidations
+        self.local_cache = LocalLRUCache(max_entries=local_cache_size)
+        self._inflight: Dict[str, "asyncio.Task[DataResponse]"] = {}
+        self._inflight_tags: Dict[str, FrozenSet[str]] = {}
+        self._coalesced_requests = 0
+        self._stale_served = 0
+        self._background_refreshes = 0
         
         # Default routing rules
         self._setup_default_routing()
+        self._setup_cache_policies()
     
     def _setup_default_routing(self) -> None:
         """Setup default routing rules for different query types"""
@@ -48,6 +81,14 @@ class DataSourceRouter(IDataSourceRouter):
             "custom_query": [DataSourceType.SUPABASE, DataSourceType.POSTGRESQL]
         }
     
+    def _setup_cache_policies(self) -> None:
+        """Setup cache TTL and stale-while-revalidate window per query type"""
+        self.cache_policies: Dict[str, Tuple[timedelta, timedelta]] = {
+            "competitive_data": (timedelta(minutes=30), timedelta(minutes=5)),
+            "reference_data": (timedelta(hours=4), timedelta(hours=1)),
+            "analytics_data": (timedelta(minutes=15), timedelta(minutes=5))
+        }
+    
     def register_source(
         self, 
         source_type: DataSourceType, 
@@ -55,12 +96,21 @@ class DataSourceRouter(IDataSourceRouter):
     ) -> None:
         """Register a new data source"""
         self.sources[source_type] = source
+        self.health_monitor.breaker_for(source_type)
         logger.info(f"Registered data source: {source_type}")
     
     def get_source(self, source_type: DataSourceType) -> Optional[AbstractDataSource]:
         """Get a specific data source"""
         return self.sources.get(source_type)
     
+    def start_health_monitor(self) -> None:
+        """Start background health probes of the registered sources"""
+        self.health_monitor.start()
+    
+    def stop_health_monitor(self) -> None:
+        """Stop background health probes"""
+        self.health_monitor.cancel()
+    
     async def route_competitive_data(
         self,
         org_id: str,
@@ -80,34 +130,87 @@ class DataSourceRouter(IDataSourceRouter):
                 market=market,
                 **(params.model_dump(exclude_none=True) if hasattr(params, 'model_dump') else params.dict(exclude_none=True))
             )
-            
-            # Try to get from cache first
-            cached_result = await self.cache_manager.get(cache_key)
-            if cached_result:
-                logger.debug(f"Cache hit for competitive data query: {cache_key}")
-                cached_result["cached"] = True
-                return DataResponse(**cached_result)
-        
-        # Get data from source with fallback
-        result = await self._execute_with_fallback(
-            query_type=query_type,
-            method_name="get_competitive_data",
-            org_id=org_id,
-            market=market,
-            params=params
-        )
         
-        # Cache the result
-        if self.cache_manager and cache_key and result:
-            cache_ttl = timedelta(minutes=30)  # Cache competitive data for 30 minutes
-            await self.cache_manager.set(
-                cache_key, 
-                (result.model_dump() if hasattr(result, 'model_dump') else result.dict()), 
-                ttl=cache_ttl
+        return await self._route_cached(
+            query_type,
+            cache_key,
+            tags=build_cache_tags(source=query_type, org_id=org_id, market=market),
+            fetch=lambda: self._execute_with_fallback(
+                query_type=query_type,
+                method_name="get_competitive_data",
+                org_id=org_id,
+                market=market,
+                params=params
             )
-            result.cache_ttl = int(cache_ttl.total_seconds())
+        )
+    
+    async def stream_competitive_data(
+        self,
+        org_id: str,
+        market: str,
+        params: QueryParams,
+        cursor: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[DataPage]:
+        """
+        Stream competitive data pages from the first available source
         
-        return result
+        Streams bypass the cache. Failover to the next source is only
+        possible until the first page has been yielded.
+        """
+        query_type = "competitive_data"
+        last_error = None
+        
+        for source_type in self.fallback_order.get(query_type, []):
+            source = self.sources.get(source_type)
+            if not source or not source.is_initialized:
+                continue
+            if not self.health_monitor.is_available(source_type):
+                logger.debug(f"Skipping data source {source_type}: circuit open")
+                continue
+            
+            try:
+                pages = source.stream_competitive_data(
+                    org_id=org_id,
+                    market=market,
+                    params=params,
+                    cursor=cursor,
+                    page_size=page_size
+                )
+            except NotImplementedError:
+                continue
+            
+            breaker = self.health_monitor.breaker_for(source_type)
+            start = time.perf_counter()
+            started = False
+            try:
+                async for page in pages:
+                    if not started:
+                        started = True
+                        breaker.record_success((time.perf_counter() - start) * 1000)
+                    yield page
+            except ValueError:
+                # Invalid cursor or parameters, not a source failure
+                raise
+            except Exception as e:
+                if not started:
+                    breaker.record_failure((time.perf_counter() - start) * 1000)
+                logger.error(f"Error streaming from source {source_type} for {query_type}: {e}")
+                if started:
+                    raise
+                last_error = e
+                continue
+            
+            if not started:
+                breaker.record_success((time.perf_counter() - start) * 1000)
+            return
+        
+        error_msg = f"All data sources failed for streamed {query_type}"
+        if last_error:
+            error_msg += f". Last error: {last_error}"
+        
+        logger.error(error_msg)
+        raise Exception(error_msg)
     
     async def route_reference_data(
         self,
@@ -127,33 +230,18 @@ class DataSourceRouter(IDataSourceRouter):
                 dataset=dataset,
                 **cache_params
             )
-            
-            # Try to get from cache first
-            cached_result = await self.cache_manager.get(cache_key)
-            if cached_result:
-                logger.debug(f"Cache hit for reference data query: {cache_key}")
-                cached_result["cached"] = True
-                return DataResponse(**cached_result)
-        
-        # Get data from source with fallback
-        result = await self._execute_with_fallback(
-            query_type=query_type,
-            method_name="get_reference_data",
-            dataset=dataset,
-            params=params
-        )
         
-        # Cache the result (reference data can be cached longer)
-        if self.cache_manager and cache_key and result:
-            cache_ttl = timedelta(hours=4)  # Cache reference data for 4 hours
-            await self.cache_manager.set(
-                cache_key, 
-                (result.model_dump() if hasattr(result, 'model_dump') else result.dict()), 
-                ttl=cache_ttl
+        return await self._route_cached(
+            query_type,
+            cache_key,
+            tags=build_cache_tags(source=query_type),
+            fetch=lambda: self._execute_with_fallback(
+                query_type=query_type,
+                method_name="get_reference_data",
+                dataset=dataset,
+                params=params
             )
-            result.cache_ttl = int(cache_ttl.total_seconds())
-        
-        return result
+        )
     
     async def route_analytics_data(
         self,
@@ -172,34 +260,176 @@ class DataSourceRouter(IDataSourceRouter):
                 org_id=org_id,
                 **(params.model_dump(exclude_none=True) if hasattr(params, 'model_dump') else params.dict(exclude_none=True))
             )
+        
+        return await self._route_cached(
+            query_type,
+            cache_key,
+            tags=build_cache_tags(source=query_type, org_id=org_id),
+            fetch=lambda: self._execute_with_fallback(
+                query_type=query_type,
+                method_name="get_analytics_data",
+                org_id=org_id,
+                params=params
+            )
+        )
+    
+    async def _route_cached(
+        self,
+        query_type: str,
+        cache_key: Optional[str],
+        tags: List[str],
+        fetch: Callable[[], Awaitable[DataResponse]]
+    ) -> DataResponse:
+        """
+        Serve a query through the local L1 cache, then Redis, then the source
+        
+        Entries past their soft TTL are served stale while a single background
+        refresh runs; concurrent misses for the same key share one fetch.
+        """
+        if not self.cache_manager or not cache_key:
+            return await fetch()
+        
+        now = time.time()
+        
+        # L1: no network round trip, no JSON decode, no model rebuild
+        entry = self.local_cache.get(cache_key, now)
+        if entry:
+            if entry.is_fresh(now):
+                return self._copy_response(entry.value, cached=True)
+            if entry.is_stale(now):
+                self._stale_served += 1
+                self._refresh_in_background(query_type, cache_key, tags, fetch)
+                return self._copy_response(entry.value, cached=True)
+        
+        # L2: Redis shared by all workers
+        cached_result = await self.cache_manager.get(cache_key)
+        if cached_result:
+            logger.debug(f"Cache hit for {query_type} query: {cache_key}")
+            stale_after = cached_result.pop(STALE_AFTER_FIELD, None)
+            cached_result["cached"] = True
+            response = DataResponse(**cached_result)
             
-            # Try to get from cache first
-            cached_result = await self.cache_manager.get(cache_key)
-            if cached_result:
-                logger.debug(f"Cache hit for analytics data query: {cache_key}")
-                cached_result["cached"] = True
-                return DataResponse(**cached_result)
-        
-        # Get data from source with fallback
-        result = await self._execute_with_fallback(
-            query_type=query_type,
-            method_name="get_analytics_data",
-            org_id=org_id,
-            params=params
+            now = time.time()
+            ttl, stale_window = self.cache_policies[query_type]
+            if stale_after is None:
+                stale_after = now + ttl.total_seconds()
+            self._store_local(cache_key, response, tags, now, stale_after, stale_after + stale_window.total_seconds())
+            
+            if now >= stale_after:
+                self._stale_served += 1
+                self._refresh_in_background(query_type, cache_key, tags, fetch)
+            return self._copy_response(response, cached=True)
+        
+        # Miss: coalesce concurrent fetches of the same key
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = self._start_load(query_type, cache_key, tags, fetch)
+        else:
+            self._coalesced_requests += 1
+        
+        result = await asyncio.shield(task)
+        return self._copy_response(result) if result else result
+    
+    def _start_load(
+        self,
+        query_type: str,
+        cache_key: str,
+        tags: List[str],
+        fetch: Callable[[], Awaitable[DataResponse]]
+    ) -> "asyncio.Task[DataResponse]":
+        """Start the single upstream fetch for a key"""
+        task = asyncio.ensure_future(
+            self._load_and_store(query_type, cache_key, tags, fetch)
         )
+        self._inflight[cache_key] = task
+        self._inflight_tags[cache_key] = frozenset(tags)
         
-        # Cache the result
-        if self.cache_manager and cache_key and result:
-            cache_ttl = timedelta(minutes=15)  # Cache analytics data for 15 minutes
-            await self.cache_manager.set(
-                cache_key, 
-                (result.model_dump() if hasattr(result, 'model_dump') else result.dict()), 
-                ttl=cache_ttl
-            )
-            result.cache_ttl = int(cache_ttl.total_seconds())
+        def _release(done: "asyncio.Task[DataResponse]") -> None:
+            if self._inflight.get(cache_key) is done:
+                del self._inflight[cache_key]
+                del self._inflight_tags[cache_key]
+        
+        task.add_done_callback(_release)
+        return task
+    
+    def _refresh_in_background(
+        self,
+        query_type: str,
+        cache_key: str,
+        tags: List[str],
+        fetch: Callable[[], Awaitable[DataResponse]]
+    ) -> None:
+        """Revalidate a stale entry unless a fetch for it is already running"""
+        if cache_key in self._inflight:
+            return
+        
+        self._background_refreshes += 1
+        task = self._start_load(query_type, cache_key, tags, fetch)
+        
+        def _log_failure(done: "asyncio.Task[DataResponse]") -> None:
+            if not done.cancelled() and done.exception():
+                logger.warning(f"Background refresh failed for {query_type} query {cache_key}: {done.exception()}")
+        
+        task.add_done_callback(_log_failure)
+    
+    async def _load_and_store(
+        self,
+        query_type: str,
+        cache_key: str,
+        tags: List[str],
+        fetch: Callable[[], Awaitable[DataResponse]]
+    ) -> DataResponse:
+        """Fetch from the sources and populate both cache levels"""
+        result = await fetch()
+        
+        # Skip caching if an invalidation detached this fetch while it was running
+        if not result or not self._owns_load(cache_key):
+            return result
+        
+        ttl, stale_window = self.cache_policies[query_type]
+        now = time.time()
+        stale_after = now + ttl.total_seconds()
+        
+        payload = result.model_dump() if hasattr(result, 'model_dump') else result.dict()
+        payload[STALE_AFTER_FIELD] = stale_after
+        await self.cache_manager.set(cache_key, payload, ttl=ttl + stale_window, tags=tags)
+        result.cache_ttl = int(ttl.total_seconds())
+        
+        if self._owns_load(cache_key):
+            self._store_local(cache_key, result, tags, now, stale_after, stale_after + stale_window.total_seconds())
         
         return result
     
+    def _owns_load(self, cache_key: str) -> bool:
+        """Whether the running load is still the registered fetch for its key"""
+        return self._inflight.get(cache_key) is asyncio.current_task()
+    
+    def _store_local(
+        self,
+        cache_key: str,
+        response: DataResponse,
+        tags: List[str],
+        now: float,
+        stale_after: float,
+        expires_at: float
+    ) -> None:
+        """Keep a response in the L1 cache"""
+        self.local_cache.set(cache_key, LocalCacheEntry(
+            value=response,
+            local_until=now + self.local_cache_ttl,
+            stale_after=stale_after,
+            expires_at=expires_at,
+            tags=frozenset(tags)
+        ))
+    
+    @staticmethod
+    def _copy_response(response: DataResponse, cached: Optional[bool] = None) -> DataResponse:
+        """Deep copy so callers cannot mutate the shared cached instance or its rows"""
+        update = {"cached": cached} if cached is not None else None
+        if hasattr(response, 'model_copy'):
+            return response.model_copy(update=update, deep=True)
+        return response.copy(update=update, deep=True)
+    
     async def route_custom_query(
         self,
         query_type: str,
@@ -242,25 +472,31 @@ class DataSourceRouter(IDataSourceRouter):
                 logger.warning(f"Data source {source_type} not initialized")
                 continue
             
+            # Circuit state is kept up to date by the health monitor and by
+            # request outcomes, so skipping an unhealthy source costs no I/O
+            if not self.health_monitor.is_available(source_type):
+                logger.debug(f"Skipping data source {source_type}: circuit open")
+                continue
+            
+            breaker = self.health_monitor.breaker_for(source_type)
+            start = time.perf_counter()
             try:
-                # Check source health before using
-                if not await source.health_check():
-                    logger.warning(f"Data source {source_type} failed health check")
-                    continue
-                
                 # Execute the method
                 method = getattr(source, method_name)
                 result = await method(**kwargs)
                 
-                if source_type != primary_source_type:
-                    logger.info(f"Used fallback source {source_type} for {query_type}")
-                
-                return result
-                
             except Exception as e:
+                breaker.record_failure((time.perf_counter() - start) * 1000)
                 last_error = e
                 logger.error(f"Error with source {source_type} for {query_type}: {e}")
                 continue
+            
+            breaker.record_success((time.perf_counter() - start) * 1000)
+            
+            if source_type != primary_source_type:
+                logger.info(f"Used fallback source {source_type} for {query_type}")
+            
+            return result
         
         # All sources failed
         error_msg = f"All data sources failed for {query_type}"
@@ -310,11 +546,19 @@ class DataSourceRouter(IDataSourceRouter):
             "registered_sources": list(self.sources.keys()),
             "routing_rules": self.query_routing_rules.copy(),
             "fallback_orders": self.fallback_order.copy(),
-            "health_status": await self.health_check_all()
+            "health_status": await self.health_check_all(),
+            "source_stats": self.health_monitor.get_stats()
         }
         
         if self.cache_manager:
             stats["cache_stats"] = await self.cache_manager.get_cache_stats()
+            stats["local_cache"] = {
+                **self.local_cache.get_stats(),
+                "inflight_fetches": len(self._inflight),
+                "coalesced_requests": self._coalesced_requests,
+                "stale_served": self._stale_served,
+                "background_refreshes": self._background_refreshes
+            }
         
         return stats
     
@@ -323,15 +567,24 @@ class DataSourceRouter(IDataSourceRouter):
         if not self.cache_manager:
             return 0
         
-        return await self.cache_manager.invalidate_org_cache(org_id)
+        self._invalidate_local(build_cache_tags(org_id=org_id))
+        return await self.cache_manager.invalidate_for_org(org_id)
     
     async def invalidate_cache_for_market(self, market: str) -> int:
         """Invalidate all cached data for a specific market"""
         if not self.cache_manager:
             return 0
         
-        pattern = f"*:*:*{market}*"
-        return await self.cache_manager.clear_pattern(pattern)
+        self._invalidate_local(build_cache_tags(market=market))
+        return await self.cache_manager.invalidate_for_market(market)
+    
+    def _invalidate_local(self, tags: List[str]) -> None:
+        """Drop L1 entries for the tags and detach in-flight fetches carrying any of them"""
+        invalidated = frozenset(tags)
+        for key in [key for key, key_tags in self._inflight_tags.items() if key_tags & invalidated]:
+            del self._inflight[key]
+            del self._inflight_tags[key]
+        self.local_cache.invalidate_tags(invalidated)
     
     def _get_cache_key(self, query_type: str, org_id: str, market: str, params: QueryParams) -> str:
         """Generate cache key for data queries"""
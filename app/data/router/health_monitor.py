@@ -0,0 +1,228 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Mapping, Optional
+
+from ..interfaces.base import AbstractDataSource, DataSourceType
+from ...core.logging import logger
+
+
+class CircuitState(Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"        # Normal operation
+    OPEN = "open"            # Failing, skip the source
+    HALF_OPEN = "half_open"  # Letting a trial request through
+
+
+@dataclass
+class SourceCircuitConfig:
+    """Configuration for per-source circuit breakers"""
+    failure_threshold: int = 5        # Consecutive failures before opening
+    open_seconds: float = 30.0        # Time to stay open before a trial request
+    stats_window: int = 100           # Recent requests used for latency and error rate
+
+
+class SourceCircuitBreaker:
+    """
+    Circuit breaker and request statistics for a single data source
+
+    All methods are synchronous and do no I/O so the router can consult
+    the breaker on every query for free.
+    """
+
+    def __init__(self, config: SourceCircuitConfig):
+        self.config = config
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+        self.total_requests = 0
+        self.total_failures = 0
+        self.times_opened = 0
+        self._latencies_ms: deque = deque(maxlen=config.stats_window)
+        self._outcomes: deque = deque(maxlen=config.stats_window)
+
+    def allow_request(self, now: Optional[float] = None) -> bool:
+        """Check whether a request may be sent to the source"""
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        now = now if now is not None else time.monotonic()
+        if self.state == CircuitState.OPEN:
+            if now - self.opened_at < self.config.open_seconds:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._trial_started_at = None
+
+        # Half-open: one trial at a time; a trial that never reported back
+        # (e.g. a cancelled request) is abandoned after open_seconds
+        if self._trial_started_at is not None and now - self._trial_started_at < self.config.open_seconds:
+            return False
+        self._trial_started_at = now
+        return True
+
+    def record_success(self, latency_ms: float) -> None:
+        """Record a successful request"""
+        self.total_requests += 1
+        self._latencies_ms.append(latency_ms)
+        self._outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.state != CircuitState.CLOSED:
+            logger.info("Data source circuit closed after successful trial request")
+        self.state = CircuitState.CLOSED
+        self._trial_started_at = None
+
+    def record_failure(self, latency_ms: Optional[float] = None) -> None:
+        """Record a failed request or health probe"""
+        self.total_requests += 1
+        self.total_failures += 1
+        if latency_ms is not None:
+            self._latencies_ms.append(latency_ms)
+        self._outcomes.append(False)
+        self.consecutive_failures += 1
+
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.config.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        """Open the circuit"""
+        if self.state != CircuitState.OPEN:
+            self.times_opened += 1
+        self.state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+        self._trial_started_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get latency and error-rate statistics"""
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "error_rate": (self._outcomes.count(False) / len(self._outcomes)) if self._outcomes else 0.0,
+            "avg_latency_ms": (sum(latencies) / len(latencies)) if latencies else 0.0,
+            "p95_latency_ms": percentile(0.95)
+        }
+
+
+class SourceHealthMonitor:
+    """
+    Probes registered data sources in the background
+
+    Probe results and request outcomes feed one circuit breaker per
+    DataSourceType, so routing decisions need no extra round trips.
+    """
+
+    def __init__(
+        self,
+        sources: Mapping[DataSourceType, AbstractDataSource],
+        interval_seconds: float = 60,
+        probe_timeout_seconds: float = 5.0,
+        circuit_config: Optional[SourceCircuitConfig] = None
+    ):
+        self.sources = sources
+        self.interval_seconds = interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.circuit_config = circuit_config or SourceCircuitConfig()
+        self.breakers: Dict[DataSourceType, SourceCircuitBreaker] = {}
+        self.last_probe: Dict[DataSourceType, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def breaker_for(self, source_type: DataSourceType) -> SourceCircuitBreaker:
+        """Get or create the circuit breaker for a source"""
+        breaker = self.breakers.get(source_type)
+        if breaker is None:
+            breaker = self.breakers[source_type] = SourceCircuitBreaker(self.circuit_config)
+        return breaker
+
+    def is_available(self, source_type: DataSourceType) -> bool:
+        """Whether the router may send a query to the source right now"""
+        return self.breaker_for(source_type).allow_request()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start periodic probing on the running event loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        """Stop periodic probing without waiting for the probe task to exit"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self) -> None:
+        """Stop periodic probing"""
+        task = self._task
+        self.cancel()
+        if task:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def probe_all(self) -> Dict[DataSourceType, bool]:
+        """Probe every initialized source concurrently"""
+        source_types = [
+            source_type for source_type, source in list(self.sources.items())
+            if source.is_initialized
+        ]
+        results = await asyncio.gather(*(self._probe(source_type) for source_type in source_types))
+        return dict(zip(source_types, results))
+
+    async def _probe(self, source_type: DataSourceType) -> bool:
+        source = self.sources[source_type]
+        breaker = self.breaker_for(source_type)
+        start = time.perf_counter()
+
+        try:
+            healthy = bool(await asyncio.wait_for(source.health_check(), self.probe_timeout_seconds))
+        except Exception as e:
+            logger.warning(f"Health probe failed for {source_type}: {e}")
+            healthy = False
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.last_probe[source_type] = {
+            "healthy": healthy,
+            "latency_ms": latency_ms,
+            "checked_at": time.time()
+        }
+
+        if not healthy:
+            if breaker.state != CircuitState.OPEN:
+                logger.warning(f"Opening circuit for unhealthy data source {source_type}")
+            breaker.trip()
+        elif breaker.state == CircuitState.OPEN:
+            # Reachable again: let the next query through as the trial request
+            breaker.opened_at = time.monotonic() - breaker.config.open_seconds
+
+        return healthy
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-source circuit and probe statistics"""
+        stats = {}
+        for source_type in set(self.sources) | set(self.breakers):
+            source_stats = self.breaker_for(source_type).get_stats()
+            source_stats["last_probe"] = self.last_probe.get(source_type)
+            stats[getattr(source_type, "value", str(source_type))] = source_stats
+        return stats
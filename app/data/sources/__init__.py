@@ -1,3 +1,4 @@
 from .supabase_client import SupabaseDataSource
+from .postgresql_source import PostgreSQLDataSource
 
-__all__ = ["SupabaseDataSource"]
\ No newline at end of file
+__all__ = ["SupabaseDataSource", "PostgreSQLDataSource"]
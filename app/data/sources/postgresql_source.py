@@ -0,0 +1,416 @@
+import re
+import time
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import and_, any_, bindparam, column, false, func, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.types import NullType
+
+from ..interfaces.base import AbstractDataSource, DataSourceType, QueryParams, DataResponse, DataPage
+from ..pagination import KEYSET_TIEBREAKER, KeysetOrder, decode_cursor, encode_cursor, keyset_order
+from ...core.database import get_async_engine
+from ...core.logging import logger
+
+
+# Filters, ordering and field names come from request parameters; they are
+# only ever used as quoted identifiers and must look like column names
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_AGGREGATE_FUNCTIONS = {"sum", "avg", "min", "max", "count"}
+
+REFERENCE_TABLES = {
+    "uk_markets": "uk_markets",
+    "competitors": "competitors",
+    "market_segments": "market_segments",
+    "data_sources": "data_sources"
+}
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name}")
+    return name
+
+
+def _bind(name: str, value: Any, **kwargs):
+    """
+    Untyped bound parameter
+
+    Without a client-side type SQLAlchemy emits no ::VARCHAR casts, so
+    PostgreSQL infers each parameter type from the column when preparing
+    the statement (uuid, date, text, ...).
+    """
+    return bindparam(name, value, type_=NullType(), **kwargs)
+
+
+def _parse_date(value: Any) -> Any:
+    """Convert ISO date strings to date/datetime objects for asyncpg"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+class PostgreSQLDataSource(AbstractDataSource):
+    """
+    PostgreSQL data source on the application's async engine
+
+    Queries run on the asyncpg pool owned by core/database.py instead of a
+    thread per request. Every statement is built from bound parameters with
+    a shape that depends only on which filters are present, so asyncpg's
+    per-connection prepared statement cache is reused across requests.
+    Large competitive-intelligence result sets can be streamed in keyset
+    pages through a server-side cursor with stream_competitive_data().
+    """
+
+    def __init__(self, config: Dict[str, Any], engine: Optional[AsyncEngine] = None):
+        super().__init__(DataSourceType.POSTGRESQL, config)
+        self.engine = engine
+        self.schema = config.get("schema")
+        self.stream_batch_size = config.get("stream_batch_size", 1000)
+
+    async def initialize(self) -> None:
+        """Attach to the shared async engine"""
+        try:
+            if self.engine is None:
+                self.engine = get_async_engine()
+
+            if not await self.health_check():
+                raise ConnectionError("PostgreSQL health check failed")
+            self._initialized = True
+
+            logger.info("PostgreSQL data source initialized successfully")
+
+        except Exception as e:
+            logger.error(f"Failed to initialize PostgreSQL data source: {e}")
+            raise
+
+    async def health_check(self) -> bool:
+        """Check PostgreSQL connection health"""
+        try:
+            if self.engine is None:
+                return False
+
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return True
+
+        except Exception as e:
+            logger.error(f"PostgreSQL health check failed: {e}")
+            return False
+
+    def _table(self, name: str):
+        return table(_identifier(name), schema=self.schema)
+
+    def _in(self, name: str, values: List[Any], param_name: str):
+        """Membership test whose SQL does not change with the list length"""
+        if self._is_postgresql:
+            return column(name) == any_(_bind(param_name, list(values)))
+        return column(name).in_(_bind(param_name, list(values), expanding=True))
+
+    @property
+    def _is_postgresql(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def _date_value(self, value: Any) -> Any:
+        return _parse_date(value) if self._is_postgresql else value
+
+    def _apply_filters(self, stmt, filters: Optional[Dict[str, Any]], list_columns: Dict[str, str] = None):
+        """Apply equality, list and date range filters"""
+        list_columns = list_columns or {}
+        for key, value in (filters or {}).items():
+            if key == "date_range" and isinstance(value, dict):
+                if "start_date" in value:
+                    stmt = stmt.where(column("date") >= _bind("start_date", self._date_value(value["start_date"])))
+                if "end_date" in value:
+                    stmt = stmt.where(column("date") <= _bind("end_date", self._date_value(value["end_date"])))
+            elif isinstance(value, list):
+                name = _identifier(list_columns.get(key, key))
+                stmt = stmt.where(self._in(name, value, f"{name}_values"))
+            else:
+                name = _identifier(key)
+                stmt = stmt.where(column(name) == _bind(f"{name}_value", value))
+        return stmt
+
+    def _apply_ordering(self, stmt, order_by: Optional[List[str]], default: Optional[str] = None):
+        for order_field in order_by or ([default] if default else []):
+            if order_field.startswith("-"):
+                stmt = stmt.order_by(column(_identifier(order_field[1:])).desc())
+            else:
+                stmt = stmt.order_by(column(_identifier(order_field)))
+        return stmt
+
+    def _apply_pagination(self, stmt, params: Optional[QueryParams]):
+        if params and params.limit:
+            stmt = stmt.limit(params.limit)
+        if params and params.offset:
+            stmt = stmt.offset(params.offset)
+        return stmt
+
+    def _select_fields(self, params: Optional[QueryParams], extra_fields: Optional[List[str]] = None):
+        if params and params.include_fields:
+            fields = list(dict.fromkeys(params.include_fields + (extra_fields or [])))
+            return select(*(column(_identifier(field)) for field in fields))
+        return select(literal_column("*"))
+
+    def _competitive_base(self, org_id: str, market: str, params: QueryParams, extra_fields: Optional[List[str]] = None):
+        stmt = self._select_fields(params, extra_fields).select_from(self._table("competitive_intelligence"))
+        stmt = stmt.where(column("market") == _bind("market", market))
+        stmt = stmt.where(column("org_id") == _bind("org_id", org_id))
+        return self._apply_filters(stmt, params.filters, {"competitors": "competitor_name"})
+
+    def _competitive_query(self, org_id: str, market: str, params: QueryParams):
+        stmt = self._competitive_base(org_id, market, params)
+        stmt = self._apply_ordering(stmt, params.order_by, default="-date")
+        return self._apply_pagination(stmt, params)
+
+    async def _fetch_all(self, stmt) -> List[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(stmt)
+            return [dict(row) for row in result.mappings()]
+
+    async def get_competitive_data(
+        self,
+        org_id: str,
+        market: str,
+        params: QueryParams
+    ) -> DataResponse:
+        """Get competitive intelligence data from PostgreSQL"""
+        start_time = time.time()
+
+        try:
+            rows = await self._fetch_all(self._competitive_query(org_id, market, params))
+
+            execution_time = (time.time() - start_time) * 1000
+
+            return DataResponse(
+                data=rows,
+                source=DataSourceType.POSTGRESQL,
+                total_count=len(rows),
+                execution_time_ms=execution_time,
+                metadata={
+                    "market": market,
+                    "org_id": org_id,
+                    "query_params": params.model_dump()
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Error getting competitive data from PostgreSQL: {e}")
+            raise
+
+    async def stream_competitive_data(
+        self,
+        org_id: str,
+        market: str,
+        params: QueryParams,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[DataPage]:
+        """
+        Stream competitive intelligence data in keyset-paginated pages
+
+        Rows are read through a server-side cursor, so memory use is bounded
+        by page_size rather than by the size of the result set. Resuming
+        from a cursor seeks on the sort keys instead of skipping rows.
+        """
+        page_size = page_size or self.stream_batch_size
+        order = keyset_order(params.order_by or ["-date"])
+
+        stmt = self._competitive_base(org_id, market, params, extra_fields=[name for name, _ in order])
+        if cursor:
+            stmt = stmt.where(self._keyset_condition(order, decode_cursor(cursor, order)))
+        for name, descending in order:
+            key = column(_identifier(name))
+            # Spell out PostgreSQL's default NULL placement so other engines
+            # order the same way the keyset condition assumes
+            stmt = stmt.order_by(key.desc().nulls_first() if descending else key.asc().nulls_last())
+        if params.limit:
+            stmt = stmt.limit(params.limit)
+
+        async with self.engine.connect() as conn:
+            result = await conn.stream(stmt.execution_options(yield_per=page_size))
+            try:
+                # Hold one page back so the final page can report whether
+                # rows remain beyond params.limit
+                previous: Optional[List[Dict[str, Any]]] = None
+                streamed = 0
+                async for partition in result.mappings().partitions(page_size):
+                    rows = [dict(row) for row in partition]
+                    streamed += len(rows)
+                    if previous is not None:
+                        yield DataPage(
+                            data=previous,
+                            source=DataSourceType.POSTGRESQL,
+                            next_cursor=encode_cursor(previous[-1], order)
+                        )
+                    previous = rows
+
+                if previous is not None:
+                    truncated = bool(params.limit) and streamed >= params.limit
+                    yield DataPage(
+                        data=previous,
+                        source=DataSourceType.POSTGRESQL,
+                        next_cursor=encode_cursor(previous[-1], order) if truncated else None
+                    )
+            finally:
+                await result.close()
+
+    def _keyset_condition(self, order: KeysetOrder, values: List[Any]):
+        """
+        Rows strictly after the cursor position in the given ordering
+
+        NULL sort values are placed as PostgreSQL does by default: last in
+        ascending order and first in descending order. The tiebreaker is the
+        primary key and never NULL.
+        """
+        keys = [column(_identifier(name)) for name, _ in order]
+        binds = [
+            None if value is None
+            else _bind(f"cursor_{index}", self._date_value(value) if name == "date" else value)
+            for index, ((name, _), value) in enumerate(zip(order, values))
+        ]
+        clauses = []
+        for index, (name, descending) in enumerate(order):
+            key, bind = keys[index], binds[index]
+            ties = [keys[j].is_(None) if binds[j] is None else keys[j] == binds[j] for j in range(index)]
+            if bind is None:
+                # Nothing sorts after NULL ascending; every value does descending
+                after = key.is_not(None) if descending else false()
+            elif descending:
+                after = key < bind
+            elif name == KEYSET_TIEBREAKER:
+                after = key > bind
+            else:
+                after = or_(key > bind, key.is_(None))
+            clauses.append(and_(*ties, after))
+        return or_(*clauses)
+
+    async def get_reference_data(
+        self,
+        dataset: str,
+        params: Optional[QueryParams] = None
+    ) -> DataResponse:
+        """Get reference/lookup data from PostgreSQL"""
+        start_time = time.time()
+
+        try:
+            table_name = REFERENCE_TABLES.get(dataset)
+            if not table_name:
+                raise ValueError(f"Unknown reference dataset: {dataset}")
+
+            stmt = self._select_fields(params).select_from(self._table(table_name))
+            stmt = self._apply_filters(stmt, params.filters if params else None)
+            stmt = self._apply_ordering(stmt, params.order_by if params else None)
+            stmt = self._apply_pagination(stmt, params)
+
+            rows = await self._fetch_all(stmt)
+
+            execution_time = (time.time() - start_time) * 1000
+
+            return DataResponse(
+                data=rows,
+                source=DataSourceType.POSTGRESQL,
+                total_count=len(rows),
+                execution_time_ms=execution_time,
+                metadata={
+                    "dataset": dataset,
+                    "table": table_name
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Error getting reference data from PostgreSQL: {e}")
+            raise
+
+    async def get_analytics_data(
+        self,
+        org_id: str,
+        params: QueryParams
+    ) -> DataResponse:
+        """Get analytics data from PostgreSQL, aggregating in the database when requested"""
+        start_time = time.time()
+
+        try:
+            group_by = [_identifier(name) for name in (params.group_by or [])]
+            aggregations = params.aggregations or {}
+
+            if aggregations:
+                selected = [column(name) for name in group_by]
+                for name, function in aggregations.items():
+                    function = function.lower()
+                    if function not in _AGGREGATE_FUNCTIONS:
+                        raise ValueError(f"Unsupported aggregation: {function}")
+                    selected.append(getattr(func, function)(column(_identifier(name))).label(f"{function}_{name}"))
+                stmt = select(*selected)
+            else:
+                stmt = self._select_fields(params)
+
+            stmt = stmt.select_from(self._table("analytics_data"))
+            stmt = stmt.where(column("org_id") == _bind("org_id", org_id))
+            stmt = self._apply_filters(stmt, params.filters)
+            if aggregations and group_by:
+                stmt = stmt.group_by(*(column(name) for name in group_by))
+            stmt = self._apply_ordering(stmt, params.order_by)
+            stmt = self._apply_pagination(stmt, params)
+
+            rows = await self._fetch_all(stmt)
+
+            execution_time = (time.time() - start_time) * 1000
+
+            return DataResponse(
+                data=rows,
+                source=DataSourceType.POSTGRESQL,
+                total_count=len(rows),
+                execution_time_ms=execution_time,
+                metadata={
+                    "org_id": org_id,
+                    "analytics_type": "aggregated" if aggregations else "general"
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Error getting analytics data from PostgreSQL: {e}")
+            raise
+
+    async def execute_custom_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> DataResponse:
+        """Call a set-returning database function, mirroring Supabase RPC"""
+        start_time = time.time()
+
+        try:
+            params = params or {}
+            function_name = ".".join(_identifier(part) for part in query.split("."))
+            arguments = ", ".join(f"{_identifier(name)} => :{name}" for name in params)
+
+            rows = await self._fetch_all(
+                text(f"SELECT * FROM {function_name}({arguments})").bindparams(**params)
+            )
+
+            execution_time = (time.time() - start_time) * 1000
+
+            return DataResponse(
+                data=rows,
+                source=DataSourceType.POSTGRESQL,
+                total_count=len(rows),
+                execution_time_ms=execution_time,
+                metadata={
+                    "query": query,
+                    "custom": True
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Error executing custom query on PostgreSQL: {e}")
+            raise
+
+    async def close(self) -> None:
+        """Detach from the engine; the shared pool is disposed by core/database.py"""
+        self._initialized = False
+        logger.info("PostgreSQL data source closed")
@@ -1,14 +1,50 @@
 import asyncio
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime, timedelta
 from supabase import create_client, Client
 from postgrest.exceptions import APIError
 
-from ..interfaces.base import AbstractDataSource, DataSourceType, QueryParams, DataResponse
+from ..interfaces.base import AbstractDataSource, DataSourceType, QueryParams, DataResponse, DataPage
+from ..pagination import KEYSET_TIEBREAKER, KeysetOrder, decode_cursor, encode_cursor, keyset_order
 from ...core.logging import logger
 
 
+def _postgrest_value(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logical filter"""
+    text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _postgrest_keyset_filter(order: KeysetOrder, values: List[Any]) -> str:
+    """
+    PostgREST or=() filter selecting rows after a keyset position
+
+    NULL sort values are placed as PostgreSQL does by default: last in
+    ascending order and first in descending order. The tiebreaker is the
+    primary key and never NULL.
+    """
+    clauses = []
+    for index, (name, descending) in enumerate(order):
+        parts = [
+            f"{order[j][0]}.is.null" if values[j] is None else f"{order[j][0]}.eq.{_postgrest_value(values[j])}"
+            for j in range(index)
+        ]
+        if values[index] is None:
+            # Nothing sorts after NULL ascending; every value does descending
+            if not descending:
+                continue
+            parts.append(f"{name}.not.is.null")
+        elif descending:
+            parts.append(f"{name}.lt.{_postgrest_value(values[index])}")
+        elif name == KEYSET_TIEBREAKER:
+            parts.append(f"{name}.gt.{_postgrest_value(values[index])}")
+        else:
+            parts.append(f"or({name}.gt.{_postgrest_value(values[index])},{name}.is.null)")
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(clauses)
+
+
 class SupabaseDataSource(AbstractDataSource):
     """Supabase data source implementation with competitive intelligence focus"""
     
@@ -51,6 +87,32 @@ class SupabaseDataSource(AbstractDataSource):
             logger.error(f"Supabase health check failed: {e}")
             return False
     
+    def _competitive_query(self, org_id: str, market: str, params: QueryParams, columns: str = "*"):
+        """Build the filtered competitive intelligence query"""
+        # Build base query for competitive data
+        query = self.client.table("competitive_intelligence").select(columns)
+        
+        # Apply market filter
+        query = query.eq("market", market)
+        
+        # Apply organization filter if RLS doesn't handle it
+        query = query.eq("org_id", org_id)
+        
+        # Apply additional filters
+        if params.filters:
+            for key, value in params.filters.items():
+                if key == "competitors" and isinstance(value, list):
+                    query = query.in_("competitor_name", value)
+                elif key == "date_range" and isinstance(value, dict):
+                    if "start_date" in value:
+                        query = query.gte("date", value["start_date"])
+                    if "end_date" in value:
+                        query = query.lte("date", value["end_date"])
+                else:
+                    query = query.eq(key, value)
+        
+        return query
+    
     async def get_competitive_data(
         self,
         org_id: str,
@@ -61,27 +123,7 @@ class SupabaseDataSource(AbstractDataSource):
         start_time = time.time()
         
         try:
-            # Build base query for competitive data
-            query = self.client.table("competitive_intelligence").select("*")
-            
-            # Apply market filter
-            query = query.eq("market", market)
-            
-            # Apply organization filter if RLS doesn't handle it
-            query = query.eq("org_id", org_id)
-            
-            # Apply additional filters
-            if params.filters:
-                for key, value in params.filters.items():
-                    if key == "competitors" and isinstance(value, list):
-                        query = query.in_("competitor_name", value)
-                    elif key == "date_range" and isinstance(value, dict):
-                        if "start_date" in value:
-                            query = query.gte("date", value["start_date"])
-                        if "end_date" in value:
-                            query = query.lte("date", value["end_date"])
-                    else:
-                        query = query.eq(key, value)
+            query = self._competitive_query(org_id, market, params)
             
             # Apply ordering
             if params.order_by:
@@ -123,6 +165,61 @@ class SupabaseDataSource(AbstractDataSource):
             logger.error(f"Error getting competitive data: {e}")
             raise
     
+    async def stream_competitive_data(
+        self,
+        org_id: str,
+        market: str,
+        params: QueryParams,
+        cursor: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[DataPage]:
+        """
+        Stream competitive intelligence data in keyset-paginated pages
+        
+        Each page is a separate PostgREST request that seeks past the last
+        row of the previous page, so only one page is held in memory.
+        """
+        order = keyset_order(params.order_by or ["-date"])
+        position = decode_cursor(cursor, order) if cursor else None
+        remaining = params.limit
+        columns = "*"
+        if params.include_fields:
+            columns = ",".join(dict.fromkeys(params.include_fields + [name for name, _ in order]))
+        
+        while remaining is None or remaining > 0:
+            query = self._competitive_query(org_id, market, params, columns)
+            if position is not None:
+                query = query.or_(_postgrest_keyset_filter(order, position))
+            for name, descending in order:
+                query = query.order(name, desc=descending, nullsfirst=descending)
+            
+            batch_size = page_size if remaining is None else min(page_size, remaining)
+            query = query.limit(batch_size)
+            
+            try:
+                result = await asyncio.to_thread(lambda: query.execute())
+            except APIError as e:
+                logger.error(f"Supabase API error in stream_competitive_data: {e}")
+                raise
+            
+            rows = result.data or []
+            if remaining is not None:
+                remaining -= len(rows)
+            
+            # A short page means the result set is exhausted; a full page may
+            # be followed by an empty request, which yields nothing
+            exhausted = len(rows) < batch_size
+            if rows:
+                position = [row.get(name) for name, _ in order]
+                yield DataPage(
+                    data=rows,
+                    source=DataSourceType.SUPABASE,
+                    next_cursor=None if exhausted else encode_cursor(rows[-1], order)
+                )
+            
+            if exhausted:
+                return
+    
     async def get_reference_data(
         self,
         dataset: str,
@@ -67,6 +67,7 @@ except Exception as import_error:
 from app.middleware.error_handler import ErrorHandlerMiddleware
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.csrf import CSRFMiddleware
+from app.middleware.identity_scope import IdentityScopeMiddleware
 from app.middleware.auth_rate_limiter import auth_rate_limiter
 from app.core.lazy_startup import lazy_startup_manager
 from slowapi.errors import RateLimitExceeded
@@ -149,6 +150,8 @@ else:
 
 app.add_middleware(ErrorHandlerMiddleware)
 app.add_middleware(LoggingMiddleware)
+# Outermost: one identity memo per request, shared by every layer below
+app.add_middleware(IdentityScopeMiddleware)
 
 # Add slowapi state and exception handler for rate limiting
 app.state.limiter = auth_rate_limiter.limiter
@@ -272,6 +275,18 @@ async def startup_event():
         except Exception as init_error:
             logger.error(f"⚠️  Lazy initialization error: {init_error} - continuing with core services")
         
+        # Fetch Auth0 signing keys now and keep them refreshed ahead of expiry
+        from app.auth.jwks import jwks_manager
+        jwks_manager.start()
+        
+        # Keep the upcoming monthly domain_events partitions created
+        from app.core.domain_event_partitions import domain_event_partitions
+        domain_event_partitions.start()
+        
+        # Keep the revoked-token filter in sync so blacklist checks skip Redis
+        from app.services.jwt_service import initialize_jwt_service
+        initialize_jwt_service(await _get_redis_client_safely()).start()
+        
         # CRITICAL: Initialize module registry for £925K Zebra Associates
         try:
             from app.core.module_registry import initialize_module_registry
@@ -307,6 +322,16 @@ async def startup_event():
         logger.warning("⚠️  Application starting with minimal services - CORS and API endpoints still available")
 
 
+async def _get_redis_client_safely():
+    """Main Redis client, or None when Redis is unavailable"""
+    try:
+        from app.core.redis_manager import redis_manager
+        return await asyncio.wait_for(redis_manager.get_main_client(), timeout=5.0)
+    except Exception as redis_error:
+        logger.error(f"⚠️  Redis unavailable for the token revocation filter: {redis_error}")
+        return None
+
+
 async def _initialize_startup_safely():
     """Safe initialization of lazy startup manager"""
     try:
@@ -670,6 +695,18 @@ async def system_status():
 async def shutdown_event():
     """Graceful shutdown with lazy service cleanup"""
     await lazy_startup_manager.graceful_shutdown()
+    
+    from app.auth.jwks import jwks_manager
+    await jwks_manager.stop()
+    
+    from app.core.domain_event_partitions import domain_event_partitions
+    await domain_event_partitions.stop()
+    
+    from app.services.jwt_service import close_jwt_service
+    await close_jwt_service()
+    
+    from .data.platform_data_layer import close_platform_data_layer
+    await close_platform_data_layer()
     logger.info("Lazy initialization architecture shutdown completed")
 
 
@@ -0,0 +1,24 @@
+"""
+Identity Scope Middleware
+
+Gives every request its own identity memo (see app.auth.identity), so the
+middleware, dependencies and services that resolve the request's user share
+one lookup. Registered outermost and as plain ASGI: the memo is set before
+any BaseHTTPMiddleware copies the context into its own task.
+"""
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..auth.identity import identity_scope
+
+
+class IdentityScopeMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with identity_scope():
+            await self.app(scope, receive, send)
@@ -4,13 +4,14 @@ Industry Context Middleware
 Provides industry-specific context and feature flag routing for requests.
 Integrates with the tenant context to provide industry-aware routing and validation.
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.responses import Response
 import uuid
 
 from ..core.rate_limit_config import Industry
 from ..core.industry_config import industry_config_manager
+from ..core.route_matcher import RoutePatternMatcher
 from ..models.organisation import Organisation
 from ..models.user import User
 from ..core.database import get_db
@@ -28,6 +29,8 @@ class IndustryContextMiddleware:
     def __init__(self, app):
         self.app = app
         self.industry_config = industry_config_manager
+        # Compiled matchers per distinct restriction table
+        self._restriction_matchers: Dict[Tuple[str, ...], RoutePatternMatcher] = {}
     
     async def __call__(self, scope, receive, send):
         if scope["type"] == "http":
@@ -115,9 +118,10 @@ class IndustryContextMiddleware:
             
             # Apply industry-specific route restrictions
             restrictions = self._get_industry_route_restrictions(industry_type, feature_flags)
+            matcher = self._get_restriction_matcher(restrictions)
             
-            for restriction in restrictions:
-                if self._path_matches_restriction(path, method, restriction):
+            for restriction in matcher.match(path):
+                if method in restriction["methods"]:
                     logger.warning(
                         f"Industry access denied: {industry_type.value} to {method} {path}"
                     )
@@ -189,31 +193,16 @@ class IndustryContextMiddleware:
         
         return restrictions
     
-    def _path_matches_restriction(
-        self, 
-        path: str, 
-        method: str, 
-        restriction: Dict[str, Any]
-    ) -> bool:
-        """Check if a path and method match a restriction."""
-        pattern = restriction["pattern"]
-        methods = restriction["methods"]
-        
-        # Check method match
-        if method not in methods:
-            return False
-        
-        # Simple wildcard matching
-        if pattern.endswith("*"):
-            return path.startswith(pattern[:-1])
-        elif pattern.startswith("*"):
-            return path.endswith(pattern[1:])
-        elif "*" in pattern:
-            parts = pattern.split("*")
-            if len(parts) == 2:
-                return path.startswith(parts[0]) and path.endswith(parts[1])
-        
-        return path == pattern
+    def _get_restriction_matcher(self, restrictions: List[Dict[str, Any]]) -> RoutePatternMatcher:
+        """Get the compiled matcher for a restriction table, compiling it on first use."""
+        table_key = tuple(
+            f"{restriction['pattern']} {','.join(restriction['methods'])}" for restriction in restrictions
+        )
+        matcher = self._restriction_matchers.get(table_key)
+        if matcher is None:
+            matcher = RoutePatternMatcher([(restriction["pattern"], restriction) for restriction in restrictions])
+            self._restriction_matchers[table_key] = matcher
+        return matcher
 
 
 def get_industry_context(request: Request) -> Optional[Dict[str, Any]]:
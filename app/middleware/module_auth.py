@@ -21,9 +21,9 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
 from ..auth.dependencies import get_current_user, verify_token
+from ..auth.identity import resolve_user_by_id
 from ..models.user import User, UserRole
 from ..services.feature_flag_service import FeatureFlagService
 from ..services.module_service import ModuleService
@@ -548,34 +548,9 @@ class ModuleAuthMiddleware(BaseHTTPMiddleware):
         return None
     
     async def _get_user_optimized(self, user_id: str) -> Optional[User]:
-        """PERFORMANCE FIX: Optimized user loading with single database query"""
+        """PERFORMANCE FIX: User with organisation, shared with the rest of the request"""
         try:
-            # Use a single database session to avoid connection pool exhaustion
-            async for db_session in get_db():
-                try:
-                    # PERFORMANCE FIX: Single query with all required joins
-                    stmt = (
-                        select(User)
-                        .where(User.id == user_id)
-                        .options(
-                            selectinload(User.organisation),
-                            # Add other relations that might be needed to avoid N+1 queries
-                            # selectinload(User.roles) if such relation exists
-                        )
-                    )
-                    
-                    result = await db_session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    
-                    # Explicitly break to close the session properly
-                    break
-                    
-                except Exception as db_error:
-                    logger.error(f"Database error in optimized user loading for {user_id}: {str(db_error)}")
-                    await db_session.rollback()
-                    break
-            
-            return user
+            return await resolve_user_by_id(user_id)
             
         except Exception as e:
             logger.error(f"Error in optimized user loading for {user_id}: {str(e)}")
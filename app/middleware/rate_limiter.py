@@ -25,6 +25,7 @@ from redis.exceptions import RedisError
 from ..core.config import settings
 from ..models.user import UserRole
 from ..models.organisation import Organisation
+from ..services.rate_limit_engine import WINDOW_KEY_PREFIX, SlidingWindowCounterEngine, WindowLimit
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +69,8 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
         self.redis_client: Optional[redis.Redis] = None
         self.default_limits = DEFAULT_RATE_LIMITS.copy()
         self.window_size = timedelta(hours=1)  # Sliding window size
-        self.key_prefix = "rate_limit:"
+        self.key_prefix = WINDOW_KEY_PREFIX
+        self._engine: Optional[SlidingWindowCounterEngine] = None
     
     def _parse_redis_url(self, redis_url: str) -> dict:
         """Parse Redis URL and extract connection parameters."""
@@ -267,41 +269,17 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
             # Create rate limit key
             rate_limit_key = self._create_rate_limit_key(tenant_context, request)
             
-            # Implement sliding window rate limiting
+            # Check and record the request in one round trip
             current_time = time.time()
-            window_start = current_time - self.window_size.total_seconds()
-            
-            # Use Redis pipeline for atomic operations
-            async with self.redis_client.pipeline(transaction=True) as pipe:
-                # Remove expired entries
-                await pipe.zremrangebyscore(rate_limit_key, 0, window_start)
-                
-                # Count current requests in window
-                await pipe.zcard(rate_limit_key)
-                
-                # Add current request
-                await pipe.zadd(rate_limit_key, {str(current_time): current_time})
-                
-                # Set expiry
-                await pipe.expire(rate_limit_key, int(self.window_size.total_seconds()) + 10)
-                
-                # Execute pipeline
-                results = await pipe.execute()
-            
-            current_count = results[1]  # Count after cleanup
+            decision = await self._get_engine().check(
+                [WindowLimit(rate_limit_key, int(self.window_size.total_seconds()), rate_limit)],
+                current_time
+            )
+            usage = decision.windows[0]
             
             # Check if rate limit exceeded
-            if current_count >= rate_limit:
-                # Get oldest request time for retry calculation
-                oldest_requests = await self.redis_client.zrange(
-                    rate_limit_key, 0, 0, withscores=True
-                )
-                
-                retry_after = 0
-                if oldest_requests:
-                    oldest_time = oldest_requests[0][1]
-                    retry_after = int(oldest_time + self.window_size.total_seconds() - current_time)
-                    retry_after = max(retry_after, 1)  # Minimum 1 second
+            if not decision.allowed:
+                retry_after = usage.retry_after
                 
                 # Log rate limit violation
                 logger.info(
@@ -311,7 +289,7 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
                         "tenant_id": tenant_context["tenant_id"],
                         "user_id": tenant_context["user_id"],
                         "rate_limit": rate_limit,
-                        "current_count": current_count,
+                        "current_count": usage.count,
                         "path": request.url.path,
                         "ip": self._get_client_ip(request)
                     }
@@ -326,7 +304,7 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
                 }
             
             # Request allowed
-            remaining = max(0, rate_limit - (current_count + 1))
+            remaining = usage.remaining
             reset_time = int(current_time + self.window_size.total_seconds())
             
             return {
@@ -414,6 +392,12 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
             # Return default standard limit on errors
             return self.default_limits["standard"]
     
+    def _get_engine(self) -> SlidingWindowCounterEngine:
+        """Shared counter engine bound to the current Redis client."""
+        if self._engine is None or self._engine.redis is not self.redis_client:
+            self._engine = SlidingWindowCounterEngine(self.redis_client)
+        return self._engine
+    
     def _create_rate_limit_key(
         self, 
         tenant_context: Dict[str, Any], 
@@ -529,15 +513,15 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
             async for key in self.redis_client.scan_iter(match=pattern):
                 keys.append(key)
             
-            current_time = time.time()
-            window_start = current_time - self.window_size.total_seconds()
+            window_seconds = int(self.window_size.total_seconds())
             
             total_requests = 0
             active_users = 0
             
             for key in keys:
-                # Count requests in current window
-                count = await self.redis_client.zcount(key, window_start, current_time)
+                # Estimated requests in current window
+                usage = await self._get_engine().get_usage(key, [window_seconds])
+                count = usage[window_seconds]
                 if count > 0:
                     active_users += 1
                     total_requests += count
@@ -9,18 +9,24 @@ Automatically enforces tenant data isolation at the API level by:
 """
 import time
 import logging
+from contextvars import Token
+from dataclasses import replace
 from typing import Callable, Optional
 from fastapi import Request, Response, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
 
 from ..auth.jwt import verify_token
 from ..models.user import User, UserRole
 from ..core.database import get_db
 from ..core.config import settings
+from ..core.tenant_context import (
+    NO_TENANT_ID,
+    TenantDatabaseContext,
+    get_tenant_context,
+    reset_tenant_context,
+    set_tenant_context,
+)
 from ..core.validators import create_security_headers, sanitize_string_input, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -56,6 +62,7 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Main middleware processing logic."""
         start_time = time.time()
+        context_token = None
         
         try:
             # Skip tenant context for excluded routes
@@ -66,8 +73,8 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
             tenant_context = await self._extract_tenant_context(request)
             
             if tenant_context:
-                # Set database session variables
-                await self._set_database_context(tenant_context)
+                # RLS settings for every transaction begun by this request
+                context_token = self._set_database_context(tenant_context)
                 
                 # Add context to request state for access by endpoints with validation
                 try:
@@ -111,9 +118,6 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
                 response.headers["X-Tenant-Context"] = "validated"
                 response.headers["X-Tenant-ID"] = str(tenant_context["tenant_id"])
                 response.headers["X-User-Role"] = tenant_context["user_role"]
-                
-                # Clear database context after request
-                await self._clear_database_context()
             
             # Add security headers if enabled
             if settings.SECURITY_HEADERS_ENABLED:
@@ -159,6 +163,9 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Internal server error in tenant context processing"
             )
+        finally:
+            if context_token is not None:
+                self._clear_database_context(context_token)
     
     def _should_skip_tenant_context(self, request: Request) -> bool:
         """Check if request should skip tenant context processing."""
@@ -312,126 +319,30 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
                 detail="Could not establish tenant context"
             )
     
-    async def _set_database_context(self, tenant_context: dict):
-        """Set PostgreSQL session variables for RLS policies."""
-        db_gen = get_db()
-        db = next(db_gen)
+    def _set_database_context(self, tenant_context: dict) -> Token:
+        """
+        Set the RLS context for the request's database transactions.
         
-        try:
-            # Set tenant ID for RLS policies
-            db.execute(
-                text("SELECT set_config('app.current_tenant_id', :tenant_id, true)"),
-                {"tenant_id": str(tenant_context["tenant_id"])}
-            )
-            
-            # Set user role for role-based policies
-            db.execute(
-                text("SELECT set_config('app.current_user_role', :user_role, true)"),
-                {"user_role": tenant_context["user_role"]}
-            )
-            
-            # Set user ID for audit purposes
-            db.execute(
-                text("SELECT set_config('app.current_user_id', :user_id, true)"),
-                {"user_id": str(tenant_context["user_id"])}
-            )
-            
-            # Set industry type for industry-specific policies
-            industry_type = tenant_context.get("industry_type")
-            if industry_type:
-                db.execute(
-                    text("SELECT set_config('app.current_industry_type', :industry_type, true)"),
-                    {"industry_type": industry_type.value}
-                )
-            
-            # For super admins, allow cross-tenant access to be explicitly enabled per request
-            # Default is false for security
-            allow_cross_tenant = "false"
-            if tenant_context["user_role"] == UserRole.admin.value:
-                # Super admins can access cross-tenant data only when explicitly requested
-                # This should be handled by specific admin endpoints
-                allow_cross_tenant = "false"  # Default to secure mode
-            
-            db.execute(
-                text("SELECT set_config('app.allow_cross_tenant', :allow_cross_tenant, true)"),
-                {"allow_cross_tenant": allow_cross_tenant}
-            )
-            
-            db.commit()
-            
-        except SQLAlchemyError as e:
-            logger.error(
-                "Database error setting tenant context",
-                extra={
-                    "event": "db_context_error",
-                    "error": str(e),
-                    "tenant_id": str(tenant_context["tenant_id"])
-                },
-                exc_info=True
-            )
-            # Ensure rollback on error
-            try:
-                db.rollback()
-            except Exception:
-                pass
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to establish database tenant context"
-            )
-        finally:
-            # Ensure session is properly closed
-            try:
-                db.close()
-            except Exception as e:
-                logger.warning(
-                    "Error closing database session in context setting",
-                    extra={
-                        "event": "db_session_close_error",
-                        "error": str(e)
-                    }
-                )
-    
-    async def _clear_database_context(self):
-        """Clear PostgreSQL session variables after request."""
-        db_gen = get_db()
-        db = next(db_gen)
+        The settings are applied by the session's after_begin event on the
+        request's own connection, once per transaction.
+        """
+        # Only known roles reach the RLS policies (raises ValueError otherwise)
+        user_role = UserRole(tenant_context["user_role"]).value
+        industry_type = tenant_context.get("industry_type")
         
-        try:
-            # Clear all app-specific session variables
-            db.execute(text("SELECT set_config('app.current_tenant_id', null, true)"))
-            db.execute(text("SELECT set_config('app.current_user_role', null, true)"))
-            db.execute(text("SELECT set_config('app.current_user_id', null, true)"))
-            db.execute(text("SELECT set_config('app.current_industry_type', null, true)"))
-            db.execute(text("SELECT set_config('app.allow_cross_tenant', null, true)"))
-            
-            db.commit()
-            
-        except SQLAlchemyError as e:
-            # Log error but don't fail the request
-            logger.warning(
-                "Failed to clear database tenant context",
-                extra={
-                    "event": "db_context_clear_error",
-                    "error": str(e)
-                }
-            )
-            # Attempt rollback but don't fail if it errors
-            try:
-                db.rollback()
-            except Exception:
-                pass
-        finally:
-            # Ensure session is properly closed
-            try:
-                db.close()
-            except Exception as e:
-                logger.warning(
-                    "Error closing database session in context clearing",
-                    extra={
-                        "event": "db_session_close_error",
-                        "error": str(e)
-                    }
-                )
+        # Cross-tenant access is never enabled here; super admin endpoints
+        # opt in explicitly through SuperAdminContextManager
+        return set_tenant_context(TenantDatabaseContext(
+            tenant_id=str(tenant_context["tenant_id"]),
+            user_role=user_role,
+            user_id=str(tenant_context["user_id"]),
+            industry_type=industry_type.value if industry_type else None,
+            allow_cross_tenant=False
+        ))
+    
+    def _clear_database_context(self, token: Token) -> None:
+        """Restore the RLS context that was current before the request."""
+        reset_tenant_context(token)
 
 
 class SuperAdminContextManager:
@@ -450,98 +361,33 @@ class SuperAdminContextManager:
         self.user = user
     
     async def __aenter__(self):
-        """Enable cross-tenant access for super admin."""
-        db_gen = get_db()
-        db = next(db_gen)
-        
-        try:
-            # Enable cross-tenant access for this session
-            db.execute(
-                text("SELECT set_config('app.allow_cross_tenant', 'true', true)")
+        """Enable cross-tenant access for transactions begun inside the block."""
+        context = get_tenant_context()
+        if context is None:
+            context = TenantDatabaseContext(
+                tenant_id=NO_TENANT_ID,
+                user_role=self.user.role.value,
+                user_id=str(self.user.id)
             )
-            db.commit()
-            
-            logger.info(
-                "Cross-tenant access enabled",
-                extra={
-                    "event": "cross_tenant_enabled",
-                    "admin_user_id": str(self.user.id),
-                    "justification": "Super admin context manager"
-                }
-            )
-            
-        except Exception as e:
-            logger.error(
-                "Failed to enable cross-tenant access",
-                extra={
-                    "event": "cross_tenant_enable_error",
-                    "admin_user_id": str(self.user.id),
-                    "error": str(e)
-                },
-                exc_info=True
-            )
-            # Ensure rollback on error
-            try:
-                db.rollback()
-            except Exception:
-                pass
-            raise
-        finally:
-            # Ensure session is properly closed
-            try:
-                db.close()
-            except Exception as e:
-                logger.warning(
-                    "Error closing database session in super admin context enter",
-                    extra={
-                        "event": "db_session_close_error",
-                        "error": str(e)
-                    }
-                )
+        self._token = set_tenant_context(replace(context, allow_cross_tenant=True))
+        
+        logger.info(
+            "Cross-tenant access enabled",
+            extra={
+                "event": "cross_tenant_enabled",
+                "admin_user_id": str(self.user.id),
+                "justification": "Super admin context manager"
+            }
+        )
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Disable cross-tenant access after operation."""
-        db_gen = get_db()
-        db = next(db_gen)
+        reset_tenant_context(self._token)
         
-        try:
-            # Disable cross-tenant access
-            db.execute(
-                text("SELECT set_config('app.allow_cross_tenant', 'false', true)")
-            )
-            db.commit()
-            
-            logger.info(
-                "Cross-tenant access disabled",
-                extra={
-                    "event": "cross_tenant_disabled",
-                    "admin_user_id": str(self.user.id)
-                }
-            )
-            
-        except Exception as e:
-            logger.warning(
-                "Failed to disable cross-tenant access",
-                extra={
-                    "event": "cross_tenant_disable_error", 
-                    "admin_user_id": str(self.user.id),
-                    "error": str(e)
-                }
-            )
-            # Attempt rollback but don't fail if it errors
-            try:
-                db.rollback()
-            except Exception:
-                pass
-        finally:
-            # Ensure session is properly closed
-            try:
-                db.close()
-            except Exception as e:
-                logger.warning(
-                    "Error closing database session in super admin context exit",
-                    extra={
-                        "event": "db_session_close_error",
-                        "error": str(e)
-                    }
-                )
\ No newline at end of file
+        logger.info(
+            "Cross-tenant access disabled",
+            extra={
+                "event": "cross_tenant_disabled",
+                "admin_user_id": str(self.user.id)
+            }
+        )
@@ -11,6 +11,7 @@ from .modules import AnalyticsModule, OrganisationModule, ModuleConfiguration, M
 Module = AnalyticsModule
 from .feature_flags import FeatureFlag, FeatureFlagOverride, FeatureFlagUsage
 from .audit_log import AuditLog, AdminAction
+from .domain_events import DomainEventRecord
 
 # Hierarchical organization models
 from .hierarchy import (
@@ -29,7 +30,7 @@ __all__ = [
     "SICCode", "SectorModule", "CompetitiveFactorTemplate",
     "AnalyticsModule", "OrganisationModule", "ModuleConfiguration", "ModuleUsageLog", "Module",
     "FeatureFlag", "FeatureFlagOverride", "FeatureFlagUsage",
-    "AuditLog", "AdminAction",
+    "AuditLog", "AdminAction", "DomainEventRecord",
     
     # Hierarchical organization models
     "OrganizationHierarchy", "UserHierarchyAssignment", "HierarchyRoleAssignment",
@@ -0,0 +1,47 @@
+from typing import Optional, Dict, Any
+from sqlalchemy import String, Integer, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import uuid
+
+from .base import Base
+from .database_types import CompatibleUUID, CompatibleJSON
+
+
+class DomainEventRecord(Base):
+    """
+    Append-only event sourcing log for the event store
+    Range-partitioned by occurred_at on PostgreSQL; rows are never updated
+    """
+    __tablename__ = "domain_events"
+    __table_args__ = (
+        Index("ix_domain_events_aggregate_version", "aggregate_id", "version"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    # The partition key must be part of the primary key
+    id: Mapped[str] = mapped_column(CompatibleUUID(), primary_key=True, default=lambda: str(uuid.uuid4()))
+    occurred_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    # Event identity
+    event_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    # Aggregate stream position
+    aggregate_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    aggregate_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    # Source and correlation
+    source_module: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    user_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    correlation_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    category: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+
+    # Event body; event_metadata holds the full serialized EventMetadata
+    payload: Mapped[Dict[str, Any]] = mapped_column(CompatibleJSON(), nullable=False, default=dict)
+    event_metadata: Mapped[Dict[str, Any]] = mapped_column(CompatibleJSON(), nullable=False, default=dict)
+
+    def __repr__(self):
+        return f"<DomainEventRecord(name='{self.name}', aggregate={self.aggregate_id}, version={self.version})>"
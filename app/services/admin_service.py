@@ -16,6 +16,7 @@ from ..models.audit_log import AuditLog, AdminAction, AuditAction
 from ..models.sectors import SICCode
 from ..models.user import User
 from .audit_service import AuditService
+from .feature_flag_snapshot import feature_flag_snapshots
 
 logger = logging.getLogger(__name__)
 
@@ -140,6 +141,7 @@ class AdminService:
             
             await self.db.commit()
             await self.db.refresh(flag)
+            await feature_flag_snapshots.publish_change()
             
             # Log the change
             await self.audit_service.log_action(
@@ -1,15 +1,15 @@
 from typing import Dict, Any, Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, inspect
 from sqlalchemy.orm import selectinload
 from datetime import datetime
-import hashlib
 import random
 
 from ..models.feature_flags import FeatureFlag, FeatureFlagOverride, FeatureFlagUsage, FeatureFlagScope
 from ..models.user import User
 from ..models.organisation import Organisation
 from ..services.audit_service import AuditService
+from .feature_flag_snapshot import feature_flag_snapshots, rollout_bucket
 
 
 class FeatureFlagService:
@@ -106,26 +106,14 @@ class FeatureFlagService:
     ) -> Dict[str, Any]:
         """
         Get all enabled features for a user, optionally filtered by module
-        """
-        query = select(FeatureFlag).where(FeatureFlag.is_enabled == True)
-        
-        if module_id:
-            query = query.where(FeatureFlag.module_id == module_id)
-        
-        result = await self.db.execute(query)
-        feature_flags = result.scalars().all()
         
-        enabled_features = {}
-        for flag in feature_flags:
-            is_enabled = await self.is_feature_enabled(flag.flag_key, user)
-            if is_enabled:
-                enabled_features[flag.flag_key] = {
-                    "name": flag.name,
-                    "config": flag.config,
-                    "module_id": flag.module_id
-                }
+        Evaluated against the in-memory flag snapshot: the only query is for
+        the organisation's SIC code, when the user's organisation isn't loaded.
+        """
+        snapshot = await feature_flag_snapshots.get()
+        sic_code = await self._get_organisation_sic_code(user)
         
-        return enabled_features
+        return snapshot.enabled_features(user.id, user.organisation_id, sic_code, module_id)
     
     async def create_feature_flag(
         self, 
@@ -141,6 +129,7 @@ class FeatureFlagService:
         self.db.add(feature_flag)
         await self.db.commit()
         await self.db.refresh(feature_flag)
+        await feature_flag_snapshots.publish_change()
         
         # Log the creation
         await self.audit_service.log_action(
@@ -183,6 +172,7 @@ class FeatureFlagService:
         
         await self.db.commit()
         await self.db.refresh(feature_flag)
+        await feature_flag_snapshots.publish_change()
         
         # Log the update
         await self.audit_service.log_action(
@@ -212,6 +202,7 @@ class FeatureFlagService:
         self.db.add(override)
         await self.db.commit()
         await self.db.refresh(override)
+        await feature_flag_snapshots.publish_change()
         
         # Log the override creation
         target = f"org:{override.organisation_id}" if override.organisation_id else f"user:{override.user_id}"
@@ -319,13 +310,20 @@ class FeatureFlagService:
         
         return True
     
+    async def _get_organisation_sic_code(self, user: User) -> Optional[str]:
+        """SIC code of the user's organisation, from the loaded organisation when there is one"""
+        if "organisation" not in inspect(user).unloaded:
+            organisation = user.organisation
+            return organisation.sic_code if organisation else None
+        
+        result = await self.db.execute(
+            select(Organisation.sic_code).where(Organisation.id == user.organisation_id)
+        )
+        return result.scalar_one_or_none()
+    
     def _get_user_hash(self, user_id: str, flag_key: str) -> int:
         """Generate deterministic hash for percentage rollout"""
-        hash_input = f"{user_id}:{flag_key}"
-        hash_object = hashlib.md5(hash_input.encode())
-        hash_hex = hash_object.hexdigest()
-        # Convert first 8 characters to int and get percentage (0-99)
-        return int(hash_hex[:8], 16) % 100
+        return rollout_bucket(user_id, flag_key)
     
     async def _log_usage(
         self, 
@@ -0,0 +1,289 @@
+"""
+Feature Flag Snapshots
+
+Every feature flag, with its overrides and sector rules, compiled into an
+immutable in-memory snapshot so that evaluating all flags for a user is a
+pure CPU operation:
+- overrides are indexed by user id and by organisation id per flag
+- sector lists become frozensets
+- the snapshot is rebuilt in a single query pair, once per change, with
+  concurrent rebuilds coalesced into one
+
+Changes made through FeatureFlagService / AdminService call publish_change,
+which drops this worker's snapshot and writes a new version token to the
+shared cache; other workers compare against it at most every
+FEATURE_FLAG_SNAPSHOT_VERSION_CHECK_SECONDS. Without Redis, other workers
+pick changes up when their snapshot reaches FEATURE_FLAG_SNAPSHOT_MAX_AGE_SECONDS.
+
+Snapshots are loaded on their own session with cross-tenant RLS settings:
+they are shared by every tenant in the worker, so they must not be limited
+to the overrides visible to the request that happened to trigger the load.
+"""
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import get_async_session_local
+from ..core.logging import logger
+from ..core.tenant_context import NO_TENANT_ID, TenantDatabaseContext, reset_tenant_context, set_tenant_context
+from ..data.cache.redis_cache import cache_manager
+from ..models.feature_flags import FeatureFlag, FeatureFlagOverride
+
+VERSION_CACHE_KEY = "feature_flags:version"
+
+# Snapshots hold every tenant's overrides
+_SNAPSHOT_DB_CONTEXT = TenantDatabaseContext(
+    tenant_id=NO_TENANT_ID,
+    user_role="super_admin",
+    user_id="",
+    allow_cross_tenant=True
+)
+
+
+def rollout_bucket(user_id: Any, flag_key: str) -> int:
+    """Deterministic 0-99 bucket of a user for a flag's percentage rollout"""
+    hash_hex = hashlib.md5(f"{user_id}:{flag_key}".encode()).hexdigest()
+    return int(hash_hex[:8], 16) % 100
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class CompiledOverride:
+    is_enabled: bool
+    expires_at: Optional[datetime]
+
+    def applies(self, now: datetime) -> bool:
+        """Whether the override enables the flag; an expired override disables it"""
+        return self.is_enabled and (self.expires_at is None or self.expires_at > now)
+
+
+@dataclass(frozen=True)
+class CompiledFlag:
+    """One feature flag's rules, ready to evaluate without the database"""
+    id: str
+    flag_key: str
+    name: str
+    is_enabled: bool
+    rollout_percentage: int
+    config: Mapping[str, Any]
+    module_id: Optional[str]
+    allowed_sectors: frozenset
+    blocked_sectors: frozenset
+    user_overrides: Mapping[str, CompiledOverride]
+    organisation_overrides: Mapping[str, CompiledOverride]
+
+    def evaluate(
+        self,
+        user_id: Any,
+        organisation_id: Any,
+        sic_code: Optional[str],
+        now: datetime
+    ) -> Tuple[bool, str]:
+        """Same rules, in the same order, as FeatureFlagService.is_feature_enabled"""
+        if not self.is_enabled:
+            return False, "Flag disabled"
+
+        override = self.user_overrides.get(str(user_id))
+        if override is not None:
+            return override.applies(now), "User override"
+
+        override = self.organisation_overrides.get(str(organisation_id))
+        if override is not None:
+            return override.applies(now), "Organisation override"
+
+        if sic_code:
+            if sic_code in self.blocked_sectors:
+                return False, "Sector restricted"
+            if self.allowed_sectors and sic_code not in self.allowed_sectors:
+                return False, "Sector restricted"
+
+        if self.rollout_percentage >= 100:
+            return True, "Full rollout"
+        if self.rollout_percentage <= 0:
+            return False, "Zero rollout"
+
+        enabled = rollout_bucket(user_id, self.flag_key) < self.rollout_percentage
+        return enabled, f"Percentage rollout: {self.rollout_percentage}%"
+
+
+def compile_flag(flag: FeatureFlag, overrides: Iterable[FeatureFlagOverride]) -> CompiledFlag:
+    user_overrides: Dict[str, CompiledOverride] = {}
+    organisation_overrides: Dict[str, CompiledOverride] = {}
+    for override in overrides:
+        compiled = CompiledOverride(override.is_enabled, _as_utc(override.expires_at))
+        # Where several overrides target the same user or organisation, the oldest wins
+        if override.user_id is not None:
+            user_overrides.setdefault(str(override.user_id), compiled)
+        if override.organisation_id is not None:
+            organisation_overrides.setdefault(str(override.organisation_id), compiled)
+
+    return CompiledFlag(
+        id=str(flag.id),
+        flag_key=flag.flag_key,
+        name=flag.name,
+        is_enabled=flag.is_enabled,
+        rollout_percentage=flag.rollout_percentage or 0,
+        config=flag.config,
+        module_id=flag.module_id,
+        allowed_sectors=frozenset(flag.allowed_sectors or ()),
+        blocked_sectors=frozenset(flag.blocked_sectors or ()),
+        user_overrides=user_overrides,
+        organisation_overrides=organisation_overrides,
+    )
+
+
+class FeatureFlagSnapshot:
+    """Immutable set of compiled flags, keyed by flag_key"""
+
+    def __init__(self, flags: Iterable[CompiledFlag], version: Optional[str] = None):
+        self.flags: Dict[str, CompiledFlag] = {flag.flag_key: flag for flag in flags}
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def get(self, flag_key: str) -> Optional[CompiledFlag]:
+        return self.flags.get(flag_key)
+
+    def enabled_features(
+        self,
+        user_id: Any,
+        organisation_id: Any,
+        sic_code: Optional[str],
+        module_id: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Every flag enabled for the user, in the shape of get_enabled_features"""
+        now = now or datetime.now(timezone.utc)
+        enabled_features = {}
+        for flag in self.flags.values():
+            if not flag.is_enabled or (module_id and flag.module_id != module_id):
+                continue
+            if flag.evaluate(user_id, organisation_id, sic_code, now)[0]:
+                enabled_features[flag.flag_key] = {
+                    "name": flag.name,
+                    "config": flag.config,
+                    "module_id": flag.module_id
+                }
+        return enabled_features
+
+
+async def load_snapshot(db: AsyncSession, version: Optional[str] = None) -> FeatureFlagSnapshot:
+    """Compile every flag and override on the given session"""
+    flags = (await db.execute(select(FeatureFlag).order_by(FeatureFlag.flag_key))).scalars().all()
+    overrides = (await db.execute(
+        select(FeatureFlagOverride).order_by(FeatureFlagOverride.created_at)
+    )).scalars().all()
+
+    overrides_by_flag: Dict[str, List[FeatureFlagOverride]] = {}
+    for override in overrides:
+        overrides_by_flag.setdefault(str(override.feature_flag_id), []).append(override)
+
+    return FeatureFlagSnapshot(
+        (compile_flag(flag, overrides_by_flag.get(str(flag.id), ())) for flag in flags),
+        version=version
+    )
+
+
+class FeatureFlagSnapshotStore:
+    """This worker's current snapshot, rebuilt on change"""
+
+    def __init__(
+        self,
+        max_age_seconds: Optional[float] = None,
+        version_check_seconds: Optional[float] = None,
+    ):
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None
+            else settings.FEATURE_FLAG_SNAPSHOT_MAX_AGE_SECONDS
+        )
+        self.version_check_seconds = (
+            version_check_seconds if version_check_seconds is not None
+            else settings.FEATURE_FLAG_SNAPSHOT_VERSION_CHECK_SECONDS
+        )
+        self._snapshot: Optional[FeatureFlagSnapshot] = None
+        self._checked_at: float = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._generation = 0
+        self.load_count = 0
+
+    async def get(self) -> FeatureFlagSnapshot:
+        """The current snapshot, rebuilding it if it is missing, too old or outdated"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.max_age_seconds:
+            if time.monotonic() - self._checked_at < self.version_check_seconds:
+                return snapshot
+            self._checked_at = time.monotonic()
+            if await self._shared_version() == snapshot.version:
+                return snapshot
+        return await self.rebuild()
+
+    async def rebuild(self) -> FeatureFlagSnapshot:
+        """Load a new snapshot now; concurrent callers share a single load"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._inflight)
+
+    def invalidate(self) -> None:
+        """Drop this worker's snapshot; the next get rebuilds it"""
+        # A load already under way may predate the change: let it finish unused
+        self._generation += 1
+        self._snapshot = None
+        self._inflight = None
+
+    async def publish_change(self) -> None:
+        """Drop the snapshot here and tell other workers to drop theirs"""
+        self.invalidate()
+        try:
+            await cache_manager.set(VERSION_CACHE_KEY, uuid.uuid4().hex, ttl=timedelta(days=7))
+        except Exception as e:
+            logger.warning("Failed to publish feature flag change", extra={
+                "event": "feature_flag_snapshot_publish_failed",
+                "error": str(e)
+            })
+
+    async def _shared_version(self) -> Optional[str]:
+        try:
+            return await cache_manager.get(VERSION_CACHE_KEY)
+        except Exception:
+            return None
+
+    async def _load(self) -> FeatureFlagSnapshot:
+        generation = self._generation
+        version = await self._shared_version()
+        self.load_count += 1
+
+        token = set_tenant_context(_SNAPSHOT_DB_CONTEXT)
+        try:
+            async with get_async_session_local()() as session:
+                snapshot = await load_snapshot(session, version)
+        finally:
+            reset_tenant_context(token)
+
+        if generation == self._generation:
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+        logger.debug("Loaded feature flag snapshot", extra={
+            "event": "feature_flag_snapshot_loaded",
+            "flag_count": len(snapshot),
+            "version": version
+        })
+        return snapshot
+
+
+# Feature flag rules shared by every request in this worker
+feature_flag_snapshots = FeatureFlagSnapshotStore()
@@ -20,11 +20,11 @@ from collections import defaultdict
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload
 
 from ..models.user import User, UserRole
-from ..core.database import get_db
+from ..auth.identity import resolve_user_by_id
 from ..core.config import settings
+from ..core.bloom_filter import BloomFilter
 
 logger = logging.getLogger(__name__)
 
@@ -86,7 +86,18 @@ class TokenPair:
 
 
 class TokenBlacklist:
-    """Thread-safe token blacklist with Redis fallback and race condition protection"""
+    """
+    Thread-safe token blacklist with Redis fallback and race condition protection
+
+    With Redis, every worker keeps a Bloom filter of revoked JTIs so the
+    common "not revoked" answer needs no I/O; Redis is only asked on a filter
+    hit. The filter is loaded from the blacklisted_tokens set, kept current
+    by a pub/sub message per revocation and rebuilt periodically to drop
+    expired JTIs. Until start() has subscribed and loaded it, and whenever
+    the subscription drops, every check goes to Redis as before.
+    """
+    
+    REVOCATION_CHANNEL = "blacklist:revoked"
     
     def __init__(self, redis_client=None):
         self.redis = redis_client
@@ -94,6 +105,14 @@ class TokenBlacklist:
         self.blacklist_cleanup_interval = 3600  # 1 hour
         self.last_cleanup = time.time()
         
+        # Revoked-JTI filter, authoritative for misses only while in sync
+        self.filter_capacity = settings.TOKEN_BLACKLIST_FILTER_CAPACITY
+        self.filter_rebuild_interval = settings.TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS
+        self.sync_retry_seconds = 5.0
+        self._filter = BloomFilter(self.filter_capacity)
+        self._filter_synced = False
+        self._sync_task: Optional[asyncio.Task] = None
+        
         # SECURITY FIX: Thread-safe operations
         self._lock = threading.RLock()  # Reentrant lock for nested operations
         self._pending_operations: Dict[str, asyncio.Lock] = {}
@@ -127,6 +146,7 @@ class TokenBlacklist:
                 # Thread-safe local blacklist update
                 with self._lock:
                     self.local_blacklist.add(token_jti)
+                    self._filter.add(token_jti)
                 
                 # Add to Redis if available with proper error handling
                 if self.redis:
@@ -137,6 +157,7 @@ class TokenBlacklist:
                             pipe = self.redis.pipeline()
                             pipe.setex(f"blacklist:{token_jti}", ttl, "revoked")
                             pipe.sadd("blacklisted_tokens", token_jti)  # Track for cleanup
+                            pipe.publish(self.REVOCATION_CHANNEL, token_jti)  # Other workers' filters
                             await pipe.execute()
                         except Exception as redis_error:
                             logger.error(f"Redis blacklist operation failed: {str(redis_error)}")
@@ -164,19 +185,21 @@ class TokenBlacklist:
             
             # Check Redis if available with fallback handling
             if self.redis:
+                # Not in the synced filter: never revoked, answered from memory
+                if self._filter_synced and not self._filter.might_contain(token_jti):
+                    return False
+                
                 try:
-                    # Use operation-specific lock for consistency
-                    async with self._get_operation_lock(f"check_{token_jti}"):
-                        result = await self.redis.get(f"blacklist:{token_jti}")
-                        is_blacklisted = result is not None
-                        
-                        # Sync local cache if found in Redis but not locally
-                        if is_blacklisted:
-                            with self._lock:
-                                self.local_blacklist.add(token_jti)
-                        
-                        return is_blacklisted
-                        
+                    result = await self.redis.get(f"blacklist:{token_jti}")
+                    is_blacklisted = result is not None
+                    
+                    # Sync local cache if found in Redis but not locally
+                    if is_blacklisted:
+                        with self._lock:
+                            self.local_blacklist.add(token_jti)
+                    
+                    return is_blacklisted
+                    
                 except Exception as redis_error:
                     logger.warning(f"Redis blacklist check failed, using local cache: {str(redis_error)}")
                     # Fall back to local cache only
@@ -234,6 +257,87 @@ class TokenBlacklist:
         except Exception as e:
             logger.error(f"Error cleaning up token blacklist: {str(e)}")
     
+    @property
+    def filter_synced(self) -> bool:
+        return self._filter_synced
+    
+    @property
+    def is_running(self) -> bool:
+        return self._sync_task is not None and not self._sync_task.done()
+    
+    def start(self):
+        """Start keeping the revocation filter in sync on the running event loop"""
+        if not self.redis or self.is_running:
+            return
+        self._sync_task = asyncio.create_task(self._run_sync())
+    
+    def cancel(self):
+        """Stop syncing without waiting for the sync task to exit"""
+        self._filter_synced = False
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
+    
+    async def stop(self):
+        """Stop syncing the revocation filter"""
+        task = self._sync_task
+        self.cancel()
+        if task:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    async def rebuild_filter(self):
+        """Replace the filter with one built from the blacklisted_tokens set"""
+        members = await self.redis.smembers("blacklisted_tokens")
+        token_jtis = [
+            member.decode("utf-8") if isinstance(member, bytes) else member
+            for member in members
+        ]
+        
+        with self._lock:
+            token_jtis.extend(self.local_blacklist)
+            self._filter = BloomFilter.from_items(token_jtis, self.filter_capacity)
+        
+        logger.debug(f"Rebuilt token revocation filter with {len(token_jtis)} entries")
+    
+    async def _run_sync(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                # Subscribe before loading so no revocation falls between the two
+                await pubsub.subscribe(self.REVOCATION_CHANNEL)
+                await self.rebuild_filter()
+                self._filter_synced = True
+                next_rebuild = time.monotonic() + self.filter_rebuild_interval
+                
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        token_jti = message["data"]
+                        if isinstance(token_jti, bytes):
+                            token_jti = token_jti.decode("utf-8")
+                        with self._lock:
+                            self._filter.add(token_jti)
+                    
+                    if time.monotonic() >= next_rebuild or self._filter.is_saturated:
+                        await self.rebuild_filter()
+                        next_rebuild = time.monotonic() + self.filter_rebuild_interval
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token revocation filter sync failed, checking Redis directly: {str(e)}")
+            finally:
+                self._filter_synced = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            
+            await asyncio.sleep(self.sync_retry_seconds)
+    
     def _get_operation_lock(self, operation_id: str) -> asyncio.Lock:
         """Get or create operation-specific async lock"""
         with self._operation_locks_lock:
@@ -306,7 +410,7 @@ class JWTService:
     """
     
     def __init__(self, redis_client=None):
-        self.secret_key = settings.SECRET_KEY
+        self.secret_key = settings.JWT_SECRET_KEY
         self.algorithm = "HS256"
         self.access_token_expire_minutes = 60  # 1 hour
         self.refresh_token_expire_days = 7  # 7 days
@@ -707,6 +811,14 @@ class JWTService:
         except Exception:
             return None
     
+    def start(self):
+        """Start background work: syncing the revoked-token filter across workers"""
+        self.blacklist.start()
+    
+    async def stop(self):
+        """Stop background work started by start()"""
+        await self.blacklist.stop()
+    
     async def cleanup(self):
         """Clean up expired tokens and cache entries"""
         try:
@@ -745,19 +857,9 @@ class JWTService:
     # Private helper methods
     
     async def _load_user(self, user_id: str) -> Optional[User]:
-        """Load user from database"""
+        """Load user with organisation, shared with the rest of the request"""
         try:
-            async for db_session in get_db():
-                try:
-                    stmt = select(User).where(User.id == user_id).options(
-                        selectinload(User.organisation)
-                    )
-                    result = await db_session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    return user
-                except Exception as db_error:
-                    logger.error(f"Database error loading user {user_id}: {str(db_error)}")
-                    break
+            return await resolve_user_by_id(user_id)
         except Exception as e:
             logger.error(f"Error loading user {user_id}: {str(e)}")
         return None
@@ -795,4 +897,10 @@ def initialize_jwt_service(redis_client=None) -> JWTService:
     if jwt_service is None:
         jwt_service = JWTService(redis_client=redis_client)
         logger.info("Global JWT service initialized")
-    return jwt_service
\ No newline at end of file
+    return jwt_service
+
+
+async def close_jwt_service():
+    """Stop the global JWT service's background work"""
+    if jwt_service is not None:
+        await jwt_service.stop()
@@ -13,6 +13,7 @@ from ..models.user import User
 from ..core.rate_limit_config import Industry
 from ..core.industry_config import industry_config_manager
 from ..core.logging import logger
+from ..auth.identity import invalidate_organisation
 
 
 class OrganisationValidationError(Exception):
@@ -161,6 +162,7 @@ class OrganisationService:
             
             self.db.commit()
             self.db.refresh(organisation)
+            invalidate_organisation(organisation_id)
             
             logger.info(f"Updated organisation '{organisation.name}' (ID: {organisation_id})")
             return organisation
@@ -242,6 +244,7 @@ class OrganisationService:
                 logger.info(f"Soft deleted organisation '{organisation.name}'")
             
             self.db.commit()
+            invalidate_organisation(organisation_id)
             return True
             
         except Exception as e:
@@ -7,7 +7,9 @@ supporting role inheritance, permission overrides, and fine-grained access contr
 import json
 import uuid
 import time
-from typing import Dict, List, Optional, Set, Tuple, Any
+from datetime import timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
 from ..core.logging import logger
@@ -26,6 +28,21 @@ from ..models.hierarchy import (
     HierarchyLevel
 )
 
+# Most parent levels permissions are inherited through
+MAX_INHERITANCE_DEPTH = 10
+
+
+@lru_cache(maxsize=4096)
+def parse_role_permissions(permissions_json: str) -> Tuple[str, ...]:
+    """Permission list of a role assignment, parsed once per distinct JSON value"""
+    return tuple(json.loads(permissions_json))
+
+
+def ancestor_paths(hierarchy_path: str) -> List[str]:
+    """Materialized paths of a node's ancestors, nearest first"""
+    parts = hierarchy_path.split("/")
+    return ["/".join(parts[:i]) for i in range(len(parts) - 1, 0, -1)]
+
 
 class PermissionResolutionEngine:
     """
@@ -40,10 +57,13 @@ class PermissionResolutionEngine:
     
     def __init__(self, db: Session):
         self.db = db
-        self.cache_ttl = 300  # 5 minutes cache TTL
+        # Keys embed the tenant's permissions version, so changes invalidate
+        # them immediately; the TTL only bounds how long orphans linger
+        self.cache_ttl = timedelta(hours=4)
+        self.version_ttl = 2 * self.cache_ttl
         self.cache_prefix = "permissions:"
         
-    def resolve_user_permissions(
+    async def resolve_user_permissions(
         self, 
         user_id: uuid.UUID, 
         context_node_id: Optional[uuid.UUID] = None,
@@ -60,15 +80,18 @@ class PermissionResolutionEngine:
         Returns:
             Dict containing resolved permissions with metadata
         """
-        # Create cache key for permission resolution
-        cache_key = f"{self.cache_prefix}user:{user_id}:node:{context_node_id}:inherited:{include_inherited}"
-        
-        # Check cache first
+        # Check cache first, under the current version of the user's tenant
+        cache_key = None
         try:
-            cached_result = cache_manager.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Permission cache hit for user {user_id}")
-                return cached_result
+            tenant_id = await cache_manager.get(self._tenant_key(user_id))
+            if tenant_id is not None:
+                cache_key = self._cache_key(
+                    user_id, await self._permissions_version(tenant_id), context_node_id, include_inherited
+                )
+                cached_result = await cache_manager.get(cache_key)
+                if cached_result is not None:
+                    logger.debug(f"Permission cache hit for user {user_id}")
+                    return cached_result
         except Exception as e:
             logger.warning(f"Permission cache read error: {str(e)}")
         
@@ -84,6 +107,12 @@ class PermissionResolutionEngine:
                 logger.warning(f"User not found for permission resolution: {user_id}")
                 return {"permissions": [], "context": "user_not_found"}
             
+            # Active assignment per node (the first one wins)
+            assignments: Dict[uuid.UUID, UserHierarchyAssignment] = {}
+            for assignment in user.hierarchy_assignments:
+                if assignment.is_active:
+                    assignments.setdefault(assignment.hierarchy_node_id, assignment)
+            
             # Get relevant hierarchy nodes for the user
             if context_node_id:
                 context_node = self.db.query(OrganizationHierarchy).filter(
@@ -95,7 +124,7 @@ class PermissionResolutionEngine:
                 hierarchy_nodes = [context_node]
             else:
                 # Use all nodes the user is assigned to
-                hierarchy_nodes = user.get_hierarchy_nodes()
+                hierarchy_nodes = [assignment.hierarchy_node for assignment in assignments.values()]
             
             resolved_permissions = {}
             resolution_metadata = {
@@ -106,9 +135,28 @@ class PermissionResolutionEngine:
                 "inheritance_chain": []
             }
             
+            # Ancestors and role assignments for every node in one query
+            assigned_nodes = [node for node in hierarchy_nodes if node.id in assignments]
+            nodes_by_id, role_assignments = self._load_hierarchy_context(
+                assigned_nodes,
+                {assignments[node.id].role for node in assigned_nodes},
+                include_inherited
+            )
+            
+            overrides: Dict[uuid.UUID, List[HierarchyPermissionOverride]] = {}
+            for override in (user.permission_overrides if assigned_nodes else []):
+                if override.is_active:
+                    overrides.setdefault(override.hierarchy_node_id, []).append(override)
+            
             for node in hierarchy_nodes:
                 node_permissions = self._resolve_permissions_for_node(
-                    user, node, include_inherited, resolution_metadata
+                    node,
+                    assignments.get(node.id),
+                    nodes_by_id,
+                    role_assignments,
+                    overrides.get(node.id, []),
+                    include_inherited,
+                    resolution_metadata
                 )
                 
                 # Merge permissions (union of all permissions)
@@ -126,10 +174,15 @@ class PermissionResolutionEngine:
                 "metadata": resolution_metadata
             }
             
-            # Cache the result for future requests
+            # Cache the result for future requests. Only a version read before
+            # resolving is safe to key it by, so without the user's tenant
+            # recorded yet, record it and cache from the next resolution on
             try:
-                cache_manager.set(cache_key, result, ttl=self.cache_ttl)
-                logger.debug(f"Cached permission resolution for user {user_id}")
+                if cache_key is not None:
+                    await cache_manager.set(cache_key, result, ttl=self.cache_ttl)
+                    logger.debug(f"Cached permission resolution for user {user_id}")
+                else:
+                    await cache_manager.set(self._tenant_key(user_id), str(user.organisation_id or ""), ttl=self.cache_ttl)
             except Exception as e:
                 logger.warning(f"Permission cache write error: {str(e)}")
             
@@ -139,26 +192,66 @@ class PermissionResolutionEngine:
             logger.error(f"Error resolving permissions for user {user_id}: {str(e)}")
             return {"permissions": [], "error": str(e)}
     
+    def _load_hierarchy_context(
+        self,
+        nodes: List[OrganizationHierarchy],
+        roles: Set[EnhancedUserRole],
+        include_inherited: bool
+    ) -> Tuple[Dict[uuid.UUID, OrganizationHierarchy], Dict[Tuple[uuid.UUID, EnhancedUserRole], HierarchyRoleAssignment]]:
+        """
+        Load the nodes' ancestors and the active role assignments for the
+        given roles on the nodes and their ancestors in a single query
+        
+        Ancestors are found by their materialized hierarchy_path; the
+        inheritance chain itself still follows parent_id.
+        """
+        nodes_by_id = {node.id: node for node in nodes}
+        if not nodes or not roles:
+            return nodes_by_id, {}
+        
+        paths: Set[str] = set()
+        if include_inherited:
+            for node in nodes:
+                paths.update(ancestor_paths(node.hierarchy_path)[:MAX_INHERITANCE_DEPTH])
+        
+        node_filter = OrganizationHierarchy.id.in_(list(nodes_by_id))
+        if paths:
+            node_filter = or_(node_filter, OrganizationHierarchy.hierarchy_path.in_(sorted(paths)))
+        
+        rows = self.db.query(OrganizationHierarchy, HierarchyRoleAssignment).outerjoin(
+            HierarchyRoleAssignment,
+            and_(
+                HierarchyRoleAssignment.hierarchy_node_id == OrganizationHierarchy.id,
+                HierarchyRoleAssignment.role.in_(list(roles)),
+                HierarchyRoleAssignment.is_active == True
+            )
+        ).filter(node_filter).all()
+        
+        role_assignments = {}
+        for node, role_assignment in rows:
+            nodes_by_id.setdefault(node.id, node)
+            if role_assignment is not None:
+                role_assignments[(node.id, role_assignment.role)] = role_assignment
+        
+        return nodes_by_id, role_assignments
+    
     def _resolve_permissions_for_node(
         self, 
-        user: User, 
         node: OrganizationHierarchy,
+        user_assignment: Optional[UserHierarchyAssignment],
+        nodes_by_id: Dict[uuid.UUID, OrganizationHierarchy],
+        role_assignments: Dict[Tuple[uuid.UUID, EnhancedUserRole], HierarchyRoleAssignment],
+        user_overrides: Iterable[HierarchyPermissionOverride],
         include_inherited: bool,
         metadata: Dict[str, Any]
     ) -> Dict[str, Dict[str, Any]]:
-        """Resolve permissions for a specific hierarchy node"""
+        """Resolve permissions for a specific hierarchy node from preloaded rows"""
         
         permissions = {}
         
         # 1. Get user's role assignment at this node
-        user_assignment = None
-        for assignment in user.hierarchy_assignments:
-            if assignment.hierarchy_node_id == node.id and assignment.is_active:
-                user_assignment = assignment
-                break
-        
         if not user_assignment:
-            logger.debug(f"No active assignment found for user {user.id} at node {node.id}")
+            logger.debug(f"No active assignment found at node {node.id}")
             return permissions
         
         user_role = user_assignment.role
@@ -170,17 +263,10 @@ class PermissionResolutionEngine:
         })
         
         # 2. Get role-based permissions at current level
-        role_assignment = self.db.query(HierarchyRoleAssignment).filter(
-            and_(
-                HierarchyRoleAssignment.hierarchy_node_id == node.id,
-                HierarchyRoleAssignment.role == user_role,
-                HierarchyRoleAssignment.is_active == True
-            )
-        ).first()
+        role_assignment = role_assignments.get((node.id, user_role))
         
         if role_assignment:
-            role_permissions = json.loads(role_assignment.permissions)
-            for perm in role_permissions:
+            for perm in parse_role_permissions(role_assignment.permissions):
                 permissions[perm] = {
                     "granted": True,
                     "source": "role_assignment",
@@ -195,23 +281,14 @@ class PermissionResolutionEngine:
         # 3. Apply inherited permissions from parent nodes
         if include_inherited and node.parent_id:
             inherited_permissions = self._get_inherited_permissions(
-                node.parent, user_role, metadata
+                node.parent_id, user_role, nodes_by_id, role_assignments, metadata
             )
-            
             for perm, details in inherited_permissions.items():
                 if perm not in permissions:
                     permissions[perm] = details
                     permissions[perm]["inherited"] = True
         
         # 4. Apply user-specific permission overrides (highest priority)
-        user_overrides = self.db.query(HierarchyPermissionOverride).filter(
-            and_(
-                HierarchyPermissionOverride.user_id == user.id,
-                HierarchyPermissionOverride.hierarchy_node_id == node.id,
-                HierarchyPermissionOverride.is_active == True
-            )
-        ).all()
-        
         for override in user_overrides:
             permissions[override.permission] = {
                 "granted": override.granted,
@@ -235,34 +312,24 @@ class PermissionResolutionEngine:
     
     def _get_inherited_permissions(
         self, 
-        parent_node: OrganizationHierarchy,
+        parent_id: uuid.UUID,
         user_role: EnhancedUserRole,
+        nodes_by_id: Dict[uuid.UUID, OrganizationHierarchy],
+        role_assignments: Dict[Tuple[uuid.UUID, EnhancedUserRole], HierarchyRoleAssignment],
         metadata: Dict[str, Any]
     ) -> Dict[str, Dict[str, Any]]:
         """Get permissions inherited from parent hierarchy levels"""
         
-        if not parent_node:
-            return {}
-        
         permissions = {}
-        current_node = parent_node
+        current_node = nodes_by_id.get(parent_id)
         depth = 0
-        max_depth = 10  # Prevent infinite loops
         
-        while current_node and depth < max_depth:
+        while current_node and depth < MAX_INHERITANCE_DEPTH:
             # Get role assignment that allows inheritance
-            role_assignment = self.db.query(HierarchyRoleAssignment).filter(
-                and_(
-                    HierarchyRoleAssignment.hierarchy_node_id == current_node.id,
-                    HierarchyRoleAssignment.role == user_role,
-                    HierarchyRoleAssignment.inherits_from_parent == True,
-                    HierarchyRoleAssignment.is_active == True
-                )
-            ).first()
+            role_assignment = role_assignments.get((current_node.id, user_role))
             
-            if role_assignment:
-                inherited_permissions = json.loads(role_assignment.permissions)
-                for perm in inherited_permissions:
+            if role_assignment and role_assignment.inherits_from_parent:
+                for perm in parse_role_permissions(role_assignment.permissions):
                     if perm not in permissions:
                         permissions[perm] = {
                             "granted": True,
@@ -283,12 +350,12 @@ class PermissionResolutionEngine:
                     "depth": depth + 1
                 })
             
-            current_node = current_node.parent
+            current_node = nodes_by_id.get(current_node.parent_id) if current_node.parent_id else None
             depth += 1
         
         return permissions
     
-    def check_permission(
+    async def check_permission(
         self, 
         user_id: uuid.UUID, 
         permission: str,
@@ -306,7 +373,7 @@ class PermissionResolutionEngine:
             True if user has the permission, False otherwise
         """
         try:
-            resolved = self.resolve_user_permissions(user_id, context_node_id)
+            resolved = await self.resolve_user_permissions(user_id, context_node_id)
             return permission in resolved.get("permissions", [])
         except Exception as e:
             logger.error(f"Error checking permission {permission} for user {user_id}: {str(e)}")
@@ -384,14 +451,14 @@ class PermissionResolutionEngine:
         else:
             return 0
     
-    def invalidate_user_permissions_cache(self, user_id: uuid.UUID):
+    async def invalidate_user_permissions_cache(self, user_id: uuid.UUID):
         """Invalidate all cached permissions for a specific user"""
         try:
             # Pattern to match all permission cache keys for this user
             pattern = f"{self.cache_prefix}user:{user_id}:*"
             
             # Delete all matching keys
-            deleted_count = cache_manager.delete_pattern(pattern)
+            deleted_count = await cache_manager.clear_pattern(pattern)
             
             if deleted_count > 0:
                 logger.info(f"Invalidated {deleted_count} permission cache entries for user {user_id}")
@@ -399,20 +466,49 @@ class PermissionResolutionEngine:
         except Exception as e:
             logger.error(f"Error invalidating permission cache for user {user_id}: {str(e)}")
     
-    def invalidate_node_permissions_cache(self, node_id: uuid.UUID):
-        """Invalidate cached permissions for all users affected by a node change"""
+    async def invalidate_node_permissions_cache(self, node: OrganizationHierarchy):
+        """
+        Invalidate cached permissions for all users affected by a node change
+        
+        A change to a node's role assignments or structure reaches every user
+        assigned at or below it, so the whole tenant's version is bumped.
+        Nodes without an organisation bump the version shared by all tenants.
+        """
+        await self.invalidate_tenant_permissions_cache(node.legacy_organisation_id)
+    
+    async def invalidate_tenant_permissions_cache(self, tenant_id: Optional[uuid.UUID]):
+        """Invalidate all cached permissions of a tenant (of every tenant when None)"""
         try:
-            # Pattern to match all permission cache keys for this node
-            pattern = f"{self.cache_prefix}user:*:node:{node_id}:*"
-            
-            # Delete all matching keys
-            deleted_count = cache_manager.delete_pattern(pattern)
-            
-            if deleted_count > 0:
-                logger.info(f"Invalidated {deleted_count} permission cache entries for node {node_id}")
+            # A fresh random version rather than an increment, so concurrent
+            # bumps can never settle on a version that entries were cached under
+            if not await cache_manager.set(self._version_key(tenant_id), uuid.uuid4().hex, ttl=self.version_ttl):
+                logger.error(f"Failed to bump permission cache version for tenant {tenant_id or 'all'}")
+                return
+            logger.info(f"Bumped permission cache version for tenant {tenant_id or 'all'}")
             
         except Exception as e:
-            logger.error(f"Error invalidating permission cache for node {node_id}: {str(e)}")
+            logger.error(f"Error invalidating permission cache for tenant {tenant_id}: {str(e)}")
+    
+    def _tenant_key(self, user_id: uuid.UUID) -> str:
+        return f"{self.cache_prefix}user:{user_id}:tenant"
+    
+    def _version_key(self, tenant_id: Optional[Any]) -> str:
+        return f"{self.cache_prefix}version:" + (f"tenant:{tenant_id}" if tenant_id else "global")
+    
+    async def _permissions_version(self, tenant_id: str) -> str:
+        """Current cache version of a tenant, including the all-tenants version"""
+        global_version = await cache_manager.get(self._version_key(None)) or "0"
+        tenant_version = await cache_manager.get(self._version_key(tenant_id)) or "0"
+        return f"{global_version}.{tenant_version}"
+    
+    def _cache_key(
+        self,
+        user_id: uuid.UUID,
+        version: str,
+        context_node_id: Optional[uuid.UUID],
+        include_inherited: bool
+    ) -> str:
+        return f"{self.cache_prefix}user:{user_id}:v{version}:node:{context_node_id}:inherited:{include_inherited}"
 
 
 class IndustryTemplateService:
@@ -0,0 +1,324 @@
+"""
+Sliding Window Counter Rate Limit Engine
+
+Single Redis engine shared by every rate limiter in the platform. Each
+subject (tenant, user, rule bucket) is one Redis hash holding two fixed
+buckets per window; the sliding window count is approximated by weighting
+the previous bucket by how much of it still overlaps the window. All
+windows for a request are checked and the request recorded in one EVALSHA,
+and memory per subject stays constant however many requests it makes.
+"""
+import math
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+
+# Namespace for counter hashes. Deliberately distinct from the sorted-set
+# keys written by the previous limiters so the two never collide.
+WINDOW_KEY_PREFIX = "rate_limit:window:"
+
+# KEYS: counter hashes. ARGV: now, window count, lease fraction, then for
+# each window the KEYS index, window size in seconds, limit, cost, the most
+# units to grant, and the bucket number and count of units to give back.
+# Each window keeps three hash fields: "<size>:b" (current bucket number),
+# "<size>:c" (count in the current bucket) and "<size>:p" (count in the
+# previous bucket).
+#
+# Units given back were recorded earlier by the caller and never spent;
+# they are taken off the bucket they were recorded in, if it still counts,
+# whether or not the request is admitted. The request is admitted only if
+# every window has room for its cost. Each window then records between
+# cost and its maximum grant, taking the lease fraction of its remaining
+# capacity, so callers can hold the difference as a local lease. A plain
+# check grants exactly the cost.
+# Returns {allowed, count_1, retry_after_1, granted_1, count_2, ...}.
+SLIDING_WINDOW_COUNTER_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window_count = tonumber(ARGV[2])
+local lease_fraction = tonumber(ARGV[3])
+local allowed = 1
+local windows = {}
+
+for i = 1, window_count do
+    local base = 3 + (i - 1) * 7
+    local key = KEYS[tonumber(ARGV[base + 1])]
+    local size = tonumber(ARGV[base + 2])
+    local limit = tonumber(ARGV[base + 3])
+    local cost = tonumber(ARGV[base + 4])
+    local max_grant = tonumber(ARGV[base + 5])
+    local return_bucket = tonumber(ARGV[base + 6])
+    local return_units = tonumber(ARGV[base + 7])
+    local bucket = math.floor(now / size)
+
+    local stored = redis.call('HMGET', key, size .. ':b', size .. ':c', size .. ':p')
+    local stored_bucket = tonumber(stored[1])
+    local current = tonumber(stored[2]) or 0
+    local previous = tonumber(stored[3]) or 0
+    local returned = false
+    if return_units > 0 and stored_bucket ~= nil then
+        if stored_bucket == return_bucket then
+            current = math.max(0, current - return_units)
+            returned = true
+        elseif stored_bucket == return_bucket + 1 then
+            previous = math.max(0, previous - return_units)
+            returned = true
+        end
+    end
+    if stored_bucket == nil then
+        current, previous = 0, 0
+    elseif stored_bucket == bucket - 1 then
+        current, previous = 0, current
+    elseif stored_bucket < bucket - 1 then
+        current, previous = 0, 0
+    end
+
+    local elapsed = now - bucket * size
+    local estimate = previous * (1 - elapsed / size) + current
+    local retry_after = 0
+    local grant = 0
+    if estimate + cost > limit then
+        allowed = 0
+        if cost > limit then
+            retry_after = size
+        elseif current + cost <= limit then
+            -- Wait for enough of the previous bucket to slide out
+            retry_after = (estimate + cost - limit) * size / previous
+        else
+            -- Wait for the next bucket, then for this one to slide out
+            retry_after = (size - elapsed) + (current + cost - limit) * size / current
+        end
+        retry_after = math.max(1, math.ceil(retry_after))
+    else
+        local available = math.floor(limit - estimate)
+        grant = math.min(math.max(cost, math.floor(available * lease_fraction)), max_grant, available)
+    end
+
+    windows[i] = {key, size, bucket, current, previous, grant, estimate, retry_after, returned}
+end
+
+local result = {allowed}
+local ttls = {}
+for i = 1, window_count do
+    local w = windows[i]
+    local count = w[7]
+    local granted = 0
+    if allowed == 1 then
+        granted = w[6]
+        count = count + granted
+    end
+    if allowed == 1 or w[9] then
+        redis.call('HSET', w[1], w[2] .. ':b', w[3], w[2] .. ':c', w[4] + granted, w[2] .. ':p', w[5])
+        ttls[w[1]] = math.max(ttls[w[1]] or 0, w[2] * 2)
+    end
+    result[#result + 1] = math.ceil(count)
+    result[#result + 1] = w[8]
+    result[#result + 1] = granted
+end
+
+for key, ttl in pairs(ttls) do
+    redis.call('EXPIRE', key, ttl)
+end
+
+return result
+"""
+
+
+@dataclass(frozen=True)
+class WindowLimit:
+    """One window to enforce for a request"""
+    key: str
+    window_seconds: int
+    limit: int
+    cost: int = 1
+    name: str = ""
+
+
+@dataclass
+class WindowUsage:
+    """Outcome of a single window check"""
+    window: WindowLimit
+    count: int
+    remaining: int
+    retry_after: int
+    reset_time: datetime
+    granted: int = 0  # Units recorded in Redis for this window
+
+    @property
+    def allowed(self) -> bool:
+        return self.retry_after == 0
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of checking every window for a request"""
+    allowed: bool
+    windows: List[WindowUsage]
+
+    @property
+    def denied(self) -> Optional[WindowUsage]:
+        """The denied window the client must wait longest for"""
+        denied = [usage for usage in self.windows if not usage.allowed]
+        return max(denied, key=lambda usage: usage.retry_after) if denied else None
+
+
+class SlidingWindowCounterEngine:
+    """
+    Approximated sliding window rate limiting on Redis hashes
+
+    Errors are raised to the caller; each limiter keeps its own fail-open
+    or fail-closed policy.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        # redis-py runs EVALSHA and reloads the script on NOSCRIPT
+        self._script = redis_client.register_script(SLIDING_WINDOW_COUNTER_SCRIPT)
+
+    async def check(
+        self,
+        windows: Sequence[WindowLimit],
+        current_time: Optional[float] = None
+    ) -> RateLimitDecision:
+        """
+        Check all windows and, only if every one allows it, record the request
+
+        Args:
+            windows: Windows to enforce; several may share a key
+            current_time: Current timestamp (for testing)
+        """
+        return await self._evaluate(windows, [window.cost for window in windows], 0.0, current_time)
+
+    async def lease(
+        self,
+        windows: Sequence[WindowLimit],
+        max_grants: Sequence[int],
+        lease_fraction: float,
+        current_time: Optional[float] = None,
+        returns: Optional[Sequence[Tuple[int, int]]] = None
+    ) -> RateLimitDecision:
+        """
+        Admit a request and record extra units to be spent locally
+
+        Each window records at least its cost and at most its max grant,
+        aiming for lease_fraction of its remaining capacity. The units
+        recorded are reported as WindowUsage.granted. returns gives, per
+        window, the (bucket, units) of an earlier grant that was not spent;
+        those units are given back first, admitted or not.
+        """
+        return await self._evaluate(windows, max_grants, lease_fraction, current_time, returns)
+
+    async def give_back(
+        self,
+        windows: Sequence[WindowLimit],
+        returns: Sequence[Tuple[int, int]],
+        current_time: Optional[float] = None
+    ) -> None:
+        """Give back unspent (bucket, units) of earlier grants without recording anything"""
+        await self._evaluate(
+            [replace(window, cost=0) for window in windows], [0] * len(windows), 0.0, current_time, returns
+        )
+
+    async def _evaluate(
+        self,
+        windows: Sequence[WindowLimit],
+        max_grants: Sequence[int],
+        lease_fraction: float,
+        current_time: Optional[float],
+        returns: Optional[Sequence[Tuple[int, int]]] = None
+    ) -> RateLimitDecision:
+        if not windows:
+            return RateLimitDecision(allowed=True, windows=[])
+
+        now = current_time if current_time is not None else time.time()
+        returns = returns or [(0, 0)] * len(windows)
+        keys: List[str] = []
+        args: List[Any] = [repr(now), len(windows), repr(float(lease_fraction))]
+        for window, max_grant, (return_bucket, return_units) in zip(windows, max_grants, returns):
+            if window.key not in keys:
+                keys.append(window.key)
+            args.extend([
+                keys.index(window.key) + 1,
+                int(window.window_seconds),
+                int(window.limit),
+                int(window.cost),
+                max(int(max_grant), int(window.cost)),
+                int(return_bucket),
+                int(return_units)
+            ])
+
+        reply = await self._script(keys=keys, args=args)
+
+        usages = []
+        for i, window in enumerate(windows):
+            count, retry_after, granted = (int(value) for value in reply[1 + i * 3:4 + i * 3])
+            usages.append(WindowUsage(
+                window=window,
+                count=count,
+                remaining=max(0, window.limit - count),
+                retry_after=retry_after,
+                reset_time=datetime.fromtimestamp(now + (retry_after or window.window_seconds)),
+                granted=granted
+            ))
+
+        return RateLimitDecision(allowed=bool(int(reply[0])), windows=usages)
+
+    async def get_usage(
+        self,
+        key: str,
+        window_seconds: Optional[Sequence[int]] = None,
+        current_time: Optional[float] = None
+    ) -> Dict[int, int]:
+        """
+        Estimated request count per window without recording anything
+
+        With no window_seconds, every window stored in the hash is reported.
+        """
+        now = current_time if current_time is not None else time.time()
+
+        if window_seconds is None:
+            stored = {
+                (field.decode() if isinstance(field, bytes) else field): value
+                for field, value in (await self.redis.hgetall(key)).items()
+            }
+            sizes = sorted({int(field.split(":")[0]) for field in stored})
+            return {
+                size: estimate_count(
+                    [stored.get(f"{size}:b"), stored.get(f"{size}:c"), stored.get(f"{size}:p")], size, now
+                )
+                for size in sizes
+            }
+
+        fields = []
+        for size in window_seconds:
+            fields.extend([f"{size}:b", f"{size}:c", f"{size}:p"])
+
+        values = await self.redis.hmget(key, fields)
+        return {
+            size: estimate_count(values[i * 3:i * 3 + 3], size, now)
+            for i, size in enumerate(window_seconds)
+        }
+
+
+def bucket_number(window_seconds: int, now: float) -> int:
+    """Bucket a timestamp falls in, as the script numbers them"""
+    return math.floor(now / window_seconds)
+
+
+def estimate_count(stored: Sequence[Any], window_seconds: int, now: float) -> int:
+    """Sliding window estimate from the stored (bucket, current, previous) fields"""
+    stored_bucket, current, previous = stored
+    if stored_bucket is None:
+        return 0
+
+    bucket = math.floor(now / window_seconds)
+    stored_bucket, current, previous = int(stored_bucket), int(current or 0), int(previous or 0)
+    if stored_bucket == bucket - 1:
+        current, previous = 0, current
+    elif stored_bucket < bucket - 1:
+        return 0
+
+    elapsed = now - bucket * window_seconds
+    return math.ceil(previous * (1 - elapsed / window_seconds) + current)
@@ -0,0 +1,425 @@
+"""
+Local Rate Limit Leases
+
+Per-worker pre-admission in front of the Redis rate limiter. Instead of
+spending one request's worth of quota per round trip, a worker records a
+batch (a share of the remaining quota) in Redis and admits the following
+requests for the same key from that local lease. Keys far below their
+limits therefore touch Redis once per batch; keys close to their limits
+get batches of one and are checked in Redis on every request.
+
+Leased units are counted in Redis before they are spent, so the cluster
+never admits more than a limit allows. The error is in the other
+direction: each worker can hold at most lease_fraction of a key's
+remaining quota (and no more than max_lease_requests requests' worth)
+that it has not used yet. Unspent units are given back to the bucket
+they were recorded in, so they only stay counted while a lease is live:
+- when a lease is refilled, the old balance is given back in the same
+  round trip
+- leases that expire or are evicted are given back by
+  release_expired(), which the background task runs every lease_seconds
+  (and concurrency slots held past their lease by idle workers likewise)
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ..core.logging import logger
+from ..core.rate_limit_config import RateLimitRule, RateLimitType
+from .rate_limit_engine import WindowLimit, WindowUsage, bucket_number
+from .rate_limit_service import (
+    WINDOWED_LIMIT_TYPES,
+    RateLimitResult,
+    SlidingWindowRateLimiter,
+)
+
+
+@dataclass
+class LeaseConfig:
+    """Configuration for local rate limit leases"""
+    lease_fraction: float = 0.1      # Share of the remaining quota leased per refill
+    max_lease_requests: int = 100    # Most requests' worth of quota leased per refill
+    lease_seconds: float = 1.0       # Lifetime of a lease before it is refreshed from Redis
+    max_leases: int = 10000          # Window leases kept per worker
+
+
+@dataclass
+class WindowLease:
+    """Units recorded in Redis for one window that this worker has not spent yet"""
+    balance: int
+    bucket: int             # Bucket the units were recorded in
+    expires_at: float
+    limit: int
+    remaining: int          # Remaining in Redis once the lease was recorded
+    reset_time: datetime
+    rule_name: str
+
+    def to_result(self) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=True,
+            limit=self.limit,
+            remaining=self.remaining + self.balance,
+            reset_time=self.reset_time,
+            rule_name=self.rule_name
+        )
+
+    @property
+    def unspent(self) -> Tuple[int, int]:
+        """(bucket, units) to give back"""
+        return self.bucket, max(0, self.balance)
+
+
+@dataclass
+class SlotLease:
+    """Concurrency slots reserved in the Redis gauge by this worker"""
+    reserved: int
+    in_use: int
+    expires_at: float
+
+
+class LocalLeaseLimiter:
+    """
+    Token-bucket leases layered over SlidingWindowRateLimiter
+
+    check_limits() has the same contract as the wrapped limiter. All state
+    is per worker and no locking is needed: leases are only read and
+    updated between awaits on the event loop, and a refill detaches what it
+    gives back before awaiting Redis.
+    """
+
+    def __init__(self, limiter: SlidingWindowRateLimiter, config: Optional[LeaseConfig] = None):
+        self.limiter = limiter
+        self.config = config or LeaseConfig()
+        self._leases: "OrderedDict[Tuple[str, int], WindowLease]" = OrderedDict()
+        self._slots: Dict[str, SlotLease] = {}
+        # Evicted leases whose units are given back on the next release_expired
+        self._evicted: List[Tuple[Tuple[str, int], WindowLease]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.local_admissions = 0
+        self.redis_admissions = 0
+        self.units_given_back = 0
+
+    async def check_limits(
+        self,
+        checks: List[Tuple[str, RateLimitRule, int]],
+        current_time: Optional[float] = None
+    ) -> List[RateLimitResult]:
+        """Check (key, rule, cost) limits, going to Redis only for exhausted leases."""
+        now = current_time if current_time is not None else time.time()
+        results: List[Optional[RateLimitResult]] = [None] * len(checks)
+        windowed: List[Tuple[int, WindowLimit]] = []
+
+        for i, (key, rule, request_cost) in enumerate(checks):
+            if rule.limit_type in WINDOWED_LIMIT_TYPES:
+                windowed.append((i, self.limiter.window_limit(key, rule, request_cost)))
+            elif rule.limit_type == RateLimitType.CONCURRENT_REQUESTS:
+                results[i] = await self._check_concurrent(key, rule, now)
+            else:
+                results[i] = (await self.limiter.check_limits([checks[i]], now))[0]
+
+        # Lease bookkeeping happens before the round trip: other requests for
+        # the same keys run while it is awaited, and must neither spend the
+        # balance taken here nor give back the same unspent units again
+        spent: List[Tuple[int, WindowLimit, WindowLease]] = []
+        short: List[Tuple[int, WindowLimit]] = []
+        returns: List[Tuple[int, int]] = []
+        for i, window in windowed:
+            if self._has_balance(window, now):
+                lease = self._leases[self._lease_key(window)]
+                lease.balance -= window.cost
+                spent.append((i, window, lease))
+                continue
+            # Balances too small for this request, or on expired leases, are
+            # given back in the same round trip
+            short.append((i, window))
+            lease = self._leases.pop(self._lease_key(window), None)
+            returns.append(self._take_unspent(lease) if lease else (0, 0))
+
+        if not short:
+            self.local_admissions += 1
+            for i, _, lease in spent:
+                results[i] = lease.to_result()
+            return results
+
+        try:
+            decision = await self.limiter.engine.lease(
+                [window for _, window in short],
+                [window.cost * self.config.max_lease_requests for _, window in short],
+                self.config.lease_fraction,
+                now,
+                returns=returns
+            )
+        except Exception as e:
+            logger.error(f"Error refilling rate limit leases: {e}")
+            # Nothing was given back; do so on the next release_expired
+            for (_, window), (bucket, units) in zip(short, returns):
+                if units:
+                    self._evicted.append((self._lease_key(window), self._orphan(window, bucket, units, now)))
+            # Fail open - allow request but log the error
+            for i, _ in windowed:
+                results[i] = self.limiter.fail_open(checks[i][1], now)
+            return results
+
+        self.redis_admissions += 1
+        self.units_given_back += sum(units for _, units in returns)
+
+        if not decision.allowed:
+            # Nothing was recorded; report the refused windows and refund the
+            # others
+            refused = {i: usage for (i, _), usage in zip(short, decision.windows)}
+            for i, window, lease in spent:
+                self._refund(window, lease, now)
+                results[i] = lease.to_result()
+            for i, usage in refused.items():
+                results[i] = self.limiter.usage_result(usage)
+            return results
+
+        for (i, window), usage in zip(short, decision.windows):
+            lease = self._store_lease(window, usage, now)
+            lease.balance -= window.cost
+            results[i] = lease.to_result()
+        for i, _, lease in spent:
+            results[i] = lease.to_result()
+
+        return results
+
+    def acquire_concurrent(self, key: str) -> None:
+        """Hold one reserved concurrency slot for an admitted request."""
+        self._slot_lease(key).in_use += 1
+
+    async def release_concurrent(self, key: str, current_time: Optional[float] = None) -> None:
+        """Release a slot; an idle expired reservation is handed back to Redis."""
+        lease = self._slots.get(key)
+        if lease is None:
+            return
+
+        lease.in_use = max(0, lease.in_use - 1)
+        now = current_time if current_time is not None else time.time()
+        if lease.in_use == 0 and now >= lease.expires_at:
+            del self._slots[key]
+            if lease.reserved:
+                await self._return_slots(key, lease.reserved)
+
+    async def release_expired(self, current_time: Optional[float] = None, release_all: bool = False) -> None:
+        """
+        Give back the unspent units of expired and evicted leases, and the
+        idle part of expired concurrency reservations (of every lease with
+        release_all)
+        """
+        now = current_time if current_time is not None else time.time()
+
+        # Leases are kept in the order they were taken, so expired ones lead
+        expired = self._evicted
+        self._evicted = []
+        while self._leases:
+            lease_key, lease = next(iter(self._leases.items()))
+            if now < lease.expires_at and not release_all:
+                break
+            del self._leases[lease_key]
+            expired.append((lease_key, lease))
+
+        returns = [
+            (WindowLimit(key, window_seconds, lease.limit), self._take_unspent(lease))
+            for (key, window_seconds), lease in expired if lease.balance > 0
+        ]
+        if returns:
+            try:
+                await self.limiter.engine.give_back(
+                    [window for window, _ in returns],
+                    [unspent for _, unspent in returns],
+                    now
+                )
+                self.units_given_back += sum(units for _, (_, units) in returns)
+            except Exception as e:
+                logger.warning(f"Error giving back unspent rate limit leases: {e}")
+
+        for key, lease in list(self._slots.items()):
+            idle = lease.reserved - lease.in_use
+            if (now < lease.expires_at and not release_all) or idle <= 0:
+                continue
+            # Slots still in use are returned by release_concurrent
+            if lease.in_use == 0:
+                del self._slots[key]
+            else:
+                lease.reserved = lease.in_use
+            try:
+                await self._return_slots(key, idle)
+            except Exception as e:
+                logger.warning(f"Error releasing concurrency slots for {key}: {e}")
+
+    def clear(self) -> None:
+        """Forget all window leases held by this worker."""
+        self._leases.clear()
+        self._evicted.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get lease statistics"""
+        return {
+            "window_leases": len(self._leases),
+            "slot_leases": len(self._slots),
+            "local_admissions": self.local_admissions,
+            "redis_admissions": self.redis_admissions,
+            "units_given_back": self.units_given_back
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start giving back expired leases in the background on the running event loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        """Stop the background task without waiting for it to exit"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self) -> None:
+        """Stop the background task and give back everything still leased"""
+        task = self._task
+        self.cancel()
+        if task:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.release_expired(release_all=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.config.lease_seconds, 0.1))
+            try:
+                await self.release_expired()
+            except Exception as e:
+                logger.warning(f"Error in rate limit lease release: {e}")
+
+    @staticmethod
+    def _lease_key(window: WindowLimit) -> Tuple[str, int]:
+        return window.key, window.window_seconds
+
+    def _has_balance(self, window: WindowLimit, now: float) -> bool:
+        lease = self._leases.get(self._lease_key(window))
+        return lease is not None and now < lease.expires_at and lease.balance >= window.cost
+
+    def _store_lease(self, window: WindowLimit, usage: WindowUsage, now: float) -> WindowLease:
+        lease = WindowLease(
+            balance=usage.granted,
+            bucket=bucket_number(window.window_seconds, now),
+            expires_at=now + self.config.lease_seconds,
+            limit=window.limit,
+            remaining=usage.remaining,
+            reset_time=usage.reset_time,
+            rule_name=window.name
+        )
+        lease_key = self._lease_key(window)
+        current = self._leases.pop(lease_key, None)
+        if current is not None:
+            # A concurrent refill stored a lease meanwhile: keep its balance if
+            # it was recorded in the same bucket, else give it back
+            if current.bucket == lease.bucket:
+                lease.balance += self._take_unspent(current)[1]
+            else:
+                self._evicted.append((lease_key, current))
+
+        self._leases[lease_key] = lease
+        while len(self._leases) > self.config.max_leases:
+            self._evicted.append(self._leases.popitem(last=False))
+        return lease
+
+    def _refund(self, window: WindowLimit, lease: WindowLease, now: float) -> None:
+        """Return units spent from a lease for a request that was refused after all"""
+        lease_key = self._lease_key(window)
+        if self._leases.get(lease_key) is lease:
+            lease.balance += window.cost
+        else:
+            # The lease was given back or replaced meanwhile
+            self._evicted.append((lease_key, self._orphan(window, lease.bucket, window.cost, now)))
+
+    def _orphan(self, window: WindowLimit, bucket: int, units: int, now: float) -> WindowLease:
+        """Units counted in Redis that belong to no live lease, to be given back"""
+        return WindowLease(
+            balance=units,
+            bucket=bucket,
+            expires_at=now,
+            limit=window.limit,
+            remaining=0,
+            reset_time=datetime.fromtimestamp(now),
+            rule_name=window.name
+        )
+
+    @staticmethod
+    def _take_unspent(lease: WindowLease) -> Tuple[int, int]:
+        """(bucket, units) to give back, leaving none on the lease"""
+        unspent = lease.unspent
+        lease.balance = 0
+        return unspent
+
+    async def _check_concurrent(self, key: str, rule: RateLimitRule, now: float) -> RateLimitResult:
+        lease = self._slots.get(key)
+        if lease is not None and now < lease.expires_at and lease.in_use < lease.reserved:
+            return self._slot_result(rule, lease, rule.limit - lease.reserved, now)
+
+        # Hand back unused slots and reserve a fresh batch in one round trip.
+        # The unused slots leave the lease before the await so a concurrent
+        # refill does not hand them back again.
+        release = 0
+        if lease is not None:
+            release = max(0, lease.reserved - lease.in_use)
+            lease.reserved -= release
+        try:
+            granted, gauge = await self.limiter.reserve_concurrent(
+                key,
+                rule.limit,
+                release=release,
+                max_slots=self.config.max_lease_requests,
+                lease_fraction=self.config.lease_fraction
+            )
+        except Exception as e:
+            logger.error(f"Error reserving concurrency slots: {e}")
+            # The slots are still reserved in Redis; keep them on the lease
+            self._slot_lease(key).reserved += release
+            return self.limiter.fail_open(rule, now)
+
+        # Acquires and releases may have happened meanwhile, so add to the
+        # current lease rather than replacing it
+        lease = self._slot_lease(key)
+        lease.reserved += granted
+        lease.expires_at = now + self.config.lease_seconds
+        if not granted:
+            return RateLimitResult(
+                allowed=False,
+                limit=rule.limit,
+                remaining=0,
+                reset_time=datetime.fromtimestamp(now + 60),
+                retry_after=5,
+                rule_name=f"concurrent_{rule.limit}"
+            )
+        return self._slot_result(rule, lease, rule.limit - gauge, now)
+
+    def _slot_lease(self, key: str) -> SlotLease:
+        lease = self._slots.get(key)
+        if lease is None:
+            lease = self._slots[key] = SlotLease(reserved=0, in_use=0, expires_at=0.0)
+        return lease
+
+    async def _return_slots(self, key: str, count: int) -> None:
+        # Reserving nothing with a release returns the slots atomically and
+        # keeps the gauge's TTL, unlike decrement_concurrent
+        await self.limiter.reserve_concurrent(key, 0, release=count, max_slots=0)
+
+    @staticmethod
+    def _slot_result(rule: RateLimitRule, lease: SlotLease, unreserved: int, now: float) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=True,
+            limit=rule.limit,
+            remaining=max(0, unreserved + lease.reserved - lease.in_use - 1),
+            reset_time=datetime.fromtimestamp(now + 60),
+            rule_name=f"concurrent_{rule.limit}"
+        )
@@ -7,7 +7,7 @@ Provides high-performance rate limiting with <5ms overhead using efficient Redis
 import asyncio
 import time
 import hashlib
-from typing import Dict, List, Optional, Tuple, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import redis.asyncio as redis
 from redis.exceptions import RedisError
@@ -15,6 +15,36 @@ import json
 
 from ..core.logging import logger
 from ..core.rate_limit_config import RateLimitRule, RateLimitType, Industry, rate_limit_config
+from .rate_limit_engine import WINDOW_KEY_PREFIX, SlidingWindowCounterEngine, WindowLimit, WindowUsage
+
+if TYPE_CHECKING:
+    from .rate_limit_lease import LeaseConfig, LocalLeaseLimiter
+
+# Limit types enforced as sliding window counters; concurrency is a plain gauge
+WINDOWED_LIMIT_TYPES = {
+    RateLimitType.REQUESTS_PER_MINUTE,
+    RateLimitType.REQUESTS_PER_HOUR,
+    RateLimitType.BANDWIDTH_LIMIT,
+}
+
+# KEYS: concurrency gauge. ARGV: limit, slots to release, max slots, lease
+# fraction, ttl. Returns {slots reserved, gauge after reserving}.
+RESERVE_CONCURRENT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local current = math.max(0, (tonumber(redis.call('GET', KEYS[1])) or 0) - tonumber(ARGV[2]))
+local available = limit - current
+local granted = 0
+if available >= 1 then
+    granted = math.min(math.max(1, math.floor(available * tonumber(ARGV[4]))), tonumber(ARGV[3]), available)
+end
+current = current + granted
+if current > 0 then
+    redis.call('SET', KEYS[1], current, 'EX', tonumber(ARGV[5]))
+else
+    redis.call('DEL', KEYS[1])
+end
+return {granted, current}
+"""
 
 
 class RateLimitResult:
@@ -55,13 +85,16 @@ class SlidingWindowRateLimiter:
     """
     High-performance sliding window rate limiter using Redis.
     
-    Uses Redis sorted sets to implement precise sliding window rate limiting
-    with sub-5ms performance overhead.
+    Request and bandwidth limits are approximated sliding window counters
+    kept by the shared SlidingWindowCounterEngine, so every limit for a
+    request is checked and recorded in a single EVALSHA.
     """
     
     def __init__(self, redis_client: redis.Redis):
         self.redis = redis_client
-        self.key_prefix = "rate_limit:"
+        self.key_prefix = WINDOW_KEY_PREFIX
+        self.engine = SlidingWindowCounterEngine(redis_client)
+        self._reserve_script = redis_client.register_script(RESERVE_CONCURRENT_SCRIPT)
     
     async def check_limit(
         self, 
@@ -82,107 +115,98 @@ class SlidingWindowRateLimiter:
         Returns:
             RateLimitResult with decision and metadata
         """
+        results = await self.check_limits([(key, rule, request_cost)], current_time)
+        return results[0]
+    
+    async def check_limits(
+        self,
+        checks: List[Tuple[str, RateLimitRule, int]],
+        current_time: Optional[float] = None
+    ) -> List[RateLimitResult]:
+        """
+        Check several (key, rule, cost) limits for one request.
+        
+        Request and bandwidth limits are checked together and the request is
+        only recorded against them if none is exceeded.
+        """
         if current_time is None:
             current_time = time.time()
         
-        window_seconds = rule.window.total_seconds()
-        window_start = current_time - window_seconds
+        results: List[Optional[RateLimitResult]] = [None] * len(checks)
+        windows: List[WindowLimit] = []
+        window_indexes: List[int] = []
         
-        try:
-            if rule.limit_type == RateLimitType.REQUESTS_PER_MINUTE or \
-               rule.limit_type == RateLimitType.REQUESTS_PER_HOUR:
-                return await self._check_requests_limit(
-                    key, rule, current_time, window_start, request_cost
-                )
+        for i, (key, rule, request_cost) in enumerate(checks):
+            if rule.limit_type in WINDOWED_LIMIT_TYPES:
+                windows.append(self.window_limit(key, rule, request_cost))
+                window_indexes.append(i)
             elif rule.limit_type == RateLimitType.CONCURRENT_REQUESTS:
-                return await self._check_concurrent_limit(
-                    key, rule, current_time, request_cost
-                )
-            elif rule.limit_type == RateLimitType.BANDWIDTH_LIMIT:
-                return await self._check_bandwidth_limit(
-                    key, rule, current_time, window_start, request_cost
-                )
+                try:
+                    results[i] = await self._check_concurrent_limit(key, rule, current_time, request_cost)
+                except Exception as e:
+                    logger.error(f"Error checking concurrent rate limit: {e}")
+                    # Fail open - allow request but log the error
+                    results[i] = self.fail_open(rule, current_time)
             else:
                 logger.warning(f"Unsupported rate limit type: {rule.limit_type}")
-                return RateLimitResult(True, rule.limit, rule.limit, datetime.fromtimestamp(current_time))
-        
-        except RedisError as e:
-            logger.error(f"Redis error in rate limiting: {e}")
-            # Fail open - allow request but log the error
-            return RateLimitResult(True, rule.limit, rule.limit, datetime.fromtimestamp(current_time))
-        except Exception as e:
-            logger.error(f"Unexpected error in rate limiting: {e}")
-            # Fail open - allow request but log the error
-            return RateLimitResult(True, rule.limit, rule.limit, datetime.fromtimestamp(current_time))
-    
-    async def _check_requests_limit(
-        self, 
-        key: str, 
-        rule: RateLimitRule, 
-        current_time: float, 
-        window_start: float,
-        request_cost: int
-    ) -> RateLimitResult:
-        """Check request-based rate limits using sliding window."""
-        
-        redis_key = f"{self.key_prefix}{key}"
-        
-        # Use Redis pipeline for atomic operations
-        pipe = self.redis.pipeline()
-        
-        # Remove expired entries
-        pipe.zremrangebyscore(redis_key, 0, window_start)
+                results[i] = self.fail_open(rule, current_time)
         
-        # Count current requests in window
-        pipe.zcard(redis_key)
-        
-        # Execute pipeline
-        results = await pipe.execute()
-        current_count = results[1]
-        
-        # Calculate remaining capacity
-        effective_limit = rule.burst_limit if rule.burst_limit else rule.limit
-        remaining = max(0, effective_limit - current_count)
-        
-        # Check if request would exceed limit
-        if current_count + request_cost > effective_limit:
-            # Calculate retry after time
-            oldest_entry_score = await self.redis.zrange(redis_key, 0, 0, withscores=True)
-            if oldest_entry_score:
-                oldest_time = oldest_entry_score[0][1]
-                retry_after = int(oldest_time + rule.window.total_seconds() - current_time) + 1
-            else:
-                retry_after = int(rule.window.total_seconds())
-            
-            return RateLimitResult(
-                allowed=False,
-                limit=effective_limit,
-                remaining=remaining,
-                reset_time=datetime.fromtimestamp(current_time + rule.window.total_seconds()),
-                retry_after=retry_after,
-                rule_name=f"{rule.limit_type.value}_{rule.limit}"
-            )
-        
-        # Add current request(s) to sliding window
-        pipe = self.redis.pipeline()
-        for i in range(request_cost):
-            # Use microsecond precision to handle high-frequency requests
-            request_time = current_time + (i * 0.000001)
-            pipe.zadd(redis_key, {f"req_{request_time}_{i}": request_time})
-        
-        # Set expiration on the key
-        pipe.expire(redis_key, int(rule.window.total_seconds()) + 60)
-        
-        await pipe.execute()
+        if windows:
+            try:
+                decision = await self.engine.check(windows, current_time)
+                for i, usage in zip(window_indexes, decision.windows):
+                    results[i] = self.usage_result(usage)
+            except RedisError as e:
+                logger.error(f"Redis error in rate limiting: {e}")
+                # Fail open - allow request but log the error
+                for i in window_indexes:
+                    results[i] = self.fail_open(checks[i][1], current_time)
+            except Exception as e:
+                logger.error(f"Unexpected error in rate limiting: {e}")
+                for i in window_indexes:
+                    results[i] = self.fail_open(checks[i][1], current_time)
         
+        return results
+    
+    def window_limit(self, key: str, rule: RateLimitRule, request_cost: int) -> WindowLimit:
+        """Engine window enforcing a request or bandwidth rule."""
+        return WindowLimit(
+            key=f"{self.key_prefix}{key}",
+            window_seconds=int(rule.window.total_seconds()),
+            limit=self._effective_limit(rule),
+            cost=request_cost,
+            name=self._rule_name(rule)
+        )
+    
+    @staticmethod
+    def usage_result(usage: WindowUsage) -> RateLimitResult:
+        """Convert an engine window outcome to a RateLimitResult."""
         return RateLimitResult(
-            allowed=True,
-            limit=effective_limit,
-            remaining=remaining - request_cost,
-            reset_time=datetime.fromtimestamp(current_time + rule.window.total_seconds()),
-            rule_name=f"{rule.limit_type.value}_{rule.limit}"
+            allowed=usage.allowed,
+            limit=usage.window.limit,
+            remaining=usage.remaining,
+            reset_time=usage.reset_time,
+            retry_after=usage.retry_after or None,
+            rule_name=usage.window.name
         )
     
+    @staticmethod
+    def _effective_limit(rule: RateLimitRule) -> int:
+        if rule.limit_type == RateLimitType.BANDWIDTH_LIMIT:
+            return rule.limit
+        return rule.burst_limit if rule.burst_limit else rule.limit
+    
+    @staticmethod
+    def _rule_name(rule: RateLimitRule) -> str:
+        if rule.limit_type == RateLimitType.BANDWIDTH_LIMIT:
+            return f"bandwidth_{rule.limit}"
+        return f"{rule.limit_type.value}_{rule.limit}"
+    
+    @staticmethod
+    def fail_open(rule: RateLimitRule, current_time: float) -> RateLimitResult:
+        """Result allowing a request when Redis cannot be consulted."""
+        return RateLimitResult(True, rule.limit, rule.limit, datetime.fromtimestamp(current_time))
+    
     async def _check_concurrent_limit(
         self, 
         key: str, 
@@ -219,52 +243,6 @@ class SlidingWindowRateLimiter:
             rule_name=f"concurrent_{rule.limit}"
         )
     
-    async def _check_bandwidth_limit(
-        self, 
-        key: str, 
-        rule: RateLimitRule, 
-        current_time: float, 
-        window_start: float,
-        request_cost: int  # In bytes
-    ) -> RateLimitResult:
-        """Check bandwidth-based rate limits."""
-        
-        redis_key = f"{self.key_prefix}bandwidth:{key}"
-        
-        # Remove expired bandwidth entries
-        await self.redis.zremrangebyscore(redis_key, 0, window_start)
-        
-        # Sum current bandwidth usage
-        bandwidth_entries = await self.redis.zrange(redis_key, 0, -1, withscores=True)
-        current_usage = sum(int(entry[0].decode().split('_')[1]) for entry in bandwidth_entries)
-        
-        remaining_bandwidth = max(0, rule.limit - current_usage)
-        
-        if current_usage + request_cost > rule.limit:
-            return RateLimitResult(
-                allowed=False,
-                limit=rule.limit,
-                remaining=remaining_bandwidth,
-                reset_time=datetime.fromtimestamp(current_time + rule.window.total_seconds()),
-                retry_after=int(rule.window.total_seconds()),
-                rule_name=f"bandwidth_{rule.limit}"
-            )
-        
-        # Add current bandwidth usage
-        await self.redis.zadd(
-            redis_key, 
-            {f"bw_{request_cost}_{current_time}": current_time}
-        )
-        await self.redis.expire(redis_key, int(rule.window.total_seconds()) + 60)
-        
-        return RateLimitResult(
-            allowed=True,
-            limit=rule.limit,
-            remaining=remaining_bandwidth - request_cost,
-            reset_time=datetime.fromtimestamp(current_time + rule.window.total_seconds()),
-            rule_name=f"bandwidth_{rule.limit}"
-        )
-    
     async def increment_concurrent(self, key: str, amount: int = 1, ttl: int = 300) -> int:
         """Increment concurrent request counter."""
         redis_key = f"{self.key_prefix}concurrent:{key}"
@@ -276,6 +254,28 @@ class SlidingWindowRateLimiter:
         
         return results[0]
     
+    async def reserve_concurrent(
+        self,
+        key: str,
+        limit: int,
+        release: int = 0,
+        max_slots: int = 1,
+        lease_fraction: float = 0.0,
+        ttl: int = 300
+    ) -> Tuple[int, int]:
+        """
+        Return unused slots and reserve new ones in one round trip.
+        
+        Reserves at least one and at most max_slots slots, aiming for
+        lease_fraction of the free capacity. Returns (reserved, gauge).
+        """
+        redis_key = f"{self.key_prefix}concurrent:{key}"
+        granted, current = await self._reserve_script(
+            keys=[redis_key],
+            args=[limit, release, max_slots, repr(float(lease_fraction)), ttl]
+        )
+        return int(granted), int(current)
+    
     async def decrement_concurrent(self, key: str, amount: int = 1) -> int:
         """Decrement concurrent request counter."""
         redis_key = f"{self.key_prefix}concurrent:{key}"
@@ -298,10 +298,13 @@ class RateLimitService:
     and integrates with the multi-tenant configuration system.
     """
     
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, lease_config: Optional["LeaseConfig"] = None):
         self.redis_url = redis_url
         self.redis_client: Optional[redis.Redis] = None
         self.limiter: Optional[SlidingWindowRateLimiter] = None
+        # Local token leases admit most requests without a Redis round trip
+        self.lease_config = lease_config
+        self.leases: Optional["LocalLeaseLimiter"] = None
         self._initialized = False
     
     async def initialize(self) -> None:
@@ -321,6 +324,11 @@ class RateLimitService:
             await self.redis_client.ping()
             
             self.limiter = SlidingWindowRateLimiter(self.redis_client)
+            if self.lease_config is not None:
+                from .rate_limit_lease import LocalLeaseLimiter
+                self.leases = LocalLeaseLimiter(self.limiter, self.lease_config)
+                # Gives unspent units and idle slots back to Redis
+                self.leases.start()
             self._initialized = True
             
             logger.info("Rate limiting service initialized successfully")
@@ -352,10 +360,7 @@ class RateLimitService:
             path, industry, tenant_id, user_id
         )
         
-        results = []
-        current_time = time.time()
-        
-        # Check each applicable limit
+        checks = []
         for limit_name, rule, context in applicable_limits:
             # Generate cache key for this specific limit
             cache_key = self._generate_cache_key(limit_name, context, ip_address)
@@ -365,14 +370,16 @@ class RateLimitService:
             if rule.limit_type == RateLimitType.BANDWIDTH_LIMIT:
                 request_cost = request_size
             
-            # Check the rate limit
-            result = await self.limiter.check_limit(
-                cache_key, rule, current_time, request_cost
-            )
+            checks.append((cache_key, rule, request_cost))
+        
+        # All windowed limits are checked and recorded in one round trip,
+        # or admitted from local leases without one
+        checker = self.leases or self.limiter
+        results = await checker.check_limits(checks, time.time())
+        
+        for (limit_name, _, _), result in zip(applicable_limits, results):
             result.rule_name = limit_name
-            results.append(result)
             
-            # If this limit is exceeded, we can short-circuit (optional optimization)
             if not result.allowed:
                 logger.info(
                     f"Rate limit exceeded: {limit_name}",
@@ -410,7 +417,10 @@ class RateLimitService:
         for limit_name, rule, context in applicable_limits:
             if rule.limit_type == RateLimitType.CONCURRENT_REQUESTS:
                 cache_key = self._generate_cache_key(limit_name, context)
-                await self.limiter.increment_concurrent(cache_key)
+                if self.leases:
+                    self.leases.acquire_concurrent(cache_key)
+                else:
+                    await self.limiter.increment_concurrent(cache_key)
                 concurrent_keys.append(cache_key)
         
         return concurrent_keys
@@ -422,7 +432,10 @@ class RateLimitService:
         
         for key in concurrent_keys:
             try:
-                await self.limiter.decrement_concurrent(key)
+                if self.leases:
+                    await self.leases.release_concurrent(key)
+                else:
+                    await self.limiter.decrement_concurrent(key)
             except Exception as e:
                 logger.warning(f"Failed to decrement concurrent counter for {key}: {e}")
     
@@ -480,6 +493,7 @@ class RateLimitService:
                 "redis_memory_usage": info.get("used_memory_human", "N/A"),
                 "redis_keyspace_hits": info.get("keyspace_hits", 0),
                 "redis_keyspace_misses": info.get("keyspace_misses", 0),
+                "local_leases": self.leases.get_stats() if self.leases else None,
                 "tenant_filter": tenant_id
             }
             
@@ -518,6 +532,9 @@ class RateLimitService:
                     deleted = await self.redis_client.delete(*keys)
                     total_deleted += deleted
             
+            if self.leases:
+                self.leases.clear()
+            
             logger.info(f"Reset {total_deleted} rate limit keys")
             return total_deleted
             
@@ -527,6 +544,8 @@ class RateLimitService:
     
     async def close(self) -> None:
         """Close Redis connection."""
+        if self.leases:
+            await self.leases.stop()
         if self.redis_client:
             await self.redis_client.close()
             logger.info("Rate limiting service closed")
@@ -542,7 +561,16 @@ async def get_rate_limit_service() -> RateLimitService:
     
     if rate_limit_service is None:
         from ..core.config import settings
-        rate_limit_service = RateLimitService(settings.REDIS_URL)
+        from .rate_limit_lease import LeaseConfig
+        
+        lease_config = None
+        if settings.RATE_LIMIT_LOCAL_LEASES_ENABLED:
+            lease_config = LeaseConfig(
+                lease_fraction=settings.RATE_LIMIT_LEASE_FRACTION,
+                max_lease_requests=settings.RATE_LIMIT_LEASE_MAX_REQUESTS,
+                lease_seconds=settings.RATE_LIMIT_LEASE_SECONDS
+            )
+        rate_limit_service = RateLimitService(settings.REDIS_URL, lease_config)
         await rate_limit_service.initialize()
     
     return rate_limit_service
\ No newline at end of file
@@ -14,6 +14,7 @@ from ..models.rate_limiting import RateLimitRule, RateLimitScope, RateLimitPerio
 from ..models.organisation import Organisation, SubscriptionPlan
 from ..models.sectors import SICCode
 from ..data.cache.redis_cache import RedisCacheManager
+from .rate_limit_engine import WINDOW_KEY_PREFIX, SlidingWindowCounterEngine, WindowLimit
 from sqlalchemy.orm import Session
 
 
@@ -29,14 +30,6 @@ class RateLimitResult:
     rule_applied: Optional[str] = None
 
 
-@dataclass
-class RateLimitWindow:
-    """Sliding window configuration"""
-    window_size_seconds: int
-    max_requests: int
-    bucket_size_seconds: int = 60  # Size of each bucket in the sliding window
-
-
 class RateLimiterService:
     """
     High-performance Redis-based rate limiter with sliding window algorithm
@@ -56,44 +49,8 @@ class RateLimiterService:
         self.rule_cache: Dict[str, RateLimitRule] = {}
         self.cache_ttl = 300  # 5 minutes cache for rules
         self.last_cache_refresh = 0
-        
-        # Performance optimization: Lua scripts for atomic operations
-        self.sliding_window_script = """
-        local key = KEYS[1]
-        local window_size = tonumber(ARGV[1])
-        local max_requests = tonumber(ARGV[2])
-        local current_time = tonumber(ARGV[3])
-        local bucket_size = tonumber(ARGV[4])
-        
-        -- Calculate window start
-        local window_start = current_time - window_size
-        
-        -- Remove expired buckets
-        redis.call('ZREMRANGEBYSCORE', key, 0, window_start)
-        
-        -- Count current requests in window
-        local current_count = redis.call('ZCARD', key)
-        
-        -- Check if limit exceeded
-        if current_count >= max_requests then
-            -- Get oldest entry to calculate retry time
-            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
-            local retry_after = 0
-            if #oldest > 0 then
-                retry_after = math.ceil(oldest[2] + window_size - current_time)
-            end
-            return {0, current_count, max_requests, retry_after}
-        end
-        
-        -- Add current request
-        local bucket_time = math.floor(current_time / bucket_size) * bucket_size
-        redis.call('ZADD', key, current_time, current_time .. ':' .. math.random())
-        
-        -- Set expiry
-        redis.call('EXPIRE', key, window_size + bucket_size)
-        
-        return {1, current_count + 1, max_requests, 0}
-        """
+
+        self.engine: Optional[SlidingWindowCounterEngine] = None
 
     async def initialize(self):
         """Initialize Redis connection and Lua scripts"""
@@ -112,8 +69,8 @@ class RateLimiterService:
             # Test connection
             await self.redis_client.ping()
             
-            # Register Lua scripts
-            self.sliding_window_sha = await self.redis_client.script_load(self.sliding_window_script)
+            # Shared sliding window counter engine (one EVALSHA per check)
+            self.engine = SlidingWindowCounterEngine(self.redis_client)
             
             logger.info("Rate limiter service initialized successfully")
             
@@ -156,32 +113,13 @@ class RateLimiterService:
             # 2. Generate Redis key for this rate limit scope
             redis_key = self._generate_redis_key(rule, tenant_id, user_id, ip_address)
             
-            # 3. Apply sliding window rate limiting
-            window = RateLimitWindow(
-                window_size_seconds=rule.period_seconds,
-                max_requests=rule.requests_per_period,
-                bucket_size_seconds=min(60, rule.period_seconds // 10)  # Optimize bucket size
-            )
-            
-            # 4. Execute Lua script for atomic check and increment
+            # 3. Check and record the request against the rule's window
             current_time = time.time()
-            result = await self.redis_client.evalsha(
-                self.sliding_window_sha,
-                1,
-                redis_key.encode(),
-                str(window.window_size_seconds).encode(),
-                str(window.max_requests).encode(),
-                str(current_time).encode(),
-                str(window.bucket_size_seconds).encode()
-            )
-            
-            allowed, current_usage, limit, retry_after = result
-            allowed = bool(allowed)
-            
-            # 5. Calculate reset time
-            reset_time = datetime.fromtimestamp(
-                current_time + window.window_size_seconds - (current_time % window.bucket_size_seconds)
+            decision = await self.engine.check(
+                [WindowLimit(redis_key, rule.period_seconds, rule.requests_per_period, name=rule.identifier)],
+                current_time
             )
+            usage = decision.windows[0]
             
             processing_time = (time.time() - start_time) * 1000
             
@@ -197,11 +135,11 @@ class RateLimiterService:
                 )
             
             return RateLimitResult(
-                allowed=allowed,
-                current_usage=current_usage,
-                limit=limit,
-                reset_time=reset_time,
-                retry_after=retry_after if retry_after > 0 else None,
+                allowed=decision.allowed,
+                current_usage=usage.count,
+                limit=usage.window.limit,
+                reset_time=usage.reset_time,
+                retry_after=usage.retry_after or None,
                 processing_time_ms=processing_time,
                 rule_applied=rule.identifier
             )
@@ -415,7 +353,7 @@ class RateLimiterService:
     ) -> str:
         """Generate Redis key for rate limiting"""
         
-        # Key structure: rate_limit:{scope}:{identifier}:{endpoint_hash}
+        # Key structure: rate_limit:window:{scope}:{identifier}:{endpoint_hash}
         if rule.scope == RateLimitScope.user and user_id:
             identifier = f"user:{user_id}"
         elif rule.scope == RateLimitScope.organisation:
@@ -431,7 +369,7 @@ class RateLimiterService:
         import hashlib
         endpoint_hash = hashlib.md5(rule.endpoint_pattern.encode()).hexdigest()[:8]
         
-        return f"rate_limit:{identifier}:{endpoint_hash}"
+        return f"{WINDOW_KEY_PREFIX}{identifier}:{endpoint_hash}"
 
     async def get_current_usage(
         self, 
@@ -446,15 +384,15 @@ class RateLimiterService:
             
             # Pattern to match rate limit keys for this tenant/user
             if user_id:
-                pattern = f"rate_limit:user:{user_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}user:{user_id}:*"
             else:
-                pattern = f"rate_limit:org:{tenant_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}org:{tenant_id}:*"
             
             usage = {}
             async for key in self.redis_client.scan_iter(match=pattern):
                 key_str = key.decode() if isinstance(key, bytes) else key
-                current_count = await self.redis_client.zcard(key_str)
-                usage[key_str] = current_count
+                windows = await self.engine.get_usage(key_str)
+                usage[key_str] = max(windows.values(), default=0)
             
             return usage
             
@@ -475,9 +413,9 @@ class RateLimiterService:
             
             # Pattern to match rate limit keys
             if user_id:
-                pattern = f"rate_limit:user:{user_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}user:{user_id}:*"
             else:
-                pattern = f"rate_limit:org:{tenant_id}:*"
+                pattern = f"{WINDOW_KEY_PREFIX}org:{tenant_id}:*"
             
             if endpoint:
                 import hashlib
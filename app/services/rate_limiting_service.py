@@ -15,6 +15,7 @@ import redis.asyncio as redis
 from redis.exceptions import RedisError
 
 from ..core.logging import logger
+from .rate_limit_engine import WINDOW_KEY_PREFIX, SlidingWindowCounterEngine, WindowLimit
 
 
 class IndustryType(str, Enum):
@@ -102,12 +103,16 @@ class RateLimitingService:
         )
     }
     
+    # Windows tracked for every tenant user, in seconds
+    WINDOW_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+    
     def __init__(self, redis_url: str):
         """Initialize rate limiting service with Redis connection"""
         self.redis_url = redis_url
         self.redis_client: Optional[redis.Redis] = None
-        self.key_prefix = "rate_limit:"
+        self.key_prefix = WINDOW_KEY_PREFIX
         self.sliding_window_size = 60  # seconds for minute window
+        self._engine: Optional[SlidingWindowCounterEngine] = None
         
     async def initialize(self) -> None:
         """Initialize Redis connection with optimized settings"""
@@ -155,55 +160,31 @@ class RateLimitingService:
             config = self.INDUSTRY_LIMITS.get(industry_type, self.INDUSTRY_LIMITS[IndustryType.GENERAL])
             
             # Create rate limit key (tenant isolated)
-            key_base = f"{self.key_prefix}{tenant_id}:{user_id}"
-            if endpoint:
-                key_base += f":{endpoint}"
+            key = self._key(tenant_id, user_id, endpoint)
             
-            # Check minute limit (most restrictive, checked first)
-            minute_result = await self._check_sliding_window(
-                f"{key_base}:minute",
-                config.requests_per_minute + config.burst_limit,
-                60
-            )
+            # Check the minute, hour and day windows and record the request
+            # in a single round trip
+            decision = await self._get_engine().check([
+                WindowLimit(key, self.WINDOW_SECONDS["minute"], config.requests_per_minute + config.burst_limit, name="minute"),
+                WindowLimit(key, self.WINDOW_SECONDS["hour"], config.requests_per_hour, name="hour"),
+                WindowLimit(key, self.WINDOW_SECONDS["day"], config.requests_per_day, name="day"),
+            ])
             
-            if not minute_result.allowed:
+            denied = decision.denied
+            if denied:
                 processing_time = (time.perf_counter() - start_time) * 1000
                 await self._log_rate_limit_event(
-                    tenant_id, user_id, industry_type, "blocked_minute", processing_time
+                    tenant_id, user_id, industry_type, f"blocked_{denied.window.name}", processing_time
                 )
-                return minute_result
-            
-            # Check hour limit
-            hour_result = await self._check_sliding_window(
-                f"{key_base}:hour",
-                config.requests_per_hour,
-                3600
-            )
-            
-            if not hour_result.allowed:
-                processing_time = (time.perf_counter() - start_time) * 1000
-                await self._log_rate_limit_event(
-                    tenant_id, user_id, industry_type, "blocked_hour", processing_time
+                return RateLimitResult(
+                    allowed=False,
+                    remaining=0,
+                    reset_time=int(denied.reset_time.timestamp()),
+                    retry_after=denied.retry_after,
+                    limit_type=f"{denied.window.window_seconds}s"
                 )
-                return hour_result
-            
-            # Check daily limit
-            daily_result = await self._check_sliding_window(
-                f"{key_base}:day",
-                config.requests_per_day,
-                86400
-            )
-            
-            if not daily_result.allowed:
-                processing_time = (time.perf_counter() - start_time) * 1000
-                await self._log_rate_limit_event(
-                    tenant_id, user_id, industry_type, "blocked_day", processing_time
-                )
-                return daily_result
-            
-            # All checks passed, record the request
-            await self._record_request(key_base)
             
+            minute_usage = decision.windows[0]
             processing_time = (time.perf_counter() - start_time) * 1000
             
             # Log performance if over threshold
@@ -224,8 +205,8 @@ class RateLimitingService:
             
             return RateLimitResult(
                 allowed=True,
-                remaining=minute_result.remaining,
-                reset_time=minute_result.reset_time,
+                remaining=minute_usage.remaining,
+                reset_time=int(minute_usage.reset_time.timestamp()),
                 limit_type="minute"
             )
             
@@ -245,72 +226,17 @@ class RateLimitingService:
             # Fail open for availability
             return RateLimitResult(allowed=True, remaining=999, reset_time=int(time.time()) + 60)
     
-    async def _check_sliding_window(self, key: str, limit: int, window_seconds: int) -> RateLimitResult:
-        """
-        Check sliding window rate limit using Redis sorted sets.
-        Optimized for performance with pipelined operations.
-        """
-        now = time.time()
-        window_start = now - window_seconds
-        
-        # Use pipeline for atomic operations
-        pipeline = self.redis_client.pipeline()
-        
-        # Remove old entries and count current requests in one atomic operation
-        pipeline.zremrangebyscore(key, 0, window_start)
-        pipeline.zcard(key)
-        pipeline.expire(key, window_seconds + 60)  # Add buffer to TTL
-        
-        results = await pipeline.execute()
-        current_count = results[1]
-        
-        if current_count >= limit:
-            # Calculate when window will have space
-            pipeline = self.redis_client.pipeline()
-            pipeline.zrange(key, 0, 0, withscores=True)
-            oldest_request = await pipeline.execute()
-            
-            if oldest_request[0]:
-                reset_time = int(oldest_request[0][0][1] + window_seconds)
-                retry_after = max(1, reset_time - int(now))
-            else:
-                reset_time = int(now + window_seconds)
-                retry_after = window_seconds
-            
-            return RateLimitResult(
-                allowed=False,
-                remaining=0,
-                reset_time=reset_time,
-                retry_after=retry_after,
-                limit_type=f"{window_seconds}s"
-            )
-        
-        return RateLimitResult(
-            allowed=True,
-            remaining=limit - current_count - 1,  # -1 for current request
-            reset_time=int(now + window_seconds),
-            limit_type=f"{window_seconds}s"
-        )
+    def _get_engine(self) -> SlidingWindowCounterEngine:
+        if self._engine is None or self._engine.redis is not self.redis_client:
+            self._engine = SlidingWindowCounterEngine(self.redis_client)
+        return self._engine
     
-    async def _record_request(self, key_base: str) -> None:
-        """Record a request across all time windows using pipelined operations"""
-        now = time.time()
-        request_id = f"{now}:{id(asyncio.current_task())}"
-        
-        # Use pipeline for performance
-        pipeline = self.redis_client.pipeline()
-        
-        # Add to all time windows
-        pipeline.zadd(f"{key_base}:minute", {request_id: now})
-        pipeline.zadd(f"{key_base}:hour", {request_id: now})
-        pipeline.zadd(f"{key_base}:day", {request_id: now})
-        
-        # Set TTLs
-        pipeline.expire(f"{key_base}:minute", 120)  # 2 minutes
-        pipeline.expire(f"{key_base}:hour", 7200)   # 2 hours
-        pipeline.expire(f"{key_base}:day", 172800)  # 2 days
-        
-        await pipeline.execute()
+    def _key(self, tenant_id: str, user_id: str, endpoint: Optional[str] = None) -> str:
+        """Counter hash holding every window for a tenant user (and endpoint)"""
+        key = f"{self.key_prefix}{tenant_id}:{user_id}"
+        if endpoint:
+            key += f":{endpoint}"
+        return key
     
     async def _log_rate_limit_event(
         self, 
@@ -345,15 +271,12 @@ class RateLimitingService:
         
         try:
             config = self.INDUSTRY_LIMITS.get(industry_type, self.INDUSTRY_LIMITS[IndustryType.GENERAL])
-            key_base = f"{self.key_prefix}{tenant_id}:{user_id}"
             
             # Get current counts for all windows
-            pipeline = self.redis_client.pipeline()
-            pipeline.zcard(f"{key_base}:minute")
-            pipeline.zcard(f"{key_base}:hour")
-            pipeline.zcard(f"{key_base}:day")
-            
-            results = await pipeline.execute()
+            usage = await self._get_engine().get_usage(
+                self._key(tenant_id, user_id), list(self.WINDOW_SECONDS.values())
+            )
+            results = [usage[seconds] for seconds in self.WINDOW_SECONDS.values()]
             
             return {
                 "industry_type": industry_type.value,
@@ -389,11 +312,12 @@ class RateLimitingService:
             return False
         
         try:
-            key_base = f"{self.key_prefix}{tenant_id}:{user_id}"
+            key = self._key(tenant_id, user_id)
             
             if window:
                 # Reset specific window
-                await self.redis_client.delete(f"{key_base}:{window}")
+                seconds = self.WINDOW_SECONDS[window]
+                await self.redis_client.hdel(key, f"{seconds}:b", f"{seconds}:c", f"{seconds}:p")
                 logger.info(
                     f"Rate limit reset for {window} window",
                     extra={
@@ -405,11 +329,7 @@ class RateLimitingService:
                 )
             else:
                 # Reset all windows
-                pipeline = self.redis_client.pipeline()
-                pipeline.delete(f"{key_base}:minute")
-                pipeline.delete(f"{key_base}:hour")
-                pipeline.delete(f"{key_base}:day")
-                await pipeline.execute()
+                await self.redis_client.delete(key)
                 
                 logger.info(
                     "All rate limits reset",
@@ -447,7 +367,7 @@ class RateLimitingService:
                 pipeline = self.redis_client.pipeline()
                 
                 for key in sample_keys:
-                    pipeline.zcard(key)
+                    pipeline.hlen(key)
                 
                 results = await pipeline.execute()
                 active_limits = sum(1 for count in results if count > 0)
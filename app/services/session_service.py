@@ -22,6 +22,7 @@ from redis import asyncio as aioredis
 
 from ..models.base import Base
 from ..models.user import User
+from ..auth.identity import resolve_user_by_id
 from ..core.database import get_db
 from ..core.auth_context import AuthenticationContext
 
@@ -754,18 +755,9 @@ class SessionService:
             logger.error(f"Error updating session in database: {str(e)}")
     
     async def _load_user(self, user_id: str) -> Optional[User]:
-        """Load user from database"""
+        """Load user, shared with the rest of the request"""
         try:
-            async for db_session in get_db():
-                try:
-                    stmt = select(User).where(User.id == user_id)
-                    result = await db_session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    return user
-                except Exception as db_error:
-                    logger.error(f"Database error loading user: {str(db_error)}")
-                    break
-            return None
+            return await resolve_user_by_id(user_id)
         except Exception as e:
             logger.error(f"Error loading user: {str(e)}")
             return None
@@ -0,0 +1,86 @@
+"""Add partitioned domain_events table for the event store
+
+Revision ID: b3e9c1d47f20
+Revises: 7fd3054ae797
+Create Date: 2026-10-16 09:12:44.118203
+
+Replaces per-event rows in module_usage_logs with an append-only event log
+written in batches by the event store. The table is range-partitioned by
+month on occurred_at; a DEFAULT partition catches events outside the
+pre-created months so inserts never fail for lack of a partition. Later
+months are created by app.core.domain_event_partitions on startup and
+daily thereafter.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'b3e9c1d47f20'
+down_revision = '7fd3054ae797'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created up front, starting with the current month
+PREMADE_MONTHLY_PARTITIONS = 12
+
+
+def _month_start(year: int, month: int) -> date:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def upgrade() -> None:
+    op.create_table('domain_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+
+        # Event identity
+        sa.Column('event_id', sa.String(255), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('event_type', sa.String(50), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+
+        # Aggregate stream position
+        sa.Column('aggregate_id', sa.String(255)),
+        sa.Column('aggregate_type', sa.String(100)),
+        sa.Column('version', sa.Integer, nullable=False),
+
+        # Source and correlation
+        sa.Column('source_module', sa.String(255)),
+        sa.Column('user_id', sa.String(255)),
+        sa.Column('correlation_id', sa.String(255)),
+        sa.Column('category', sa.String(100)),
+
+        # Event body
+        sa.Column('payload', postgresql.JSONB, nullable=False),
+        sa.Column('event_metadata', postgresql.JSONB, nullable=False),
+
+        # Metadata
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+
+        sa.PrimaryKeyConstraint('id', 'occurred_at'),
+        postgresql_partition_by='RANGE (occurred_at)'
+    )
+
+    # Indexes on the parent are created on every partition
+    op.create_index('ix_domain_events_aggregate_version', 'domain_events', ['aggregate_id', 'version'])
+
+    today = date.today()
+    for offset in range(PREMADE_MONTHLY_PARTITIONS):
+        start = _month_start(today.year, today.month + offset)
+        end = _month_start(today.year, today.month + offset + 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS domain_events_{start:%Y_%m} PARTITION OF domain_events "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    op.execute("CREATE TABLE IF NOT EXISTS domain_events_default PARTITION OF domain_events DEFAULT")
+
+
+def downgrade() -> None:
+    # Dropping the parent drops its partitions and indexes
+    op.drop_table('domain_events')
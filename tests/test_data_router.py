@@ -1,10 +1,14 @@
+import asyncio
+import time
 import pytest
+from datetime import timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from typing import Dict, Any
 
 from app.data.router.data_router import DataSourceRouter
-from app.data.interfaces.base import DataSourceType, QueryParams, DataResponse
+from app.data.interfaces.base import DataSourceType, QueryParams, DataResponse, DataPage
 from app.data.interfaces.router import IDataSourceRouter
+from app.data.cache.local_cache import LocalLRUCache, LocalCacheEntry
 
 
 class TestDataSourceRouter:
@@ -425,4 +429,451 @@ class TestDataSourceRouter:
         assert result.source == DataSourceType.SUPABASE
         assert result.data[0]["source"] == "primary"
         primary_source.get_competitive_data.assert_called_once()
-        secondary_source.get_competitive_data.assert_not_called() 
\ No newline at end of file
+        secondary_source.get_competitive_data.assert_not_called() 
+
+class InMemoryCacheManager:
+    """Minimal stand-in for RedisCacheManager that records calls"""
+    
+    def __init__(self):
+        self.store: Dict[str, Any] = {}
+        self.get_calls = 0
+        self.invalidated_orgs = []
+    
+    def generate_cache_key(self, source: str, method: str, **kwargs) -> str:
+        return ":".join([source, method] + [f"{k}={kwargs[k]}" for k in sorted(kwargs)])
+    
+    async def get(self, key: str):
+        self.get_calls += 1
+        value = self.store.get(key)
+        # Redis hands back a freshly decoded copy on every read
+        return dict(value) if value is not None else None
+    
+    async def set(self, key: str, value: Any, ttl=None, tags=None) -> bool:
+        self.store[key] = dict(value)
+        return True
+    
+    async def invalidate_for_org(self, org_id: str) -> int:
+        self.invalidated_orgs.append(org_id)
+        return 0
+    
+    async def get_cache_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class TestDataSourceRouterCaching:
+    """L1 cache, single-flight and stale-while-revalidate behaviour"""
+    
+    @pytest.fixture
+    def cache_manager(self):
+        return InMemoryCacheManager()
+    
+    @pytest.fixture
+    def source(self):
+        """Source whose fetches take a little time so concurrent calls overlap"""
+        source = AsyncMock()
+        source.is_initialized = True
+        source.fetches = 0
+        
+        async def fetch(**kwargs):
+            source.fetches += 1
+            await asyncio.sleep(0.01)
+            return DataResponse(
+                data=[{"fetch": source.fetches}],
+                source=DataSourceType.SUPABASE,
+                cached=False
+            )
+        
+        source.get_competitive_data.side_effect = fetch
+        source.get_reference_data.side_effect = fetch
+        return source
+    
+    @pytest.fixture
+    def router(self, cache_manager, source):
+        router = DataSourceRouter(cache_manager)
+        router.register_source(DataSourceType.SUPABASE, source)
+        return router
+    
+    @pytest.mark.asyncio
+    async def test_local_cache_hit_skips_redis(self, router, cache_manager, source):
+        """A repeated query is served from process memory"""
+        first = await router.route_reference_data("uk_markets")
+        second = await router.route_reference_data("uk_markets")
+        
+        assert first.cached is False
+        assert second.cached is True
+        assert second.data == first.data
+        assert source.fetches == 1
+        assert cache_manager.get_calls == 1
+        
+        stats = await router.get_routing_stats()
+        assert stats["local_cache"]["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_local_cache_returns_copies(self, router):
+        """Callers cannot mutate the shared cached response"""
+        await router.route_reference_data("uk_markets")
+        hit = await router.route_reference_data("uk_markets")
+        hit.cached = False
+        
+        again = await router.route_reference_data("uk_markets")
+        assert again.cached is True
+    
+    @pytest.mark.asyncio
+    async def test_local_cache_rows_are_not_shared(self, router):
+        """Mutating the rows of a returned response leaves the cached rows intact"""
+        await router.route_reference_data("uk_markets")
+        hit = await router.route_reference_data("uk_markets")
+        hit.data[0]["fetch"] = 99
+        hit.data.append({"injected": True})
+        
+        again = await router.route_reference_data("uk_markets")
+        assert again.data == [{"fetch": 1}]
+    
+    @pytest.mark.asyncio
+    async def test_redis_hit_populates_local_cache(self, router, cache_manager, source):
+        """Entries written by another worker are decoded once, then served locally"""
+        await router.route_reference_data("uk_markets")
+        router.local_cache.clear()
+        
+        from_redis = await router.route_reference_data("uk_markets")
+        from_local = await router.route_reference_data("uk_markets")
+        
+        assert from_redis.cached is True
+        assert "_stale_after" not in (from_redis.metadata or {})
+        assert from_local.cached is True
+        assert cache_manager.get_calls == 2
+        assert source.fetches == 1
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self, router, source):
+        """Single-flight: N concurrent misses make one upstream call"""
+        params = QueryParams(filters={"competitors": ["vue"]})
+        results = await asyncio.gather(*[
+            router.route_competitive_data("test-org", "manchester", params)
+            for _ in range(20)
+        ])
+        
+        assert source.fetches == 1
+        assert all(result.data == [{"fetch": 1}] for result in results)
+        # Each caller gets its own instance
+        assert len({id(result) for result in results}) == 20
+        
+        stats = await router.get_routing_stats()
+        assert stats["local_cache"]["coalesced_requests"] == 19
+    
+    @pytest.mark.asyncio
+    async def test_failed_fetch_is_shared_and_not_cached(self, router, source):
+        """Coalesced callers all see the failure and the next call retries"""
+        source.get_reference_data.side_effect = Exception("Supabase down")
+        
+        results = await asyncio.gather(
+            router.route_reference_data("uk_markets"),
+            router.route_reference_data("uk_markets"),
+            return_exceptions=True
+        )
+        assert all(isinstance(result, Exception) for result in results)
+        assert source.get_reference_data.call_count == 1
+        assert router._inflight == {}
+    
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_revalidating(self, router, source):
+        """Past the soft TTL the stale value is returned and refreshed in the background"""
+        router.cache_policies["reference_data"] = (timedelta(seconds=0), timedelta(hours=1))
+        
+        first = await router.route_reference_data("uk_markets")
+        stale = await router.route_reference_data("uk_markets")
+        
+        assert stale.cached is True
+        assert stale.data == first.data
+        
+        # Further stale reads do not start another refresh
+        await router.route_reference_data("uk_markets")
+        
+        while router._inflight:
+            await asyncio.sleep(0.005)
+        
+        assert source.fetches == 2
+        stats = await router.get_routing_stats()
+        assert stats["local_cache"]["background_refreshes"] == 1
+        assert stats["local_cache"]["stale_served"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_org_invalidation_clears_local_entries(self, router, cache_manager, source):
+        """Invalidating an organization drops its L1 entries and in-flight fetches"""
+        params = QueryParams()
+        await router.route_competitive_data("test-org", "manchester", params)
+        await router.route_reference_data("uk_markets")
+        
+        pending = asyncio.ensure_future(router.route_competitive_data("test-org", "leeds", params))
+        await asyncio.sleep(0)
+        
+        await router.invalidate_cache_for_org("test-org")
+        await pending
+        
+        assert cache_manager.invalidated_orgs == ["test-org"]
+        # Reference data is not tagged with the organization
+        assert len(router.local_cache) == 1
+        # The fetch that was running during the invalidation was not cached
+        assert not any("leeds" in key for key in cache_manager.store)
+
+    @pytest.mark.asyncio
+    async def test_org_invalidation_keeps_other_orgs(self, router, cache_manager, source):
+        """Fetches and L1 entries of other organizations survive an invalidation"""
+        params = QueryParams()
+        await router.route_competitive_data("other-org", "manchester", params)
+
+        pending = asyncio.ensure_future(router.route_competitive_data("other-org", "leeds", params))
+        await asyncio.sleep(0)
+
+        await router.invalidate_cache_for_org("test-org")
+
+        # A concurrent miss still joins the running fetch
+        joined = await router.route_competitive_data("other-org", "leeds", params)
+        assert (await pending).data == joined.data
+        assert source.fetches == 2
+
+        assert len(router.local_cache) == 2
+        assert any("leeds" in key for key in cache_manager.store)
+
+
+class TestLocalLRUCache:
+    """Bounded in-process cache"""
+    
+    def make_entry(self, value, tags=(), now=None):
+        now = now if now is not None else time.time()
+        return LocalCacheEntry(
+            value=value,
+            local_until=now + 30,
+            stale_after=now + 60,
+            expires_at=now + 120,
+            tags=frozenset(tags)
+        )
+    
+    def test_evicts_least_recently_used(self):
+        cache = LocalLRUCache(max_entries=2)
+        cache.set("a", self.make_entry(1))
+        cache.set("b", self.make_entry(2))
+        cache.get("a")
+        cache.set("c", self.make_entry(3))
+        
+        assert cache.get("b") is None
+        assert cache.get("a").value == 1
+        assert cache.get_stats()["evictions"] == 1
+    
+    def test_hard_expired_entries_are_dropped(self):
+        cache = LocalLRUCache()
+        now = time.time()
+        cache.set("a", self.make_entry(1, now=now))
+        
+        entry = cache.get("a", now=now + 90)
+        assert entry.is_stale(now + 90)
+        assert cache.get("a", now=now + 120) is None
+        assert len(cache) == 0
+    
+    def test_invalidate_tags(self):
+        cache = LocalLRUCache()
+        cache.set("a", self.make_entry(1, tags=["org:one", "market:leeds"]))
+        cache.set("b", self.make_entry(2, tags=["org:two"]))
+        
+        assert cache.invalidate_tags(["market:leeds"]) == 1
+        assert cache.get("a") is None
+        assert cache.get("b").value == 2
+
+
+class TestSourceHealthMonitor:
+    """Background health probes and per-source circuit breakers"""
+    
+    def make_source(self, healthy=True):
+        source = AsyncMock()
+        source.is_initialized = True
+        source.health_check.return_value = healthy
+        source.get_reference_data.return_value = DataResponse(
+            data=[{"id": 1}],
+            source=DataSourceType.SUPABASE,
+            cached=False
+        )
+        return source
+    
+    @pytest.fixture
+    def router(self):
+        return DataSourceRouter(None, {"circuit_failure_threshold": 2, "circuit_open_seconds": 30})
+    
+    @pytest.mark.asyncio
+    async def test_queries_do_not_probe_health(self, router):
+        """Routing a query makes no health-check round trip"""
+        source = self.make_source()
+        router.register_source(DataSourceType.SUPABASE, source)
+        
+        await router.route_reference_data("uk_markets")
+        await router.route_reference_data("uk_markets")
+        
+        source.health_check.assert_not_called()
+        assert source.get_reference_data.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_failures_open_circuit_and_skip_source(self, router):
+        """After consecutive failures the primary is skipped without being called"""
+        primary = self.make_source()
+        primary.get_reference_data.side_effect = Exception("Supabase timeout")
+        fallback = self.make_source()
+        router.register_source(DataSourceType.SUPABASE, primary)
+        router.register_source(DataSourceType.POSTGRESQL, fallback)
+        
+        for _ in range(3):
+            await router.route_reference_data("uk_markets")
+        
+        assert primary.get_reference_data.call_count == 2
+        assert fallback.get_reference_data.call_count == 3
+        
+        stats = (await router.get_routing_stats())["source_stats"]
+        assert stats["supabase"]["state"] == "open"
+        assert stats["supabase"]["error_rate"] == 1.0
+        assert stats["postgresql"]["total_requests"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_half_open_trial_closes_circuit(self, router):
+        """Once the open period elapses a single trial request decides the state"""
+        primary = self.make_source()
+        router.register_source(DataSourceType.SUPABASE, primary)
+        breaker = router.health_monitor.breaker_for(DataSourceType.SUPABASE)
+        breaker.trip()
+        breaker.opened_at -= 31
+        
+        assert breaker.allow_request() is True
+        # Only one trial is let through while it is outstanding
+        assert breaker.allow_request() is False
+        
+        breaker.record_success(5.0)
+        assert breaker.get_stats()["state"] == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_failed_trial_reopens_circuit(self, router):
+        router.register_source(DataSourceType.SUPABASE, self.make_source())
+        breaker = router.health_monitor.breaker_for(DataSourceType.SUPABASE)
+        breaker.trip()
+        breaker.opened_at -= 31
+        
+        assert breaker.allow_request() is True
+        breaker.record_failure(5.0)
+        
+        assert breaker.get_stats()["state"] == "open"
+        assert breaker.allow_request() is False
+    
+    @pytest.mark.asyncio
+    async def test_probe_results_drive_circuit(self, router):
+        """Failed probes open the circuit; a successful probe allows a trial"""
+        source = self.make_source(healthy=False)
+        router.register_source(DataSourceType.SUPABASE, source)
+        monitor = router.health_monitor
+        
+        assert await monitor.probe_all() == {DataSourceType.SUPABASE: False}
+        assert monitor.is_available(DataSourceType.SUPABASE) is False
+        
+        source.health_check.return_value = True
+        await monitor.probe_all()
+        assert monitor.is_available(DataSourceType.SUPABASE) is True
+        assert monitor.get_stats()["supabase"]["last_probe"]["healthy"] is True
+    
+    @pytest.mark.asyncio
+    async def test_background_probing(self):
+        router = DataSourceRouter(None, {"health_check_interval": 0.01})
+        source = self.make_source()
+        router.register_source(DataSourceType.SUPABASE, source)
+        
+        router.start_health_monitor()
+        await asyncio.sleep(0.05)
+        router.stop_health_monitor()
+        
+        assert source.health_check.call_count >= 2
+        assert not router.health_monitor.is_running
+
+
+class TestStreamingRoutes:
+    """Streaming competitive data through the router"""
+    
+    def make_streaming_source(self, pages=None, fail_after=None):
+        source = MagicMock()
+        source.is_initialized = True
+        source.opened = 0
+        
+        async def stream(**kwargs):
+            source.opened += 1
+            source.kwargs = kwargs
+            for index, rows in enumerate(pages or []):
+                if fail_after is not None and index == fail_after:
+                    raise ConnectionError("connection reset")
+                yield DataPage(data=rows, source=DataSourceType.POSTGRESQL, next_cursor=f"c{index}")
+            if fail_after is not None and fail_after >= len(pages or []):
+                raise ConnectionError("connection reset")
+        
+        source.stream_competitive_data.side_effect = stream
+        return source
+    
+    async def collect(self, router, **kwargs):
+        return [page async for page in router.stream_competitive_data("org-1", "manchester", QueryParams(), **kwargs)]
+    
+    @pytest.mark.asyncio
+    async def test_streams_pages_from_primary(self):
+        router = DataSourceRouter(None)
+        source = self.make_streaming_source([[{"id": 1}], [{"id": 2}]])
+        router.register_source(DataSourceType.SUPABASE, source)
+        
+        pages = await self.collect(router, cursor="abc", page_size=1)
+        
+        assert [page.data for page in pages] == [[{"id": 1}], [{"id": 2}]]
+        assert source.kwargs["cursor"] == "abc"
+        assert source.kwargs["page_size"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_fails_over_before_first_page(self):
+        router = DataSourceRouter(None)
+        primary = self.make_streaming_source([[{"id": 1}]], fail_after=0)
+        fallback = self.make_streaming_source([[{"id": 2}]])
+        router.register_source(DataSourceType.SUPABASE, primary)
+        router.register_source(DataSourceType.POSTGRESQL, fallback)
+        
+        pages = await self.collect(router)
+        
+        assert [page.data for page in pages] == [[{"id": 2}]]
+        stats = router.health_monitor.get_stats()
+        assert stats["supabase"]["total_failures"] == 1
+        assert stats["postgresql"]["total_failures"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_mid_stream_failure_propagates(self):
+        """Rows already sent cannot be replayed from another source"""
+        router = DataSourceRouter(None)
+        primary = self.make_streaming_source([[{"id": 1}], [{"id": 2}]], fail_after=1)
+        fallback = self.make_streaming_source([[{"id": 3}]])
+        router.register_source(DataSourceType.SUPABASE, primary)
+        router.register_source(DataSourceType.POSTGRESQL, fallback)
+        
+        received = []
+        with pytest.raises(ConnectionError):
+            async for page in router.stream_competitive_data("org-1", "manchester", QueryParams()):
+                received.append(page)
+        
+        assert [page.data for page in received] == [[{"id": 1}]]
+        assert fallback.opened == 0
+    
+    @pytest.mark.asyncio
+    async def test_skips_sources_without_streaming(self):
+        router = DataSourceRouter(None)
+        primary = MagicMock()
+        primary.is_initialized = True
+        primary.stream_competitive_data.side_effect = NotImplementedError
+        fallback = self.make_streaming_source([[{"id": 2}]])
+        router.register_source(DataSourceType.SUPABASE, primary)
+        router.register_source(DataSourceType.POSTGRESQL, fallback)
+        
+        pages = await self.collect(router)
+        
+        assert [page.data for page in pages] == [[{"id": 2}]]
+        assert router.health_monitor.get_stats()["supabase"]["total_requests"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_no_streaming_source(self):
+        router = DataSourceRouter(None)
+        
+        with pytest.raises(Exception, match="All data sources failed"):
+            await self.collect(router)
@@ -0,0 +1,85 @@
+"""
+Tests for domain_events partition maintenance.
+
+The engine is replaced by a recording connection, so the statements issued
+for each missing month can be checked without PostgreSQL.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import app.core.domain_event_partitions as partitions_module
+from app.core.domain_event_partitions import (
+    DomainEventPartitionMaintainer,
+    partition_statements,
+    required_months,
+)
+
+
+class RecordingConnection:
+    """Answers the partition listing and records every other statement"""
+
+    def __init__(self, existing, dialect="postgresql"):
+        self.existing = existing
+        self.dialect = MagicMock()
+        self.dialect.name = dialect
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        result = MagicMock()
+        if "pg_inherits" in sql:
+            result.scalars.return_value = list(self.existing)
+        elif "pg_advisory_xact_lock" not in sql:
+            self.statements.append(sql)
+        return result
+
+
+def patched_engine(connection):
+    @asynccontextmanager
+    async def begin():
+        yield connection
+
+    engine = MagicMock(begin=begin)
+    return patch.object(partitions_module, "get_async_engine", return_value=engine)
+
+
+def test_required_months_cross_the_year():
+    assert required_months(date(2026, 11, 20), 2) == [date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)]
+
+
+def test_partition_moves_rows_out_of_default_before_attaching():
+    statements = partition_statements(date(2026, 12, 1))
+
+    assert statements[0].startswith("CREATE TABLE domain_events_2026_12 (LIKE domain_events")
+    assert "DELETE FROM domain_events_default WHERE occurred_at >= '2026-12-01' AND occurred_at < '2027-01-01'" in statements[1]
+    assert statements[2] == (
+        "ALTER TABLE domain_events ATTACH PARTITION domain_events_2026_12 "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_only_missing_months_are_created():
+    connection = RecordingConnection(["domain_events_default", "domain_events_2026_10", "domain_events_2026_11"])
+    maintainer = DomainEventPartitionMaintainer(months_ahead=2)
+
+    with patched_engine(connection):
+        created = await maintainer.ensure_partitions(date(2026, 10, 16))
+
+    assert created == ["domain_events_2026_12"]
+    assert len(connection.statements) == 3
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_do_outside_postgresql():
+    connection = RecordingConnection([], dialect="sqlite")
+    maintainer = DomainEventPartitionMaintainer(months_ahead=2)
+
+    with patched_engine(connection):
+        assert await maintainer.ensure_partitions(date(2026, 10, 16)) == []
+
+    assert connection.statements == []
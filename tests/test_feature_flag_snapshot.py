@@ -0,0 +1,218 @@
+"""
+Tests for the in-memory feature flag snapshot.
+
+Flags and overrides are compiled from unsaved model instances; the store's
+loader and the shared version in the cache are patched, so no database or
+Redis is needed.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.orm.attributes import set_committed_value
+
+import app.services.feature_flag_snapshot as snapshot_module
+from app.models.feature_flags import FeatureFlag, FeatureFlagOverride
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.services.feature_flag_service import FeatureFlagService
+from app.services.feature_flag_snapshot import (
+    FeatureFlagSnapshot,
+    FeatureFlagSnapshotStore,
+    compile_flag,
+    rollout_bucket,
+)
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_flag(flag_key="new-dashboard", **kwargs):
+    kwargs.setdefault("is_enabled", True)
+    kwargs.setdefault("rollout_percentage", 100)
+    kwargs.setdefault("config", {})
+    kwargs.setdefault("allowed_sectors", [])
+    kwargs.setdefault("blocked_sectors", [])
+    return FeatureFlag(id=f"id-{flag_key}", flag_key=flag_key, name=flag_key.title(), **kwargs)
+
+
+def make_override(**kwargs):
+    return FeatureFlagOverride(is_enabled=kwargs.pop("is_enabled", True), **kwargs)
+
+
+def evaluate(flag, overrides=(), user_id="user-1", organisation_id="org-1", sic_code=None):
+    return compile_flag(flag, overrides).evaluate(user_id, organisation_id, sic_code, NOW)
+
+
+class TestCompiledFlag:
+    """Evaluation follows FeatureFlagService.is_feature_enabled"""
+
+    def test_disabled_flag_ignores_overrides(self):
+        flag = make_flag(is_enabled=False)
+
+        assert evaluate(flag, [make_override(user_id="user-1")]) == (False, "Flag disabled")
+
+    def test_user_override_beats_organisation_override(self):
+        overrides = [
+            make_override(organisation_id="org-1", is_enabled=False),
+            make_override(user_id="user-1", is_enabled=True),
+        ]
+
+        assert evaluate(make_flag(rollout_percentage=0), overrides) == (True, "User override")
+
+    def test_expired_override_disables_the_flag(self):
+        expired = make_override(organisation_id="org-1", expires_at=NOW - timedelta(minutes=1))
+
+        assert evaluate(make_flag(), [expired]) == (False, "Organisation override")
+
+    def test_naive_expiry_is_treated_as_utc(self):
+        override = make_override(user_id="user-1", expires_at=(NOW + timedelta(hours=1)).replace(tzinfo=None))
+
+        assert evaluate(make_flag(), [override])[0] is True
+
+    def test_sector_rules(self):
+        flag = make_flag(allowed_sectors=["62020"], blocked_sectors=["64191"])
+
+        assert evaluate(flag, sic_code="62020")[0] is True
+        assert evaluate(flag, sic_code="64191") == (False, "Sector restricted")
+        assert evaluate(flag, sic_code="47110") == (False, "Sector restricted")
+        assert evaluate(flag, sic_code=None)[0] is True
+
+    def test_percentage_rollout_matches_service_hash(self):
+        flag = make_flag(rollout_percentage=50)
+        service = FeatureFlagService(MagicMock(), audit_service=MagicMock())
+
+        for i in range(200):
+            user_id = f"user-{i}"
+            expected = service._get_user_hash(user_id, flag.flag_key) < 50
+            assert evaluate(flag, user_id=user_id)[0] is expected
+
+    def test_enabled_features_filters_by_module(self):
+        snapshot = FeatureFlagSnapshot([
+            compile_flag(make_flag("reports", module_id="market_trends"), []),
+            compile_flag(make_flag("alerts", module_id="pricing"), []),
+            compile_flag(make_flag("beta", is_enabled=False), []),
+        ])
+
+        assert set(snapshot.enabled_features("user-1", "org-1", None, now=NOW)) == {"reports", "alerts"}
+        assert set(snapshot.enabled_features("user-1", "org-1", None, "pricing", now=NOW)) == {"alerts"}
+
+
+class FakeLoader:
+    """Stands in for load_snapshot, counting loads"""
+
+    def __init__(self, *flags, delay=0.0):
+        self.flags = list(flags)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, db, version=None):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return FeatureFlagSnapshot([compile_flag(flag, []) for flag in self.flags], version=version)
+
+
+def patched_store(loader, shared_version=None, **kwargs):
+    session = MagicMock()
+    session.return_value.__aenter__ = AsyncMock(return_value=MagicMock())
+    session.return_value.__aexit__ = AsyncMock(return_value=False)
+    cache = MagicMock(get=AsyncMock(return_value=shared_version), set=AsyncMock(return_value=True))
+    patches = [
+        patch.object(snapshot_module, "load_snapshot", loader),
+        patch.object(snapshot_module, "get_async_session_local", return_value=session),
+        patch.object(snapshot_module, "cache_manager", cache),
+    ]
+    kwargs.setdefault("max_age_seconds", 300)
+    kwargs.setdefault("version_check_seconds", 0)
+    return FeatureFlagSnapshotStore(**kwargs), cache, patches
+
+
+class TestFeatureFlagSnapshotStore:
+    """Rebuilds are coalesced and follow published changes"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_gets_share_one_load(self):
+        loader = FakeLoader(make_flag(), delay=0.05)
+        store, _, patches = patched_store(loader)
+
+        with patches[0], patches[1], patches[2]:
+            snapshots = await asyncio.gather(*(store.get() for _ in range(20)))
+
+        assert loader.calls == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+    @pytest.mark.asyncio
+    async def test_unchanged_version_reuses_snapshot(self):
+        loader = FakeLoader(make_flag())
+        store, _, patches = patched_store(loader, shared_version="v1")
+
+        with patches[0], patches[1], patches[2]:
+            first = await store.get()
+            second = await store.get()
+
+        assert second is first
+        assert loader.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_change_from_another_worker_triggers_rebuild(self):
+        loader = FakeLoader(make_flag())
+        store, cache, patches = patched_store(loader, shared_version="v1")
+
+        with patches[0], patches[1], patches[2]:
+            await store.get()
+            cache.get.return_value = "v2"
+            snapshot = await store.get()
+
+        assert snapshot.version == "v2"
+        assert loader.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_publish_change_rebuilds_locally_and_bumps_version(self):
+        loader = FakeLoader(make_flag())
+        store, cache, patches = patched_store(loader, version_check_seconds=60)
+
+        with patches[0], patches[1], patches[2]:
+            await store.get()
+            loader.flags.append(make_flag("alerts"))
+            await store.publish_change()
+            snapshot = await store.get()
+
+        assert snapshot.get("alerts") is not None
+        cache.set.assert_awaited_once()
+        assert cache.set.await_args.args[0] == snapshot_module.VERSION_CACHE_KEY
+
+    @pytest.mark.asyncio
+    async def test_load_in_progress_during_invalidate_is_discarded(self):
+        loader = FakeLoader(make_flag(), delay=0.05)
+        store, _, patches = patched_store(loader)
+
+        with patches[0], patches[1], patches[2]:
+            stale = asyncio.ensure_future(store.rebuild())
+            await asyncio.sleep(0.01)
+            store.invalidate()
+            await stale
+            await store.get()
+
+        assert loader.calls == 2
+
+
+class TestGetEnabledFeatures:
+    """FeatureFlagService.get_enabled_features is served from the snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_no_queries_when_organisation_is_loaded(self):
+        snapshot = FeatureFlagSnapshot([
+            compile_flag(make_flag("open"), []),
+            compile_flag(make_flag("finance-only", allowed_sectors=["64191"]), []),
+        ])
+        user = User(id="user-1", organisation_id="org-1")
+        set_committed_value(user, "organisation", Organisation(id="org-1", sic_code="62020"))
+        db = MagicMock(execute=AsyncMock())
+
+        with patch.object(snapshot_module.feature_flag_snapshots, "get", AsyncMock(return_value=snapshot)):
+            features = await FeatureFlagService(db, audit_service=MagicMock()).get_enabled_features(user)
+
+        assert list(features) == ["open"]
+        db.execute.assert_not_awaited()
@@ -267,14 +267,15 @@ class TestHierarchicalPermissions:
         assert len(create_request["locations"]) == 2
         assert create_request["industry_template_code"] == "CINEMA"
     
-    def test_permission_resolution_engine(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
+    @pytest.mark.asyncio
+    async def test_permission_resolution_engine(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
         """Test permission resolution across hierarchy levels"""
         
         permission_engine = PermissionResolutionEngine(db_session)
         
         # Test org admin permissions
         org_admin = sample_users["org_admin"]
-        org_admin_permissions = permission_engine.resolve_user_permissions(org_admin.id)
+        org_admin_permissions = await permission_engine.resolve_user_permissions(org_admin.id)
         
         assert "admin" in org_admin_permissions["permissions"]
         assert "manage_users" in org_admin_permissions["permissions"]
@@ -282,7 +283,7 @@ class TestHierarchicalPermissions:
         
         # Test location manager permissions
         location_manager = sample_users["location_manager"]
-        location_manager_permissions = permission_engine.resolve_user_permissions(location_manager.id)
+        location_manager_permissions = await permission_engine.resolve_user_permissions(location_manager.id)
         
         assert "read" in location_manager_permissions["permissions"]
         assert "write" in location_manager_permissions["permissions"]
@@ -291,7 +292,7 @@ class TestHierarchicalPermissions:
         
         # Test department lead permissions
         dept_lead = sample_users["dept_lead"]
-        dept_lead_permissions = permission_engine.resolve_user_permissions(dept_lead.id)
+        dept_lead_permissions = await permission_engine.resolve_user_permissions(dept_lead.id)
         
         assert "read" in dept_lead_permissions["permissions"]
         assert "write" in dept_lead_permissions["permissions"]
@@ -300,13 +301,14 @@ class TestHierarchicalPermissions:
         
         # Test regular user permissions
         regular_user = sample_users["regular_user"]
-        regular_user_permissions = permission_engine.resolve_user_permissions(regular_user.id)
+        regular_user_permissions = await permission_engine.resolve_user_permissions(regular_user.id)
         
         assert "read" in regular_user_permissions["permissions"]
         assert "view_reports" in regular_user_permissions["permissions"]
         assert "write" not in regular_user_permissions["permissions"]  # Should not have write access
     
-    def test_permission_inheritance(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
+    @pytest.mark.asyncio
+    async def test_permission_inheritance(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
         """Test permission inheritance from parent hierarchy levels"""
         
         permission_engine = PermissionResolutionEngine(db_session)
@@ -315,19 +317,20 @@ class TestHierarchicalPermissions:
         dept_user = sample_users["regular_user"]
         
         # Test inheritance - department user should inherit some permissions from location level
-        dept_permissions = permission_engine.resolve_user_permissions(dept_user.id, include_inherited=True)
+        dept_permissions = await permission_engine.resolve_user_permissions(dept_user.id, include_inherited=True)
         
         # Verify inheritance metadata
         assert dept_permissions["metadata"]["inheritance_chain"] is not None
         assert len(dept_permissions["metadata"]["inheritance_chain"]) >= 0  # May have inherited permissions
         
         # Test without inheritance
-        dept_permissions_no_inherit = permission_engine.resolve_user_permissions(dept_user.id, include_inherited=False)
+        dept_permissions_no_inherit = await permission_engine.resolve_user_permissions(dept_user.id, include_inherited=False)
         
         # Should have fewer or equal permissions without inheritance
         assert len(dept_permissions_no_inherit["permissions"]) <= len(dept_permissions["permissions"])
     
-    def test_permission_overrides(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
+    @pytest.mark.asyncio
+    async def test_permission_overrides(self, db_session: Session, sample_organization: Dict[str, Any], sample_users: Dict[str, Any]):
         """Test user-specific permission overrides"""
         
         from app.models.hierarchy import HierarchyPermissionOverride
@@ -348,7 +351,7 @@ class TestHierarchicalPermissions:
         db_session.commit()
         
         permission_engine = PermissionResolutionEngine(db_session)
-        user_permissions = permission_engine.resolve_user_permissions(regular_user.id)
+        user_permissions = await permission_engine.resolve_user_permissions(regular_user.id)
         
         # Should now have the overridden permission
         assert "export_data" in user_permissions["permissions"]
@@ -504,7 +507,8 @@ class TestHierarchicalPermissions:
         # response = client.post("/api/v1/v2/hierarchy-nodes", json=node_request)
         # assert response.status_code in [401, 403]
     
-    def test_performance_with_deep_hierarchy(self, db_session: Session):
+    @pytest.mark.asyncio
+    async def test_performance_with_deep_hierarchy(self, db_session: Session):
         """Test permission resolution performance with deep hierarchy"""
         
         # This test would create a deep hierarchy structure and measure
@@ -574,7 +578,7 @@ class TestHierarchicalPermissions:
         permission_engine = PermissionResolutionEngine(db_session)
         
         start_time = time.time()
-        permissions = permission_engine.resolve_user_permissions(test_user.id)
+        permissions = await permission_engine.resolve_user_permissions(test_user.id)
         end_time = time.time()
         
         resolution_time = end_time - start_time
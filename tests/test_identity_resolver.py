@@ -0,0 +1,197 @@
+"""
+Tests for the shared identity resolver.
+
+A request resolves its user once however many layers ask for it, later
+requests reuse the user for a short TTL, and user or organisation updates
+drop the cached copy. Inactive users resolve as before so callers' is_active
+checks still apply.
+"""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import inspect
+
+import app.auth.dependencies as dependencies
+import app.auth.identity as identity
+from app.auth.identity import (
+    IdentityCache,
+    identity_scope,
+    invalidate_organisation,
+    invalidate_user,
+    resolve_user_by_email,
+    resolve_user_by_id,
+    snapshot_user,
+)
+from app.models.organisation import Organisation
+from app.models.user import User, UserRole
+
+
+def make_user(email="user@example.com", is_active=True, organisation_id=None):
+    organisation = Organisation(id=organisation_id or uuid.uuid4(), name="Acme", is_active=True)
+    user = User(
+        id=uuid.uuid4(), email=email, first_name="Test", last_name="User",
+        organisation_id=organisation.id, role=UserRole.viewer, is_active=is_active,
+    )
+    user.organisation = organisation
+    return user
+
+
+def session():
+    db = MagicMock()
+    db.identity_map = {}
+    db.merge = AsyncMock(side_effect=lambda instance, load: instance)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    identity.identity_cache.clear()
+    yield
+    identity.identity_cache.clear()
+
+
+@pytest.fixture
+def loader():
+    with patch.object(identity, "_load", AsyncMock()) as load:
+        yield load
+
+
+class TestIdentityCache:
+    """Snapshots reachable by email and id"""
+
+    def test_discarding_by_id_drops_email_key(self):
+        cache = IdentityCache(maxsize=10, ttl=60)
+        snapshot = snapshot_user(make_user())
+
+        cache.set(snapshot)
+        assert cache.get(f"email:{snapshot.email}") is snapshot
+        assert cache.get(f"id:{snapshot.user_id}") is snapshot
+
+        cache.discard_user(user_id=snapshot.user_id)
+        assert len(cache) == 0
+
+    def test_discarding_organisation_drops_its_users_only(self):
+        cache = IdentityCache(maxsize=10, ttl=60)
+        org_id = uuid.uuid4()
+        member = snapshot_user(make_user("a@example.com", organisation_id=org_id))
+        other = snapshot_user(make_user("b@example.com"))
+
+        cache.set(member)
+        cache.set(other)
+        cache.discard_organisation(str(org_id))
+
+        assert cache.get(f"email:{member.email}") is None
+        assert cache.get(f"email:{other.email}") is other
+
+    def test_entries_expire(self):
+        cache = IdentityCache(maxsize=10, ttl=30)
+        snapshot = snapshot_user(make_user())
+
+        with patch.object(identity.time, "monotonic", return_value=1000.0):
+            cache.set(snapshot)
+        with patch.object(identity.time, "monotonic", return_value=1031.0):
+            assert cache.get(f"email:{snapshot.email}") is None
+
+
+class TestResolveUser:
+    """Request memo and cross-request cache"""
+
+    @pytest.mark.asyncio
+    async def test_one_query_per_request(self, loader):
+        user = make_user()
+        loader.return_value = user
+        db = session()
+
+        with patch.object(identity, "identity_cache", IdentityCache(ttl=0)):
+            with identity_scope():
+                await resolve_user_by_email(user.email, db)
+                await resolve_user_by_email(user.email, db)
+                await resolve_user_by_id(str(user.id), db)
+            assert loader.await_count == 1
+
+            await resolve_user_by_email(user.email, db)
+            assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_later_requests_reuse_user(self, loader):
+        user = make_user()
+        loader.return_value = user
+
+        await resolve_user_by_email(user.email, session())
+        cached = await resolve_user_by_email(user.email, session())
+
+        assert loader.await_count == 1
+        assert cached is not user
+        assert cached.id == user.id
+        assert cached.organisation.name == "Acme"
+        assert inspect(cached).detached
+
+    @pytest.mark.asyncio
+    async def test_session_copy_wins_over_cache(self, loader):
+        user = make_user()
+        loader.return_value = user
+        await resolve_user_by_email(user.email, session())
+
+        db = session()
+        db.identity_map = {identity.identity_key(User, user.id): user}
+
+        assert await resolve_user_by_email(user.email, db) is user
+        db.merge.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_missing_users_are_not_cached(self, loader):
+        loader.return_value = None
+
+        assert await resolve_user_by_email("nobody@example.com", session()) is None
+        assert await resolve_user_by_email("nobody@example.com", session()) is None
+        assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_user_update_invalidates(self, loader):
+        user = make_user()
+        loader.return_value = user
+
+        with identity_scope():
+            await resolve_user_by_email(user.email, session())
+            invalidate_user(user_id=user.id)
+            await resolve_user_by_email(user.email, session())
+
+        assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_organisation_update_invalidates(self, loader):
+        user = make_user()
+        loader.return_value = user
+
+        await resolve_user_by_id(str(user.id), session())
+        invalidate_organisation(user.organisation_id)
+        await resolve_user_by_id(str(user.id), session())
+
+        assert loader.await_count == 2
+
+
+class TestGetCurrentUser:
+    """Cached users keep the inactive check"""
+
+    @pytest.mark.asyncio
+    async def test_inactive_cached_user_is_forbidden(self, loader):
+        user = make_user(is_active=False)
+        loader.return_value = user
+        await resolve_user_by_email(user.email, session())
+
+        request = SimpleNamespace(url=SimpleNamespace(path="/api/v1/users/me"), state=SimpleNamespace())
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+        payload = {"sub": "auth0|123", "email": user.email}
+
+        with patch.object(dependencies, "get_unverified_issuer", return_value=None), \
+                patch.object(dependencies, "verify_token", return_value=payload):
+            with pytest.raises(HTTPException) as exc_info:
+                await dependencies.get_current_user(request=request, credentials=credentials, db=session())
+
+        assert exc_info.value.status_code == 403
+        assert loader.await_count == 1
@@ -8,12 +8,15 @@ and integrated communication patterns.
 import asyncio
 import json
 import pytest
+import pytest_asyncio
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 from unittest.mock import Mock, AsyncMock, patch
 
 from app.core.message_bus import (
+    DeliveryGuarantee,
     InterModuleMessageBus,
     Message,
     MessageType,
@@ -22,7 +25,10 @@ from app.core.message_bus import (
     MessageHandler,
     CircuitBreaker,
     CircuitBreakerConfig,
-    MessageBusMetrics
+    MessageBusMetrics,
+    RingBuffer,
+    RetryScheduler,
+    WeightedFairSemaphore
 )
 from app.core.module_discovery import (
     ModuleDiscoveryService,
@@ -39,7 +45,11 @@ from app.core.event_system import (
     EventType,
     WorkflowDefinition,
     WorkflowStep,
-    EventStore
+    WorkflowStatus,
+    WorkflowEngine,
+    EventBus,
+    EventStore,
+    DomainEventBatcher
 )
 from app.core.module_communication import (
     InterModuleCommunicationService,
@@ -537,6 +547,553 @@ class TestEventSystem:
         assert metrics["workflows_started"] >= 1
 
 
+class TestEventStoreIndexing:
+    """Test event store index maintenance under eviction"""
+    
+    def _make_event(self, seq: int, aggregate_id: str, category: str = "orders", tags=None) -> DomainEvent:
+        metadata = EventMetadata(
+            event_id=f"evt_{seq}",
+            event_type=EventType.DOMAIN_EVENT,
+            aggregate_id=aggregate_id,
+            version=seq,
+            category=category,
+            tags=set(tags or [])
+        )
+        return DomainEvent(name="test.event", payload={"seq": seq}, metadata=metadata)
+    
+    @pytest.fixture
+    def event_store(self):
+        store = EventStore(max_memory_events=3)
+        
+        async def skip_database(event):
+            pass
+        
+        store._persist_to_database = skip_database
+        return store
+    
+    @pytest.mark.asyncio
+    async def test_eviction_updates_indexes(self, event_store):
+        """Evicted events disappear from every index and empty keys are dropped"""
+        await event_store.append_event(self._make_event(1, "agg_a", tags=["first"]))
+        await event_store.append_event(self._make_event(2, "agg_b"))
+        await event_store.append_event(self._make_event(3, "agg_a"))
+        await event_store.append_event(self._make_event(4, "agg_b", category="billing"))
+        
+        assert list(event_store.memory_store) == ["evt_2", "evt_3", "evt_4"]
+        assert list(event_store.aggregate_index["agg_a"]) == ["evt_3"]
+        assert list(event_store.aggregate_index["agg_b"]) == ["evt_2", "evt_4"]
+        assert event_store.event_index["orders"] == {"evt_2", "evt_3"}
+        assert "tag:first" not in event_store.event_index
+        
+        await event_store.append_event(self._make_event(5, "agg_b"))
+        await event_store.append_event(self._make_event(6, "agg_b"))
+        
+        assert "agg_a" not in event_store.aggregate_index
+        assert "agg_a" not in event_store.aggregate_streams
+        events = await event_store.get_events(aggregate_id="agg_b")
+        assert [event.metadata.version for event in events] == [4, 5, 6]
+    
+    @pytest.mark.asyncio
+    async def test_reappended_event_is_reindexed(self, event_store):
+        """Appending an existing event id moves it to the newest position"""
+        await event_store.append_event(self._make_event(1, "agg_a"))
+        await event_store.append_event(self._make_event(2, "agg_a"))
+        await event_store.append_event(self._make_event(1, "agg_a"))
+        
+        assert list(event_store.memory_store) == ["evt_2", "evt_1"]
+        assert list(event_store.aggregate_index["agg_a"]) == ["evt_2", "evt_1"]
+        
+        await event_store.append_event(self._make_event(3, "agg_c"))
+        await event_store.append_event(self._make_event(4, "agg_c"))
+        assert list(event_store.aggregate_index["agg_a"]) == ["evt_1"]
+        
+        await event_store.append_event(self._make_event(5, "agg_c"))
+        assert "agg_a" not in event_store.aggregate_index
+        assert event_store.event_index["orders"] == {"evt_3", "evt_4", "evt_5"}
+    
+    @pytest.mark.asyncio
+    @pytest.mark.slow
+    @pytest.mark.performance
+    @pytest.mark.filterwarnings("ignore::DeprecationWarning")
+    async def test_append_latency_is_flat_when_full(self):
+        """Benchmark: 1M appends into a full store keep per-append latency flat"""
+        store = EventStore(max_memory_events=10000)
+        
+        async def skip_database(event):
+            pass
+        
+        store._persist_to_database = skip_database
+        
+        total_events = 1_000_000
+        window = 100_000
+        window_latencies_us = []
+        window_start = time.perf_counter()
+        
+        for seq in range(total_events):
+            await store.append_event(
+                self._make_event(seq, f"agg_{seq % 5000}", category=f"cat_{seq % 10}", tags=[f"tag_{seq % 7}"])
+            )
+            if (seq + 1) % window == 0:
+                now = time.perf_counter()
+                window_latencies_us.append((now - window_start) / window * 1e6)
+                window_start = now
+        
+        print(f"\nPer-append latency by 100k window (us): {[round(v, 1) for v in window_latencies_us]}")
+        
+        assert len(store.memory_store) == 10000
+        assert sum(len(event_ids) for event_ids in store.aggregate_index.values()) == 10000
+        # The first window includes filling the store; every later window
+        # runs with eviction on each append and must not get slower
+        assert max(window_latencies_us) < 3 * min(window_latencies_us)
+
+
+class TestDomainEventBatcher:
+    """Test batched persistence of domain events"""
+    
+    def _make_event(self, seq: int) -> DomainEvent:
+        metadata = EventMetadata(
+            event_id=f"evt_{seq}",
+            event_type=EventType.DOMAIN_EVENT,
+            aggregate_id="agg_a",
+            version=seq
+        )
+        return DomainEvent(name="test.event", payload={"seq": seq}, metadata=metadata)
+    
+    def _make_batcher(self, **kwargs):
+        batches = []
+        
+        async def write_batch(rows):
+            batches.append([row["version"] for row in rows])
+        
+        kwargs.setdefault("write_batch", write_batch)
+        return DomainEventBatcher(**kwargs), batches
+    
+    @pytest.mark.asyncio
+    async def test_flushes_when_batch_is_full(self):
+        """Full batches are written without waiting for the interval"""
+        batcher, batches = self._make_batcher(batch_size=3, flush_interval_seconds=10)
+        
+        for seq in range(7):
+            await batcher.submit(self._make_event(seq))
+        await asyncio.sleep(0.05)
+        
+        assert batches == [[0, 1, 2], [3, 4, 5]]
+        
+        await batcher.stop()
+        assert batches[-1] == [6]
+        assert batcher.get_stats()["total_written"] == 7
+    
+    @pytest.mark.asyncio
+    async def test_flushes_partial_batch_after_interval(self):
+        """A partial batch is written once the flush interval elapses"""
+        batcher, batches = self._make_batcher(batch_size=100, flush_interval_seconds=0.05)
+        
+        await batcher.submit(self._make_event(1))
+        await batcher.submit(self._make_event(2))
+        await asyncio.sleep(0.02)
+        assert batches == []
+        
+        await asyncio.sleep(0.1)
+        assert batches == [[1, 2]]
+        await batcher.stop()
+    
+    @pytest.mark.asyncio
+    async def test_backpressure_when_buffer_is_full(self):
+        """Producers wait for buffer space while the database is behind"""
+        release = asyncio.Event()
+        written = []
+        
+        async def slow_write(rows):
+            await release.wait()
+            written.extend(rows)
+        
+        batcher = DomainEventBatcher(
+            batch_size=2, flush_interval_seconds=0.01, max_buffered_events=2, write_batch=slow_write
+        )
+        
+        # Two events go into the in-flight batch and two fill the buffer
+        for seq in range(4):
+            await batcher.submit(self._make_event(seq))
+        await asyncio.sleep(0.05)
+        waits_before = batcher.get_stats()["backpressure_waits"]
+        
+        blocked = asyncio.create_task(batcher.submit(self._make_event(4)))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        assert batcher.get_stats()["backpressure_waits"] == waits_before + 1
+        
+        release.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        await batcher.stop()
+        assert len(written) == 5
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_dropped_after_retries(self):
+        """Persistent write failures do not block the batcher forever"""
+        attempts = []
+        
+        async def failing_write(rows):
+            attempts.append(len(rows))
+            raise ConnectionError("database unavailable")
+        
+        batcher = DomainEventBatcher(
+            batch_size=10, flush_interval_seconds=0.01, max_retries=1, write_batch=failing_write
+        )
+        
+        await batcher.submit(self._make_event(1))
+        await asyncio.sleep(0.3)
+        
+        stats = batcher.get_stats()
+        assert attempts == [1, 1]
+        assert stats["total_dropped"] == 1
+        assert stats["total_written"] == 0
+        await batcher.stop()
+    
+    def test_batch_is_a_single_multi_row_insert(self):
+        """Rows map onto domain_events and compile to one INSERT statement"""
+        from sqlalchemy import insert
+        from sqlalchemy.dialects import postgresql
+        from app.models.domain_events import DomainEventRecord
+        
+        rows = [DomainEventBatcher._event_to_row(self._make_event(seq)) for seq in range(3)]
+        
+        assert rows[0]["occurred_at"].tzinfo is not None
+        assert rows[2]["aggregate_id"] == "agg_a"
+        assert rows[2]["version"] == 2
+        assert rows[2]["event_metadata"]["event_id"] == "evt_2"
+        
+        statement = str(
+            insert(DomainEventRecord.__table__).values(rows).compile(dialect=postgresql.dialect())
+        )
+        assert statement.count("INSERT INTO domain_events") == 1
+        assert statement.count("), (") == 2
+
+
+class TestEventStoreReplay:
+    """Test snapshot-accelerated and tiered aggregate replay"""
+    
+    def _make_event(self, version: int, aggregate_id: str = "account_1") -> DomainEvent:
+        metadata = EventMetadata(
+            event_id=f"{aggregate_id}_evt_{version}",
+            event_type=EventType.DOMAIN_EVENT,
+            aggregate_id=aggregate_id,
+            aggregate_type="account",
+            version=version
+        )
+        return DomainEvent(name="account.deposited", payload={"amount": version}, metadata=metadata)
+    
+    def _make_store(self, **kwargs) -> EventStore:
+        store = EventStore(**kwargs)
+        
+        async def skip_database(event):
+            pass
+        
+        store._persist_to_database = skip_database
+        store._get_database_version = AsyncMock(return_value=0)
+        return store
+    
+    @staticmethod
+    def _apply_deposit(state, event):
+        state = dict(state or {"balance": 0})
+        state["balance"] += event.payload["amount"]
+        return state
+    
+    @pytest.mark.asyncio
+    async def test_replay_starts_after_snapshot(self):
+        """Only events after the latest snapshot are replayed"""
+        store = self._make_store(snapshot_interval=0)
+        for version in range(1, 11):
+            await store.append_event(self._make_event(version))
+        
+        assert await store.create_snapshot("account_1", {"balance": 21}, version=6)
+        
+        snapshots = []
+        replayed = []
+        
+        async def on_snapshot(snapshot):
+            snapshots.append(snapshot)
+        
+        async def on_event(event):
+            replayed.append(event.metadata.version)
+        
+        events = await store.replay_events("account_1", event_handler=on_event, snapshot_handler=on_snapshot)
+        
+        assert [snapshot["version"] for snapshot in snapshots] == [6]
+        assert replayed == [7, 8, 9, 10]
+        assert len(events) == 4
+        assert await store.next_version("account_1") == 11
+    
+    @pytest.mark.asyncio
+    async def test_versions_continue_after_restart(self):
+        """A new worker continues from the aggregate's history, not from 1"""
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        store = self._make_store(redis_client=redis, snapshot_interval=0)
+        for _ in range(8):
+            await store.append_event(self._make_event(await store.next_version("account_1")))
+        assert await store.create_snapshot("account_1", {"balance": 15}, version=5)
+        
+        # The shared counter is lost as well, so history is the only source
+        await redis.delete("version:account_1")
+        restarted = self._make_store(redis_client=redis, snapshot_interval=0)
+        
+        assert await restarted.next_version("account_1") == 9
+        
+        replayed = []
+        
+        async def on_snapshot(snapshot):
+            pass
+        
+        async def on_event(event):
+            replayed.append(event.metadata.version)
+        
+        await restarted.replay_events("account_1", event_handler=on_event, snapshot_handler=on_snapshot)
+        assert replayed == [6, 7, 8]
+    
+    @pytest.mark.asyncio
+    async def test_workers_share_the_version_counter(self):
+        """Versions are allocated from Redis, so workers never reuse one"""
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        workers = [self._make_store(redis_client=redis) for _ in range(2)]
+        
+        versions = await asyncio.gather(*(
+            workers[i % 2].next_version("account_1") for i in range(10)
+        ))
+        assert sorted(versions) == list(range(1, 11))
+    
+    @pytest.mark.asyncio
+    async def test_version_without_redis_is_seeded_from_database(self):
+        """Without Redis the counter starts from the persisted events"""
+        store = self._make_store()
+        store._get_database_version = AsyncMock(return_value=42)
+        
+        assert await store.next_version("account_1") == 43
+        assert await store.next_version("account_1") == 44
+        store._get_database_version.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_aggregate_versions_are_bounded(self):
+        """Only the most recently used aggregates' versions are cached"""
+        store = self._make_store(max_memory_events=3)
+        
+        for i in range(5):
+            await store.next_version(f"account_{i}")
+        
+        assert list(store.aggregate_versions) == ["account_2", "account_3", "account_4"]
+    
+    @pytest.mark.asyncio
+    async def test_automatic_snapshots_bound_replay(self):
+        """Aggregates with a registered reducer are snapshotted every N events"""
+        store = self._make_store(snapshot_interval=5)
+        store.register_reducer("account", self._apply_deposit)
+        
+        for version in range(1, 8):
+            await store.append_event(self._make_event(version))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        
+        snapshot = await store.get_snapshot("account_1")
+        assert snapshot["version"] == 5
+        assert snapshot["data"] == {"balance": sum(range(1, 6))}
+        
+        for version in range(8, 13):
+            await store.append_event(self._make_event(version))
+        await asyncio.sleep(0.05)
+        
+        # The snapshot folds everything appended before it ran
+        snapshot = await store.get_snapshot("account_1")
+        assert snapshot["version"] == 12
+        assert snapshot["data"] == {"balance": sum(range(1, 13))}
+        
+        await store.append_event(self._make_event(13))
+        state, version = await store.load_aggregate("account_1", self._apply_deposit)
+        assert version == 13
+        assert state == {"balance": sum(range(1, 14))}
+    
+    @pytest.mark.asyncio
+    async def test_stream_falls_back_to_redis_then_database(self):
+        """Events evicted from memory are read from Redis, then the database"""
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        store = self._make_store(redis_client=redis, max_memory_events=3, snapshot_interval=0)
+        
+        for version in range(1, 9):
+            await store.append_event(self._make_event(version))
+        
+        # Memory holds versions 6-8; keep only versions 4-8 in the Redis stream
+        await redis.xtrim("stream:account_1", maxlen=5, approximate=False)
+        
+        database_reads = []
+        
+        async def stream_from_database(aggregate_id, from_version, before_version):
+            database_reads.append((from_version, before_version))
+            for version in range(max(from_version, 1), before_version):
+                yield self._make_event(version)
+        
+        store._stream_from_database = stream_from_database
+        
+        events = await store.replay_events("account_1")
+        assert [event.metadata.version for event in events] == list(range(1, 9))
+        assert database_reads == [(0, 4)]
+        
+        # A replay covered by Redis and memory does not touch the database
+        events = await store.replay_events("account_1", from_version=5)
+        assert [event.metadata.version for event in events] == [5, 6, 7, 8]
+        assert database_reads == [(0, 4)]
+        await redis.aclose()
+
+
+class TestWorkflowDag:
+    """Test dependency-driven parallel workflow execution"""
+    
+    @pytest_asyncio.fixture
+    async def engine_factory(self):
+        engines = []
+        
+        async def create(step_seconds: Dict[str, float], **kwargs):
+            engine = WorkflowEngine(EventBus(EventStore()), **kwargs)
+            engine.peak_running = 0
+            engine.step_log = []
+            
+            async def call_step_handler(handler, step_input):
+                engine.peak_running = max(engine.peak_running, engine.running_steps)
+                engine.step_log.append(handler)
+                await asyncio.sleep(step_seconds.get(handler, 0.01))
+                if handler == "fail":
+                    raise RuntimeError("step failed")
+                return {"handled": handler}
+            
+            engine._call_step_handler = call_step_handler
+            await engine.start()
+            engines.append(engine)
+            return engine
+        
+        yield create
+        
+        for engine in engines:
+            await engine.stop()
+    
+    def _workflow(self, workflow_id: str, dependencies: Dict[str, List[str]], **kwargs) -> WorkflowDefinition:
+        return WorkflowDefinition(
+            workflow_id=workflow_id,
+            name=workflow_id,
+            description="",
+            version="1.0.0",
+            trigger_events=[],
+            steps=[
+                WorkflowStep(step_id=step_id, name=step_id, handler=step_id, depends_on=depends_on)
+                for step_id, depends_on in dependencies.items()
+            ],
+            **kwargs
+        )
+    
+    async def _run(self, engine: WorkflowEngine, workflow_id: str, timeout: float = 2.0):
+        trigger = DomainEvent(
+            name="workflow.manual_trigger",
+            payload={},
+            metadata=EventMetadata(event_id=str(uuid.uuid4()), event_type=EventType.WORKFLOW_EVENT)
+        )
+        execution_id = await engine.start_workflow(workflow_id, trigger)
+        execution = engine.active_executions[execution_id]
+        
+        deadline = time.monotonic() + timeout
+        while execution.status in (WorkflowStatus.PENDING, WorkflowStatus.RUNNING):
+            assert time.monotonic() < deadline, "workflow did not finish"
+            await asyncio.sleep(0.01)
+        return execution
+    
+    @pytest.mark.asyncio
+    async def test_independent_steps_run_concurrently(self, engine_factory):
+        """A diamond finishes in the depth of the graph, not its length"""
+        engine = await engine_factory({"a": 0.1, "b": 0.1, "c": 0.15, "d": 0.1, "e": 0.1})
+        engine.register_workflow(self._workflow(
+            "diamond",
+            {"a": [], "b": ["a"], "c": ["a"], "d": ["a"], "e": ["b", "c", "d"]},
+            parallel_execution=True
+        ))
+        
+        started = time.perf_counter()
+        execution = await self._run(engine, "diamond")
+        elapsed = time.perf_counter() - started
+        
+        assert execution.status == WorkflowStatus.COMPLETED
+        assert elapsed < 0.5
+        assert engine.peak_running == 3
+        assert execution.completed_steps[0] == "a"
+        assert execution.completed_steps[-1] == "e"
+        assert execution.critical_path == ["a", "c", "e"]
+        assert execution.critical_path_ms == pytest.approx(350, abs=60)
+        assert execution.step_timings["e"]["ready_ms"] == execution.step_timings["c"]["finished_ms"]
+    
+    @pytest.mark.asyncio
+    async def test_per_workflow_step_limit(self, engine_factory):
+        """Parallel steps within one execution respect max_parallel_steps"""
+        engine = await engine_factory({})
+        engine.register_workflow(self._workflow(
+            "fan_out", {f"s{i}": [] for i in range(6)}, parallel_execution=True, max_parallel_steps=2
+        ))
+        
+        execution = await self._run(engine, "fan_out")
+        
+        assert execution.status == WorkflowStatus.COMPLETED
+        assert engine.peak_running == 2
+    
+    @pytest.mark.asyncio
+    async def test_global_step_limit(self, engine_factory):
+        """Steps across executions share the engine-wide limit"""
+        engine = await engine_factory({}, max_concurrent_steps=3)
+        engine.register_workflow(self._workflow(
+            "fan_out", {f"s{i}": [] for i in range(4)}, parallel_execution=True
+        ))
+        
+        executions = await asyncio.gather(*(self._run(engine, "fan_out") for _ in range(3)))
+        
+        assert all(execution.status == WorkflowStatus.COMPLETED for execution in executions)
+        assert engine.peak_running == 3
+    
+    @pytest.mark.asyncio
+    async def test_sequential_workflow_respects_dependencies(self, engine_factory):
+        """Without parallel execution, steps run one at a time once their dependencies are done"""
+        engine = await engine_factory({})
+        engine.register_workflow(self._workflow(
+            "ordered", {"report": ["load"], "load": [], "notify": []}
+        ))
+        
+        execution = await self._run(engine, "ordered")
+        
+        assert execution.status == WorkflowStatus.COMPLETED
+        assert engine.peak_running == 1
+        assert engine.step_log == ["load", "report", "notify"]
+    
+    @pytest.mark.asyncio
+    async def test_failed_step_stops_dependents(self, engine_factory):
+        """A failing step fails the execution without running its dependents"""
+        engine = await engine_factory({"slow": 0.05})
+        engine.register_workflow(self._workflow(
+            "failing", {"fail": [], "slow": [], "after": ["fail"]}, parallel_execution=True
+        ))
+        
+        execution = await self._run(engine, "failing")
+        
+        assert execution.status == WorkflowStatus.FAILED
+        assert execution.failed_steps == ["fail"]
+        assert execution.error_message == "step failed"
+        assert "after" not in engine.step_log
+    
+    def test_invalid_graphs_are_rejected(self):
+        """Cycles and unknown dependencies fail at registration"""
+        engine = WorkflowEngine(EventBus(EventStore()))
+        
+        with pytest.raises(ValueError, match="cycle"):
+            engine.register_workflow(self._workflow("cyclic", {"a": ["b"], "b": ["a"]}))
+        
+        with pytest.raises(ValueError, match="unknown step"):
+            engine.register_workflow(self._workflow("dangling", {"a": ["missing"]}))
+        
+        assert engine.workflow_definitions == {}
+
+
 class TestIntegratedCommunication:
     """Test integrated communication service"""
     
@@ -803,6 +1360,275 @@ class TestPerformanceAndReliability:
             await bus.stop()
 
 
+class TestLaneScheduling:
+    """Test consumer pools and weighted fair scheduling across priority lanes"""
+    
+    @pytest.mark.asyncio
+    async def test_weighted_fair_slot_allocation(self):
+        """Saturated lanes receive slots in proportion to their weights"""
+        semaphore = WeightedFairSemaphore(1)
+        order = []
+        
+        async def worker(priority):
+            async with semaphore.slot(priority):
+                order.append(priority)
+                await asyncio.sleep(0)
+        
+        # Hold the only slot so every worker queues up
+        await semaphore.acquire(MessagePriority.NORMAL)
+        tasks = [
+            asyncio.create_task(worker(priority))
+            for priority in (MessagePriority.LOW, MessagePriority.CRITICAL)
+            for _ in range(9)
+        ]
+        await asyncio.sleep(0)
+        semaphore.release()
+        await asyncio.gather(*tasks)
+        
+        # CRITICAL (weight 8) gets eight slots for each LOW (weight 1) slot
+        first_round = order[:9]
+        assert first_round.count(MessagePriority.CRITICAL) == 8
+        assert first_round.count(MessagePriority.LOW) == 1
+        assert semaphore.grants[MessagePriority.LOW] == 9
+    
+    @pytest.mark.asyncio
+    async def test_default_slots_are_fewer_than_lane_consumers(self):
+        """Saturated lanes compete for slots, so their weights take effect"""
+        bus = InterModuleMessageBus(consumers_per_lane=4)
+        
+        assert bus.lane_slots < len(MessagePriority) * bus.consumers_per_lane
+        assert bus.lane_semaphore._value == bus.lane_slots
+        # In-process deliveries keep a pool of their own
+        assert bus.processing_semaphore._value == bus.max_concurrent_messages == 1000
+    
+    @pytest.mark.asyncio
+    async def test_nested_in_process_requests_do_not_wait_for_slots(self):
+        """A handler's own in-process request does not need a second slot"""
+        bus = InterModuleMessageBus(max_concurrent_messages=2)
+        
+        class InnerHandler(MessageHandler):
+            def get_supported_message_types(self):
+                return [MessageType.REQUEST]
+            
+            def get_topics(self):
+                return []
+            
+            async def handle_message(self, message):
+                return {"inner": message.payload["seq"]}
+        
+        class OuterHandler(InnerHandler):
+            async def handle_message(self, message):
+                await asyncio.sleep(0.01)
+                return await bus.send_request(
+                    sender_module="outer_module",
+                    recipient_module="inner_module",
+                    payload=message.payload,
+                    delivery=DeliveryGuarantee.AT_MOST_ONCE
+                )
+        
+        bus.register_handler(InnerHandler(), "inner_module")
+        bus.register_handler(OuterHandler(), "outer_module")
+        
+        # Every slot is held by an outer handler while it makes its request
+        responses = await asyncio.wait_for(asyncio.gather(*[
+            bus.send_request(
+                sender_module="client",
+                recipient_module="outer_module",
+                payload={"seq": i},
+                delivery=DeliveryGuarantee.AT_MOST_ONCE
+            )
+            for i in range(4)
+        ]), timeout=2)
+        
+        assert responses == [{"inner": i} for i in range(4)]
+        assert bus.processing_semaphore._value == 2
+    
+    @pytest.mark.asyncio
+    async def test_lane_consumers_process_concurrently(self):
+        """Messages in one lane are processed by a pool of consumers"""
+        bus = InterModuleMessageBus(consumers_per_lane=4)
+        await bus.start()
+        
+        try:
+            class SlowHandler(MessageHandler):
+                def __init__(self):
+                    self.active = 0
+                    self.peak = 0
+                
+                def get_supported_message_types(self):
+                    return [MessageType.COMMAND]
+                
+                def get_topics(self):
+                    return []
+                
+                async def handle_message(self, message):
+                    self.active += 1
+                    self.peak = max(self.peak, self.active)
+                    await asyncio.sleep(0.05)
+                    self.active -= 1
+            
+            handler = SlowHandler()
+            bus.register_handler(handler, "slow_module")
+            
+            for i in range(8):
+                await bus.send_command("client", "slow_module", "work", {"seq": i})
+            await asyncio.sleep(0.3)
+            
+            assert handler.peak == 4
+            lane = bus.get_metrics()["lanes"]["NORMAL"]
+            assert lane["consumers"] == 4
+            assert lane["processing_latency_ms"]["count"] == 8
+            assert lane["queue_latency_ms"]["count"] == 8
+        finally:
+            await bus.stop()
+
+
+class TestRetryScheduler:
+    """Test delayed retries of failed messages"""
+    
+    def _make_message(self, seq: int) -> Message:
+        metadata = MessageMetadata(message_id=f"msg_{seq}", sender_module="test")
+        return Message(MessageType.EVENT, {"seq": seq}, metadata)
+    
+    @pytest.mark.asyncio
+    async def test_dispatches_in_due_order(self):
+        """Retries are dispatched by due time, not scheduling order"""
+        dispatched = []
+        
+        async def dispatch(message):
+            dispatched.append(message.payload["seq"])
+        
+        scheduler = RetryScheduler(dispatch)
+        task = asyncio.create_task(scheduler.run())
+        
+        try:
+            scheduler.schedule(self._make_message(1), 0.2)
+            scheduler.schedule(self._make_message(2), 0.05)
+            scheduler.schedule(self._make_message(3), 0.1)
+            assert scheduler.backlog == 3
+            
+            await asyncio.sleep(0.4)
+            
+            assert dispatched == [2, 3, 1]
+            stats = scheduler.get_stats()
+            assert stats["backlog"] == 0
+            assert stats["total_dispatched"] == 3
+            assert stats["max_lateness_ms"] >= 0
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    @pytest.mark.asyncio
+    async def test_failed_handler_does_not_stall_lane(self):
+        """A handler waiting out its backoff must not block the priority lane"""
+        bus = InterModuleMessageBus()
+        bus._retry_delay = lambda retry_count: 0.3
+        await bus.start()
+        
+        try:
+            class FlakyHandler(MessageHandler):
+                def __init__(self):
+                    self.processed = []
+                    self.failed_once = False
+                
+                def get_supported_message_types(self):
+                    return [MessageType.COMMAND]
+                
+                def get_topics(self):
+                    return []
+                
+                async def handle_message(self, message):
+                    if message.payload["command"] == "flaky" and not self.failed_once:
+                        self.failed_once = True
+                        raise Exception("Transient failure")
+                    self.processed.append(message.payload["command"])
+            
+            handler = FlakyHandler()
+            bus.register_handler(handler, "flaky_module")
+            
+            await bus.send_command("client", "flaky_module", "flaky", {})
+            await bus.send_command("client", "flaky_module", "steady", {})
+            await asyncio.sleep(0.1)
+            
+            # The second command was processed while the first waits to retry
+            assert handler.processed == ["steady"]
+            assert bus.get_metrics()["retry_scheduler"]["backlog"] == 1
+            
+            await asyncio.sleep(0.4)
+            assert handler.processed == ["steady", "flaky"]
+            assert bus.get_metrics()["retry_scheduler"]["backlog"] == 0
+        finally:
+            await bus.stop()
+
+
+class TestMessageBusMetrics:
+    """Test ring-buffer backed message bus metrics"""
+    
+    def _make_message(self, message_type=MessageType.COMMAND, recipient="orders") -> Message:
+        metadata = MessageMetadata(message_id=str(uuid.uuid4()), sender_module="client", recipient_module=recipient)
+        return Message(message_type, {}, metadata)
+    
+    def test_ring_buffer_wraps_around(self):
+        """Only the most recent samples are retained once the buffer is full"""
+        buffer = RingBuffer(capacity=4)
+        for value in range(10):
+            buffer.append(float(value))
+        
+        assert len(buffer) == 4
+        assert list(buffer.values()) == [6.0, 7.0, 8.0, 9.0]
+        assert buffer.mean() == 7.5
+    
+    def test_ring_buffer_percentiles(self):
+        """Percentiles interpolate over the retained window"""
+        buffer = RingBuffer(capacity=1000)
+        for value in range(1, 101):
+            buffer.append(float(value))
+        
+        percentiles = buffer.percentiles(50, 95, 99)
+        assert percentiles[50] == pytest.approx(50.5)
+        assert percentiles[95] == pytest.approx(95.05)
+        assert percentiles[99] == pytest.approx(99.01)
+        assert RingBuffer(capacity=4).percentiles(50) == {50: 0.0}
+    
+    def test_performance_summary_reports_percentiles(self):
+        """Summary exposes real tail latencies instead of just the mean"""
+        metrics = MessageBusMetrics(max_processing_times=100)
+        message = self._make_message()
+        
+        for _ in range(99):
+            metrics.record_message_sent(message)
+            metrics.record_message_processed(message, 1.0)
+        metrics.record_message_sent(message)
+        metrics.record_message_processed(message, 500.0)
+        
+        summary = metrics.get_performance_summary()
+        assert summary["total_messages_processed"] == 100
+        assert summary["metrics_collected"] == 100
+        assert summary["p50_processing_time_ms"] == 1.0
+        assert summary["p99_processing_time_ms"] > summary["p95_processing_time_ms"]
+        assert summary["average_processing_time_ms"] == pytest.approx(5.99)
+    
+    def test_counters_by_module_and_message_type(self):
+        """Per-module and per-message-type counters are maintained"""
+        metrics = MessageBusMetrics(max_recent_failures=2)
+        command = self._make_message()
+        event = self._make_message(MessageType.EVENT, recipient="billing")
+        
+        metrics.record_message_sent(command)
+        metrics.record_message_sent(event)
+        metrics.record_message_processed(command, 2.0)
+        for attempt in range(3):
+            metrics.record_failure(event, f"error {attempt}")
+        
+        breakdown = metrics.get_breakdown()
+        assert breakdown["by_module"]["sent"] == {"client": 2}
+        assert breakdown["by_module"]["processed"] == {"orders": 1}
+        assert breakdown["by_module"]["failures"] == {"billing": 3}
+        assert breakdown["by_message_type"]["sent"] == {"command": 1, "event": 1}
+        assert breakdown["by_message_type"]["failures"] == {"event": 3}
+        assert [failure["error"] for failure in breakdown["recent_failures"]] == ["error 1", "error 2"]
+
+
 @pytest.mark.asyncio
 async def test_full_integration_scenario():
     """Test complete integration scenario"""
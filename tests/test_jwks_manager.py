@@ -0,0 +1,180 @@
+"""
+Tests for the Auth0 JWKS manager.
+
+Auth0's /.well-known/jwks.json is replaced by a local httpx stub. Concurrent
+fetches are coalesced, the document is refreshed ahead of expiry and for
+unknown key ids, and a failing endpoint falls back to the last good keys.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from unittest.mock import patch
+
+import app.auth.dependencies as dependencies
+from app.auth.dependencies import verify_auth0_token
+from app.auth.jwks import JWKSManager
+from app.core.config import settings
+
+JWKS_URL = "http://jwks.test/.well-known/jwks.json"
+
+
+class StubJWKSEndpoint:
+    """Serves a JWKS document and counts requests"""
+
+    def __init__(self, *kids, delay=0.0):
+        self.kids = list(kids)
+        self.delay = delay
+        self.status_code = 200
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return httpx.Response(self.status_code, json=self.document())
+
+    def document(self):
+        return {"keys": [{"kid": kid, "kty": "RSA", "use": "sig"} for kid in self.kids]}
+
+    @property
+    def transport(self):
+        return httpx.MockTransport(self)
+
+
+def manager_for(endpoint, **kwargs):
+    kwargs.setdefault("ttl_seconds", 3600)
+    kwargs.setdefault("refresh_ahead_seconds", 300)
+    kwargs.setdefault("unknown_kid_interval_seconds", 60)
+    return JWKSManager(url=JWKS_URL, transport=endpoint.transport, **kwargs)
+
+
+class TestJWKSManager:
+    """Fetching, coalescing and fallback"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_fetch(self):
+        endpoint = StubJWKSEndpoint("key-1", delay=0.05)
+        manager = manager_for(endpoint)
+
+        documents = await asyncio.gather(*(manager.get_jwks() for _ in range(20)))
+
+        assert len(endpoint.requests) == 1
+        assert all(document["keys"][0]["kid"] == "key-1" for document in documents)
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_configured_url_is_used(self):
+        endpoint = StubJWKSEndpoint("key-1")
+        manager = JWKSManager(transport=endpoint.transport)
+
+        with patch.object(settings, "AUTH0_JWKS_URL", JWKS_URL):
+            await manager.get_jwks()
+
+        assert str(endpoint.requests[0].url) == JWKS_URL
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_serves_last_good_document(self):
+        endpoint = StubJWKSEndpoint("key-1")
+        manager = manager_for(endpoint, ttl_seconds=0, refresh_ahead_seconds=0, retry_seconds=30)
+        await manager.refresh()
+
+        endpoint.status_code = 503
+        first = await manager.get_jwks()
+        second = await manager.get_jwks()
+
+        assert first["keys"][0]["kid"] == "key-1"
+        assert second is first
+        # The second call is inside the retry backoff and does not refetch
+        assert len(endpoint.requests) == 2
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_no_document_and_failing_endpoint_raises(self):
+        endpoint = StubJWKSEndpoint("key-1")
+        endpoint.status_code = 500
+        manager = manager_for(endpoint)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await manager.get_jwks()
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_refresh_is_rate_limited(self):
+        endpoint = StubJWKSEndpoint("key-1")
+        manager = manager_for(endpoint)
+        await manager.get_jwks()
+
+        endpoint.kids.append("key-2")
+        document = await manager.refresh_for_unknown_kid("key-2")
+        assert [key["kid"] for key in document["keys"]] == ["key-1", "key-2"]
+
+        # Within the interval, further unknown kids are served the current keys
+        await manager.refresh_for_unknown_kid("made-up")
+        await manager.refresh_for_unknown_kid("made-up")
+        assert len(endpoint.requests) == 2
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_ahead_of_expiry(self):
+        endpoint = StubJWKSEndpoint("key-1")
+        manager = manager_for(endpoint, ttl_seconds=1.2, refresh_ahead_seconds=1.0)
+
+        manager.start()
+        await asyncio.sleep(1.5)
+        await manager.stop()
+
+        assert len(endpoint.requests) >= 2
+        assert not manager.is_running
+
+
+@pytest.fixture(scope="module")
+def signing_keys():
+    keys = {}
+    for kid in ("key-1", "key-2"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_jwk = jwk.construct(pem, algorithm="RS256").public_key().to_dict()
+        keys[kid] = (pem, dict(public_jwk, kid=kid, use="sig"))
+    return keys
+
+
+class TestKeyRotation:
+    """Tokens signed with a newly rotated key verify without waiting for the TTL"""
+
+    @pytest.mark.asyncio
+    async def test_rotated_key_is_fetched_on_first_use(self, signing_keys):
+        published = ["key-1"]
+
+        def handler(request):
+            return httpx.Response(200, json={"keys": [signing_keys[kid][1] for kid in published]})
+
+        manager = JWKSManager(url=JWKS_URL, transport=httpx.MockTransport(handler))
+        await manager.get_jwks()
+
+        published.append("key-2")
+        now = int(time.time())
+        token = jwt.encode(
+            {"sub": "auth0|123", "email": "user@example.com", "iss": f"https://{settings.AUTH0_DOMAIN}/",
+             "aud": settings.AUTH0_CLIENT_ID, "iat": now, "exp": now + 600},
+            signing_keys["key-2"][0], algorithm="RS256", headers={"kid": "key-2"},
+        )
+
+        dependencies.auth0_token_cache.clear()
+        with patch.object(dependencies, "jwks_manager", manager), \
+                patch.object(settings, "SKIP_AUTH0_USERINFO_CHECK", True):
+            payload = await verify_auth0_token(token)
+
+        assert payload is not None
+        assert payload["sub"] == "auth0|123"
+        assert manager.fetch_count == 2
+        dependencies.auth0_token_cache.clear()
+        await manager.stop()
@@ -0,0 +1,566 @@
+"""
+Tests for message bus transports.
+
+The Redis Streams transport is exercised against fakeredis so that consumer
+groups, pending-entry reclaim and cross-worker request/response routing can be
+verified without a running Redis server.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from unittest.mock import patch
+
+from app.core.message_bus import (
+    DeliveryGuarantee,
+    InterModuleMessageBus,
+    InMemoryTransport,
+    RedisStreamsTransport,
+    Message,
+    MessageHandler,
+    MessageMetadata,
+    MessagePriority,
+    MessageType,
+)
+
+
+class RecordingHandler(MessageHandler):
+    """Handler that records every message it receives"""
+
+    def __init__(self, name: str, work_seconds: float = 0.0):
+        self.name = name
+        self.work_seconds = work_seconds
+        self.received = []
+
+    def get_supported_message_types(self):
+        return [MessageType.REQUEST, MessageType.COMMAND]
+
+    def get_topics(self):
+        return []
+
+    async def handle_message(self, message: Message):
+        self.received.append(message)
+        if self.work_seconds:
+            await asyncio.sleep(self.work_seconds)
+        return {"handled_by": self.name, "echo": message.payload}
+
+
+def make_command(seq: int, priority: MessagePriority = MessagePriority.NORMAL) -> Message:
+    metadata = MessageMetadata(
+        message_id=str(uuid.uuid4()),
+        sender_module="producer",
+        recipient_module="worker_module",
+        priority=priority
+    )
+    return Message(
+        message_type=MessageType.COMMAND,
+        payload={"command": "process", "data": {"seq": seq}},
+        metadata=metadata
+    )
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+class BlockingFakeRedis(fakeredis.FakeAsyncRedis):
+    """
+    fakeredis returns immediately from XREADGROUP when both COUNT and BLOCK
+    are given, without yielding to the event loop. Emulate the server-side
+    block so idle consumers behave as they would against real Redis.
+    """
+
+    async def xreadgroup(self, *args, block=None, **kwargs):
+        response = await super().xreadgroup(*args, **kwargs)
+        if not response and block:
+            await asyncio.sleep(block / 1000.0)
+            response = await super().xreadgroup(*args, **kwargs)
+        return response
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def make_transport(server, consumer_name: str, **kwargs) -> RedisStreamsTransport:
+    client = BlockingFakeRedis(server=server, decode_responses=True)
+    kwargs.setdefault("block_ms", 20)
+    return RedisStreamsTransport(
+        client,
+        stream_prefix="test_bus",
+        group_name="test_workers",
+        consumer_name=consumer_name,
+        **kwargs
+    )
+
+
+class TestInMemoryTransport:
+    """The in-memory transport keeps the single-process fast path"""
+
+    @pytest.mark.asyncio
+    async def test_publish_and_receive(self):
+        transport = InMemoryTransport()
+        message = make_command(1, MessagePriority.HIGH)
+
+        await transport.publish(message)
+        assert transport.queue_sizes()["HIGH"] == 1
+
+        delivery_tag, received = await transport.receive(MessagePriority.HIGH)
+        assert received is message
+        await transport.ack(MessagePriority.HIGH, delivery_tag)
+
+    @pytest.mark.asyncio
+    async def test_bus_defaults_to_in_memory_transport(self):
+        bus = InterModuleMessageBus()
+        assert isinstance(bus.transport, InMemoryTransport)
+        assert bus.get_metrics()["transport"] == "InMemoryTransport"
+
+    @pytest.mark.asyncio
+    async def test_reply_resolves_local_request(self):
+        bus = InterModuleMessageBus()
+        await bus.transport.start(on_reply=bus._resolve_pending_response)
+        future = asyncio.get_running_loop().create_future()
+        bus.pending_responses["corr-1"] = future
+
+        await bus.transport.publish_reply("local", "corr-1", {"ok": True}, True)
+
+        assert future.result() == {"ok": True}
+
+
+class TestRedisStreamsTransport:
+    """Redis Streams transport behaviour"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_and_ack(self, redis_server):
+        transport = make_transport(redis_server, "worker-1")
+        await transport.start()
+
+        message = make_command(1)
+        await transport.publish(message)
+
+        delivery_tag, received = await transport.receive(MessagePriority.NORMAL)
+        assert received.metadata.message_id == message.metadata.message_id
+        assert received.payload == message.payload
+
+        info = await transport.get_lane_info()
+        assert info["NORMAL"]["pending"] == 1
+
+        await transport.ack(MessagePriority.NORMAL, delivery_tag)
+        info = await transport.get_lane_info()
+        assert info["NORMAL"]["pending"] == 0
+
+        await transport.stop()
+
+    @pytest.mark.asyncio
+    async def test_receive_returns_none_when_idle(self, redis_server):
+        transport = make_transport(redis_server, "worker-1")
+        await transport.start()
+
+        assert await transport.receive(MessagePriority.LOW) is None
+
+    @pytest.mark.asyncio
+    async def test_consumers_share_lane(self, redis_server):
+        first = make_transport(redis_server, "worker-1", batch_size=1)
+        second = make_transport(redis_server, "worker-2", batch_size=1)
+        await first.start()
+        await second.start()
+
+        for seq in range(4):
+            await first.publish(make_command(seq))
+
+        seen = []
+        for transport in (first, second, first, second):
+            delivery_tag, message = await transport.receive(MessagePriority.NORMAL)
+            seen.append(message.payload["data"]["seq"])
+            await transport.ack(MessagePriority.NORMAL, delivery_tag)
+
+        # Each entry is delivered to exactly one consumer in the group
+        assert sorted(seen) == [0, 1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_stale_pending_entries_are_reclaimed(self, redis_server):
+        crashed = make_transport(redis_server, "crashed-worker")
+        survivor = make_transport(
+            redis_server, "survivor", claim_idle_ms=10, claim_interval_seconds=0
+        )
+        await crashed.start()
+        await survivor.start()
+
+        message = make_command(42)
+        await crashed.publish(message)
+
+        # Delivered to the crashed worker but never acknowledged
+        _, delivered = await crashed.receive(MessagePriority.NORMAL)
+        assert delivered.metadata.message_id == message.metadata.message_id
+
+        await asyncio.sleep(0.05)
+
+        delivery_tag, reclaimed = await survivor.receive(MessagePriority.NORMAL)
+        assert reclaimed.metadata.message_id == message.metadata.message_id
+        await survivor.ack(MessagePriority.NORMAL, delivery_tag)
+
+        info = await survivor.get_lane_info()
+        assert info["NORMAL"]["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_own_pending_entries_redelivered_after_restart(self, redis_server):
+        before_restart = make_transport(redis_server, "worker-1")
+        await before_restart.start()
+        await before_restart.publish(make_command(7))
+        await before_restart.receive(MessagePriority.NORMAL)
+
+        after_restart = make_transport(redis_server, "worker-1")
+        await after_restart.start()
+        _, message = await after_restart.receive(MessagePriority.NORMAL)
+        assert message.payload["data"]["seq"] == 7
+
+    @pytest.mark.asyncio
+    async def test_restart_redelivers_pending_entries_to_one_consumer(self, redis_server):
+        before_restart = make_transport(redis_server, "worker-1")
+        await before_restart.start()
+        await before_restart.publish(make_command(7))
+        await before_restart.receive(MessagePriority.NORMAL)
+
+        after_restart = make_transport(redis_server, "worker-1")
+        await after_restart.start()
+        # Every consumer of the lane polls at once after the restart
+        deliveries = await asyncio.gather(*[after_restart.receive(MessagePriority.NORMAL) for _ in range(4)])
+
+        assert [d[1].payload["data"]["seq"] for d in deliveries if d is not None] == [7]
+
+    @pytest.mark.asyncio
+    async def test_restart_recovers_more_pending_entries_than_a_batch(self, redis_server):
+        before_restart = make_transport(redis_server, "worker-1", batch_size=5)
+        await before_restart.start()
+        for seq in range(5):
+            await before_restart.publish(make_command(seq))
+        await before_restart.receive(MessagePriority.NORMAL)
+
+        after_restart = make_transport(redis_server, "worker-1", batch_size=2)
+        await after_restart.start()
+        seen = []
+        while (delivery := await after_restart.receive(MessagePriority.NORMAL)) is not None:
+            seen.append(delivery[1].payload["data"]["seq"])
+            await after_restart.ack(MessagePriority.NORMAL, delivery[0])
+
+        assert seen == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_idle_consumers_are_removed_once_their_entries_are_claimed(self, redis_server):
+        crashed = make_transport(redis_server, "crashed-worker")
+        survivor = make_transport(
+            redis_server, "survivor", claim_idle_ms=10, claim_interval_seconds=0
+        )
+        await crashed.start()
+        await survivor.start()
+        key = survivor.stream_key(MessagePriority.NORMAL)
+
+        await crashed.publish(make_command(42))
+        await crashed.receive(MessagePriority.NORMAL)
+        await asyncio.sleep(0.05)
+
+        # Claimed first, so nothing is lost with the consumer
+        delivery_tag, _ = await survivor.receive(MessagePriority.NORMAL)
+        await survivor.ack(MessagePriority.NORMAL, delivery_tag)
+        consumers = await survivor.redis.xinfo_consumers(key, "test_workers")
+        assert {consumer["name"] for consumer in consumers} == {"crashed-worker", "survivor"}
+
+        assert await survivor.receive(MessagePriority.NORMAL) is None
+        consumers = await survivor.redis.xinfo_consumers(key, "test_workers")
+        assert [consumer["name"] for consumer in consumers] == ["survivor"]
+
+    @pytest.mark.asyncio
+    async def test_transport_consumer_name_is_stable_per_worker(self, redis_server):
+        from app.core import message_bus as message_bus_module
+
+        with patch.object(message_bus_module.settings, "MESSAGE_BUS_TRANSPORT", "redis_streams"), \
+                patch.object(message_bus_module.settings, "MESSAGE_BUS_WORKER_ID", "3"), \
+                patch.object(message_bus_module.socket, "gethostname", return_value="api-1"):
+            transport = message_bus_module.create_message_transport(BlockingFakeRedis(server=redis_server))
+
+        assert transport.consumer_name == "api-1-3"
+
+    @pytest.mark.asyncio
+    async def test_undecodable_entries_are_acked_and_skipped(self, redis_server):
+        transport = make_transport(redis_server, "worker-1")
+        await transport.start()
+
+        await transport.redis.xadd(transport.stream_key(MessagePriority.NORMAL), {"data": "not json"})
+        await transport.publish(make_command(1))
+
+        _, message = await transport.receive(MessagePriority.NORMAL)
+        assert message.payload["data"]["seq"] == 1
+
+
+class TestDeliveryGuarantees:
+    """At-most-once in-process delivery versus durable delivery"""
+
+    @pytest.mark.asyncio
+    async def test_at_most_once_request_skips_serialization(self, redis_server):
+        bus = InterModuleMessageBus(redis_client=BlockingFakeRedis(server=redis_server))
+        handler = RecordingHandler("local")
+        bus.register_handler(handler, "worker_module")
+        await bus.start()
+
+        payload = {"action": "lookup"}
+        try:
+            with patch.object(Message, "to_dict", side_effect=AssertionError("serialized")):
+                response = await bus.send_request(
+                    sender_module="client",
+                    recipient_module="worker_module",
+                    payload=payload,
+                    timeout_seconds=5,
+                    delivery=DeliveryGuarantee.AT_MOST_ONCE
+                )
+
+            assert response["handled_by"] == "local"
+            # The handler received the sender's object, not a copy
+            assert handler.received[0].payload is payload
+            assert handler.received[0].delivery == DeliveryGuarantee.AT_MOST_ONCE
+            assert await bus.storage.redis.keys("message:*") == []
+            assert bus.get_metrics()["total_messages_processed"] == 1
+        finally:
+            await bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_at_most_once_falls_back_to_transport_without_local_handler(self, redis_server):
+        serving_bus = InterModuleMessageBus(transport=make_transport(redis_server, "serving"))
+        serving_bus.register_handler(RecordingHandler("serving"), "worker_module")
+        await serving_bus.start()
+
+        requesting_bus = InterModuleMessageBus(transport=make_transport(redis_server, "requesting"))
+        await requesting_bus.transport.start(on_reply=requesting_bus._resolve_pending_response)
+
+        try:
+            response = await requesting_bus.send_request(
+                sender_module="client",
+                recipient_module="worker_module",
+                payload={"action": "lookup"},
+                timeout_seconds=5,
+                delivery=DeliveryGuarantee.AT_MOST_ONCE
+            )
+            assert response["handled_by"] == "serving"
+        finally:
+            await requesting_bus.transport.stop()
+            await serving_bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_at_most_once_event_delivered_in_process(self):
+        bus = InterModuleMessageBus()
+        received = []
+
+        class TopicHandler(MessageHandler):
+            def get_supported_message_types(self):
+                return [MessageType.EVENT]
+
+            def get_topics(self):
+                return ["orders.created"]
+
+            async def handle_message(self, message):
+                received.append(message)
+
+        bus.register_handler(TopicHandler(), "subscriber")
+        await bus.start()
+
+        try:
+            payload = {"order_id": 1}
+            await bus.publish_event(
+                "publisher", "orders.created", payload,
+                delivery=DeliveryGuarantee.AT_MOST_ONCE
+            )
+            await wait_until(lambda: received)
+
+            assert received[0].payload is payload
+            assert bus.storage.memory_storage == {}
+        finally:
+            await bus.stop()
+
+    @pytest.mark.asyncio
+    @pytest.mark.performance
+    async def test_request_latency_by_delivery_guarantee(self, redis_server):
+        """Benchmark: in-process at-most-once vs durable request round trips"""
+        request_count = 300
+        bus = InterModuleMessageBus(redis_client=BlockingFakeRedis(server=redis_server))
+        bus.register_handler(RecordingHandler("local"), "worker_module")
+        await bus.start()
+
+        payload = {"action": "lookup", "filters": {"market": "manchester", "limit": 50}}
+        latencies = {}
+        try:
+            for delivery in (DeliveryGuarantee.DURABLE, DeliveryGuarantee.AT_MOST_ONCE):
+                start = time.perf_counter()
+                for _ in range(request_count):
+                    await bus.send_request(
+                        sender_module="client",
+                        recipient_module="worker_module",
+                        payload=payload,
+                        timeout_seconds=5,
+                        delivery=delivery
+                    )
+                latencies[delivery] = (time.perf_counter() - start) / request_count * 1_000_000
+        finally:
+            await bus.stop()
+
+        print(
+            f"\nRequest latency: durable {latencies[DeliveryGuarantee.DURABLE]:.0f}us, "
+            f"at-most-once {latencies[DeliveryGuarantee.AT_MOST_ONCE]:.0f}us"
+        )
+        assert latencies[DeliveryGuarantee.AT_MOST_ONCE] < latencies[DeliveryGuarantee.DURABLE]
+
+
+class FlakyHandler(RecordingHandler):
+    """Handler that fails its first ``failures`` messages"""
+
+    def __init__(self, name: str, failures: int = 1):
+        super().__init__(name)
+        self.failures = failures
+
+    async def handle_message(self, message: Message):
+        self.received.append(message)
+        if len(self.received) <= self.failures:
+            raise RuntimeError("temporary failure")
+        return {"handled_by": self.name}
+
+
+class TestDurableRetries:
+    """Failed stream entries stay pending until their retry is re-published"""
+
+    @pytest.mark.asyncio
+    async def test_entry_stays_pending_until_retry_is_published(self, redis_server):
+        bus = InterModuleMessageBus(transport=make_transport(redis_server, "worker-1"))
+        handler = FlakyHandler("worker-1")
+        bus.register_handler(handler, "worker_module")
+        key = bus.transport.stream_key(MessagePriority.NORMAL)
+        await bus.start()
+
+        try:
+            with patch.object(bus, "_retry_delay", return_value=0.2):
+                await bus.transport.publish(make_command(1))
+                await wait_until(lambda: len(handler.received) == 1)
+                await asyncio.sleep(0.05)
+                assert bus.retry_scheduler.backlog == 1
+                assert (await bus.transport.redis.xpending(key, "test_workers"))["pending"] == 1
+
+                await wait_until(lambda: len(handler.received) == 2)
+                await asyncio.sleep(0.05)
+            assert (await bus.transport.redis.xpending(key, "test_workers"))["pending"] == 0
+            assert bus._unacked_retries == {}
+        finally:
+            await bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_retry_survives_a_worker_crash(self, redis_server):
+        crashed_bus = InterModuleMessageBus(transport=make_transport(redis_server, "worker-1"))
+        crashed_bus.register_handler(FlakyHandler("crashed", failures=10), "worker_module")
+        await crashed_bus.start()
+
+        with patch.object(crashed_bus, "_retry_delay", return_value=60):
+            await crashed_bus.transport.publish(make_command(3))
+            await wait_until(lambda: crashed_bus.retry_scheduler.backlog == 1)
+
+        # The worker dies with the retry still waiting in memory
+        for task in crashed_bus.background_tasks:
+            task.cancel()
+        await asyncio.gather(*crashed_bus.background_tasks, return_exceptions=True)
+        await crashed_bus.transport.stop()
+
+        restarted_bus = InterModuleMessageBus(transport=make_transport(redis_server, "worker-1"))
+        handler = RecordingHandler("restarted")
+        restarted_bus.register_handler(handler, "worker_module")
+        await restarted_bus.start()
+        try:
+            await wait_until(lambda: len(handler.received) == 1)
+            assert handler.received[0].payload["data"]["seq"] == 3
+        finally:
+            await restarted_bus.stop()
+
+    def test_retry_delay_stays_below_claim_idle_time(self, redis_server):
+        bus = InterModuleMessageBus(transport=make_transport(redis_server, "worker-1", claim_idle_ms=20000))
+
+        assert bus._retry_delay(2) == 4
+        assert bus._retry_delay(6) == 10
+
+
+class TestDistributedMessageBus:
+    """Message bus instances sharing a Redis Streams transport"""
+
+    @pytest.mark.asyncio
+    async def test_request_served_by_another_worker(self, redis_server):
+        serving_bus = InterModuleMessageBus(transport=make_transport(redis_server, "serving"))
+        handler = RecordingHandler("serving")
+        serving_bus.register_handler(handler, "worker_module")
+        await serving_bus.start()
+
+        # The requesting worker only listens for replies, it does not consume lanes
+        requesting_bus = InterModuleMessageBus(transport=make_transport(redis_server, "requesting"))
+        await requesting_bus.transport.start(on_reply=requesting_bus._resolve_pending_response)
+
+        try:
+            response = await requesting_bus.send_request(
+                sender_module="client",
+                recipient_module="worker_module",
+                payload={"action": "lookup"},
+                timeout_seconds=5
+            )
+            assert response == {"handled_by": "serving", "echo": {"action": "lookup"}}
+            assert len(handler.received) == 1
+        finally:
+            await requesting_bus.transport.stop()
+            await serving_bus.stop()
+
+    @pytest.mark.asyncio
+    @pytest.mark.performance
+    async def test_throughput_across_workers(self, redis_server):
+        """Benchmark: commands are load-balanced across two worker buses"""
+        message_count = 500
+        handlers = [
+            RecordingHandler("worker-a", work_seconds=0.001),
+            RecordingHandler("worker-b", work_seconds=0.001)
+        ]
+        buses = []
+        for handler in handlers:
+            transport = make_transport(redis_server, handler.name, batch_size=8, block_ms=5)
+            bus = InterModuleMessageBus(transport=transport)
+            bus.register_handler(handler, "worker_module")
+            buses.append(bus)
+
+        producer = make_transport(redis_server, "producer")
+        await producer.start()
+
+        for bus in buses:
+            await bus.start()
+
+        try:
+            start = time.perf_counter()
+            for seq in range(message_count):
+                await producer.publish(make_command(seq))
+
+            await wait_until(
+                lambda: sum(len(h.received) for h in handlers) == message_count,
+                timeout=30
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            for bus in buses:
+                await bus.stop()
+
+        seqs = sorted(m.payload["data"]["seq"] for h in handlers for m in h.received)
+        assert seqs == list(range(message_count))
+        assert all(handler.received for handler in handlers)
+
+        throughput = message_count / elapsed
+        print(
+            f"\nRedis Streams transport: {message_count} messages in {elapsed:.3f}s "
+            f"({throughput:.0f} msg/s), split "
+            f"{[len(h.received) for h in handlers]}"
+        )
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any
 
 from app.data.platform_data_layer import PlatformDataLayer
-from app.data.interfaces.base import DataSourceType, QueryParams, DataResponse
+from app.data.interfaces.base import DataSourceType, QueryParams, DataResponse, DataPage
 from app.data.config.data_layer_config import create_test_config
 
 
@@ -523,4 +523,122 @@ class TestPlatformDataLayer:
         # Should not raise exception
         await data_layer.close()
         
-        assert not data_layer._initialized 
\ No newline at end of file
+        assert not data_layer._initialized 
+
+class TestStreamingDataLayer:
+    """Streaming variants of the competitive data queries"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_competitive_intelligence_params(self, test_config):
+        data_layer = PlatformDataLayer(test_config)
+        data_layer.router = MagicMock()
+        data_layer._initialized = True
+        
+        data_layer.stream_competitive_intelligence(
+            "test-org", "manchester", competitors=["vue"], cursor="abc", page_size=100, limit=1000
+        )
+        
+        args, kwargs = data_layer.router.stream_competitive_data.call_args
+        assert args[:2] == ("test-org", "manchester")
+        assert args[2].filters == {"competitors": ["vue"]}
+        assert args[2].limit == 1000
+        assert args[2].offset is None
+        assert kwargs == {"cursor": "abc", "page_size": 100}
+    
+    def test_stream_requires_initialization(self, test_config):
+        data_layer = PlatformDataLayer(test_config)
+        
+        with pytest.raises(RuntimeError, match="not initialized"):
+            data_layer.stream_trending_data("test-org", "manchester")
+
+
+class TestMarketEdgeStreamingEndpoints:
+    """NDJSON streaming endpoints"""
+    
+    @pytest.fixture
+    def data_layer(self):
+        return MagicMock()
+    
+    @pytest.fixture
+    def client(self, data_layer):
+        from types import SimpleNamespace
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.api.api_v1.endpoints import market_edge
+        from app.auth.dependencies import get_current_user
+        
+        app = FastAPI()
+        app.include_router(market_edge.router)
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="user-1", organisation_id="org-1")
+        app.dependency_overrides[market_edge.get_data_layer] = lambda: data_layer
+        return TestClient(app)
+    
+    @staticmethod
+    def pages(*pages, error=None):
+        async def generate():
+            for rows, cursor in pages:
+                yield DataPage(data=rows, source=DataSourceType.SUPABASE, next_cursor=cursor)
+            if error:
+                raise error
+        return generate()
+    
+    def test_streams_pages_as_ndjson(self, client, data_layer):
+        import json
+        from app.data.pagination import encode_cursor, keyset_order
+        
+        data_layer.stream_competitive_intelligence.return_value = self.pages(
+            ([{"id": 1, "date": datetime(2024, 1, 2)}], "next-1"),
+            ([{"id": 2, "date": datetime(2024, 1, 1)}], None)
+        )
+        cursor = encode_cursor({"date": "2024-01-03", "id": 9}, keyset_order(["-date"]))
+        
+        response = client.get(
+            "/market-edge/markets/manchester/competitive-data/stream",
+            params={"competitors": ["vue", "odeon"], "start_date": "2024-01-01", "cursor": cursor, "page_size": 1}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == [
+            {"data": [{"id": 1, "date": "2024-01-02 00:00:00"}], "count": 1, "next_cursor": "next-1"},
+            {"data": [{"id": 2, "date": "2024-01-01 00:00:00"}], "count": 1, "next_cursor": None}
+        ]
+        
+        kwargs = data_layer.stream_competitive_intelligence.call_args.kwargs
+        assert kwargs["org_id"] == "org-1"
+        assert kwargs["market"] == "manchester"
+        assert kwargs["competitors"] == ["vue", "odeon"]
+        assert kwargs["date_range"] == {"start_date": "2024-01-01"}
+        assert kwargs["cursor"] == cursor
+        assert kwargs["page_size"] == 1
+    
+    def test_invalid_cursor_rejected_before_streaming(self, client, data_layer):
+        response = client.get("/market-edge/markets/manchester/trending/stream", params={"cursor": "%%%"})
+        
+        assert response.status_code == 400
+        data_layer.stream_trending_data.assert_not_called()
+    
+    def test_failure_mid_stream_reported_as_last_line(self, client, data_layer):
+        import json
+        
+        data_layer.stream_search_results.return_value = self.pages(
+            ([{"id": 1}], "next-1"),
+            error=ConnectionError("connection reset")
+        )
+        
+        response = client.get("/market-edge/markets/manchester/search/stream", params={"q": "imax"})
+        
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["data"] == [{"id": 1}]
+        assert lines[-1] == {"error": "Data stream interrupted"}
+        assert data_layer.stream_search_results.call_args.kwargs["search_query"] == "imax"
+    
+    def test_data_layer_disabled(self, client):
+        from app.api.api_v1.endpoints import market_edge
+        
+        client.app.dependency_overrides.pop(market_edge.get_data_layer)
+        with patch.object(market_edge.settings, "DATA_LAYER_ENABLED", False):
+            response = client.get("/market-edge/markets/manchester/trending/stream")
+        
+        assert response.status_code == 503
@@ -0,0 +1,469 @@
+"""
+Tests for the shared sliding window counter rate limit engine
+"""
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.rate_limit_config import RateLimitRule, RateLimitType
+from app.services.rate_limit_engine import (
+    WINDOW_KEY_PREFIX,
+    SlidingWindowCounterEngine,
+    WindowLimit,
+    estimate_count,
+)
+from app.services.rate_limit_lease import LeaseConfig, LocalLeaseLimiter
+from app.services.rate_limit_service import SlidingWindowRateLimiter
+from app.services.rate_limiting_service import IndustryType, RateLimitingService
+
+fakeredis = pytest.importorskip("fakeredis")
+# fakeredis needs lupa to run Lua scripts
+pytest.importorskip("lupa")
+
+# Start of a day so minute, hour and day buckets all begin together
+DAY_START = 1_700_006_400.0
+
+
+def fake_redis(**kwargs):
+    """A client on a server of its own; servers are shared by default"""
+    return fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(), **kwargs)
+
+
+@pytest.fixture
+def redis_client():
+    return fake_redis(decode_responses=True)
+
+
+@pytest.fixture
+def engine(redis_client):
+    return SlidingWindowCounterEngine(redis_client)
+
+
+def tenant_windows(key="rate_limit:window:t1:u1", minute=5, hour=8, day=100):
+    return [
+        WindowLimit(key, 60, minute, name="minute"),
+        WindowLimit(key, 3600, hour, name="hour"),
+        WindowLimit(key, 86400, day, name="day"),
+    ]
+
+
+class TestSlidingWindowCounterEngine:
+    """Lua sliding window counter engine"""
+
+    @pytest.mark.asyncio
+    async def test_allows_up_to_limit_then_denies(self, engine):
+        windows = tenant_windows()
+        decisions = [await engine.check(windows, DAY_START + i) for i in range(6)]
+
+        assert [d.allowed for d in decisions] == [True] * 5 + [False]
+        assert [d.windows[0].remaining for d in decisions[:5]] == [4, 3, 2, 1, 0]
+
+        denied = decisions[-1].denied
+        assert denied.window.name == "minute"
+        # Bucket rolls over at +60s, then one of the five must slide out (12s)
+        assert denied.retry_after == 60 - 5 + 12
+
+    @pytest.mark.asyncio
+    async def test_denied_request_is_not_recorded(self, engine, redis_client):
+        windows = tenant_windows(minute=100, hour=3)
+        for i in range(3):
+            assert (await engine.check(windows, DAY_START + i)).allowed
+
+        decision = await engine.check(windows, DAY_START + 3)
+
+        assert not decision.allowed
+        assert decision.denied.window.name == "hour"
+        # The minute window allowed the request but nothing was counted
+        usage = await engine.get_usage(windows[0].key, [60, 3600], DAY_START + 3)
+        assert usage == {60: 3, 3600: 3}
+
+    @pytest.mark.asyncio
+    async def test_previous_bucket_is_weighted_by_overlap(self, engine):
+        window = [WindowLimit("k", 60, 10)]
+        for _ in range(10):
+            await engine.check(window, DAY_START + 50)
+        assert not (await engine.check(window, DAY_START + 59)).allowed
+
+        # 30s into the next bucket half of the previous bucket still counts
+        decision = await engine.check(window, DAY_START + 90)
+
+        assert decision.allowed
+        assert decision.windows[0].count == 6
+        # Two buckets on, the old requests no longer count at all
+        assert await engine.get_usage("k", [60], DAY_START + 130) == {60: 1}
+
+    @pytest.mark.asyncio
+    async def test_memory_per_subject_is_constant(self, engine, redis_client):
+        windows = tenant_windows(minute=10_000, hour=10_000, day=10_000)
+        for i in range(500):
+            await engine.check(windows, DAY_START + i * 0.5)
+
+        assert await redis_client.dbsize() == 1
+        # Bucket number, current and previous count for each of three windows
+        assert await redis_client.hlen(windows[0].key) == 9
+        assert await redis_client.ttl(windows[0].key) == 2 * 86400
+
+    @pytest.mark.asyncio
+    async def test_single_round_trip_per_check(self, engine, redis_client):
+        # The first call loads the script
+        await engine.check(tenant_windows(), DAY_START)
+
+        with patch.object(redis_client, "evalsha", wraps=redis_client.evalsha) as evalsha, \
+                patch.object(redis_client, "pipeline", wraps=redis_client.pipeline) as pipeline:
+            await engine.check(tenant_windows(), DAY_START + 1)
+            await engine.check(tenant_windows(), DAY_START + 2)
+
+        assert evalsha.call_count == 2
+        pipeline.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reloads_script_after_flush(self, engine, redis_client):
+        await engine.check(tenant_windows(), DAY_START)
+        await redis_client.script_flush()
+
+        decision = await engine.check(tenant_windows(), DAY_START + 1)
+
+        assert decision.allowed
+        assert decision.windows[0].count == 2
+
+    @pytest.mark.asyncio
+    async def test_cost_and_multiple_keys(self, engine):
+        windows = [WindowLimit("a", 60, 10), WindowLimit("b", 60, 1000, cost=400)]
+
+        assert (await engine.check(windows, DAY_START)).allowed
+        assert (await engine.check(windows, DAY_START + 1)).allowed
+        decision = await engine.check(windows, DAY_START + 2)
+
+        assert not decision.allowed
+        assert [usage.allowed for usage in decision.windows] == [True, False]
+        assert await engine.get_usage("a", None, DAY_START + 2) == {60: 2}
+
+    def test_estimate_count_with_bytes(self):
+        bucket = int(DAY_START // 60)
+        assert estimate_count([str(bucket).encode(), b"4", b"8"], 60, DAY_START + 15) == 10
+        assert estimate_count([None, None, None], 60, DAY_START) == 0
+
+
+class TestLimitersUseEngine:
+    """Existing limiters delegate to the shared engine"""
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_limiter_checks_all_rules_at_once(self):
+        client = fake_redis()
+        limiter = SlidingWindowRateLimiter(client)
+        per_minute = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 2, timedelta(minutes=1))
+        bandwidth = RateLimitRule(RateLimitType.BANDWIDTH_LIMIT, 1000, timedelta(minutes=1))
+
+        results = [
+            await limiter.check_limits([("rpm", per_minute, 1), ("bw", bandwidth, 300)], DAY_START + i)
+            for i in range(3)
+        ]
+
+        assert [all(r.allowed for r in step) for step in results] == [True, True, False]
+        assert results[2][0].rule_name == "requests_per_minute_2"
+        assert results[2][0].retry_after > 0
+        assert sorted(await client.keys()) == [
+            f"{WINDOW_KEY_PREFIX}bw".encode(), f"{WINDOW_KEY_PREFIX}rpm".encode()
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rate_limiting_service_windows(self, redis_client):
+        service = RateLimitingService("redis://unused")
+        service.redis_client = redis_client
+        limits = service.INDUSTRY_LIMITS[IndustryType.GENERAL]
+
+        result = await service.check_rate_limit("t1", "u1", IndustryType.GENERAL)
+        status = await service.get_rate_limit_status("t1", "u1", IndustryType.GENERAL)
+
+        assert result.allowed
+        assert result.remaining == limits.requests_per_minute + limits.burst_limit - 1
+        assert status["current"] == {"minute": 1, "hour": 1, "day": 1}
+        assert await redis_client.keys() == [f"{WINDOW_KEY_PREFIX}t1:u1"]
+
+        assert await service.reset_rate_limit("t1", "u1", window="minute")
+        status = await service.get_rate_limit_status("t1", "u1", IndustryType.GENERAL)
+        assert status["current"] == {"minute": 0, "hour": 1, "day": 1}
+
+
+class TestLocalLeaseLimiter:
+    """Local token leases in front of the Redis limiter"""
+
+    @pytest.fixture
+    def client(self):
+        return fake_redis()
+
+    def make_leases(self, client, **config):
+        return LocalLeaseLimiter(SlidingWindowRateLimiter(client), LeaseConfig(**config))
+
+    @pytest.mark.asyncio
+    async def test_far_below_limit_admits_locally(self, client):
+        leases = self.make_leases(client, lease_fraction=0.1, max_lease_requests=100)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 1000, timedelta(minutes=1))
+        # Warm the script cache so only real refills are counted
+        await leases.limiter.engine.check([WindowLimit("warmup", 60, 1)], DAY_START)
+
+        with patch.object(client, "evalsha", wraps=client.evalsha) as evalsha:
+            results = [await leases.check_limits([("t1", rule, 1)], DAY_START + i * 0.01) for i in range(50)]
+
+        assert all(r[0].allowed for r in results)
+        assert evalsha.call_count == 1
+        # A tenth of the quota was recorded up front
+        usage = await leases.limiter.engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START + 1)
+        assert usage == {60: 100}
+        assert results[-1][0].remaining == 950
+
+    @pytest.mark.asyncio
+    async def test_workers_never_exceed_cluster_limit(self, client):
+        workers = [self.make_leases(client, lease_fraction=0.5) for _ in range(3)]
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 40, timedelta(minutes=1))
+
+        admitted = 0
+        for i in range(90):
+            worker = workers[i % 3]
+            admitted += (await worker.check_limits([("t1", rule, 1)], DAY_START + i * 0.001))[0].allowed
+
+        # Leased but unspent quota can only make the limit stricter
+        assert admitted <= 40
+        unspent = sum(lease.balance for worker in workers for lease in worker._leases.values())
+        assert admitted + unspent == 40
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refills_of_one_key(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, lease_seconds=0.1)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 10, timedelta(minutes=1))
+        hourly = RateLimitRule(RateLimitType.REQUESTS_PER_HOUR, 1000, timedelta(hours=1))
+
+        admitted = 0
+        for step in range(15):
+            now = DAY_START + step * 0.1
+            results = await asyncio.gather(*[
+                leases.check_limits([("t1", rule, 1), ("t1", hourly, 1)], now) for _ in range(4)
+            ])
+            admitted += sum(all(r.allowed for r in result) for result in results)
+
+        assert admitted == 10
+        # Each unspent unit was given back exactly once
+        await leases.release_expired(DAY_START + 60, release_all=True)
+        usage = await leases.limiter.engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60, 3600], DAY_START + 2)
+        assert usage == {60: 10, 3600: 10}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_slot_refills_release_idle_slots_once(self, client):
+        leases = self.make_leases(client, lease_fraction=0.1, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.CONCURRENT_REQUESTS, 100, timedelta(seconds=1))
+        gauge = f"{WINDOW_KEY_PREFIX}concurrent:global"
+
+        assert (await leases.check_limits([("global", rule, 1)], DAY_START))[0].allowed
+        leases.acquire_concurrent("global")
+        assert int(await client.get(gauge)) == 10
+
+        async def admit():
+            result = (await leases.check_limits([("global", rule, 1)], DAY_START + 2))[0]
+            if result.allowed:
+                leases.acquire_concurrent("global")
+            return result.allowed
+
+        # Both refills find the lease expired with nine idle slots
+        assert await asyncio.gather(admit(), admit()) == [True, True]
+        lease = leases._slots["global"]
+        assert lease.in_use == 3
+        assert int(await client.get(gauge)) == lease.reserved
+
+        await leases.release_expired(DAY_START + 2, release_all=True)
+        assert int(await client.get(gauge)) == 3
+
+    @pytest.mark.asyncio
+    async def test_near_limit_leases_shrink_to_single_requests(self, client):
+        leases = self.make_leases(client, lease_fraction=0.1)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 5, timedelta(minutes=1))
+
+        results = [(await leases.check_limits([("t1", rule, 1)], DAY_START + i))[0] for i in range(6)]
+
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert results[-1].retry_after > 0
+        assert leases.get_stats()["redis_admissions"] == 6
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_refreshed(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 100, timedelta(minutes=1))
+
+        await leases.check_limits([("t1", rule, 1)], DAY_START)
+        await leases.check_limits([("t1", rule, 1)], DAY_START + 0.5)
+        await leases.check_limits([("t1", rule, 1)], DAY_START + 2)
+
+        assert leases.get_stats()["redis_admissions"] == 2
+        # The first lease's 48 unspent units went back with the refill
+        usage = await leases.limiter.engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START + 2)
+        assert usage == {60: 2 + 49}
+        assert leases.get_stats()["units_given_back"] == 48
+
+    @pytest.mark.parametrize("limit,window,requests,interval", [
+        (60, 60, 50, 60 / 50),
+        (100, 60, 80, 60 / 80),
+        (1000, 3600, 300, 3600 / 300),
+    ])
+    @pytest.mark.asyncio
+    async def test_low_rate_clients_get_their_full_limit(self, client, limit, window, requests, interval):
+        leases = self.make_leases(client, lease_fraction=0.1, lease_seconds=1.0)
+        rule_type = RateLimitType.REQUESTS_PER_MINUTE if window == 60 else RateLimitType.REQUESTS_PER_HOUR
+        rule = RateLimitRule(rule_type, limit, timedelta(seconds=window))
+
+        admitted = 0
+        for i in range(requests):
+            admitted += (await leases.check_limits([("t1", rule, 1)], DAY_START + i * interval))[0].allowed
+
+        # Every lease expires before the next request, so none of it is wasted
+        assert admitted == requests
+
+    @pytest.mark.asyncio
+    async def test_expired_leases_are_given_back(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 100, timedelta(minutes=1))
+        engine = leases.limiter.engine
+
+        await leases.check_limits([("t1", rule, 1)], DAY_START)
+        await leases.release_expired(DAY_START + 0.5)
+        assert await engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START + 0.5) == {60: 50}
+
+        await leases.release_expired(DAY_START + 1.5)
+        assert await engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START + 1.5) == {60: 1}
+        assert leases.get_stats()["window_leases"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lease_from_previous_bucket_is_given_back_there(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 100, timedelta(minutes=1))
+        engine = leases.limiter.engine
+
+        await leases.check_limits([("t1", rule, 1)], DAY_START + 59.5)
+        await leases.release_expired(DAY_START + 60.5)
+
+        # 1 unit stays in the previous bucket, weighted by the window overlap
+        assert await engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START + 60.5) == {60: 1}
+
+    @pytest.mark.asyncio
+    async def test_evicted_leases_are_given_back(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, max_leases=1)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 100, timedelta(minutes=1))
+
+        await leases.check_limits([("t1", rule, 1)], DAY_START)
+        await leases.check_limits([("t2", rule, 1)], DAY_START)
+        await leases.release_expired(DAY_START)
+
+        usage = await leases.limiter.engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60], DAY_START)
+        assert usage == {60: 1}
+
+    @pytest.mark.asyncio
+    async def test_stop_gives_back_live_leases(self, client):
+        leases = self.make_leases(client, lease_fraction=0.5, lease_seconds=60.0)
+        rule = RateLimitRule(RateLimitType.REQUESTS_PER_MINUTE, 100, timedelta(minutes=1))
+
+        leases.start()
+        assert leases.is_running
+        await leases.check_limits([("t1", rule, 1)])
+        await leases.stop()
+
+        assert not leases.is_running
+        assert await leases.limiter.engine.get_usage(f"{WINDOW_KEY_PREFIX}t1", [60]) == {60: 1}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_slots_are_reserved_in_batches(self, client):
+        leases = self.make_leases(client, lease_fraction=0.1, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.CONCURRENT_REQUESTS, 100, timedelta(seconds=1))
+        gauge = f"{WINDOW_KEY_PREFIX}concurrent:global"
+
+        for _ in range(5):
+            assert (await leases.check_limits([("global", rule, 1)], DAY_START))[0].allowed
+            leases.acquire_concurrent("global")
+
+        assert int(await client.get(gauge)) == 10
+        assert leases.get_stats()["redis_admissions"] == 0
+
+        for _ in range(4):
+            await leases.release_concurrent("global", DAY_START + 0.5)
+        assert int(await client.get(gauge)) == 10
+
+        # Idle after the lease expired: the reservation goes back to Redis
+        await leases.release_concurrent("global", DAY_START + 2)
+        assert await client.get(gauge) is None
+
+    @pytest.mark.asyncio
+    async def test_idle_concurrency_reservation_is_given_back(self, client):
+        leases = self.make_leases(client, lease_fraction=0.1, lease_seconds=1.0)
+        rule = RateLimitRule(RateLimitType.CONCURRENT_REQUESTS, 100, timedelta(seconds=1))
+        gauge = f"{WINDOW_KEY_PREFIX}concurrent:global"
+
+        for _ in range(2):
+            assert (await leases.check_limits([("global", rule, 1)], DAY_START))[0].allowed
+            leases.acquire_concurrent("global")
+        await leases.release_concurrent("global", DAY_START + 0.5)
+        assert int(await client.get(gauge)) == 10
+
+        # One request is still running: only the idle slots go back
+        await leases.release_expired(DAY_START + 2)
+        assert int(await client.get(gauge)) == 1
+        assert await client.ttl(gauge) > 0
+
+        await leases.release_concurrent("global", DAY_START + 3)
+        assert await client.get(gauge) is None
+
+
+async def zset_rate_limit_check(client, key_base, limits, now):
+    """The per-request ZSET algorithm the limiters used before the engine"""
+    for window, (seconds, limit) in limits.items():
+        key = f"{key_base}:{window}"
+        pipeline = client.pipeline()
+        pipeline.zremrangebyscore(key, 0, now - seconds)
+        pipeline.zcard(key)
+        pipeline.expire(key, seconds + 60)
+        count = (await pipeline.execute())[1]
+        if count >= limit:
+            return False
+
+    pipeline = client.pipeline()
+    for window, (seconds, _) in limits.items():
+        pipeline.zadd(f"{key_base}:{window}", {f"{now}": now})
+        pipeline.expire(f"{key_base}:{window}", seconds * 2)
+    await pipeline.execute()
+    return True
+
+
+class TestRateLimitEngineBenchmark:
+    """Engine against the previous sorted-set implementation"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.performance
+    async def test_engine_against_sorted_sets(self):
+        request_count = 2000
+        limits = {"minute": (60, 10_000), "hour": (3600, 100_000), "day": (86400, 1_000_000)}
+        timings = {}
+        server = fakeredis.FakeServer()
+
+        zset_client = fakeredis.aioredis.FakeRedis(server=server, db=0)
+        start = time.perf_counter()
+        for i in range(request_count):
+            await zset_rate_limit_check(zset_client, "zset:t1:u1", limits, DAY_START + i * 0.01)
+        timings["zset"] = (time.perf_counter() - start) / request_count * 1_000_000
+        zset_members = sum([await zset_client.zcard(f"zset:t1:u1:{window}") for window in limits])
+
+        engine_client = fakeredis.aioredis.FakeRedis(server=server, db=1)
+        engine = SlidingWindowCounterEngine(engine_client)
+        windows = [WindowLimit("t1:u1", seconds, limit, name=name) for name, (seconds, limit) in limits.items()]
+        start = time.perf_counter()
+        for i in range(request_count):
+            await engine.check(windows, DAY_START + i * 0.01)
+        timings["engine"] = (time.perf_counter() - start) / request_count * 1_000_000
+        engine_fields = await engine_client.hlen("t1:u1")
+
+        print(
+            f"\nRate limit check: sorted sets {timings['zset']:.0f}us ({zset_members} members), "
+            f"engine {timings['engine']:.0f}us ({engine_fields} hash fields)"
+        )
+        # Three pipelines per request collapse into one script call, and
+        # state no longer grows with the number of requests in the window
+        assert zset_members == 3 * request_count
+        assert engine_fields == 9
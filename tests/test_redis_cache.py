@@ -1,6 +1,8 @@
 import pytest
+import pytest_asyncio
 import json
 import time
+from datetime import timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from typing import Dict, Any
 
@@ -351,36 +353,90 @@ class TestRedisCacheManager:
             assert stats.get("keyspace_hits", 0) == 0
             assert stats.get("keyspace_misses", 0) == 0
     
-    @pytest.mark.asyncio
-    async def test_invalidate_org_cache(self, cache_config):
-        """Test invalidating cache for organization"""
-        with patch('app.data.cache.redis_cache.redis_manager.create_cache_client') as mock_create_client:
-            mock_client = AsyncMock()
-            mock_create_client.return_value = mock_client
-            
-            # Create async iterator for scan_iter
-            async def async_scan_iter(*args, **kwargs):
-                keys = [
-                    "test_cache:test_org:market1:data1",
-                    "test_cache:test_org:market2:data2",
-                    "test_cache:other_org:market1:data1"
-                ]
-                for key in keys:
-                    yield key
-                    
-            mock_client.scan_iter = async_scan_iter
-            # Mock delete to return the number of deleted keys
-            mock_client.delete.return_value = 2
-            
+    @pytest_asyncio.fixture
+    async def tagged_cache(self, cache_config):
+        """Cache manager backed by an in-memory Redis that refuses keyspace scans"""
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        
+        def no_scan(*args, **kwargs):
+            raise AssertionError("tag invalidation must not scan the keyspace")
+        
+        client.scan_iter = no_scan
+        client.scan = no_scan
+        
+        with patch('app.data.cache.redis_cache.redis_manager.create_cache_client', return_value=client):
             cache_manager = RedisCacheManager(cache_config)
             await cache_manager.initialize()
-            
-            result = await cache_manager.invalidate_org_cache("test_org")
-            
-            # Should delete 2 keys for the org
-            assert result == 2
-            # Verify delete was called once with all matching keys
-            mock_client.delete.assert_called_once()
+        
+        yield cache_manager, client
+        await client.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_tagged_set_registers_key(self, tagged_cache):
+        """Tagged entries are indexed in one set per tag"""
+        cache_manager, client = tagged_cache
+        
+        await cache_manager.set("competitive:abc", {"v": 1}, tags=["org:test_org", "source:competitive_data"])
+        
+        assert await client.zrange("test_cache:tag_index:org:test_org", 0, -1) == ["test_cache:competitive:abc"]
+        assert await client.zrange("test_cache:tag_index:source:competitive_data", 0, -1) == ["test_cache:competitive:abc"]
+        assert 3590 < await client.ttl("test_cache:competitive:abc") <= 3600
+        assert 86390 < await client.ttl("test_cache:tag_index:org:test_org") <= 86400
+    
+    @pytest.mark.asyncio
+    async def test_tag_writes_prune_expired_members(self, tagged_cache):
+        """Keys that have expired are dropped from the tag on the next write"""
+        cache_manager, client = tagged_cache
+        tag_key = "test_cache:tag_index:org:test_org"
+        
+        await cache_manager.set("long", 1, ttl=timedelta(hours=1), tags=["org:test_org"])
+        assert await client.zscore(tag_key, "test_cache:long") == pytest.approx(time.time() + 3600, abs=5)
+        # Left behind by a key that expired two minutes ago
+        await client.zadd(tag_key, {"test_cache:expired": time.time() - 120})
+        
+        await cache_manager.set("other", 2, tags=["org:test_org"])
+        
+        assert set(await client.zrange(tag_key, 0, -1)) == {"test_cache:long", "test_cache:other"}
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_org_cache(self, tagged_cache):
+        """Invalidating an organization deletes only its tagged keys"""
+        cache_manager, client = tagged_cache
+        
+        for index in range(3):
+            await cache_manager.set(
+                f"competitive_data:get_competitive_data:{index}",
+                {"index": index},
+                tags=["source:competitive_data", "org:test_org"]
+            )
+        await cache_manager.set("competitive_data:get_competitive_data:other", {}, tags=["org:other_org"])
+        
+        result = await cache_manager.invalidate_org_cache("test_org")
+        
+        assert result == 3
+        assert await cache_manager.get("competitive_data:get_competitive_data:0") is None
+        assert await cache_manager.get("competitive_data:get_competitive_data:other") == {}
+        assert not await client.exists("test_cache:tag_index:org:test_org")
+        
+        # Nothing left to invalidate
+        assert await cache_manager.invalidate_for_org("test_org") == 0
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_source_and_market(self, tagged_cache):
+        """Source and market tags invalidate independently"""
+        cache_manager, client = tagged_cache
+        
+        await cache_manager.set("a", 1, tags=["source:competitive_data", "market:manchester"])
+        await cache_manager.set("b", 2, tags=["source:competitive_data", "market:leeds"])
+        await cache_manager.set("c", 3, tags=["source:reference_data"])
+        
+        assert await cache_manager.invalidate_for_market("manchester") == 1
+        assert await cache_manager.get("b") == 2
+        
+        # Already-deleted keys left in other tag sets are harmless
+        assert await cache_manager.invalidate_source_cache("competitive_data") == 1
+        assert await cache_manager.get("c") == 3
     
     @pytest.mark.asyncio
     async def test_close(self, cache_config):
@@ -0,0 +1,175 @@
+"""
+Tests for compiled route pattern matching used by rate limits and
+industry route restrictions.
+"""
+
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.rate_limit_config import EndpointLimits, Industry, RateLimitConfig
+from app.core.route_matcher import RoutePatternMatcher, route_template
+from app.middleware.industry_context import IndustryContextMiddleware
+
+
+def scan_matches(path, pattern):
+    """The per-request wildcard scan the matcher replaces"""
+    if pattern.endswith("*"):
+        return path.startswith(pattern[:-1])
+    elif pattern.startswith("*"):
+        return path.endswith(pattern[1:])
+    elif "*" in pattern:
+        parts = pattern.split("*")
+        if len(parts) == 2:
+            return path.startswith(parts[0]) and path.endswith(parts[1])
+    return path == pattern
+
+
+PATTERNS = [
+    "/api/v1/auth/*",
+    "/api/v1/admin/*",
+    "*/upload*",
+    "*/export",
+    "/api/v1/*/reports",
+    "/api/v1/re*orts",
+    "/health",
+    "*",
+]
+
+PATHS = [
+    "/api/v1/auth/login",
+    "/api/v1/auth/",
+    "/api/v1/authx",
+    "/api/v1/admin/users/42",
+    "/health",
+    "/health/",
+    "/api/v1/market-edge/export",
+    "/api/v1/reports",
+    "/api/v1/rexorts",
+    "/api/v1/orgs/7/reports",
+    "*/upload/files",
+    "/api/v1/files/upload",
+    "",
+    "/api/v1/auth/line\nbreak/export",
+]
+
+
+class TestRoutePatternMatcher:
+    """One combined regex per pattern table"""
+
+    def test_matches_same_patterns_as_scan(self):
+        matcher = RoutePatternMatcher([(pattern, pattern) for pattern in PATTERNS])
+
+        for path in PATHS:
+            assert list(matcher.match(path)) == [p for p in PATTERNS if scan_matches(path, p)], path
+
+    def test_route_template(self):
+        assert route_template(f"/api/v1/users/{uuid.uuid4()}/invite") == "/api/v1/users/{id}/invite"
+        assert route_template("/api/v1/organizations/42/users/7") == "/api/v1/organizations/{id}/users/{id}"
+        assert route_template("/api/v1/v2/health") == "/api/v1/v2/health"
+
+    def test_results_memoized_per_route_template(self):
+        matcher = RoutePatternMatcher([("/api/v1/admin/*", "admin"), ("*/invite", "invite")])
+
+        for _ in range(3):
+            assert matcher.match(f"/api/v1/admin/users/{uuid.uuid4()}/invite") == ("admin", "invite")
+
+        info = matcher.cache_info()
+        assert (info.misses, info.hits, info.currsize) == (1, 2, 1)
+
+    def test_templating_disabled_for_identifier_literals(self):
+        """A pattern that compares against identifier text sees the raw path"""
+        matcher = RoutePatternMatcher([("/api/v1/users/42/*", "user-42")])
+
+        assert not matcher.templated
+        assert matcher.match("/api/v1/users/42/profile") == ("user-42",)
+        assert matcher.match("/api/v1/users/43/profile") == ()
+
+
+class TestCompiledRouteTables:
+    """Rate limit and industry restriction lookups"""
+
+    def test_endpoint_limits_by_priority(self):
+        config = RateLimitConfig()
+
+        assert [c.pattern for c in config.get_endpoint_limits("/api/v1/auth/login")] == ["/api/v1/auth/*"]
+        assert [c.pattern for c in config.get_endpoint_limits("/health")] == ["/health"]
+        assert config.get_endpoint_limits("/api/v1/users/12") == []
+
+        class OverlappingConfig(RateLimitConfig):
+            def _initialize_endpoint_configs(self):
+                return [
+                    EndpointLimits(pattern="/api/v1/*", rules=[], priority=10),
+                    EndpointLimits(pattern="/api/v1/admin/*", rules=[], priority=90),
+                ]
+
+        overlapping = OverlappingConfig()
+        assert [c.pattern for c in overlapping.get_endpoint_limits("/api/v1/admin/x")] == [
+            "/api/v1/admin/*", "/api/v1/*"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_industry_restrictions(self):
+        middleware = IndustryContextMiddleware(app=None)
+        context = {"industry_type": Industry.GYM, "feature_flags": {"integration_marketplace": False}}
+
+        def request(method, path):
+            return SimpleNamespace(method=method, url=SimpleNamespace(path=path))
+
+        assert not await middleware._validate_industry_access(request("GET", "/api/v1/inventory/1"), context)
+        assert not await middleware._validate_industry_access(request("POST", "/api/v1/integrations/x"), context)
+        assert await middleware._validate_industry_access(request("PATCH", "/api/v1/inventory/1"), context)
+        assert await middleware._validate_industry_access(request("GET", "/api/v1/room-management/1"), context)
+
+        # One compiled table is reused for every request with the same flags
+        assert len(middleware._restriction_matchers) == 1
+
+
+class TestRouteMatcherBenchmark:
+    """Compiled lookup against the per-request scan over the full route table"""
+
+    @pytest.mark.performance
+    def test_full_route_table(self):
+        from app.api.api_v1.api import api_router
+
+        templates = ["/api/v1" + route.path for route in api_router.routes]
+        # Fresh identifiers every round, so only the template cache can hit
+        paths = [
+            "/".join(str(uuid.uuid4()) if segment.startswith("{") else segment for segment in path.split("/"))
+            for _ in range(20)
+            for path in templates
+        ]
+        endpoint_configs = RateLimitConfig()._endpoint_configs
+        restrictions = IndustryContextMiddleware(app=None)._get_industry_route_restrictions(
+            Industry.GYM, {"api_access": False, "advanced_analytics": False, "multi_location_support": False}
+        )
+        table = [(c.pattern, c.priority) for c in endpoint_configs] + [(r["pattern"], 0) for r in restrictions]
+        table.sort(key=lambda entry: entry[1], reverse=True)
+        matcher = RoutePatternMatcher([(pattern, pattern) for pattern, _ in table])
+
+        def scan(path):
+            matching = [(pattern, priority) for pattern, priority in table if scan_matches(path, pattern)]
+            return [pattern for pattern, _ in sorted(matching, key=lambda entry: entry[1], reverse=True)]
+
+        start = time.perf_counter()
+        scanned = [scan(path) for path in paths]
+        scan_us = (time.perf_counter() - start) / len(paths) * 1e6
+
+        start = time.perf_counter()
+        compiled = [list(matcher.match(path)) for path in paths]
+        compiled_us = (time.perf_counter() - start) / len(paths) * 1e6
+
+        start = time.perf_counter()
+        for path in paths:
+            matcher.match(path)
+        repeat_us = (time.perf_counter() - start) / len(paths) * 1e6
+
+        print(
+            f"\n{len(paths)} lookups over {len(table)} patterns: scan {scan_us:.2f}us, "
+            f"compiled {compiled_us:.2f}us, repeated path {repeat_us:.2f}us"
+        )
+        assert compiled == scanned
+        # One regex match per distinct route template
+        assert matcher.cache_info().misses == len(set(route_template(path) for path in paths))
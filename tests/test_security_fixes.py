@@ -315,43 +315,41 @@ class TestMultiTenantSecurityIsolation:
     @pytest.mark.asyncio
     async def test_database_session_isolation(self):
         """Test database session variables maintain tenant isolation"""
-        # Mock database session for testing RLS policies
+        from app.core.tenant_context import apply_tenant_context, get_tenant_context
+        from app.middleware.tenant_context import TenantContextMiddleware
+        middleware = TenantContextMiddleware(app)
+        
+        # Test tenant context setting maintains isolation
+        tenant_context = {
+            "tenant_id": "550e8400-e29b-41d4-a716-446655440000",
+            "user_role": "viewer",
+            "user_id": "user_123"
+        }
+        
         with patch('app.middleware.tenant_context.get_db') as mock_get_db:
-            mock_db = Mock(spec=Session)
-            # Create proper generator function
-            def mock_db_generator():
-                yield mock_db
-            mock_get_db.return_value = mock_db_generator()
-            # Mock database operations
-            mock_db.execute.return_value = Mock()
-            mock_db.commit.return_value = None
-            
-            from app.middleware.tenant_context import TenantContextMiddleware
-            middleware = TenantContextMiddleware(app)
+            token = middleware._set_database_context(tenant_context)
             
-            # Test tenant context setting maintains isolation
-            tenant_context = {
-                "tenant_id": "550e8400-e29b-41d4-a716-446655440000",
-                "user_role": "viewer",
-                "user_id": "user_123"
-            }
-            
-            await middleware._set_database_context(tenant_context)
-            
-            # Verify session variables are set for RLS
-            expected_calls = [
-                ("SELECT set_config('app.current_tenant_id', :tenant_id, true)", 
-                 {"tenant_id": "550e8400-e29b-41d4-a716-446655440000"}),
-                ("SELECT set_config('app.current_user_role', :user_role, true)", 
-                 {"user_role": "viewer"}),
-                ("SELECT set_config('app.current_user_id', :user_id, true)", 
-                 {"user_id": "user_123"}),
-                ("SELECT set_config('app.allow_cross_tenant', :allow_cross_tenant, true)", 
-                 {"allow_cross_tenant": "false"})
-            ]
-            
-            # Verify execute was called with correct parameters
-            assert mock_db.execute.call_count >= len(expected_calls)
+            # No extra session is opened to set the context
+            mock_get_db.assert_not_called()
+        
+        # The request's own transaction gets every RLS setting in one statement
+        connection = Mock()
+        connection.dialect.name = "postgresql"
+        apply_tenant_context(Mock(spec=Session), Mock(), connection)
+        
+        statement, params = connection.execute.call_args.args
+        assert connection.execute.call_count == 1
+        assert "set_config('app.current_tenant_id', :tenant_id, true)" in str(statement)
+        assert params == {
+            "tenant_id": "550e8400-e29b-41d4-a716-446655440000",
+            "user_role": "viewer",
+            "user_id": "user_123",
+            "industry_type": "",
+            "allow_cross_tenant": "false"
+        }
+        
+        middleware._clear_database_context(token)
+        assert get_tenant_context() is None
 
 
 class TestModuleSystemSecurity:
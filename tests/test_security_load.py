@@ -17,6 +17,7 @@ from app.models.user import User, UserRole
 from app.models.organisation import Organisation, SubscriptionPlan
 from app.auth.jwt import create_access_token
 from app.middleware.tenant_context import TenantContextMiddleware
+from app.core.tenant_context import apply_tenant_context, get_tenant_context
 
 
 class TestSecurityLoadPerformance:
@@ -252,8 +253,8 @@ class TestSecurityLoadPerformance:
             
             # Process many tenant contexts
             for i, context in enumerate(tenant_contexts):
-                asyncio.run(middleware._set_database_context(context))
-                asyncio.run(middleware._clear_database_context())
+                token = middleware._set_database_context(context)
+                middleware._clear_database_context(token)
                 
                 # Sample memory every 100 operations
                 if i % 100 == 0:
@@ -282,39 +283,26 @@ class TestSecurityLoadPerformance:
         error_count = 0
         success_count = 0
         
-        with patch('app.middleware.tenant_context.get_db') as mock_get_db:
-            # Mix successful and failing database operations
-            def mock_db_generator():
-                mock_db = Mock()
-                if error_count < 100:  # First 100 operations fail
-                    mock_db.execute.side_effect = Exception("Database error")
-                else:  # Next operations succeed
-                    mock_db.execute.return_value = None
-                    mock_db.commit.return_value = None
-                mock_db.close.return_value = None
-                return mock_db
+        # Mix rejected and valid tenant contexts
+        for i in range(200):
+            tenant_context = {
+                "tenant_id": uuid.uuid4(),
+                "user_role": "hacker" if i < 100 else "analyst",  # First 100 operations fail
+                "user_id": uuid.uuid4()
+            }
             
-            mock_get_db.return_value = iter([mock_db_generator()])
+            try:
+                token = middleware._set_database_context(tenant_context)
+                success_count += 1
+            except Exception:
+                error_count += 1
+                continue
             
-            # Process many operations with mixed success/failure
-            for i in range(200):
-                tenant_context = {
-                    "tenant_id": uuid.uuid4(),
-                    "user_role": "analyst", 
-                    "user_id": uuid.uuid4()
-                }
-                
-                try:
-                    asyncio.run(middleware._set_database_context(tenant_context))
-                    success_count += 1
-                except Exception:
-                    error_count += 1
-                
-                # Always try to clear context
-                try:
-                    asyncio.run(middleware._clear_database_context())
-                except Exception:
-                    pass
+            # Always clear context
+            middleware._clear_database_context(token)
+        
+        # A rejected context never leaks into later operations
+        assert get_tenant_context() is None
         
         # Should handle errors gracefully without crashing
         assert error_count > 0, "Should have encountered some errors"
@@ -348,39 +336,36 @@ class TestSecurityUnderLoad:
             """Process operations for a specific tenant context."""
             violations = []
             
-            with patch('app.middleware.tenant_context.get_db') as mock_get_db:
-                mock_db = Mock()
-                
-                # Track what tenant context was set
-                set_contexts = []
-                
-                def track_set_config(query, params=None):
-                    if params and 'tenant_id' in params:
-                        set_contexts.append(params['tenant_id'])
-                
-                mock_db.execute.side_effect = track_set_config
-                mock_db.commit.return_value = None
-                mock_db.close.return_value = None
-                mock_get_db.return_value = iter([mock_db])
-                
-                for _ in range(iterations):
-                    try:
-                        asyncio.run(middleware._set_database_context(context))
-                        
-                        # Verify that only the correct tenant ID was set
-                        if set_contexts:
-                            last_set_tenant = set_contexts[-1]
-                            if last_set_tenant != str(context["tenant_id"]):
-                                violations.append({
-                                    "expected": str(context["tenant_id"]),
-                                    "actual": last_set_tenant
-                                })
-                        
-                        asyncio.run(middleware._clear_database_context())
-                        
-                    except Exception as e:
-                        # Errors are OK, but context corruption is not
-                        pass
+            # Track what tenant context was issued by the after_begin hook
+            set_contexts = []
+            connection = Mock()
+            connection.dialect.name = "postgresql"
+            
+            def track_set_config(query, params=None):
+                if params and 'tenant_id' in params:
+                    set_contexts.append(params['tenant_id'])
+            
+            connection.execute.side_effect = track_set_config
+            
+            for _ in range(iterations):
+                try:
+                    token = middleware._set_database_context(context)
+                    apply_tenant_context(Mock(), Mock(), connection)
+                    
+                    # Verify that only the correct tenant ID was set
+                    if set_contexts:
+                        last_set_tenant = set_contexts[-1]
+                        if last_set_tenant != str(context["tenant_id"]):
+                            violations.append({
+                                "expected": str(context["tenant_id"]),
+                                "actual": last_set_tenant
+                            })
+                    
+                    middleware._clear_database_context(token)
+                    
+                except Exception as e:
+                    # Errors are OK, but context corruption is not
+                    pass
             
             return violations
         
@@ -413,37 +398,38 @@ class TestSecurityUnderLoad:
         
         validation_results = []
         
-        with patch('app.middleware.tenant_context.get_db') as mock_get_db:
-            mock_db = Mock()
-            mock_db.commit.return_value = None
-            mock_db.close.return_value = None
-            mock_get_db.return_value = iter([mock_db])
-            
-            # Track role validation
-            def track_role_config(query, params=None):
-                if params and 'user_role' in params:
-                    role = params['user_role']
-                    validation_results.append({
-                        "role": role,
-                        "valid": role in ["admin", "analyst", "viewer"]
-                    })
-            
-            mock_db.execute.side_effect = track_role_config
-            
-            # Test role validation under load
-            for _ in range(100):
-                for role in test_roles:
-                    tenant_context = {
-                        "tenant_id": uuid.uuid4(),
-                        "user_role": role,
-                        "user_id": uuid.uuid4()
-                    }
-                    
-                    try:
-                        asyncio.run(middleware._set_database_context(tenant_context))
-                    except Exception:
-                        # Exceptions are expected for invalid roles
-                        pass
+        # Track the roles issued to the database by the after_begin hook
+        connection = Mock()
+        connection.dialect.name = "postgresql"
+        
+        def track_role_config(query, params=None):
+            if params and 'user_role' in params:
+                role = params['user_role']
+                validation_results.append({
+                    "role": role,
+                    "valid": role in ["admin", "analyst", "viewer"]
+                })
+        
+        connection.execute.side_effect = track_role_config
+        
+        # Test role validation under load
+        for _ in range(100):
+            for role in test_roles:
+                tenant_context = {
+                    "tenant_id": uuid.uuid4(),
+                    "user_role": role,
+                    "user_id": uuid.uuid4()
+                }
+                
+                try:
+                    token = middleware._set_database_context(tenant_context)
+                except Exception:
+                    # Exceptions are expected for invalid roles
+                    continue
+                try:
+                    apply_tenant_context(Mock(), Mock(), connection)
+                finally:
+                    middleware._clear_database_context(token)
         
         # Analyze role validation results
         valid_role_sets = [r for r in validation_results if r["valid"]]
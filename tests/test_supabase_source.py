@@ -3,7 +3,8 @@ from unittest.mock import AsyncMock, MagicMock, patch, Mock
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
-from app.data.sources.supabase_client import SupabaseDataSource
+from app.data.pagination import keyset_order
+from app.data.sources.supabase_client import SupabaseDataSource, _postgrest_keyset_filter
 from app.data.interfaces.base import DataSourceType, QueryParams, DataResponse
 
 
@@ -474,4 +475,23 @@ class TestSupabaseDataSource:
         mock_query.offset.assert_called_once_with(10)
         
         # Verify ordering
-        assert mock_query.order.call_count == 3  # Three order fields 
\ No newline at end of file
+        assert mock_query.order.call_count == 3  # Three order fields
+
+
+class TestPostgrestKeysetFilter:
+    """Seek filters for streamed pages"""
+    
+    def test_ascending_seek_includes_null_sort_values(self):
+        order = keyset_order(["price"])
+        
+        assert _postgrest_keyset_filter(order, [10, 7]) == (
+            'or(price.gt."10",price.is.null),and(price.eq."10",id.gt."7")'
+        )
+        # Only later NULL rows follow a NULL position
+        assert _postgrest_keyset_filter(order, [None, 7]) == 'and(price.is.null,id.gt."7")'
+    
+    def test_descending_seek_after_null_sort_values(self):
+        order = keyset_order(["-price"])
+        
+        assert _postgrest_keyset_filter(order, [10, 7]) == 'price.lt."10",and(price.eq."10",id.lt."7")'
+        assert _postgrest_keyset_filter(order, [None, 7]) == 'price.not.is.null,and(price.is.null,id.lt."7")'
@@ -0,0 +1,150 @@
+"""
+Tests for tenant database context propagation.
+
+The RLS settings are applied from the session's after_begin event on the
+request's own connection; these tests check the hook sees the right
+context, once per transaction, without any extra session.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.core.tenant_context as tenant_context
+from app.core.tenant_context import (
+    NO_TENANT_ID,
+    SET_TENANT_CONTEXT_SQL,
+    TenantDatabaseContext,
+    apply_tenant_context,
+    get_tenant_context,
+    reset_tenant_context,
+    set_tenant_context,
+)
+from app.middleware.tenant_context import SuperAdminContextManager, TenantContextMiddleware
+from app.models.user import UserRole
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest_asyncio.fixture
+async def session_maker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/tenant.db")
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def applied():
+    """Contexts seen by the after_begin hook"""
+    seen = []
+    original = tenant_context.get_tenant_context
+
+    def recording():
+        context = original()
+        seen.append(context)
+        return context
+
+    with patch.object(tenant_context, "get_tenant_context", recording):
+        yield seen
+
+
+def tenant(tenant_id, **overrides):
+    return TenantDatabaseContext(tenant_id=tenant_id, user_role="viewer", user_id=f"user-{tenant_id}", **overrides)
+
+
+class TestTenantContextPropagation:
+    """Contextvar applied on the request's own session"""
+
+    @pytest.mark.asyncio
+    async def test_applied_once_per_transaction(self, session_maker, applied):
+        token = set_tenant_context(tenant("org-1"))
+        try:
+            async with session_maker() as session:
+                await session.execute(text("SELECT 1"))
+                await session.execute(text("SELECT 2"))
+                await session.commit()
+                # Transaction-local settings are gone after commit; the next
+                # transaction gets them again
+                await session.execute(text("SELECT 3"))
+        finally:
+            reset_tenant_context(token)
+
+        assert applied == [tenant("org-1"), tenant("org-1")]
+        assert get_tenant_context() is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_keep_their_own_context(self, session_maker, applied):
+        async def request(tenant_id):
+            token = set_tenant_context(tenant(tenant_id))
+            try:
+                await asyncio.sleep(0)
+                async with session_maker() as session:
+                    await session.execute(text("SELECT 1"))
+            finally:
+                reset_tenant_context(token)
+
+        await asyncio.gather(request("org-1"), request("org-2"))
+
+        assert sorted(context.tenant_id for context in applied) == ["org-1", "org-2"]
+
+    def test_single_statement_on_postgresql(self):
+        connection = Mock()
+        connection.dialect.name = "postgresql"
+
+        apply_tenant_context(Mock(), Mock(), connection)
+        connection.execute.assert_not_called()
+
+        token = set_tenant_context(tenant("org-1", industry_type="cinema"))
+        try:
+            apply_tenant_context(Mock(), Mock(), connection)
+        finally:
+            reset_tenant_context(token)
+
+        connection.execute.assert_called_once_with(SET_TENANT_CONTEXT_SQL, {
+            "tenant_id": "org-1",
+            "user_role": "viewer",
+            "user_id": "user-org-1",
+            "industry_type": "cinema",
+            "allow_cross_tenant": "false",
+        })
+
+    def test_context_without_tenant_sends_castable_tenant_id(self):
+        context = TenantDatabaseContext(tenant_id="", user_role="super_admin", user_id="", allow_cross_tenant=True)
+
+        # current_setting('app.current_tenant_id', true)::uuid must not fail
+        assert context.as_params()["tenant_id"] == NO_TENANT_ID
+        assert str(uuid.UUID(NO_TENANT_ID)) == NO_TENANT_ID
+
+    @pytest.mark.asyncio
+    async def test_middleware_sets_context_without_sessions(self):
+        middleware = TenantContextMiddleware(app=Mock())
+
+        with patch("app.middleware.tenant_context.get_db") as mock_get_db:
+            token = middleware._set_database_context({
+                "tenant_id": "org-1", "user_role": "viewer", "user_id": "user-1",
+                "industry_type": SimpleNamespace(value="gym")
+            })
+            assert get_tenant_context() == TenantDatabaseContext("org-1", "viewer", "user-1", "gym")
+            middleware._clear_database_context(token)
+
+        mock_get_db.assert_not_called()
+        assert get_tenant_context() is None
+
+    @pytest.mark.asyncio
+    async def test_super_admin_cross_tenant_access_is_scoped(self):
+        admin = SimpleNamespace(id="admin-1", role=UserRole.admin)
+        token = set_tenant_context(tenant("org-1"))
+        try:
+            async with SuperAdminContextManager(admin):
+                assert get_tenant_context().allow_cross_tenant is True
+                assert get_tenant_context().tenant_id == "org-1"
+
+            assert get_tenant_context() == tenant("org-1")
+        finally:
+            reset_tenant_context(token)
@@ -20,6 +20,7 @@ from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.models.organisation import Organisation, SubscriptionPlan
 from app.middleware.tenant_context import TenantContextMiddleware, SuperAdminContextManager
+from app.core.tenant_context import get_tenant_context
 from app.auth.jwt import create_access_token, verify_token
 
 
@@ -115,23 +116,20 @@ class TestTenantIsolationWithSecurityFixes:
                 "user_id": tenant1_user.id
             }
             
-            await middleware._set_database_context(tenant_context)
+            token = middleware._set_database_context(tenant_context)
             
-            # Verify database session variables are set for RLS
-            expected_calls = [
-                (text("SELECT set_config('app.current_tenant_id', :tenant_id, true)"),
-                 {"tenant_id": str(tenant1_user.organisation_id)}),
-                (text("SELECT set_config('app.current_user_role', :user_role, true)"),
-                 {"user_role": tenant1_user.role.value}),
-                (text("SELECT set_config('app.current_user_id', :user_id, true)"),
-                 {"user_id": str(tenant1_user.id)}),
-                (text("SELECT set_config('app.allow_cross_tenant', :allow_cross_tenant, true)"),
-                 {"allow_cross_tenant": "false"})
-            ]
+            # Verify the RLS context is carried to the request's own transactions
+            context = get_tenant_context()
+            assert context.tenant_id == str(tenant1_user.organisation_id)
+            assert context.user_role == tenant1_user.role.value
+            assert context.user_id == str(tenant1_user.id)
+            assert context.allow_cross_tenant is False
             
-            # Verify execute was called with tenant isolation parameters
-            assert mock_db.execute.call_count >= 4
-            assert mock_db.commit.called
+            # No extra session is opened to set the context
+            mock_db.execute.assert_not_called()
+            
+            middleware._clear_database_context(token)
+            assert get_tenant_context() is None
     
     def test_cross_tenant_access_prevention(self, tenant1_user, tenant2_user):
         """Test that users cannot access data from other tenants"""
@@ -168,22 +166,14 @@ class TestTenantIsolationWithSecurityFixes:
             await context_manager.__aenter__()
             
             # Verify cross-tenant access is enabled
-            expected_call = (
-                text("SELECT set_config('app.allow_cross_tenant', 'true', true)")
-            )
-            
-            mock_db.execute.assert_called()
-            mock_db.commit.assert_called()
+            assert get_tenant_context().allow_cross_tenant is True
             
             # Test exiting context
             await context_manager.__aexit__(None, None, None)
             
             # Verify cross-tenant access is disabled
-            expected_disable_call = (
-                text("SELECT set_config('app.allow_cross_tenant', 'false', true)")
-            )
-            
-            assert mock_db.execute.call_count >= 2
+            assert get_tenant_context() is None
+            mock_db.execute.assert_not_called()
     
     def test_non_admin_cannot_use_super_admin_context(self, tenant1_user):
         """Test that non-admin users cannot use SuperAdminContextManager"""
@@ -293,17 +283,16 @@ class TestDatabaseRLSWithSecurityFixes:
                 "user_id": str(uuid.uuid4())
             }
             
-            await middleware._set_database_context(tenant_context)
+            token = middleware._set_database_context(tenant_context)
             
-            # Verify RLS session variables are set
-            assert mock_db.execute.called
-            assert mock_db.commit.called
+            # Verify the RLS context is set for the request's transactions
+            assert get_tenant_context().tenant_id == tenant_context["tenant_id"]
             
             # Clear context
-            await middleware._clear_database_context()
+            middleware._clear_database_context(token)
             
             # Verify context is cleared
-            assert mock_db.execute.call_count >= 8  # 4 sets + 4 clears
+            assert get_tenant_context() is None
 
 
 class TestAPIEndpointTenantIsolation:
@@ -0,0 +1,173 @@
+"""
+Tests for the Bloom-filter-fronted token blacklist.
+
+Two TokenBlacklist instances on one fakeredis server stand in for two
+workers: a revocation on one reaches the other's filter over pub/sub, and
+unrevoked tokens are answered from memory without touching Redis.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.bloom_filter import BloomFilter
+from app.services.jwt_service import TokenBlacklist
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def make_blacklist(server) -> TokenBlacklist:
+    return TokenBlacklist(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def expires_in(minutes=30):
+    return datetime.utcnow() + timedelta(minutes=minutes)
+
+
+class TestBloomFilter:
+    """No false negatives, bounded false positives"""
+
+    def test_added_items_are_always_found(self):
+        bloom = BloomFilter(capacity=1000)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        assert all(f"jti-{i}" in bloom for i in range(1000))
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom = BloomFilter(capacity=10000, false_positive_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives / 10000 < 0.02
+
+    def test_from_items_leaves_headroom(self):
+        bloom = BloomFilter.from_items([f"jti-{i}" for i in range(500)], capacity=100)
+
+        assert bloom.capacity == 1000
+        assert not bloom.is_saturated
+
+
+class TestTokenBlacklistFilter:
+    """Revocations shared across workers; misses served from memory"""
+
+    @pytest.mark.asyncio
+    async def test_unrevoked_tokens_skip_redis(self, redis_server):
+        blacklist = make_blacklist(redis_server)
+        blacklist.start()
+        await wait_until(lambda: blacklist.filter_synced)
+
+        blacklist.redis.get = AsyncMock(return_value=None)
+        assert await blacklist.is_blacklisted("never-revoked") is False
+        blacklist.redis.get.assert_not_awaited()
+        await blacklist.stop()
+
+    @pytest.mark.asyncio
+    async def test_unsynced_filter_falls_back_to_redis(self, redis_server):
+        blacklist = make_blacklist(redis_server)
+        await blacklist.redis.setex("blacklist:revoked-elsewhere", 600, "revoked")
+
+        assert await blacklist.is_blacklisted("revoked-elsewhere") is True
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_workers(self, redis_server):
+        worker_a = make_blacklist(redis_server)
+        worker_b = make_blacklist(redis_server)
+        worker_b.start()
+        await wait_until(lambda: worker_b.filter_synced)
+
+        await worker_a.add_token("revoked-jti", expires_in())
+        await wait_until(lambda: worker_b._filter.might_contain("revoked-jti"))
+
+        assert await worker_b.is_blacklisted("revoked-jti") is True
+        await worker_b.stop()
+
+    @pytest.mark.asyncio
+    async def test_existing_revocations_load_on_start(self, redis_server):
+        worker_a = make_blacklist(redis_server)
+        await worker_a.add_token("revoked-before-start", expires_in())
+
+        worker_b = make_blacklist(redis_server)
+        worker_b.start()
+        await wait_until(lambda: worker_b.filter_synced)
+
+        assert await worker_b.is_blacklisted("revoked-before-start") is True
+        await worker_b.stop()
+
+    @pytest.mark.asyncio
+    async def test_rebuild_drops_expired_tokens(self, redis_server):
+        blacklist = make_blacklist(redis_server)
+        await blacklist.add_token("short-lived", expires_in())
+        blacklist.local_blacklist.clear()
+
+        await blacklist.redis.delete("blacklist:short-lived")
+        await blacklist.redis.srem("blacklisted_tokens", "short-lived")
+        await blacklist.rebuild_filter()
+
+        assert not blacklist._filter.might_contain("short-lived")
+
+    @pytest.mark.asyncio
+    async def test_stop_unsyncs_filter(self, redis_server):
+        blacklist = make_blacklist(redis_server)
+        blacklist.start()
+        await wait_until(lambda: blacklist.filter_synced)
+
+        await blacklist.stop()
+
+        assert not blacklist.filter_synced
+        assert not blacklist.is_running
+
+
+class TestApplicationLifecycle:
+    """The app's startup and shutdown hooks run the filter sync"""
+
+    @pytest.mark.asyncio
+    async def test_filter_is_populated_after_startup(self, redis_server, monkeypatch):
+        import app.main as main_module
+        import app.services.jwt_service as jwt_service_module
+        from app.auth.jwks import jwks_manager
+        from app.core.domain_event_partitions import domain_event_partitions
+        from app.core.redis_manager import redis_manager
+        from app.data import platform_data_layer
+
+        client = fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True)
+        await client.sadd("blacklisted_tokens", "revoked-before-startup")
+
+        monkeypatch.setattr(jwt_service_module, "jwt_service", None)
+        monkeypatch.setattr(redis_manager, "get_main_client", AsyncMock(return_value=client))
+        # Background work of other services is not under test
+        monkeypatch.setattr(main_module, "_initialize_startup_safely", AsyncMock())
+        monkeypatch.setattr(main_module.lazy_startup_manager, "graceful_shutdown", AsyncMock())
+        monkeypatch.setattr(jwks_manager, "start", lambda: None)
+        monkeypatch.setattr(jwks_manager, "stop", AsyncMock())
+        monkeypatch.setattr(domain_event_partitions, "start", lambda: None)
+        monkeypatch.setattr(domain_event_partitions, "stop", AsyncMock())
+        monkeypatch.setattr("app.core.module_registry.initialize_module_registry", AsyncMock())
+        monkeypatch.setattr("app.core.database.get_async_db", AsyncMock(side_effect=RuntimeError("no database")))
+        monkeypatch.setattr(platform_data_layer, "close_platform_data_layer", AsyncMock())
+
+        await main_module.startup_event()
+        blacklist = jwt_service_module.get_jwt_service().blacklist
+        try:
+            await wait_until(lambda: blacklist.filter_synced)
+            assert blacklist._filter.might_contain("revoked-before-startup")
+        finally:
+            await main_module.shutdown_event()
+
+        assert not blacklist.is_running
@@ -0,0 +1,195 @@
+"""
+Tests for verified-token caching and pre-parsed JWKS keys.
+
+Repeat requests with the same bearer token reuse its verified claims,
+Auth0 signing keys are constructed once per JWKS document, and tokens are
+routed to the verifier for their issuer.
+"""
+
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+import app.auth.dependencies as dependencies
+import app.auth.jwt as internal_jwt
+from app.auth.dependencies import get_current_user, verify_auth0_token
+from app.auth.jwt import create_access_token, verify_token
+from app.auth.token_cache import VerifiedTokenCache
+from app.core.config import settings
+
+ISSUER = f"https://{settings.AUTH0_DOMAIN}/"
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_jwk = jwk.construct(pem, algorithm="RS256").public_key().to_dict()
+    return pem, {"keys": [dict(public_jwk, kid="key-1", use="sig")]}
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    internal_jwt.verified_token_cache.clear()
+    dependencies.auth0_token_cache.clear()
+    yield
+    internal_jwt.verified_token_cache.clear()
+    dependencies.auth0_token_cache.clear()
+
+
+@pytest.fixture
+def jwks(signing_key):
+    _, document = signing_key
+    with patch.object(dependencies, "get_auth0_jwks", AsyncMock(return_value=document)), \
+            patch.object(settings, "SKIP_AUTH0_USERINFO_CHECK", True):
+        yield document
+
+
+def auth0_token(signing_key, **claims):
+    pem, _ = signing_key
+    now = int(time.time())
+    payload = {
+        "sub": "auth0|123", "email": "user@example.com", "iss": ISSUER,
+        "aud": settings.AUTH0_CLIENT_ID, "iat": now, "exp": now + 600,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, pem, algorithm="RS256", headers={"kid": "key-1"})
+
+
+class TestVerifiedTokenCache:
+    """Bounded TTL cache of verified claims"""
+
+    def test_entries_expire_at_token_exp(self):
+        cache = VerifiedTokenCache(maxsize=10, ttl=60)
+
+        cache.set("long", {"sub": "a", "exp": time.time() + 3600})
+        cache.set("short", {"sub": "b", "exp": time.time() - 1})
+
+        assert cache.get("long") == {"sub": "a", "exp": pytest.approx(time.time() + 3600, abs=5)}
+        assert cache.get("short") is None
+        assert len(cache) == 1
+
+    def test_bounded_lru_of_copies(self):
+        cache = VerifiedTokenCache(maxsize=2, ttl=60)
+        for token in ("a", "b"):
+            cache.set(token, {"sub": token})
+        cache.get("a")["sub"] = "mutated"
+        cache.set("c", {"sub": "c"})
+
+        assert cache.get("a") == {"sub": "a"}
+        assert cache.get("b") is None
+        assert "a" not in cache._entries  # keyed by hash, never the raw token
+
+
+class TestInternalTokenCache:
+    """verify_token reuses claims of a token it verified"""
+
+    def test_repeat_verification_skips_decode(self):
+        token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(minutes=5))
+
+        with patch.object(internal_jwt.jwt, "decode", wraps=jwt.decode) as decode:
+            first = verify_token(token, expected_type="access")
+            second = verify_token(token, expected_type="access")
+            wrong_type = verify_token(token, expected_type="refresh")
+
+        assert decode.call_count == 1
+        assert first == second and first["sub"] == "user-1"
+        assert wrong_type is None
+
+    def test_rejected_tokens_are_not_cached(self):
+        token = create_access_token({"sub": "user-1"})
+        tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+        assert verify_token(tampered) is None
+        assert len(internal_jwt.verified_token_cache) == 0
+
+
+class TestAuth0TokenVerification:
+    """Pre-parsed JWKS keys and a single decode per new token"""
+
+    @pytest.mark.asyncio
+    async def test_keys_constructed_once_per_jwks(self, signing_key, jwks):
+        tokens = [auth0_token(signing_key), auth0_token(signing_key, sub="auth0|456")]
+
+        with patch.object(dependencies.jwk, "construct", wraps=jwk.construct) as construct, \
+                patch.object(dependencies.jwt, "decode", wraps=jwt.decode) as decode:
+            first = await verify_auth0_token(tokens[0])
+            second = await verify_auth0_token(tokens[1])
+
+        assert first["sub"] == "auth0|123" and second["sub"] == "auth0|456"
+        assert construct.call_count == 1
+        assert decode.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_repeat_token_skips_verification(self, signing_key, jwks):
+        token = auth0_token(signing_key, aud=["https://api.example.com", f"{ISSUER}userinfo"])
+
+        with patch.object(dependencies.jwt, "decode", wraps=jwt.decode) as decode:
+            first = await verify_auth0_token(token)
+            second = await verify_auth0_token(token)
+
+        assert first == second and first["aud"][1] == f"{ISSUER}userinfo"
+        # Audience picked from the token's claims: one decode, no retries
+        assert decode.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_foreign_issuer_rejected_before_decode(self, signing_key, jwks):
+        foreign = auth0_token(signing_key, iss="https://evil.example.com/")
+        expired = auth0_token(signing_key, exp=int(time.time()) - 10)
+
+        with patch.object(dependencies.jwt, "decode", wraps=jwt.decode) as decode:
+            assert await verify_auth0_token(foreign) is None
+            assert await verify_auth0_token(expired) is None
+
+        assert decode.call_count == 1
+        assert len(dependencies.auth0_token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_auth0_tokens_skip_internal_verification(self, signing_key):
+        request = SimpleNamespace(url=SimpleNamespace(path="/api/v1/test"), state=SimpleNamespace())
+        credentials = SimpleNamespace(credentials=auth0_token(signing_key))
+
+        with patch.object(dependencies, "verify_token") as internal_verify, \
+                patch.object(dependencies, "verify_auth0_token", AsyncMock(return_value=None)):
+            with pytest.raises(HTTPException):
+                await get_current_user(request=request, credentials=credentials, db=Mock())
+            internal_verify.assert_not_called()
+
+            credentials.credentials = create_access_token({"sub": "user-1"})
+            internal_verify.return_value = None
+            with pytest.raises(HTTPException):
+                await get_current_user(request=request, credentials=credentials, db=Mock())
+            internal_verify.assert_called_once()
+
+
+class TestTokenVerificationBenchmark:
+    """Cold verification against cached claims"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.performance
+    async def test_repeat_requests(self, signing_key, jwks):
+        token = auth0_token(signing_key)
+        rounds = 200
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            dependencies.auth0_token_cache.clear()
+            await verify_auth0_token(token)
+        cold_us = (time.perf_counter() - start) / rounds * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await verify_auth0_token(token)
+        cached_us = (time.perf_counter() - start) / rounds * 1e6
+
+        print(f"\nAuth0 token verification: cold {cold_us:.1f}us, cached {cached_us:.1f}us")
+        assert len(dependencies.auth0_token_cache) == 1